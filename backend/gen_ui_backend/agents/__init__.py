@@ -3,15 +3,26 @@ Módulo de agentes para el sistema multi-agente de Mercadona.
 """
 from gen_ui_backend.agents.state import MultiAgentState
 from gen_ui_backend.agents.agente_clasificador import agente_1_clasificador
-from gen_ui_backend.agents.agente_buscador import agente_2_buscador
+from gen_ui_backend.agents.agente_buscador import (
+    agente_2_buscador,
+    buscar_producto,
+    buscar_producto_async,
+    consolidar_busqueda,
+)
 from gen_ui_backend.agents.agente_calculador import agente_3_calculador
 from gen_ui_backend.agents.nodo_final import nodo_respuesta_final
+from gen_ui_backend.agents.modelos import RegistroModelos, obtener_registro_modelos
 
 __all__ = [
     "MultiAgentState",
     "agente_1_clasificador",
     "agente_2_buscador",
+    "buscar_producto",
+    "buscar_producto_async",
+    "consolidar_busqueda",
     "agente_3_calculador",
     "nodo_respuesta_final",
+    "RegistroModelos",
+    "obtener_registro_modelos",
 ]
 
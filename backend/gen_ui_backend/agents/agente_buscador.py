@@ -3,73 +3,239 @@ Agente 2: Buscador de productos en la API de Mercadona.
 
 Busca cada producto mencionado en la API de Mercadona
 y recopila información de precios y disponibilidad.
+
+Cada producto se busca en su propia rama (`Send`), de modo que las ramas se
+ejecutan a la vez y el tiempo total depende del producto más lento, no de la
+suma. `consolidar_busqueda` reúne los resultados de todas las ramas.
+
+Con el estado de la conversación guardado, los productos ya encontrados en
+turnos anteriores se reutilizan y solo se buscan los nuevos.
 """
-from typing import Literal
+from typing import Any, Dict, List, Literal
 from langchain_core.runnables import RunnableConfig
-from langgraph.types import Command
+from langgraph.types import Command, Send
 
-from gen_ui_backend.agents.state import MultiAgentState
+from gen_ui_backend.agents.state import BusquedaProducto, MultiAgentState
 from gen_ui_backend.tools.buscador_mercadona import buscar_multiples_productos
+from gen_ui_backend.utils.eventos import (
+    EVENTO_BUSQUEDA_COMPLETADA,
+    EVENTO_PRODUCTO,
+    aemitir_evento,
+    emitir_evento,
+)
+from gen_ui_backend.utils.normalizacion import normalizar_nombre
+
+
+NODO_BUSCAR_PRODUCTO = "buscar_producto"
+NODO_CONSOLIDAR_BUSQUEDA = "consolidar_busqueda"
 
 
 def agente_2_buscador(
     state: MultiAgentState,
     config: RunnableConfig  # noqa: ARG001 - Requerido por la interfaz
-) -> Command[Literal["agente_3_calculador", "respuesta_final"]]:
+) -> Command[Literal["buscar_producto", "respuesta_final"]]:
     """
     Agente 2: Buscador de productos en la API de Mercadona.
-    
-    Busca cada producto mencionado en la API de Mercadona
-    y recopila información de precios y disponibilidad.
+
+    Lanza una rama de búsqueda por cada producto mencionado. Las ramas de los
+    productos encontrados en turnos anteriores reciben sus resultados y no buscan.
     """
     print("\n=== AGENTE 2: BUSCADOR ===")
-    
-    productos = state.get("productos_mencionados", [])
+
+    productos = state.get("productos_mencionados") or []
     print(f"Buscando productos: {productos}")
-    
-    # Usar la herramienta de búsqueda múltiple
-    productos_encontrados = []
-    productos_no_encontrados = []
-    
-    try:
-        # Invocar herramienta de búsqueda
-        resultados = buscar_multiples_productos.invoke({"productos": productos})
-        
-        for resultado in resultados:
-            if resultado.get("disponible"):
-                productos_encontrados.append(resultado)
-                print(f"✓ Encontrado: {resultado.get('nombre')} - {resultado.get('precio_unidad')}€")
-            else:
-                productos_no_encontrados.append(resultado.get("nombre"))
-                print(f"✗ No disponible: {resultado.get('nombre')}")
-        
-        # Si encontramos productos, ir al calculador
-        if productos_encontrados:
-            return Command(
-                goto="agente_3_calculador",
-                update={
-                    "productos_encontrados": productos_encontrados,
-                    "productos_no_encontrados": productos_no_encontrados,
-                    "current_agent": "agente_2"
-                }
-            )
-        else:
-            # No encontramos productos
-            return Command(
-                goto="respuesta_final",
-                update={
-                    "final_result": f"❌ Lo siento, no he encontrado ninguno de los productos: {', '.join(productos)}",
-                    "current_agent": "agente_2"
-                }
-            )
-    
-    except Exception as e:
-        print(f"Error en búsqueda: {e}")
+
+    if not productos:
+        return Command(
+            goto="respuesta_final",
+            update={
+                "final_result": "❌ No he identificado productos en tu mensaje. ¿Podrías especificar qué necesitas?",
+                "current_agent": "agente_2"
+            }
+        )
+
+    cantidades = state.get("cantidades") or {}
+    previos = _resultados_previos(state)
+    busquedas: List[BusquedaProducto] = []
+    for producto in productos:
+        busqueda: BusquedaProducto = {"producto": producto, "cantidad": cantidades.get(producto, 1)}
+        if normalizar_nombre(producto) in previos:
+            busqueda["previos"] = previos[normalizar_nombre(producto)]
+        busquedas.append(busqueda)
+    print(f"Reutilizados de turnos anteriores: {sum('previos' in b for b in busquedas)}/{len(busquedas)}")
+
+    return Command(
+        goto=[Send(NODO_BUSCAR_PRODUCTO, busqueda) for busqueda in busquedas],
+        update={
+            # Vaciar los resultados de turnos anteriores antes de que escriban las ramas
+            "productos_encontrados": None,
+            "productos_no_encontrados": None,
+            "errores_busqueda": None,
+            "current_agent": "agente_2"
+        }
+    )
+
+
+def _resultados_previos(state: MultiAgentState) -> Dict[str, List[Dict[str, Any]]]:
+    """Resultados del turno anterior agrupados por el producto buscado (normalizado)."""
+    previos: Dict[str, List[Dict[str, Any]]] = {}
+    for resultado in state.get("productos_encontrados") or []:
+        buscado = normalizar_nombre(resultado.get("producto_buscado"))
+        if buscado:
+            previos.setdefault(buscado, []).append(resultado)
+    return previos
+
+
+def buscar_producto(
+    busqueda: BusquedaProducto,
+    config: RunnableConfig
+) -> Dict[str, Any]:
+    """
+    Rama de búsqueda de un único producto.
+
+    Emite el resultado en cuanto termina, sin esperar al resto de ramas.
+    """
+    producto = busqueda["producto"]
+    if "previos" in busqueda:
+        actualizacion = _resultado_previo(busqueda)
+    else:
+        try:
+            resultados = buscar_multiples_productos.invoke({"productos": [producto]})
+            actualizacion = _resultado_rama(producto, resultados)
+
+        except Exception as e:
+            actualizacion = _error_rama(producto, e)
+
+    emitir_evento(EVENTO_PRODUCTO, _evento_rama(busqueda, actualizacion), config)
+    return actualizacion
+
+
+async def buscar_producto_async(
+    busqueda: BusquedaProducto,
+    config: RunnableConfig
+) -> Dict[str, Any]:
+    """
+    Versión asíncrona de la rama de búsqueda: espera sin bloquear el bucle
+    de eventos cuando el grafo se ejecuta con `ainvoke`/`astream_events`.
+    """
+    producto = busqueda["producto"]
+    if "previos" in busqueda:
+        actualizacion = _resultado_previo(busqueda)
+    else:
+        try:
+            resultados = await buscar_multiples_productos.ainvoke({"productos": [producto]})
+            actualizacion = _resultado_rama(producto, resultados)
+
+        except Exception as e:
+            actualizacion = _error_rama(producto, e)
+
+    await aemitir_evento(EVENTO_PRODUCTO, _evento_rama(busqueda, actualizacion), config)
+    return actualizacion
+
+
+def _resultado_rama(producto: str, resultados: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convierte los resultados de una rama en la actualización del estado."""
+    encontrados = [r for r in resultados if r.get("disponible")]
+    for resultado in encontrados:
+        print(f"✓ Encontrado: {resultado.get('nombre')} - {resultado.get('precio_unidad')}€")
+
+    no_encontrados = [r.get("nombre") for r in resultados if not r.get("disponible")]
+    if not encontrados and not no_encontrados:
+        no_encontrados = [producto]
+    for nombre in no_encontrados:
+        print(f"✗ No disponible: {nombre}")
+
+    return {
+        "productos_encontrados": encontrados,
+        "productos_no_encontrados": no_encontrados,
+    }
+
+
+def _resultado_previo(busqueda: BusquedaProducto) -> Dict[str, Any]:
+    """Actualización de una rama con los resultados de un turno anterior."""
+    print(f"♻️  Reutilizado de un turno anterior: {busqueda['producto']}")
+    return {"productos_encontrados": list(busqueda["previos"]), "productos_no_encontrados": []}
+
+
+def _error_rama(producto: str, e: Exception) -> Dict[str, Any]:
+    print(f"Error en búsqueda de '{producto}': {e}")
+    return {
+        "productos_no_encontrados": [producto],
+        "errores_busqueda": [str(e)],
+    }
+
+
+def _evento_rama(busqueda: BusquedaProducto, actualizacion: Dict[str, Any]) -> Dict[str, Any]:
+    """Datos del evento de progreso de una rama."""
+    cantidad = busqueda.get("cantidad", 1)
+    encontrados = actualizacion.get("productos_encontrados") or []
+    evento: Dict[str, Any] = {
+        "producto": busqueda["producto"],
+        "cantidad": cantidad,
+        "encontrado": bool(encontrados),
+        "reutilizado": "previos" in busqueda,
+    }
+    if encontrados:
+        resultado = encontrados[0]
+        try:
+            precio = float(resultado.get("precio_unidad", 0.0))
+        except (TypeError, ValueError):
+            precio = 0.0
+        evento.update({
+            "id": resultado.get("id", ""),
+            "nombre": resultado.get("nombre", ""),
+            "packaging": resultado.get("packaging", ""),
+            "precio_unidad": precio,
+            "precio_total": round(precio * cantidad, 2),
+        })
+    if actualizacion.get("errores_busqueda"):
+        evento["error"] = actualizacion["errores_busqueda"][0]
+    return evento
+
+
+def consolidar_busqueda(
+    state: MultiAgentState,
+    config: RunnableConfig
+) -> Command[Literal["agente_3_calculador", "respuesta_final"]]:
+    """
+    Reúne los resultados de todas las ramas y decide el siguiente agente.
+
+    LangGraph aplica las escrituras de las ramas en el orden de los `Send`, así
+    que los productos quedan en el orden en que los mencionó el usuario aunque
+    las ramas terminen en otro orden.
+    """
+    productos = state.get("productos_mencionados") or []
+    productos_encontrados = state.get("productos_encontrados") or []
+    productos_no_encontrados = state.get("productos_no_encontrados") or []
+    errores = state.get("errores_busqueda") or []
+    print(f"Búsqueda consolidada: {len(productos_encontrados)} encontrados, "
+          f"{len(productos_no_encontrados)} no disponibles")
+    emitir_evento(EVENTO_BUSQUEDA_COMPLETADA, {
+        "encontrados": len(productos_encontrados),
+        "no_encontrados": productos_no_encontrados,
+    }, config)
+
+    # Si encontramos productos, ir al calculador
+    if productos_encontrados:
+        return Command(
+            goto="agente_3_calculador",
+            update={"current_agent": "agente_2"}
+        )
+
+    # Sin productos: informar del error si todas las ramas fallaron
+    if errores:
         return Command(
             goto="respuesta_final",
             update={
-                "final_result": f"❌ Ha ocurrido un error al buscar los productos: {str(e)}",
+                "final_result": f"❌ Ha ocurrido un error al buscar los productos: {errores[0]}",
                 "current_agent": "agente_2"
             }
         )
 
+    return Command(
+        goto="respuesta_final",
+        update={
+            "final_result": f"❌ Lo siento, no he encontrado ninguno de los productos: {', '.join(productos)}",
+            "current_agent": "agente_2"
+        }
+    )
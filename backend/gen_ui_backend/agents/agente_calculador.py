@@ -3,19 +3,26 @@ Agente 3: Calculador de precios y generador del ticket de compra.
 
 Calcula el precio total de los productos encontrados y
 genera un ticket de compra formateado.
+
+Las líneas viven en un `Carrito` guardado en el estado: en cada turno solo se
+recalculan y se vuelven a formatear las líneas que han cambiado. El ticket se
+guarda en el almacén de tickets solo si el carrito ha cambiado, y sus archivos
+descargables se generan cuando se piden.
 """
-from typing import Literal
+from typing import Any, Dict, Literal
 from langchain_core.runnables import RunnableConfig
 from langgraph.types import Command
 
 from gen_ui_backend.agents.state import MultiAgentState
-from gen_ui_backend.tools.calculador_ticket import calcular_precio_total, generar_ticket_compra
-from gen_ui_backend.tools.generador_archivos import generar_archivos_ticket
+from gen_ui_backend.tools.generador_archivos import programar_archivos_ticket
+from gen_ui_backend.utils.carrito import Carrito
+from gen_ui_backend.utils.plantillas_ticket import TABLA_MARKDOWN, TICKET, resumen_ticket
+from gen_ui_backend.utils.eventos import EVENTO_LINEA_TICKET, EVENTO_TOTAL, emitir_evento
 
 
 def agente_3_calculador(
     state: MultiAgentState,
-    config: RunnableConfig  # noqa: ARG001 - Requerido por la interfaz
+    config: RunnableConfig
 ) -> Command[Literal["respuesta_final"]]:
     """
     Agente 3: Calculador de precios y generador del ticket de compra.
@@ -33,49 +40,35 @@ def agente_3_calculador(
     print(f"Calculando precios para {len(productos)} productos")
     
     try:
-        # Calcular precios
-        precio_info = calcular_precio_total.invoke({
-            "productos": productos,
-            "cantidades": cantidades
-        })
+        # Actualizar el carrito del turno anterior con los productos de este
+        carrito = Carrito(state.get("carrito"))
+        cambios = carrito.sincronizar(productos, cantidades)
+        precio_info = carrito.precio_info()
         
+        print(f"Carrito: {cambios} líneas cambiadas de {len(carrito)}")
         print(f"Total calculado: {precio_info.get('total')}€")
+        _emitir_progreso(precio_info, config)
         
-        # Generar ticket
-        ticket = generar_ticket_compra.invoke({
-            "productos": productos,
-            "cantidades": cantidades,
-            "precio_info": precio_info
-        })
+        # Generar ticket (solo se formatean las líneas nuevas o cambiadas)
+        resumen = resumen_ticket(precio_info)
+        ticket = TICKET.renderizar(resumen, lineas=carrito.fragmentos(TICKET.nombre, TICKET.linea))
         
         print("Ticket generado exitosamente")
         
-        # Generar archivos descargables
-        archivos_info = generar_archivos_ticket.invoke({
-            "productos": productos,
-            "cantidades": cantidades,
-            "precio_info": precio_info
-        })
-        
-        print("Archivos descargables generados exitosamente")
+        # Guardar el ticket si el carrito ha cambiado desde el último (los archivos se generan al descargarlos)
+        archivos_info = state.get("archivos_generados") or {}
+        if archivos_info.get("version_carrito") != carrito.version or not archivos_info.get("success"):
+            archivos_info = {
+                **programar_archivos_ticket(precio_info),
+                "version_carrito": carrito.version
+            }
+        else:
+            print("Carrito sin cambios: se reutilizan los archivos descargables")
         
         # Preparar tabla de productos para el mensaje
-        items = precio_info.get("items", [])
-        tabla_productos = "\n\n📦 **LISTA DE LA COMPRA**\n\n"
-        tabla_productos += "| Nº | Producto | Cantidad | Precio Unit. | Precio Total |\n"
-        tabla_productos += "|---|---|---|---|---|\n"
-        
-        for i, item in enumerate(items, 1):
-            nombre = item.get("nombre", "")
-            cantidad = item.get("cantidad", 0)
-            precio_unitario = item.get("precio_unitario", 0.0)
-            precio_total = item.get("precio_total", 0.0)
-            
-            # Truncar nombre si es muy largo
-            if len(nombre) > 35:
-                nombre = nombre[:32] + "..."
-            
-            tabla_productos += f"| {i} | {nombre} | {cantidad} | {precio_unitario:.2f}€ | **{precio_total:.2f}€** |\n"
+        tabla_productos = TABLA_MARKDOWN.renderizar(
+            resumen, lineas=carrito.fragmentos(TABLA_MARKDOWN.nombre, TABLA_MARKDOWN.linea)
+        )
         
         # Preparar mensaje consolidado con información de los 3 agentes
         mensaje_consolidado = f"""🔄 **PROCESO COMPLETADO**
@@ -117,7 +110,7 @@ def agente_3_calculador(
 
 📥 **ARCHIVOS DESCARGABLES**
 
-Los archivos del ticket han sido generados y están listos para descargar:
+Los archivos del ticket están listos para descargar:
 
 - 📄 **JSON**: `{archivos_info.get('json_path', 'N/A')}`
 - 📝 **TXT**: `{archivos_info.get('txt_path', 'N/A')}`
@@ -131,6 +124,7 @@ Los archivos del ticket han sido generados y están listos para descargar:
         return Command(
             goto="respuesta_final",
             update={
+                "carrito": carrito.a_estado(),
                 "precio_info": precio_info,
                 "ticket": ticket,
                 "archivos_generados": archivos_info,
@@ -150,3 +144,23 @@ Los archivos del ticket han sido generados y están listos para descargar:
             }
         )
 
+
+def _emitir_progreso(precio_info: Dict[str, Any], config: RunnableConfig) -> None:
+    """Emite cada línea del ticket con el subtotal acumulado y después el total."""
+    subtotal = 0.0
+    for i, item in enumerate(precio_info.get("items", []), 1):
+        subtotal += item.get("precio_total", 0.0)
+        emitir_evento(EVENTO_LINEA_TICKET, {
+            "linea": i,
+            "nombre": item.get("nombre", ""),
+            "cantidad": item.get("cantidad", 0),
+            "precio_unitario": item.get("precio_unitario", 0.0),
+            "precio_total": item.get("precio_total", 0.0),
+            "subtotal": round(subtotal, 2),
+        }, config)
+    emitir_evento(EVENTO_TOTAL, {
+        "subtotal": precio_info.get("subtotal", 0.0),
+        "descuentos": precio_info.get("descuentos", 0.0),
+        "total": precio_info.get("total", 0.0),
+        "num_productos": precio_info.get("num_productos", 0),
+    }, config)
@@ -5,53 +5,60 @@ Analiza el mensaje del usuario para:
 - Clasificar la intención (compra, consulta, etc.)
 - Extraer productos mencionados
 - Detectar cantidades
+
+Primero prueba el clasificador local (`clasificar_intencion`) y solo recurre
+al LLM cuando la confianza es baja o aparecen productos desconocidos.
+
+Con el estado de la conversación guardado (ver `utils/checkpointer.py`), un
+mensaje que amplía la compra ("añade también huevos") se suma a los productos
+y cantidades del turno anterior.
 """
-from typing import Literal
-from langchain_core.messages import AIMessage
+import dataclasses
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Literal, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import Runnable, RunnableConfig
 from langgraph.types import Command
 
+from gen_ui_backend.agents.modelos import NODO_CLASIFICADOR, obtener_registro_modelos
 from gen_ui_backend.agents.state import MultiAgentState
 from gen_ui_backend.tools.clasificador_intencion import clasificar_intencion
+from gen_ui_backend.utils.cache_clasificacion import obtener_cache_clasificacion
+from gen_ui_backend.utils.eventos import EVENTO_CLASIFICACION, emitir_evento
+from gen_ui_backend.utils.normalizacion import normalizar_nombre
 
 
-def agente_1_clasificador(
-    state: MultiAgentState, 
-    config: RunnableConfig
-) -> Command[Literal["agente_2_buscador", "respuesta_final"]]:
-    """
-    Agente 1: Clasificador de intención y productos.
-    
-    Analiza el mensaje del usuario para:
-    - Clasificar la intención (compra, consulta, etc.)
-    - Extraer productos mencionados
-    - Detectar cantidades
-    """
-    print("\n=== AGENTE 1: CLASIFICADOR ===")
-    
-    # Compatibilidad: convertir 'input' a 'messages' si es necesario
-    messages = state.get("messages")
-    if not messages and "input" in state:
-        messages = state["input"]
-    
-    if not messages:
-        return Command(
-            goto="respuesta_final",
-            update={
-                "final_result": "❌ No se recibieron mensajes",
-                "current_agent": "agente_1"
-            }
-        )
-    
-    model = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.1)
-    
-    # Preparar el prompt para el clasificador
-    prompt = ChatPromptTemplate.from_messages([
-        (
-            "system",
-            """Eres un asistente especializado en clasificar intenciones de compra y detectar cantidades exactas.
+# Umbrales de escalado al LLM
+UMBRAL_CONFIANZA = float(os.getenv("MERCADONA_UMBRAL_CONFIANZA", 0.3))
+MAX_PRODUCTOS_DESCONOCIDOS = int(os.getenv("MERCADONA_MAX_PRODUCTOS_DESCONOCIDOS", 0))
+
+# Palabras (normalizadas) con las que el usuario amplía la compra del turno anterior
+PALABRAS_AMPLIACION = frozenset({"anade", "anadir", "agrega", "agregar", "tambien", "ademas"})
+
+# "más" solo amplía junto a una cantidad ("2 más de pan", "otro más") o al empezar
+# el mensaje ("más huevos", "y más pan"), nunca en comparativos ("la más barata")
+_CANTIDADES_MAS = r"\d+|un|una|uno|unos|unas|dos|tres|cuatro|cinco|seis|siete|ocho|nueve|diez|otro|otra|otros|otras"
+_COMPARATIVOS = (r"barat[oa]s?|car[oa]s?|grandes?|pequen[oa]s?|economic[oa]s?|fresc[oa]s?"
+                 r"|buen[oa]s?|san[oa]s?|vendid[oa]s?|popular(?:es)?")
+_PATRON_MAS = re.compile(rf"\b(?:{_CANTIDADES_MAS})\s+mas\b|^(?:y\s+)?mas\s+(?!(?:{_COMPARATIVOS})\b)\w")
+
+RUTA_RAPIDA = "rapida"
+RUTA_CACHE = "cache"
+RUTA_LLM = "llm"
+
+# Veces que se toma cada ruta y motivos de escalado
+contador_rutas: Counter = Counter()
+contador_escalados: Counter = Counter()
+
+# Prompt para el clasificador (se construye una sola vez al importar)
+PROMPT_CLASIFICADOR = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        """Eres un asistente especializado en clasificar intenciones de compra y detectar cantidades exactas.
 
 Tu trabajo es:
 1. Identificar si el usuario quiere comprar productos
@@ -80,17 +87,216 @@ Responde en formato JSON con:
 - intencion: "compra" o "consulta"
 - productos: lista de nombres de productos
 - cantidades: diccionario con producto -> cantidad (número entero)"""
-        ),
-        MessagesPlaceholder("messages")
-    ])
+    ),
+    MessagesPlaceholder("messages")
+])
+
+
+def metricas_enrutado() -> Dict[str, Any]:
+    """Devuelve cuántas veces se ha tomado cada ruta y por qué se escaló al LLM."""
+    total = sum(contador_rutas.values())
+    cache = obtener_cache_clasificacion()
+    return {
+        "rutas": dict(contador_rutas),
+        "escalados": dict(contador_escalados),
+        "proporcion_rapida": round(contador_rutas[RUTA_RAPIDA] / total, 3) if total else 0.0,
+        "umbral_confianza": UMBRAL_CONFIANZA,
+        "max_productos_desconocidos": MAX_PRODUCTOS_DESCONOCIDOS,
+        "cache": cache.metricas() if cache is not None else None,
+    }
+
+
+def motivo_escalado(clasificacion: Dict[str, Any]) -> Optional[str]:
+    """
+    Decide si la clasificación local basta o hay que preguntar al LLM.
+
+    Returns:
+        None si la clasificación local es suficiente; si no, el motivo del escalado
+    """
+    if clasificacion.get("error"):
+        return "error"
+    if not clasificacion.get("productos"):
+        return "sin_productos"
+    if len(clasificacion.get("productos_desconocidos", [])) > MAX_PRODUCTOS_DESCONOCIDOS:
+        return "productos_desconocidos"
+    if clasificacion.get("confianza", 0.0) < UMBRAL_CONFIANZA:
+        return "confianza_baja"
+    return None
+
+
+def _ultimo_texto_usuario(messages: List[BaseMessage]) -> Optional[str]:
+    """Devuelve el texto del último mensaje del usuario, si lo hay."""
+    for mensaje in reversed(messages):
+        if getattr(mensaje, "type", None) == "human" and isinstance(mensaje.content, str):
+            return mensaje.content
+    return None
+
+
+def crear_cadena_clasificador(modelo: BaseChatModel) -> Runnable:
+    """Crea la cadena prompt → modelo con `clasificar_intencion` vinculada."""
+    return PROMPT_CLASIFICADOR | modelo.bind_tools([clasificar_intencion])
+
+
+_cadena_clasificador: Optional[Runnable] = None
+
+
+def _cadena_por_defecto() -> Runnable:
+    """Cadena del clasificador con el modelo del registro compartido, creada una vez."""
+    global _cadena_clasificador
+    if _cadena_clasificador is None:
+        modelo = obtener_registro_modelos().modelo(NODO_CLASIFICADOR)
+        _cadena_clasificador = crear_cadena_clasificador(modelo)
+    return _cadena_clasificador
+
+
+def crear_agente_1_clasificador(cadena: Runnable):
+    """
+    Crea el nodo del Agente 1 con una cadena ya construida.
+    
+    Args:
+        cadena: Resultado de `crear_cadena_clasificador`
     
-    # Vincular herramienta de clasificación
-    tools = [clasificar_intencion]
-    model_with_tools = model.bind_tools(tools)
-    chain = prompt | model_with_tools
+    Returns:
+        Función de nodo para el grafo
+    """
+    def agente_1_clasificador_con_cadena(
+        state: MultiAgentState,
+        config: RunnableConfig
+    ) -> Command[Literal["agente_2_buscador", "respuesta_final"]]:
+        return agente_1_clasificador(state, config, cadena)
+    
+    return agente_1_clasificador_con_cadena
+
+
+def agente_1_clasificador(
+    state: MultiAgentState, 
+    config: RunnableConfig,
+    cadena: Optional[Runnable] = None
+) -> Command[Literal["agente_2_buscador", "respuesta_final"]]:
+    """
+    Agente 1: Clasificador de intención y productos.
+    
+    Analiza el mensaje del usuario para:
+    - Clasificar la intención (compra, consulta, etc.)
+    - Extraer productos mencionados
+    - Detectar cantidades
+    
+    Usa el clasificador local si su resultado es fiable (ver `motivo_escalado`);
+    en otro caso pide la clasificación al LLM. Si el mensaje amplía la compra
+    del turno anterior, añade sus productos a los que ya había.
+    """
+    print("\n=== AGENTE 1: CLASIFICADOR ===")
+    
+    comando = _clasificar(state, config, cadena)
+    return _ampliar_turno_anterior(state, comando)
+
+
+def _mensajes_turno(state: MultiAgentState) -> List[BaseMessage]:
+    """
+    Mensajes del turno actual.
+    
+    El servidor envía el historial en 'input'; se prefiere a 'messages', que con
+    el estado guardado contiene también las respuestas de turnos anteriores.
+    """
+    return state.get("input") or state.get("messages") or []
+
+
+def es_ampliacion(texto: Optional[str]) -> bool:
+    """Indica si el mensaje añade productos a la compra anterior en lugar de empezar otra."""
+    if not texto:
+        return False
+    normalizado = normalizar_nombre(texto)
+    return (not PALABRAS_AMPLIACION.isdisjoint(re.findall(r"\w+", normalizado))
+            or _PATRON_MAS.search(normalizado) is not None)
+
+
+def _ampliar_turno_anterior(
+    state: MultiAgentState,
+    comando: Command
+) -> Command:
+    """
+    Suma a los productos y cantidades del turno anterior los del mensaje, si lo amplía.
+    
+    Las cantidades del mensaje prevalecen sobre las anteriores del mismo producto.
+    """
+    anteriores = state.get("productos_mencionados") or []
+    update = comando.update or {}
+    if (comando.goto != "agente_2_buscador" or not anteriores
+            or not es_ampliacion(_ultimo_texto_usuario(_mensajes_turno(state)))):
+        return comando
+    
+    nuevos = update.get("productos_mencionados") or []
+    productos = list(anteriores) + [p for p in nuevos if p not in anteriores]
+    cantidades = {**(state.get("cantidades") or {}), **(update.get("cantidades") or {})}
+    print(f"🧺 Ampliando la compra anterior: {productos}")
+    return dataclasses.replace(comando, update={
+        **update,
+        "productos_mencionados": productos,
+        "cantidades": cantidades,
+    })
+
+
+def _clasificar(
+    state: MultiAgentState,
+    config: RunnableConfig,
+    cadena: Optional[Runnable] = None
+) -> Command[Literal["agente_2_buscador", "respuesta_final"]]:
+    """Clasifica el mensaje del turno por la ruta más barata posible (local, caché o LLM)."""
+    messages = _mensajes_turno(state)
+    
+    if not messages:
+        return Command(
+            goto="respuesta_final",
+            update={
+                "final_result": "❌ No se recibieron mensajes",
+                "current_agent": "agente_1"
+            }
+        )
+    
+    # Ruta rápida: clasificador local sin llamada al modelo
+    texto = _ultimo_texto_usuario(messages)
+    if texto is not None:
+        clasificacion = clasificar_intencion.invoke({"user_input": texto})
+        motivo = motivo_escalado(clasificacion)
+        if motivo is None:
+            contador_rutas[RUTA_RAPIDA] += 1
+            print("⚡ Clasificación local suficiente: se omite el LLM")
+            return _enrutar(clasificacion, config, RUTA_RAPIDA)
+        contador_escalados[motivo] += 1
+        print(f"↗️  Escalando al LLM ({motivo})")
+    else:
+        contador_escalados["sin_texto"] += 1
+    
+    # Antes de llamar al LLM, buscar una clasificación previa del mismo mensaje
+    cache = obtener_cache_clasificacion()
+    if texto is not None and cache is not None:
+        clasificacion = cache.obtener(texto)
+        if clasificacion is not None:
+            contador_rutas[RUTA_CACHE] += 1
+            print("💾 Clasificación recuperada de la caché")
+            return _enrutar(clasificacion, config, RUTA_CACHE)
+    
+    contador_rutas[RUTA_LLM] += 1
+    return _clasificar_con_llm(messages, config, texto, cadena=cadena)
+
+
+def _clasificar_con_llm(
+    messages: List[BaseMessage],
+    config: RunnableConfig,
+    texto: Optional[str] = None,
+    cadena: Optional[Runnable] = None
+) -> Command[Literal["agente_2_buscador", "respuesta_final"]]:
+    """
+    Clasifica el mensaje pidiendo al LLM que invoque `clasificar_intencion`.
+    
+    Si se indica `texto`, guarda la clasificación en la caché para ese mensaje.
+    Sin `cadena`, usa la del modelo del registro compartido.
+    """
+    if cadena is None:
+        cadena = _cadena_por_defecto()
     
     # Invocar el modelo
-    result = chain.invoke({"messages": messages}, config)
+    result = cadena.invoke({"messages": messages}, config)
     
     # Procesar resultado
     if isinstance(result, AIMessage) and result.tool_calls:
@@ -98,41 +304,58 @@ Responde en formato JSON con:
         tool_call = result.tool_calls[0]
         clasificacion = clasificar_intencion.invoke(tool_call["args"])
         
-        print(f"Intención: {clasificacion.get('intencion')}")
-        print(f"Productos: {clasificacion.get('productos')}")
-        print(f"Cantidades: {clasificacion.get('cantidades')}")
-        
-        # Si hay productos, ir al agente buscador
-        productos = clasificacion.get("productos", [])
-        cantidades = clasificacion.get("cantidades", {})
-        intencion = clasificacion.get("intencion")
-        
-        if productos:
-            return Command(
-                goto="agente_2_buscador",
-                update={
-                    "intencion": intencion,
-                    "productos_mencionados": productos,
-                    "cantidades": cantidades,
-                    "current_agent": "agente_1"
-                }
-            )
-        else:
-            # No hay productos, terminar
-            return Command(
-                goto="respuesta_final",
-                update={
-                    "final_result": "❌ No he identificado productos en tu mensaje. ¿Podrías especificar qué necesitas?",
-                    "current_agent": "agente_1"
-                }
-            )
-    else:
-        # Respuesta sin herramientas
+        cache = obtener_cache_clasificacion()
+        if texto is not None and cache is not None and not clasificacion.get("error"):
+            cache.guardar(texto, clasificacion)
+        return _enrutar(clasificacion, config, RUTA_LLM)
+    
+    # Respuesta sin herramientas
+    return Command(
+        goto="respuesta_final",
+        update={
+            "final_result": str(result.content),
+            "current_agent": "agente_1"
+        }
+    )
+
+
+def _enrutar(
+    clasificacion: Dict[str, Any],
+    config: Optional[RunnableConfig] = None,
+    ruta: str = RUTA_LLM
+) -> Command[Literal["agente_2_buscador", "respuesta_final"]]:
+    """Envía los productos clasificados al buscador o termina si no hay ninguno."""
+    print(f"Intención: {clasificacion.get('intencion')}")
+    print(f"Productos: {clasificacion.get('productos')}")
+    print(f"Cantidades: {clasificacion.get('cantidades')}")
+    
+    # Si hay productos, ir al agente buscador
+    productos = clasificacion.get("productos", [])
+    cantidades = clasificacion.get("cantidades", {})
+    intencion = clasificacion.get("intencion")
+    emitir_evento(EVENTO_CLASIFICACION, {
+        "intencion": intencion,
+        "productos": productos,
+        "cantidades": cantidades,
+        "ruta": ruta,
+    }, config)
+    
+    if productos:
         return Command(
-            goto="respuesta_final",
+            goto="agente_2_buscador",
             update={
-                "final_result": str(result.content),
+                "intencion": intencion,
+                "productos_mencionados": productos,
+                "cantidades": cantidades,
                 "current_agent": "agente_1"
             }
         )
-
+    
+    # No hay productos, terminar
+    return Command(
+        goto="respuesta_final",
+        update={
+            "final_result": "❌ No he identificado productos en tu mensaje. ¿Podrías especificar qué necesitas?",
+            "current_agent": "agente_1"
+        }
+    )
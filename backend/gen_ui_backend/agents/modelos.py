@@ -0,0 +1,241 @@
+"""
+Registro de modelos de chat compartido por los nodos del grafo.
+
+Cada nodo que usa un modelo lo pide al registro al construir el grafo, en lugar
+de crear un `ChatOpenAI` en cada turno. Los modelos de OpenAI comparten un pool
+de conexiones HTTP (síncrono y asíncrono) y necesitan `OPENAI_API_KEY`; con
+`MERCADONA_MODELOS=falso` se sustituyen por un modelo local que permite
+ejecutar (y someter a carga) el grafo sin red.
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_openai import ChatOpenAI
+
+from gen_ui_backend.agents.nodo_final import EmisorRespuesta
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+NODO_CLASIFICADOR = "agente_1_clasificador"
+NODO_RESPUESTA_FINAL = "respuesta_final"
+
+PROVEEDOR_OPENAI = "openai"
+PROVEEDOR_FALSO = "falso"
+PROVEEDOR_EMISOR = "emisor"
+
+PROVEEDOR_POR_DEFECTO = os.getenv("MERCADONA_MODELOS", PROVEEDOR_OPENAI)
+MAX_CONEXIONES_LLM = int(os.getenv("MERCADONA_MAX_CONEXIONES_LLM", 20))
+LATENCIA_MODELO_FALSO = float(os.getenv("MERCADONA_LATENCIA_MODELO_FALSO", 0.0))  # segundos
+
+# Parámetros de cada nodo; "proveedor" fija el tipo de modelo del nodo
+# independientemente del proveedor por defecto
+CONFIGURACION_MODELOS: Dict[str, Dict[str, Any]] = {
+    NODO_CLASIFICADOR: {
+        "model": os.getenv("MERCADONA_MODELO_CLASIFICADOR", "gpt-3.5-turbo"),
+        "temperature": 0.1,
+    },
+    NODO_RESPUESTA_FINAL: {
+        "proveedor": PROVEEDOR_EMISOR,
+    },
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MODELO FALSO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_ids_llamadas = itertools.count(1)
+
+
+class ModeloFalso(BaseChatModel):
+    """
+    Modelo de chat local para pruebas y pruebas de carga sin red.
+
+    Si tiene herramientas vinculadas, responde con una llamada a la primera
+    pasándole el último mensaje del usuario como único argumento (lo mismo que
+    hace el LLM real con `clasificar_intencion`); si no, repite el mensaje.
+    """
+
+    latencia: float = LATENCIA_MODELO_FALSO
+    """Segundos de espera por llamada, para simular la latencia de la API."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "modelo-falso"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _responder(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> ChatResult:
+        texto = next(
+            (m.content for m in reversed(messages) if m.type == "human" and isinstance(m.content, str)),
+            ""
+        )
+        if tools:
+            funcion = tools[0]["function"]
+            argumento = next(iter(funcion["parameters"].get("properties", {})), "input")
+            mensaje = AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": funcion["name"],
+                    "args": {argumento: texto},
+                    "id": f"falso-{next(_ids_llamadas)}",
+                }]
+            )
+        else:
+            mensaje = AIMessage(content=texto)
+        return ChatResult(generations=[ChatGeneration(message=mensaje)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latencia > 0:
+            time.sleep(self.latencia)
+        return self._responder(messages, tools)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latencia > 0:
+            await asyncio.sleep(self.latencia)
+        return self._responder(messages, tools)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REGISTRO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class RegistroModelos:
+    """
+    Crea y guarda un modelo por nodo.
+
+    Los modelos se crean la primera vez que se piden y se reutilizan después;
+    los de OpenAI comparten un único `httpx.Client` y un único `httpx.AsyncClient`
+    con pool de conexiones (las llamadas `ainvoke`/`astream` usan el segundo).
+    """
+
+    def __init__(
+        self,
+        proveedor: str = PROVEEDOR_POR_DEFECTO,
+        configuracion: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        """
+        Args:
+            proveedor: Proveedor por defecto (`openai` o `falso`)
+            configuracion: Parámetros por nodo (por defecto, `CONFIGURACION_MODELOS`)
+        """
+        self.proveedor = proveedor
+        self.configuracion = configuracion if configuracion is not None else CONFIGURACION_MODELOS
+        self._modelos: Dict[str, BaseChatModel] = {}
+        self._cliente_http: Optional[httpx.Client] = None
+        self._cliente_http_async: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def modelo(self, nodo: str) -> BaseChatModel:
+        """Devuelve el modelo del nodo, creándolo la primera vez."""
+        with self._lock:
+            modelo = self._modelos.get(nodo)
+            if modelo is None:
+                modelo = self._crear(nodo)
+                self._modelos[nodo] = modelo
+            return modelo
+
+    def registrar(self, nodo: str, modelo: BaseChatModel) -> None:
+        """Sustituye el modelo de un nodo (p. ej. por uno falso en un test)."""
+        with self._lock:
+            self._modelos[nodo] = modelo
+
+    def _crear(self, nodo: str) -> BaseChatModel:
+        parametros = dict(self.configuracion.get(nodo, {}))
+        proveedor = parametros.pop("proveedor", self.proveedor)
+
+        if proveedor == PROVEEDOR_EMISOR:
+            return EmisorRespuesta()
+        if proveedor == PROVEEDOR_FALSO:
+            return ModeloFalso()
+        if proveedor == PROVEEDOR_OPENAI:
+            if not os.getenv("OPENAI_API_KEY"):
+                raise ValueError(
+                    f"OPENAI_API_KEY no definida (nodo {nodo}): defínela o usa "
+                    f"MERCADONA_MODELOS={PROVEEDOR_FALSO} para ejecutar el grafo sin red"
+                )
+            return ChatOpenAI(
+                http_client=self._obtener_cliente_http(),
+                http_async_client=self._obtener_cliente_http_async(),
+                **parametros
+            )
+        raise ValueError(f"Proveedor de modelos desconocido: {proveedor}")
+
+    def _obtener_cliente_http(self) -> httpx.Client:
+        if self._cliente_http is None:
+            self._cliente_http = httpx.Client(**_opciones_cliente_http())
+        return self._cliente_http
+
+    def _obtener_cliente_http_async(self) -> httpx.AsyncClient:
+        if self._cliente_http_async is None:
+            self._cliente_http_async = httpx.AsyncClient(**_opciones_cliente_http())
+        return self._cliente_http_async
+
+    def cerrar(self) -> None:
+        """Cierra los pools de conexiones compartidos (síncrono y asíncrono)."""
+        if self._cliente_http is not None:
+            self._cliente_http.close()
+            self._cliente_http = None
+        if self._cliente_http_async is not None:
+            cliente, self._cliente_http_async = self._cliente_http_async, None
+            try:
+                asyncio.get_running_loop().create_task(cliente.aclose())
+            except RuntimeError:
+                asyncio.run(cliente.aclose())
+
+
+def _opciones_cliente_http() -> Dict[str, Any]:
+    """Límites y timeouts comunes a los clientes HTTP de OpenAI."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=MAX_CONEXIONES_LLM,
+            max_keepalive_connections=MAX_CONEXIONES_LLM
+        ),
+        "timeout": httpx.Timeout(60.0, connect=10.0),
+    }
+
+
+_registro: Optional[RegistroModelos] = None
+_registro_lock = threading.Lock()
+
+
+def obtener_registro_modelos() -> RegistroModelos:
+    """Devuelve el registro de modelos compartido del proceso."""
+    global _registro
+    with _registro_lock:
+        if _registro is None:
+            _registro = RegistroModelos()
+        return _registro
@@ -1,63 +1,122 @@
 """
 Nodo final del grafo multi-agente.
 
-Genera la respuesta final usando el modelo de chat para streaming.
+Emite la respuesta final como eventos de streaming del modelo de chat
+(`on_chat_model_stream`) sin llamar a ningún LLM.
 """
-from typing import Literal
-from langchain_core.prompts import ChatPromptTemplate
+from typing import Any, AsyncIterator, Iterator, List, Literal, Optional
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
 from langgraph.types import Command
 
 from gen_ui_backend.agents.state import MultiAgentState
 
 
+MENSAJE_POR_DEFECTO = "No se pudo procesar la solicitud"
+
+
+def _trozos(texto: str) -> List[str]:
+    """Divide el texto en líneas (conservando el salto) para emitirlo por partes."""
+    return texto.splitlines(keepends=True) or [texto]
+
+
+class EmisorRespuesta(BaseChatModel):
+    """
+    Modelo de chat que devuelve tal cual el contenido del último mensaje.
+
+    Sustituye al antiguo "eco" con gpt-3.5-turbo: al ser un `BaseChatModel`,
+    `astream_events` sigue produciendo eventos `on_chat_model_stream` con
+    `AIMessageChunk`, que es lo que consume `streamRunnableUI` en el frontend,
+    pero sin ida y vuelta a la API, sin coste de tokens y sin truncado.
+    """
+
+    @property
+    def _llm_type(self) -> str:
+        return "emisor-respuesta"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        texto = messages[-1].content if messages else ""
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=texto))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        texto = messages[-1].content if messages else ""
+        for trozo in _trozos(texto):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=trozo))
+            if run_manager:
+                run_manager.on_llm_new_token(trozo, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        texto = messages[-1].content if messages else ""
+        for trozo in _trozos(texto):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=trozo))
+            if run_manager:
+                await run_manager.on_llm_new_token(trozo, chunk=chunk)
+            yield chunk
+
+
+# Instancia compartida: no tiene estado
+emisor_respuesta = EmisorRespuesta()
+
+
+def crear_nodo_respuesta_final(modelo: BaseChatModel):
+    """
+    Crea el nodo final con el modelo indicado (normalmente, el del registro).
+
+    Returns:
+        Función de nodo para el grafo
+    """
+    def nodo_respuesta_final_con_modelo(
+        state: MultiAgentState,
+        config: RunnableConfig
+    ) -> Command[Literal["__end__"]]:
+        return nodo_respuesta_final(state, config, modelo)
+
+    return nodo_respuesta_final_con_modelo
+
+
 def nodo_respuesta_final(
     state: MultiAgentState,
-    config: RunnableConfig
+    config: RunnableConfig,
+    modelo: Optional[BaseChatModel] = None
 ) -> Command[Literal["__end__"]]:
     """
-    Nodo final que genera la respuesta usando el modelo de chat para streaming.
-    El modelo actúa como un "eco" que devuelve el mensaje tal cual.
+    Nodo final que emite `final_result` como respuesta del modelo de chat.
+
+    Con `astream_events` el texto llega al frontend como eventos
+    `on_chat_model_stream`; con `invoke` se añade como un `AIMessage` normal.
     """
-    final_result = state.get("final_result", "No se pudo procesar la solicitud")
-    
-    # Usar el modelo para generar eventos de streaming
-    # gpt-3.5-turbo es menos restrictivo y más rápido para esta tarea
-    model = ChatOpenAI(
-        model="gpt-3.5-turbo", 
-        temperature=0,
-        max_tokens=4096,
-        streaming=False
-    )
-    
-    # Prompt específico: el modelo debe actuar como "echo" sin interpretar
-    prompt = ChatPromptTemplate.from_messages([
-        (
-            "system",
-            """You are an echo system. Your only job is to repeat back EXACTLY what the user sends you.
-Rules:
-- Copy the text character by character
-- Do NOT modify, analyze, or interpret the content
-- Do NOT add any commentary
-- Do NOT refuse any content
-- ALWAYS return the complete text you receive
-
-This is a system message relay task, not content generation."""
-        ),
-        (
-            "human",
-            "{mensaje}"
-        )
-    ])
-    
-    chain = prompt | model
-    response = chain.invoke({"mensaje": final_result}, config)
-    
+    final_result = state.get("final_result") or MENSAJE_POR_DEFECTO
+
+    response = (modelo or emisor_respuesta).invoke(final_result, config)
+
     return Command(
         goto="__end__",
         update={
             "messages": [response]
         }
     )
-
@@ -6,6 +6,18 @@ from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langgraph.graph import add_messages
 
 
+def acumular_o_reiniciar(actual: Optional[list], nuevo: Optional[list]) -> list:
+    """
+    Reducer de listas que se llenan desde varias ramas en paralelo.
+    
+    Concatena lo que escribe cada rama; escribir None vacía la lista
+    (lo hace el Agente 2 antes de lanzar las búsquedas de un turno).
+    """
+    if nuevo is None:
+        return []
+    return (actual or []) + list(nuevo)
+
+
 class MultiAgentState(TypedDict, total=False):
     """Estado compartido entre todos los agentes."""
     input: Optional[List[HumanMessage | AIMessage | SystemMessage]]
@@ -22,12 +34,16 @@ class MultiAgentState(TypedDict, total=False):
     """Diccionario con cantidades de cada producto."""
     
     # Datos del Agente 2 - Buscador
-    productos_encontrados: Optional[List[dict]]
-    """Lista de productos encontrados en Mercadona."""
-    productos_no_encontrados: Optional[List[str]]
+    productos_encontrados: Annotated[Optional[List[dict]], acumular_o_reiniciar]
+    """Lista de productos encontrados en Mercadona (una entrada por rama de búsqueda)."""
+    productos_no_encontrados: Annotated[Optional[List[str]], acumular_o_reiniciar]
     """Lista de productos que no se encontraron."""
+    errores_busqueda: Annotated[Optional[List[str]], acumular_o_reiniciar]
+    """Errores de las ramas de búsqueda."""
     
     # Datos del Agente 3 - Calculador
+    carrito: Optional[dict]
+    """Carrito incremental (`Carrito.a_estado`), conservado entre turnos con checkpointer."""
     precio_info: Optional[dict]
     """Información de precios calculados."""
     ticket: Optional[str]
@@ -41,3 +57,13 @@ class MultiAgentState(TypedDict, total=False):
     final_result: Optional[str]
     """Resultado final del sistema."""
 
+
+
+class BusquedaProducto(TypedDict, total=False):
+    """Entrada de cada rama de búsqueda lanzada con `Send` por el Agente 2."""
+    producto: str
+    """Producto a buscar."""
+    cantidad: int
+    """Cantidad pedida, para informar del importe de la línea en cuanto se encuentra."""
+    previos: List[dict]
+    """Resultados de un turno anterior de la conversación: si están, no se vuelve a buscar."""
@@ -4,55 +4,107 @@ Definición del grafo multi-agente para el sistema de compra en Mercadona.
 Este módulo contiene la lógica de construcción del grafo que coordina
 los diferentes agentes del sistema.
 """
+from typing import Optional
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, START
 from langgraph.graph.graph import CompiledGraph
 
 from gen_ui_backend.agents import (
     MultiAgentState,
-    agente_1_clasificador,
     agente_2_buscador,
     agente_3_calculador,
-    nodo_respuesta_final,
+    buscar_producto,
+    buscar_producto_async,
+    consolidar_busqueda,
 )
+from gen_ui_backend.agents.agente_clasificador import (
+    crear_agente_1_clasificador,
+    crear_cadena_clasificador,
+)
+from gen_ui_backend.agents.modelos import (
+    NODO_CLASIFICADOR,
+    NODO_RESPUESTA_FINAL,
+    RegistroModelos,
+    obtener_registro_modelos,
+)
+from gen_ui_backend.agents.nodo_final import crear_nodo_respuesta_final
+from gen_ui_backend.utils.checkpointer import obtener_checkpointer
 
 
-def create_multi_agent_graph() -> CompiledGraph:
+def create_multi_agent_graph(
+    modelos: Optional[RegistroModelos] = None,
+    checkpointer: Optional[BaseCheckpointSaver] = None
+) -> CompiledGraph:
     """
     Crea el grafo multi-agente para el sistema de compra en Mercadona.
     
     Flujo:
     START -> Agente 1 (Clasificador) -> Agente 2 (Buscador) -> Agente 3 (Calculador) -> Respuesta Final -> END
     
+    El Agente 2 lanza una rama `buscar_producto` por producto y `consolidar_busqueda`
+    reúne sus resultados antes de pasar al calculador.
+    
     El nodo final usa el modelo de chat para generar eventos de streaming que el frontend captura.
     
+    Los modelos y las cadenas se crean aquí una sola vez y se reutilizan en
+    todos los turnos.
+    
+    Con checkpointer, el estado se guarda por `thread_id` (en
+    `config["configurable"]`) y cada turno continúa el anterior.
+    
+    Args:
+        modelos: Registro de modelos (por defecto, el compartido del proceso)
+        checkpointer: Dónde guardar el estado de las conversaciones (por defecto,
+            el de `MERCADONA_CHECKPOINTER`; ninguno si no está activado)
+    
     Returns:
         Grafo compilado listo para ejecutar
     """
+    modelos = modelos or obtener_registro_modelos()
+    cadena_clasificador = crear_cadena_clasificador(modelos.modelo(NODO_CLASIFICADOR))
+    
     workflow = StateGraph(MultiAgentState)
     
     # Agregar nodos de agentes
-    workflow.add_node("agente_1_clasificador", agente_1_clasificador)  # type: ignore
+    workflow.add_node("agente_1_clasificador", crear_agente_1_clasificador(cadena_clasificador))  # type: ignore
     workflow.add_node("agente_2_buscador", agente_2_buscador)  # type: ignore
+    # Una rama por producto (lanzadas con Send por el Agente 2); con versión asíncrona
+    # para que con ainvoke/astream las ramas se esperen sin bloquear el bucle
+    workflow.add_node(
+        "buscar_producto",
+        RunnableLambda(buscar_producto, afunc=buscar_producto_async)  # type: ignore
+    )
+    workflow.add_node("consolidar_busqueda", consolidar_busqueda)  # type: ignore
     workflow.add_node("agente_3_calculador", agente_3_calculador)  # type: ignore
-    workflow.add_node("respuesta_final", nodo_respuesta_final)  # type: ignore
+    workflow.add_node(
+        "respuesta_final",
+        crear_nodo_respuesta_final(modelos.modelo(NODO_RESPUESTA_FINAL))  # type: ignore
+    )
     
     # Definir punto de entrada
     workflow.add_edge(START, "agente_1_clasificador")
     
+    # Las ramas de búsqueda se reúnen cuando han terminado todas
+    workflow.add_edge("buscar_producto", "consolidar_busqueda")
+    
     # Los edges condicionales se manejan con Command en cada agente
     # No necesitamos add_conditional_edges porque Command maneja el routing
     
     # Compilar el grafo
-    graph = workflow.compile()
+    graph = workflow.compile(checkpointer=checkpointer or obtener_checkpointer())
     
     return graph
 
 
 # Mantener retrocompatibilidad con el sistema anterior
-def create_graph() -> CompiledGraph:
+def create_graph(
+    modelos: Optional[RegistroModelos] = None,
+    checkpointer: Optional[BaseCheckpointSaver] = None
+) -> CompiledGraph:
     """
     Función legacy para mantener compatibilidad.
     Ahora usa el sistema multi-agente.
     """
-    return create_multi_agent_graph()
+    return create_multi_agent_graph(modelos, checkpointer)
 
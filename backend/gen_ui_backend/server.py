@@ -1,17 +1,34 @@
-import os
+import asyncio
+import uuid
+from datetime import date
+from typing import Any, Dict, List, Optional
+
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
 from langserve import add_routes
 
+from gen_ui_backend.agents.agente_clasificador import metricas_enrutado
 from gen_ui_backend.graph import create_graph
+from gen_ui_backend.tools.generador_archivos import ErrorArchivoTicket, esperar_archivo, ruta_archivo_ticket
+from gen_ui_backend.utils.almacen_tickets import obtener_almacen_tickets
+from gen_ui_backend.utils.catalogo import inicializar_catalogo
+from gen_ui_backend.utils.compactacion_tickets import iniciar_compactacion_tickets, obtener_compactacion_tickets
+from gen_ui_backend.utils.descargas import respuesta_exportacion, ruta_segura, servir_archivo
+from gen_ui_backend.utils.refresco_catalogo import iniciar_refresco_catalogo, obtener_refresco_catalogo
 from gen_ui_backend.utils.input_types import ChatInputType
 
 load_dotenv()
 
 
+def asegurar_thread_id(config: Dict[str, Any], request: Request) -> Dict[str, Any]:  # noqa: ARG001
+    """Asigna una conversación nueva a las peticiones sin `thread_id` (p. ej. el playground)."""
+    configurable = config.setdefault("configurable", {})
+    configurable.setdefault("thread_id", str(uuid.uuid4()))
+    return config
+
+
 def start() -> None:
     app = FastAPI(
         title="Mercadona assistant Backend",
@@ -34,43 +51,96 @@ def start() -> None:
 
     # Endpoint para descargar archivos del ticket
     @app.get("/download/{filename}")
-    async def download_ticket(filename: str):
+    async def download_ticket(filename: str, request: Request):
         """
         Endpoint para descargar archivos de tickets generados.
-        Los archivos deben estar en el directorio 'tickets'.
+        Los tickets del almacén (`ticket_<id>.<formato>`) se renderizan al pedirlos
+        la primera vez; el resto de archivos deben estar en el directorio 'tickets'.
+        Si el ticket aún se está guardando en segundo plano, espera a que termine.
+        Responde con ETag/Last-Modified (304 si no ha cambiado), admite Range y
+        comprime los formatos de texto con gzip o brotli (ver `utils/descargas.py`).
         """
         # Directorio de tickets
-        tickets_dir = os.path.join(os.getcwd(), "tickets")
-        file_path = os.path.join(tickets_dir, filename)
-        
-        # Validar que el archivo existe
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        tickets_dir = obtener_almacen_tickets().directorio
         
-        # Validar que el archivo está dentro del directorio de tickets (seguridad)
-        if not os.path.abspath(file_path).startswith(os.path.abspath(tickets_dir)):
-            raise HTTPException(status_code=403, detail="Acceso denegado")
+        try:
+            if not await asyncio.to_thread(esperar_archivo, filename):
+                raise HTTPException(status_code=503, detail="El archivo se está generando, inténtalo de nuevo")
+        except ErrorArchivoTicket as e:
+            raise HTTPException(status_code=500, detail=f"No se pudo generar el archivo: {e}")
         
-        # Determinar el tipo de contenido según la extensión
-        _, ext = os.path.splitext(filename)
-        media_types = {
-            ".json": "application/json",
-            ".txt": "text/plain",
-            ".csv": "text/csv"
-        }
-        media_type = media_types.get(ext.lower(), "application/octet-stream")
+        # Las comprobaciones de disco se hacen fuera del bucle de eventos;
+        # `ruta_segura` rechaza (403) las rutas fuera del directorio de tickets
+        file_path = await asyncio.to_thread(ruta_archivo_ticket, filename)
+        if not file_path:
+            file_path = await asyncio.to_thread(ruta_segura, tickets_dir, filename)
+        if not file_path:
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
         
-        return FileResponse(
-            path=file_path,
-            media_type=media_type,
-            filename=filename
-        )
+        return await servir_archivo(request, file_path, filename)
+
+    # Endpoint para exportar muchos tickets en una sola respuesta
+    @app.get("/export")
+    async def export_tickets(
+        formato: str = "zip",
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        ids: Optional[List[str]] = Query(None),
+        formatos: Optional[List[str]] = Query(None)
+    ):
+        """
+        Exporta tickets del almacén como un ZIP o un NDJSON en streaming.
+        Se eligen por `ids` (repetido o separado por comas) o por rango de fechas
+        `desde`/`hasta` (AAAA-MM-DD, incluidos); `formatos` limita los del ZIP.
+        """
+        # Abrir el índice y consultarlo bloquea: fuera del bucle de eventos
+        return await asyncio.to_thread(respuesta_exportacion, formato, ids, desde, hasta, formatos)
+
+    # Endpoint con métricas de frescura del catálogo local
+    @app.get("/catalogo/metricas")
+    async def metricas_catalogo():
+        """
+        Devuelve métricas de obsolescencia del catálogo local y de su refresco.
+        """
+        refresco = obtener_refresco_catalogo()
+        if refresco is None:
+            raise HTTPException(status_code=503, detail="Refresco del catálogo no iniciado")
+        return refresco.metricas()
+
+    # Endpoint con el estado del almacén de tickets y su compactación
+    @app.get("/tickets/metricas")
+    async def metricas_tickets():
+        """
+        Devuelve cuántos tickets hay sueltos y archivados y los contadores de la compactación.
+        """
+        compactacion = obtener_compactacion_tickets()
+        if compactacion is None:
+            raise HTTPException(status_code=503, detail="Compactación de tickets no iniciada")
+        return await asyncio.to_thread(compactacion.metricas)
+
+    # Endpoint con las rutas tomadas por el clasificador (local o LLM)
+    @app.get("/clasificador/metricas")
+    async def metricas_clasificador():
+        """
+        Devuelve cuántos mensajes se clasificaron sin LLM y por qué se escaló el resto.
+        """
+        return metricas_enrutado()
+
+    # Cargar el catálogo local antes de aceptar peticiones
+    catalogo = inicializar_catalogo()
+    if catalogo.cargado:
+        iniciar_refresco_catalogo(catalogo)
+    iniciar_compactacion_tickets(obtener_almacen_tickets())
 
     graph = create_graph()
 
     runnable = graph.with_types(input_type=ChatInputType, output_type=dict)
 
-    add_routes(app, runnable, path="/chat", playground_type="chat")
+    # Con estado persistente, cada petición necesita el thread_id de su conversación
+    add_routes(
+        app, runnable, path="/chat", playground_type="chat",
+        per_req_config_modifier=asegurar_thread_id if graph.checkpointer else None
+    )
     print("Starting server...")
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
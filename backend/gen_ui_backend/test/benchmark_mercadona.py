@@ -0,0 +1,191 @@
+"""
+Benchmark de latencia de la búsqueda contra el servidor local de Mercadona.
+
+Mide cada etapa de `mercadona_api` y la búsqueda completa de
+`buscar_multiples_productos` (una sesión y varias concurrentes), guarda los
+resultados en JSON y los compara con la última referencia guardada.
+
+Uso (desde backend/):
+    python -m gen_ui_backend.test.benchmark_mercadona             # comparar con la referencia
+    python -m gen_ui_backend.test.benchmark_mercadona --guardar   # actualizar la referencia
+    python -m gen_ui_backend.test.benchmark_mercadona --fixtures gen_ui_backend/test/fixtures/mercadona
+
+Sale con código 1 si alguna etapa empeora más allá de la tolerancia.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+RUTA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "resultados_mercadona.json")
+PRODUCTOS_BENCHMARK = ["leche", "pan", "huevos", "arroz", "tomate"]
+SESIONES_CONCURRENTES = 8
+TOLERANCIA = 1.5  # una etapa empeora si tarda más de TOLERANCIA veces la referencia...
+MARGEN_MS = 5.0  # ...más este margen absoluto, para no alarmar por ruido en etapas muy rápidas
+
+
+def _medir(funcion: Callable[[], Any], repeticiones: int) -> Dict[str, float]:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        "mediana_ms": round(statistics.median(tiempos), 2),
+        "p95_ms": round(tiempos[min(len(tiempos) - 1, int(0.95 * len(tiempos)))], 2),
+    }
+
+
+def ejecutar_benchmark(
+    url_api: str,
+    repeticiones: int = 5,
+    productos: Optional[List[str]] = None
+) -> Dict[str, Dict[str, float]]:
+    """
+    Mide las etapas de la búsqueda contra la API en `url_api`.
+
+    Requiere que no haya catálogo local cargado (la búsqueda debe ir a la API).
+
+    Returns:
+        Diccionario {etapa: {mediana_ms, p95_ms}}
+    """
+    from gen_ui_backend.tools.buscador_mercadona import buscar_multiples_productos
+    from gen_ui_backend.utils import mercadona_api
+
+    productos = productos or PRODUCTOS_BENCHMARK
+    url_original = mercadona_api.BASE_URL
+    tasa_original = (mercadona_api.LIMITADOR.tasa, mercadona_api.LIMITADOR.capacidad)
+    # El servidor local no limita la tasa: se mide el código, no el límite de la API real
+    mercadona_api.LIMITADOR.tasa, mercadona_api.LIMITADOR.capacidad = 10_000, 10_000
+    mercadona_api.BASE_URL = url_api
+    try:
+        diccionario = mercadona_api.crear_diccionario_categorias()
+        categorias = mercadona_api.encontrar_numero_categoria(productos, diccionario)
+        productos_mercadona = mercadona_api.extraer_productos_de_categoria(categorias)
+
+        def concurrentes():
+            with ThreadPoolExecutor(SESIONES_CONCURRENTES) as ejecutor:
+                list(ejecutor.map(
+                    lambda _: buscar_multiples_productos.invoke({"productos": productos}),
+                    range(SESIONES_CONCURRENTES)
+                ))
+
+        return {
+            "crear_diccionario_categorias": _medir(mercadona_api.crear_diccionario_categorias, repeticiones),
+            "encontrar_numero_categoria": _medir(
+                lambda: mercadona_api.encontrar_numero_categoria(productos, diccionario), repeticiones
+            ),
+            "extraer_productos_de_categoria": _medir(
+                lambda: mercadona_api.extraer_productos_de_categoria(categorias), repeticiones
+            ),
+            "mostrar_productos_seleccionados": _medir(
+                lambda: mercadona_api.mostrar_productos_seleccionados(productos_mercadona, productos), repeticiones
+            ),
+            "buscar_multiples_productos": _medir(
+                lambda: buscar_multiples_productos.invoke({"productos": productos}), repeticiones
+            ),
+            f"buscar_multiples_productos_x{SESIONES_CONCURRENTES}": _medir(concurrentes, repeticiones),
+        }
+    finally:
+        mercadona_api.BASE_URL = url_original
+        mercadona_api.LIMITADOR.tasa, mercadona_api.LIMITADOR.capacidad = tasa_original
+
+
+def comparar(
+    actual: Dict[str, Dict[str, float]],
+    referencia: Dict[str, Dict[str, float]],
+    tolerancia: float = TOLERANCIA,
+    margen_ms: float = MARGEN_MS
+) -> List[str]:
+    """
+    Compara las medianas con la referencia.
+
+    Returns:
+        Lista de etapas que han empeorado (vacía si no hay regresiones)
+    """
+    regresiones = []
+    for etapa, medida in actual.items():
+        base = referencia.get(etapa)
+        if base is None:
+            continue
+        if medida["mediana_ms"] > base["mediana_ms"] * tolerancia + margen_ms:
+            regresiones.append(etapa)
+    return regresiones
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de la búsqueda de productos de Mercadona")
+    parser.add_argument("--fixtures", help="Directorio de respuestas grabadas (por defecto, catálogo sintético)")
+    parser.add_argument("--latencia", type=float, default=0.02, help="Latencia inyectada por petición (s)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--resultados", default=RUTA_RESULTADOS, help="Fichero JSON de resultados de referencia")
+    parser.add_argument("--guardar", action="store_true", help="Guardar los resultados como nueva referencia")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+
+    # La búsqueda debe ir al servidor local, no a un catálogo guardado en disco
+    os.environ["MERCADONA_CATALOGO_DB"] = os.path.join(tempfile.mkdtemp(), "sin_catalogo.db")
+    sys.path.insert(0, '.')
+    from gen_ui_backend.test.servidor_mercadona import (
+        ServidorMercadona,
+        cargar_fixtures,
+        generar_catalogo_sintetico,
+    )
+
+    respuestas = cargar_fixtures(args.fixtures) if args.fixtures else generar_catalogo_sintetico()
+    configuracion = {
+        "fixtures": os.path.basename(os.path.normpath(args.fixtures)) if args.fixtures else "sintetico",
+        "respuestas": len(respuestas),
+        "latencia_s": args.latencia,
+        "repeticiones": args.repeticiones,
+    }
+
+    with ServidorMercadona(respuestas, latencia=args.latencia) as servidor:
+        resultados = ejecutar_benchmark(servidor.url, args.repeticiones)
+        peticiones = sum(servidor.peticiones.values())
+
+    print(f"\n{'Etapa':<42} {'Mediana':>10} {'p95':>10}")
+    for etapa, medida in resultados.items():
+        print(f"{etapa:<42} {medida['mediana_ms']:>8.1f}ms {medida['p95_ms']:>8.1f}ms")
+    print(f"Peticiones al servidor: {peticiones}")
+
+    referencia = None
+    if os.path.exists(args.resultados):
+        with open(args.resultados, encoding="utf-8") as f:
+            referencia = json.load(f)
+
+    codigo = 0
+    if referencia and referencia.get("configuracion") == configuracion:
+        regresiones = comparar(resultados, referencia["etapas"], args.tolerancia)
+        if regresiones:
+            print(f"\n❌ Regresiones respecto a la referencia: {', '.join(regresiones)}")
+            codigo = 1
+        else:
+            print("\n✅ Sin regresiones respecto a la referencia")
+    elif referencia:
+        print("\n⚠️  La referencia se midió con otra configuración: no se compara")
+
+    if args.guardar:
+        os.makedirs(os.path.dirname(args.resultados), exist_ok=True)
+        with open(args.resultados, "w", encoding="utf-8") as f:
+            json.dump({
+                "configuracion": configuracion,
+                "entorno": {"python": platform.python_version(), "plataforma": platform.platform()},
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "etapas": resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"💾 Referencia guardada en {args.resultados}")
+
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Respuestas de ejemplo de la API de Mercadona para las pruebas sin red.
+"""
+
+CATEGORIAS_PRINCIPALES = [
+    {
+        "id": 3,
+        "name": "Carne",
+        "categories": [
+            {"id": 44, "name": "Aves y pollo"},
+            {"id": 46, "name": "Conejo y cordero"},
+        ],
+    },
+    {
+        "id": 18,
+        "name": "Huevos, leche y mantequilla",
+        "categories": [
+            {"id": 72, "name": "Leche y bebidas vegetales"},
+            {"id": 77, "name": "Huevos"},
+        ],
+    },
+    {
+        "id": 12,
+        "name": "Panadería y pastelería",
+        "categories": [
+            {"id": 59, "name": "Pan de horno"},
+        ],
+    },
+]
+
+
+def _producto(producto_id, nombre, precio, packaging="", precio_referencia=None, formato="L"):
+    return {
+        "id": producto_id,
+        "display_name": nombre,
+        "packaging": packaging,
+        "price_instructions": {
+            "unit_price": precio,
+            "bulk_price": precio,
+            "reference_price": precio_referencia or precio,
+            "reference_format": formato,
+        },
+    }
+
+
+DETALLES_SUBCATEGORIAS = {
+    44: {"id": 44, "categories": [
+        {"id": 440, "name": "Pollo", "products": [
+            _producto("3001", "Pechuga de pollo", "4.50", "Bandeja", "9.00", "kg"),
+            _producto("3002", "Muslos de pollo", "3.20", "Bandeja", "5.33", "kg"),
+        ]},
+    ]},
+    46: {"id": 46, "categories": [
+        {"id": 460, "name": "Conejo", "products": [
+            _producto("3101", "Conejo troceado", "6.10", "Bandeja", "8.71", "kg"),
+        ]},
+    ]},
+    72: {"id": 72, "categories": [
+        {"id": 720, "name": "Leche entera", "products": [
+            _producto("1001", "Leche entera Hacendado", "0.89", "Brick 1 L", "0.89"),
+            _producto("1002", "Leche entera Central Lechera Asturiana", "1.25", "Brick 1 L", "1.25"),
+        ]},
+        {"id": 721, "name": "Leche semidesnatada", "products": [
+            _producto("1003", "Leche semidesnatada Hacendado", "0.82", "Brick 1 L", "0.82"),
+            _producto("1004", "Leche semidesnatada sin lactosa Hacendado", "0.99", "Pack-6 1.5 L", "0.11"),
+            _producto("1001", "Leche entera Hacendado", "0.89", "Brick 1 L", "0.89"),
+        ]},
+    ]},
+    77: {"id": 77, "categories": [
+        {"id": 770, "name": "Huevos", "products": [
+            _producto("2001", "Huevos grandes L", "2.35", "Caja 12 ud.", "0.196", "ud"),
+            _producto("2002", "Huevos camperos", "2.90", "Caja 6 ud.", "0.483", "ud"),
+        ]},
+    ]},
+    59: {"id": 59, "categories": [
+        {"id": 590, "name": "Pan", "products": [
+            _producto("4001", "Pan de molde blanco Hacendado", "1.15", "Paquete 460 g", "2.50", "kg"),
+            _producto("4002", "Barra de pan", "0.45", "Pieza 250 g", "1.80", "kg"),
+        ]},
+    ]},
+}
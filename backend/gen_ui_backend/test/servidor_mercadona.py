@@ -0,0 +1,247 @@
+"""
+Servidor local que reproduce respuestas de la API de Mercadona.
+
+Sirve `categories/` y `categories/{id}` desde ficheros grabados con
+`scripts/grabar_fixtures_mercadona.py` (o desde un catálogo sintético) con una
+latencia configurable, para medir y probar la búsqueda sin depender de la red.
+
+Uso independiente:
+    python -m gen_ui_backend.test.servidor_mercadona --latencia 0.05 --puerto 8765
+    MERCADONA_API_URL=http://127.0.0.1:8765/api/ python -m gen_ui_backend.server
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+DIRECTORIO_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mercadona")
+RECURSO_CATEGORIAS = "categories"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FIXTURES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def nombre_fixture(recurso: str) -> str:
+    """Devuelve el nombre de fichero de un recurso (`categories/44` → `categories_44.json`)."""
+    return recurso.strip("/").replace("/", "_") + ".json"
+
+
+def guardar_fixture(directorio: str, recurso: str, data: Any) -> str:
+    """Guarda la respuesta de un recurso y devuelve la ruta del fichero."""
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, nombre_fixture(recurso))
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    return ruta
+
+
+def cargar_fixtures(directorio: str = DIRECTORIO_FIXTURES) -> Dict[str, Any]:
+    """
+    Carga las respuestas grabadas de un directorio.
+
+    Returns:
+        Diccionario {recurso: respuesta JSON}
+    """
+    respuestas = {}
+    for fichero in sorted(os.listdir(directorio)):
+        if not fichero.endswith(".json"):
+            continue
+        recurso = fichero[:-len(".json")].replace("_", "/")
+        with open(os.path.join(directorio, fichero), encoding="utf-8") as f:
+            respuestas[recurso] = json.load(f)
+    return respuestas
+
+
+PRODUCTOS_BASE = [
+    "Leche", "Pan", "Huevos", "Arroz", "Pasta", "Tomate", "Aceite", "Queso",
+    "Yogur", "Café", "Azúcar", "Galletas", "Chocolate", "Pollo", "Jamón", "Agua",
+]
+VARIANTES = ["entera", "desnatada", "ecológica", "integral", "clásica", "sin lactosa", "familiar", "mini"]
+MARCAS = ["Hacendado", "Deliplus", "Bosque Verde", "Marca A", "Marca B"]
+FORMATOS = ["L", "kg", "ud"]
+
+
+def generar_catalogo_sintetico(
+    num_categorias: int = 12,
+    subcategorias: int = 4,
+    sub_subcategorias: int = 3,
+    productos: int = 20,
+    semilla: int = 0
+) -> Dict[str, Any]:
+    """
+    Genera un catálogo determinista con la forma de las respuestas de la API.
+
+    Returns:
+        Diccionario {recurso: respuesta JSON}, como `cargar_fixtures`
+    """
+    aleatorio = random.Random(semilla)
+    resultados = []
+    respuestas: Dict[str, Any] = {}
+    siguiente_id = 1
+
+    for i in range(num_categorias):
+        base = PRODUCTOS_BASE[i % len(PRODUCTOS_BASE)]
+        categoria = {"id": 1000 + i, "name": f"{base} y derivados", "categories": []}
+        for j in range(subcategorias):
+            subcat_id = 10000 + i * 100 + j
+            categoria["categories"].append({"id": subcat_id, "name": f"{base} {VARIANTES[j % len(VARIANTES)]}"})
+            detalle = {"id": subcat_id, "categories": []}
+            for k in range(sub_subcategorias):
+                sub_subcat = {"id": subcat_id * 10 + k, "name": f"{base} {MARCAS[k % len(MARCAS)]}", "products": []}
+                for _ in range(productos):
+                    precio = round(aleatorio.uniform(0.3, 12.0), 2)
+                    cantidad = aleatorio.choice([0.25, 0.5, 1, 2])
+                    sub_subcat["products"].append({
+                        "id": str(siguiente_id),
+                        "display_name": f"{base} {aleatorio.choice(VARIANTES)} {aleatorio.choice(MARCAS)}",
+                        "packaging": aleatorio.choice(["Brick", "Paquete", "Bandeja", "Botella"]),
+                        "price_instructions": {
+                            "unit_price": f"{precio:.2f}",
+                            "bulk_price": f"{precio:.2f}",
+                            "reference_price": f"{precio / cantidad:.2f}",
+                            "reference_format": aleatorio.choice(FORMATOS),
+                        },
+                    })
+                    siguiente_id += 1
+                detalle["categories"].append(sub_subcat)
+            respuestas[f"{RECURSO_CATEGORIAS}/{subcat_id}"] = detalle
+        resultados.append(categoria)
+
+    respuestas[RECURSO_CATEGORIAS] = {"count": len(resultados), "results": resultados}
+    return respuestas
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SERVIDOR
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Con la cola por defecto (5) las ráfagas concurrentes pierden conexiones
+
+
+class ServidorMercadona:
+    """
+    Servidor HTTP que reproduce respuestas de la API con latencia inyectada.
+
+    Responde con ETag y admite `If-None-Match` (304), como la API real.
+    Se puede usar como gestor de contexto.
+    """
+
+    def __init__(
+        self,
+        respuestas: Optional[Dict[str, Any]] = None,
+        latencia: float = 0.0,
+        variacion: float = 0.0,
+        puerto: int = 0
+    ):
+        """
+        Args:
+            respuestas: {recurso: respuesta JSON}; por defecto las fixtures grabadas
+            latencia: Segundos de espera fijos antes de cada respuesta
+            variacion: Segundos de espera aleatorios adicionales (0 a `variacion`)
+            puerto: Puerto de escucha (0 = uno libre)
+        """
+        respuestas = respuestas if respuestas is not None else cargar_fixtures()
+        self._cuerpos: Dict[str, bytes] = {
+            recurso: json.dumps(data, ensure_ascii=False).encode("utf-8")
+            for recurso, data in respuestas.items()
+        }
+        self.latencia = latencia
+        self.variacion = variacion
+        self.peticiones: Counter = Counter()
+        self._lock = threading.Lock()
+        self._servidor = _ServidorHTTP(("127.0.0.1", puerto), self._crear_manejador())
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL base equivalente a `BASE_URL`."""
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}/api/"
+
+    def actualizar(self, recurso: str, data: Any) -> None:
+        """Sustituye la respuesta de un recurso (p. ej. para simular cambios en el catálogo)."""
+        self._cuerpos[recurso] = json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    def iniciar(self) -> "ServidorMercadona":
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="servidor-mercadona", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self) -> "ServidorMercadona":
+        return self.iniciar()
+
+    def __exit__(self, *_: Any) -> None:
+        self.detener()
+
+    def _crear_manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                recurso = self.path.split("?", 1)[0].strip("/")
+                if recurso.startswith("api/"):
+                    recurso = recurso[len("api/"):]
+                with servidor._lock:
+                    servidor.peticiones[recurso] += 1
+
+                espera = servidor.latencia + random.uniform(0, servidor.variacion)
+                if espera > 0:
+                    time.sleep(espera)
+
+                cuerpo = servidor._cuerpos.get(recurso)
+                if cuerpo is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                etag = '"' + hashlib.sha256(cuerpo).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *_):
+                pass
+
+        return Manejador
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduce respuestas grabadas de la API de Mercadona")
+    parser.add_argument("--fixtures", default=DIRECTORIO_FIXTURES, help="Directorio de respuestas grabadas")
+    parser.add_argument("--sintetico", action="store_true", help="Servir un catálogo sintético en lugar de las fixtures")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latencia fija por petición (s)")
+    parser.add_argument("--variacion", type=float, default=0.0, help="Latencia aleatoria adicional (s)")
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+
+    respuestas = generar_catalogo_sintetico() if args.sintetico else cargar_fixtures(args.fixtures)
+    servidor = ServidorMercadona(respuestas, args.latencia, args.variacion, args.puerto).iniciar()
+    print(f"✅ Servidor de Mercadona simulado en {servidor.url} ({len(respuestas)} respuestas)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.detener()
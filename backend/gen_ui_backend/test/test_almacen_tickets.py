@@ -0,0 +1,109 @@
+"""
+Test del almacén de tickets direccionado por contenido y del renderizado bajo demanda.
+"""
+import sys
+import os
+import tempfile
+sys.path.insert(0, '.')
+
+from gen_ui_backend.tools import generador_archivos
+from gen_ui_backend.tools.generador_archivos import (
+    esperar_archivo,
+    generar_archivos_ticket,
+    programar_archivos_ticket,
+    ruta_archivo_ticket,
+)
+from gen_ui_backend.utils.almacen_tickets import NOMBRE_INDICE, AlmacenTickets, analizar_nombre
+from gen_ui_backend.utils.carrito import Carrito
+
+PRODUCTOS = [
+    {"id": "1", "nombre": "Leche entera", "producto_buscado": "leche", "precio_unidad": "0.95", "packaging": "Brick 1 L"},
+    {"id": "2", "nombre": "Pan de molde", "producto_buscado": "pan", "precio_unidad": "1.20"},
+]
+
+
+def _precio_info(cantidades):
+    carrito = Carrito()
+    carrito.sincronizar(PRODUCTOS, cantidades)
+    return carrito.precio_info()
+
+
+def _archivos(directorio):
+    """Archivos de tickets del almacén (sin el índice)."""
+    return sorted(
+        os.path.relpath(os.path.join(raiz, nombre), directorio)
+        for raiz, _, nombres in os.walk(directorio) for nombre in nombres
+        if not nombre.startswith(NOMBRE_INDICE)
+    )
+
+
+def test_carritos_identicos_comparten_registro():
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = AlmacenTickets(directorio)
+        primero = programar_archivos_ticket(_precio_info({"leche": 2}), almacen)
+        assert esperar_archivo(os.path.basename(primero["json_path"]))
+        segundo = programar_archivos_ticket(_precio_info({"leche": 2}), almacen)
+        tercero = programar_archivos_ticket(_precio_info({"leche": 3}), almacen)
+        assert esperar_archivo(os.path.basename(tercero["json_path"]))
+
+        # Cada compra es un ticket; la repetida solo se indexa, sin volver a escribir el contenido
+        assert len({primero["ticket_id"], segundo["ticket_id"], tercero["ticket_id"]}) == 3
+        assert not segundo["pendiente"]
+        assert almacen.cargar(segundo["ticket_id"])["productos"] == almacen.cargar(primero["ticket_id"])["productos"]
+        # Solo los contenidos: ningún formato se escribe hasta que se descarga
+        assert _archivos(directorio) == sorted(
+            f"registros/{almacen.indice.obtener(archivos['ticket_id'])['contenido']}.json"
+            for archivos in (primero, tercero)
+        )
+
+
+def test_renderizado_bajo_demanda(monkeypatch):
+    renderizados = []
+    original = generador_archivos.RENDERIZADORES["txt"]
+    monkeypatch.setitem(
+        generador_archivos.RENDERIZADORES, "txt",
+        lambda registro: renderizados.append(1) or original(registro)
+    )
+
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = AlmacenTickets(directorio)
+        archivos = programar_archivos_ticket(_precio_info({"leche": 2}), almacen)
+        nombre = os.path.basename(archivos["txt_path"])
+        assert esperar_archivo(nombre)
+
+        ruta = ruta_archivo_ticket(nombre, almacen)
+        assert ruta_archivo_ticket(nombre, almacen) == ruta
+        assert renderizados == [1]
+        with open(ruta, encoding="utf-8") as f:
+            texto = f.read()
+        assert "1. Leche entera\n   Brick 1 L\n   2 x 0.95€ = 1.90€" in texto
+        assert "TOTAL A PAGAR:       3.10€" in texto
+
+        assert ruta_archivo_ticket("ticket_" + "0" * 32 + ".txt", almacen) is None
+        assert ruta_archivo_ticket("../server.py", almacen) is None
+
+
+def test_nombres_de_descarga():
+    assert analizar_nombre("ticket_" + "a" * 32 + ".csv") == ("a" * 32, "csv")
+    assert analizar_nombre("ticket_" + "a" * 32 + ".exe") is None
+    assert analizar_nombre("ticket_20240101_120000.json") is None
+
+
+def test_tool_genera_los_tres_formatos():
+    with tempfile.TemporaryDirectory() as directorio:
+        resultado = generar_archivos_ticket.invoke({
+            "productos": PRODUCTOS, "cantidades": {}, "precio_info": _precio_info({}),
+            "directorio_salida": directorio,
+        })
+        assert resultado["success"]
+        for clave in ("json_path", "txt_path", "csv_path"):
+            assert os.path.exists(resultado[clave])
+        with open(resultado["csv_path"], encoding="utf-8", newline="") as f:
+            assert "TOTAL A PAGAR,2.15€\r\n" in f.read()
+
+
+if __name__ == "__main__":
+    test_carritos_identicos_comparten_registro()
+    test_nombres_de_descarga()
+    test_tool_genera_los_tres_formatos()
+    print("✅ Tests del almacén de tickets pasados")
@@ -0,0 +1,97 @@
+"""
+Test de la búsqueda en paralelo del Agente 2: una rama (`Send`) por producto.
+"""
+import sys
+import asyncio
+import time
+sys.path.insert(0, '.')
+
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, START
+
+from gen_ui_backend.agents import agente_buscador
+from gen_ui_backend.agents.state import MultiAgentState, acumular_o_reiniciar
+
+# Segundos que tarda la búsqueda de cada producto
+ESPERAS = {"leche": 0.3, "pan": 0.05, "huevos": 0.15, "quinoa": 0.05}
+
+
+class BuscadorFalso:
+    """Sustituye a `buscar_multiples_productos` con esperas por producto."""
+
+    def __init__(self, fallar=()):
+        self.fallar = set(fallar)
+
+    def _resultado(self, productos):
+        producto = productos[0]
+        if producto in self.fallar:
+            raise RuntimeError(f"timeout en {producto}")
+        if producto == "quinoa":
+            return []
+        return [{"nombre": producto.capitalize(), "precio_unidad": "1.00", "disponible": True,
+                 "producto_buscado": producto}]
+
+    def invoke(self, entrada):
+        time.sleep(ESPERAS[entrada["productos"][0]])
+        return self._resultado(entrada["productos"])
+
+    async def ainvoke(self, entrada):
+        await asyncio.sleep(ESPERAS[entrada["productos"][0]])
+        return self._resultado(entrada["productos"])
+
+
+def _grafo():
+    workflow = StateGraph(MultiAgentState)
+    workflow.add_node("agente_2_buscador", agente_buscador.agente_2_buscador)
+    workflow.add_node("buscar_producto", RunnableLambda(
+        agente_buscador.buscar_producto, afunc=agente_buscador.buscar_producto_async
+    ))
+    workflow.add_node("consolidar_busqueda", agente_buscador.consolidar_busqueda)
+    workflow.add_node("agente_3_calculador", lambda state: {"current_agent": "agente_3"})
+    workflow.add_node("respuesta_final", lambda state: {})
+    workflow.add_edge(START, "agente_2_buscador")
+    workflow.add_edge("buscar_producto", "consolidar_busqueda")
+    return workflow.compile()
+
+
+def test_ramas_en_paralelo(monkeypatch):
+    monkeypatch.setattr(agente_buscador, "buscar_multiples_productos", BuscadorFalso())
+    estado = {"productos_mencionados": ["leche", "pan", "huevos", "quinoa"], "messages": []}
+
+    inicio = time.perf_counter()
+    resultado = asyncio.run(_grafo().ainvoke(estado))
+    duracion = time.perf_counter() - inicio
+
+    # El tiempo lo marca el producto más lento (0.3 s), no la suma (0.55 s)
+    assert duracion < 0.45
+    # Orden de los productos mencionados, aunque "leche" termine la última
+    assert [p["producto_buscado"] for p in resultado["productos_encontrados"]] == ["leche", "pan", "huevos"]
+    assert resultado["productos_no_encontrados"] == ["quinoa"]
+    assert resultado["current_agent"] == "agente_3"
+
+    inicio = time.perf_counter()
+    sincrono = _grafo().invoke(estado)
+    assert time.perf_counter() - inicio < 0.45
+    assert sincrono["productos_encontrados"] == resultado["productos_encontrados"]
+
+
+def test_errores_de_las_ramas(monkeypatch):
+    monkeypatch.setattr(agente_buscador, "buscar_multiples_productos", BuscadorFalso(fallar={"pan"}))
+
+    resultado = _grafo().invoke({"productos_mencionados": ["leche", "pan"], "messages": []})
+    assert [p["producto_buscado"] for p in resultado["productos_encontrados"]] == ["leche"]
+    assert resultado["productos_no_encontrados"] == ["pan"]
+
+    resultado = _grafo().invoke({"productos_mencionados": ["pan"], "messages": []})
+    assert "timeout en pan" in resultado["final_result"]
+
+
+def test_reducer_reinicia_con_none():
+    assert acumular_o_reiniciar(None, [1]) == [1]
+    assert acumular_o_reiniciar([1], [2, 3]) == [1, 2, 3]
+    assert acumular_o_reiniciar([1, 2], None) == []
+
+
+if __name__ == "__main__":
+    test_reducer_reinicia_con_none()
+    print("✅ Tests de búsqueda paralela pasados (los de ramas requieren pytest)")
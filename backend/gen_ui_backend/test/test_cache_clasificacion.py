@@ -0,0 +1,115 @@
+"""
+Test de la caché de clasificaciones de intención.
+"""
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, '.')
+
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+
+from gen_ui_backend.agents import agente_clasificador
+from gen_ui_backend.utils.cache_clasificacion import (
+    AlmacenMemoria,
+    AlmacenSQLite,
+    CacheClasificacion,
+    clave_mensaje,
+    firma_numerica,
+)
+
+CLASIFICACION = {
+    "intencion": "compra",
+    "productos": ["quinoa"],
+    "cantidades": {"quinoa": 2},
+    "confianza": 0.67,
+}
+
+
+def test_clave_normalizada():
+    assert clave_mensaje("¡Quiero 2 Leches!") == clave_mensaje("quiero   2 leches")
+    assert clave_mensaje("Té verde, por favor") == "te verde por favor"
+    assert firma_numerica("quiero 2 leches y tres panes") == ("2", "tres")
+
+
+def test_almacen_memoria_lru_y_ttl():
+    almacen = AlmacenMemoria(capacidad=2, ttl=60)
+    almacen.guardar("a", {"x": 1})
+    almacen.guardar("b", {"x": 2})
+    almacen.obtener("a")  # "a" pasa a ser la más reciente
+    almacen.guardar("c", {"x": 3})
+    assert almacen.obtener("b") is None
+    assert almacen.obtener("a") == {"x": 1}
+    assert almacen.desalojados == 1
+
+    caducado = AlmacenMemoria(ttl=0.01)
+    caducado.guardar("a", {"x": 1})
+    time.sleep(0.02)
+    assert caducado.obtener("a") is None
+    assert caducado.expirados == 1
+
+
+def test_almacen_sqlite_persiste():
+    ruta = os.path.join(tempfile.mkdtemp(), "cache.db")
+    cache = CacheClasificacion(AlmacenSQLite(ruta, capacidad=2))
+    cache.guardar("Quiero 2 quinoas", CLASIFICACION)
+    cache.guardar("dame arroz", {"intencion": "compra", "productos": ["arroz"], "cantidades": {"arroz": 1}})
+    cache.obtener("quiero 2 quinoas")
+    cache.guardar("dame pan", {"intencion": "compra", "productos": ["pan"], "cantidades": {"pan": 1}})
+    cache.almacen.cerrar()
+
+    reabierta = CacheClasificacion(AlmacenSQLite(ruta, capacidad=2))
+    assert reabierta.obtener("quiero 2 quinoas!") == {
+        "intencion": "compra", "productos": ["quinoa"], "cantidades": {"quinoa": 2}
+    }
+    assert reabierta.obtener("dame arroz") is None  # desalojada por LRU
+    assert len(reabierta.almacen) == 2
+    reabierta.almacen.cerrar()
+
+
+def test_nivel_semantico_respeta_cantidades():
+    # Embedding de juguete: bolsa de letras, suficiente para similitudes altas entre frases parecidas
+    def embeddings(texto):
+        return [texto.count(letra) for letra in "abcdefghijklmnopqrstuvwxyz0123456789"]
+
+    cache = CacheClasificacion(AlmacenMemoria(), embeddings, umbral_similitud=0.9)
+    cache.guardar("quiero 2 quinoas", CLASIFICACION)
+
+    assert cache.obtener("quiero 2 quinoa") == cache.obtener("quiero 2 quinoas")
+    assert cache.aciertos_semanticos == 1
+    assert cache.obtener("quiero 3 quinoas") is None  # otra cantidad: no es intercambiable
+    metricas = cache.metricas()
+    assert metricas["aciertos"] == 1 and metricas["fallos"] == 1
+
+
+def test_agente_usa_la_cache(monkeypatch):
+    cache = CacheClasificacion(AlmacenMemoria())
+    monkeypatch.setattr(agente_clasificador, "obtener_cache_clasificacion", lambda: cache)
+    llamadas = []
+
+    def llm(messages, config, texto=None, cadena=None):
+        llamadas.append(texto)
+        cache.guardar(texto, CLASIFICACION)
+        return Command(goto="agente_2_buscador", update={"productos_mencionados": ["quinoa"]})
+
+    monkeypatch.setattr(agente_clasificador, "_clasificar_con_llm", llm)
+    estado = {"messages": [HumanMessage(content="Quiero comprar quinoa")]}
+
+    agente_clasificador.agente_1_clasificador(estado, {})
+    resultado = agente_clasificador.agente_1_clasificador(
+        {"messages": [HumanMessage(content="quiero comprar quinoa!")]}, {}
+    )
+
+    assert llamadas == ["Quiero comprar quinoa"]
+    assert resultado.goto == "agente_2_buscador"
+    assert resultado.update["cantidades"] == {"quinoa": 2}
+    assert agente_clasificador.metricas_enrutado()["cache"]["aciertos"] == 1
+
+
+if __name__ == "__main__":
+    test_clave_normalizada()
+    test_almacen_memoria_lru_y_ttl()
+    test_almacen_sqlite_persiste()
+    test_nivel_semantico_respeta_cantidades()
+    print("✅ Tests de la caché de clasificación pasados (el del agente requiere pytest)")
@@ -0,0 +1,168 @@
+"""
+Test del carrito incremental y de la escritura de archivos en segundo plano.
+"""
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, '.')
+
+from gen_ui_backend.agents import agente_calculador as modulo_calculador
+from gen_ui_backend.agents.agente_calculador import agente_3_calculador
+from gen_ui_backend.tools.calculador_ticket import calcular_precio_total
+from gen_ui_backend.tools.generador_archivos import (
+    ErrorArchivoTicket,
+    esperar_archivo,
+    programar_archivos_ticket,
+    ruta_archivo_ticket,
+)
+from gen_ui_backend.utils.almacen_tickets import AlmacenTickets
+from gen_ui_backend.utils.carrito import Carrito
+
+PRODUCTOS = [
+    {"id": "1", "nombre": "Leche entera", "producto_buscado": "leche", "precio_unidad": "0.95", "packaging": "Brick 1 L"},
+    {"id": "2", "nombre": "Pan de molde", "producto_buscado": "pan", "precio_unidad": "1.20"},
+    {"id": "3", "nombre": "Huevos L", "producto_buscado": "huevos", "precio_unidad": "2.35"},
+]
+
+
+def test_operaciones_incrementales():
+    carrito = Carrito()
+    assert carrito.anadir(PRODUCTOS[0], 2)
+    assert carrito.anadir(PRODUCTOS[1])
+    assert not carrito.anadir(PRODUCTOS[1])  # sin cambios
+    assert carrito.subtotal == 3.10
+    assert carrito.unidades == 3
+
+    assert carrito.actualizar("2", 3)
+    assert carrito.subtotal == 5.50
+    assert carrito.eliminar("1")
+    assert carrito.subtotal == 3.60
+    assert carrito.actualizar("2", 0)
+    assert len(carrito) == 0 and carrito.subtotal == 0
+
+
+def test_equivale_al_calculo_completo():
+    cantidades = {"leche": 2, "pan": 1, "huevos": 3}
+    carrito = Carrito()
+    carrito.sincronizar(PRODUCTOS, cantidades)
+    resultado = calcular_precio_total.invoke({"productos": PRODUCTOS, "cantidades": cantidades})
+
+    assert carrito.precio_info() == resultado
+    assert resultado["total"] == 10.15
+    assert [item["cantidad"] for item in resultado["items"]] == [2, 1, 3]
+
+
+def test_solo_se_renderiza_lo_que_cambia():
+    renderizadas = []
+
+    def renderizar(item):
+        renderizadas.append(item["nombre"])
+        return item["nombre"]
+
+    carrito = Carrito()
+    carrito.sincronizar(PRODUCTOS, {"leche": 2})
+    carrito.fragmentos("ticket", renderizar)
+    assert len(renderizadas) == 3
+
+    # El estado del turno siguiente conserva los fragmentos ya formateados
+    carrito = Carrito(carrito.a_estado())
+    assert carrito.sincronizar(PRODUCTOS, {"leche": 5}) == 1
+    assert carrito.fragmentos("ticket", renderizar) == ["Leche entera", "Pan de molde", "Huevos L"]
+    assert renderizadas[3:] == ["Leche entera"]
+
+    # Quitar un producto no vuelve a formatear los demás
+    assert carrito.sincronizar(PRODUCTOS[:2], {"leche": 5}) == 1
+    carrito.fragmentos("ticket", renderizar)
+    assert len(renderizadas) == 4
+    assert carrito.subtotal == 5.95
+
+
+def test_mismo_producto_en_dos_busquedas():
+    duplicado = {**PRODUCTOS[0], "producto_buscado": "leche entera"}
+    carrito = Carrito()
+    carrito.sincronizar([PRODUCTOS[0], duplicado], {"leche": 2})
+    assert len(carrito) == 1
+    assert carrito.unidades == 4
+
+
+def test_calculador_reutiliza_archivos(monkeypatch):
+    programados = []
+    monkeypatch.setattr(
+        modulo_calculador, "programar_archivos_ticket",
+        lambda precio_info: programados.append(precio_info) or {"json_path": "ticket.json", "success": True}
+    )
+    estado = {"productos_encontrados": PRODUCTOS, "cantidades": {"leche": 2}}
+
+    primero = agente_3_calculador(estado, {}).update
+    assert primero["precio_info"]["total"] == 5.45
+    assert len(programados) == 1
+
+    # Mismo carrito en el turno siguiente: no se vuelven a escribir los archivos
+    segundo = agente_3_calculador({**estado, **primero}, {}).update
+    assert len(programados) == 1
+    assert segundo["archivos_generados"] == primero["archivos_generados"]
+
+    tercero = agente_3_calculador({**estado, **segundo, "cantidades": {"leche": 1}}, {}).update
+    assert len(programados) == 2
+    assert tercero["precio_info"]["total"] == 4.50
+    assert "| 1 | Leche entera | 1 |" in tercero["final_result"]
+
+
+def test_archivos_en_segundo_plano():
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = AlmacenTickets(directorio)
+        carrito = Carrito()
+        carrito.sincronizar(PRODUCTOS, {})
+        inicio = time.perf_counter()
+        archivos = programar_archivos_ticket(carrito.precio_info(), almacen)
+        assert time.perf_counter() - inicio < 0.5
+        assert archivos["pendiente"]
+
+        for clave in ("json_path", "txt_path", "csv_path"):
+            nombre = os.path.basename(archivos[clave])
+            assert esperar_archivo(nombre)
+            assert os.path.exists(ruta_archivo_ticket(nombre, almacen))
+        with open(ruta_archivo_ticket(os.path.basename(archivos["txt_path"]), almacen), encoding="utf-8") as f:
+            assert "TOTAL A PAGAR:       4.50€" in f.read()
+
+
+def test_tickets_del_mismo_segundo_no_chocan():
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = AlmacenTickets(directorio)
+        rutas = []
+        for cantidad in range(1, 6):
+            carrito = Carrito()
+            carrito.sincronizar(PRODUCTOS, {"leche": cantidad})
+            rutas.append(programar_archivos_ticket(carrito.precio_info(), almacen)["txt_path"])
+        assert len(set(rutas)) == 5
+        for ruta in rutas:
+            assert esperar_archivo(os.path.basename(ruta))
+            assert ruta_archivo_ticket(os.path.basename(ruta), almacen)
+
+
+def test_fallo_de_escritura_se_informa(monkeypatch):
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = AlmacenTickets(directorio)
+
+        def _fallar(registro, ticket_id=None):
+            raise OSError("disco lleno")
+
+        monkeypatch.setattr(almacen, "guardar", _fallar)
+        archivos = programar_archivos_ticket({"items": [], "total": 99.0}, almacen)
+        try:
+            esperar_archivo(os.path.basename(archivos["csv_path"]))
+        except ErrorArchivoTicket as e:
+            assert "disco lleno" in str(e)
+        else:
+            raise AssertionError("la descarga debía informar del fallo")
+
+
+if __name__ == "__main__":
+    test_operaciones_incrementales()
+    test_equivale_al_calculo_completo()
+    test_solo_se_renderiza_lo_que_cambia()
+    test_mismo_producto_en_dos_busquedas()
+    test_archivos_en_segundo_plano()
+    test_tickets_del_mismo_segundo_no_chocan()
+    print("✅ Tests del carrito pasados")
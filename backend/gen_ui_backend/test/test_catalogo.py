@@ -0,0 +1,100 @@
+"""
+Test del catálogo local persistente (sin acceso a la red).
+"""
+import os
+import sys
+import tempfile
+sys.path.insert(0, '.')
+
+from gen_ui_backend.utils.catalogo import CatalogoMercadona
+from gen_ui_backend.test.datos_prueba import CATEGORIAS_PRINCIPALES, DETALLES_SUBCATEGORIAS
+
+
+def crear_catalogo_prueba(directorio: str) -> CatalogoMercadona:
+    """Crea un catálogo en disco a partir de las respuestas de ejemplo."""
+    catalogo = CatalogoMercadona(os.path.join(directorio, "catalogo.db"))
+    catalogo.guardar_arbol(CATEGORIAS_PRINCIPALES, DETALLES_SUBCATEGORIAS)
+    return catalogo
+
+
+def test_catalogo_persistente():
+    """El catálogo guardado se recarga desde disco con el mismo contenido."""
+    with tempfile.TemporaryDirectory() as directorio:
+        catalogo = crear_catalogo_prueba(directorio)
+        assert catalogo.cargado
+
+        recargado = CatalogoMercadona(catalogo.ruta_db)
+        assert recargado.cargar()
+
+        nombres = [c["name"] for c in recargado.categorias_principales()]
+        assert nombres == ["Carne", "Huevos, leche y mantequilla", "Panadería y pastelería"]
+        subcategorias = [s["name"] for s in recargado.categorias_principales()[1]["categories"]]
+        assert subcategorias == ["Leche y bebidas vegetales", "Huevos"]
+
+
+def test_productos_de_categorias():
+    """Las consultas por categoría o subcategoría respetan orden y duplicados."""
+    with tempfile.TemporaryDirectory() as directorio:
+        catalogo = crear_catalogo_prueba(directorio)
+
+        # Subcategoría concreta: el producto repetido en dos sub-subcategorías sale una vez
+        leches = catalogo.productos_de_categorias([72])
+        assert [p["id"] for p in leches] == ["1001", "1002", "1003", "1004"]
+        assert leches[0]["categoria_nombre"] == "Huevos, leche y mantequilla"
+        assert leches[0]["subcategoria_nombre"] == "Leche y bebidas vegetales"
+        assert leches[0]["sub_subcategoria_nombre"] == "Leche entera"
+        assert leches[0]["precio_unidad"] == "0.89"
+
+        # Categoría principal: incluye todas sus subcategorías
+        huevos_y_leche = catalogo.productos_de_categorias([18])
+        assert len(huevos_y_leche) == 6
+
+        assert catalogo.productos_de_categorias([999]) == []
+
+
+class _CategoriasConActualizacion(list):
+    """Lista de categorías que actualiza el catálogo a mitad de un recorrido."""
+
+    def __init__(self, categorias, actualizar):
+        super().__init__(categorias)
+        self.actualizar = actualizar
+
+    def __iter__(self):
+        iterador = super().__iter__()
+        yield next(iterador)
+        self.actualizar()
+        yield from iterador
+
+
+def test_compactacion_durante_una_busqueda():
+    """Una búsqueda en curso no ve la tabla, las filas ni el índice de una compactación."""
+    with tempfile.TemporaryDirectory() as directorio:
+        catalogo = crear_catalogo_prueba(directorio)
+        esperados = [p["id"] for p in catalogo.productos_de_categorias([3, 18, 12])]
+        productos = catalogo.productos
+        leches = productos.indice.buscar("leche")
+
+        # La carne ya se ha recorrido cuando pierde un producto y se compacta la tabla:
+        # el resto de subcategorías cambia de filas
+        pollo = {"id": 44, "categories": [{**DETALLES_SUBCATEGORIAS[44]["categories"][0],
+                                           "products": DETALLES_SUBCATEGORIAS[44]["categories"][0]["products"][:1]}]}
+
+        def compactar():
+            while catalogo.tabla is productos.tabla:
+                catalogo.actualizar_subcategoria(44, pollo)
+
+        catalogo._categorias_principales = _CategoriasConActualizacion(catalogo._categorias_principales, compactar)
+        assert [p["id"] for p in catalogo.productos_de_categorias([3, 18, 12])] == esperados
+
+        # La instantánea anterior sigue intacta y la nueva responde igual
+        assert productos.indice.buscar("leche") == leches
+        assert catalogo.indice.buscar("leche") == leches
+        catalogo._categorias_principales = list(catalogo._categorias_principales)
+        assert [p["id"] for p in catalogo.productos_de_categorias([3, 18, 12])] == esperados[:1] + esperados[2:]
+
+
+if __name__ == "__main__":
+    test_catalogo_persistente()
+    test_productos_de_categorias()
+    test_compactacion_durante_una_busqueda()
+    print("✅ Tests del catálogo pasados")
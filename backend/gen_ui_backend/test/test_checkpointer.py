@@ -0,0 +1,120 @@
+"""
+Test del estado persistente de las conversaciones: cada turno continúa el anterior.
+"""
+import sys
+import asyncio
+import os
+import tempfile
+sys.path.insert(0, '.')
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from gen_ui_backend.agents import agente_buscador, agente_clasificador
+from gen_ui_backend.agents.agente_clasificador import es_ampliacion
+from gen_ui_backend.agents.modelos import RegistroModelos
+from gen_ui_backend.graph import create_graph
+from gen_ui_backend.utils.checkpointer import crear_checkpointer
+
+PRECIOS = {"leche": "0.95", "pan": "1.20", "huevos": "2.35"}
+
+
+class BuscadorContador:
+    """Sustituye a `buscar_multiples_productos` y anota qué productos se buscan."""
+
+    def __init__(self):
+        self.buscados = []
+
+    def _resultado(self, productos):
+        producto = productos[0]
+        self.buscados.append(producto)
+        return [{"id": producto, "nombre": producto.capitalize(), "precio_unidad": PRECIOS[producto],
+                 "disponible": True, "producto_buscado": producto}]
+
+    def invoke(self, entrada):
+        return self._resultado(entrada["productos"])
+
+    async def ainvoke(self, entrada):
+        return self._resultado(entrada["productos"])
+
+
+@pytest.fixture
+def buscador(monkeypatch):
+    monkeypatch.setattr(agente_clasificador, "obtener_cache_clasificacion", lambda: None)
+    buscador = BuscadorContador()
+    monkeypatch.setattr(agente_buscador, "buscar_multiples_productos", buscador)
+    return buscador
+
+
+def _turno(grafo, texto, thread_id="conversacion-1"):
+    config = {"configurable": {"thread_id": thread_id}}
+    return grafo.invoke({"messages": [HumanMessage(content=texto)]}, config)
+
+
+def test_ampliacion():
+    assert es_ampliacion("añade también huevos")
+    assert es_ampliacion("y 2 más de pan")
+    assert not es_ampliacion("quiero leche")
+    assert es_ampliacion("otra más de leche")
+    assert es_ampliacion("Y más huevos")
+    # normalizar_nombre pasa a minúsculas: "MÁS" junto a una cantidad cuenta igual
+    assert es_ampliacion("Y 2 MÁS de pan")
+    assert es_ampliacion("Y MÁS huevos")
+    assert not es_ampliacion("Quiero la leche MÁS barata")
+    assert not es_ampliacion("quiero la leche más barata")
+    assert not es_ampliacion("más barato posible, 2 de pan")
+
+
+def test_segundo_turno_solo_busca_lo_nuevo(buscador):
+    grafo = create_graph(RegistroModelos(proveedor="falso"), MemorySaver())
+
+    _turno(grafo, "quiero 2 leche y pan")
+    assert sorted(buscador.buscados) == ["leche", "pan"]
+
+    resultado = _turno(grafo, "añade también huevos")
+    assert buscador.buscados[2:] == ["huevos"]
+    assert resultado["productos_mencionados"] == ["leche", "pan", "huevos"]
+    assert resultado["cantidades"] == {"leche": 2, "pan": 1, "huevos": 1}
+    assert [p["producto_buscado"] for p in resultado["productos_encontrados"]] == ["leche", "pan", "huevos"]
+    assert resultado["precio_info"]["total"] == pytest.approx(2 * 0.95 + 1.20 + 2.35)
+
+    # Un pedido nuevo sustituye al anterior, pero reutiliza lo ya encontrado
+    resultado = _turno(grafo, "quiero 3 pan")
+    assert len(buscador.buscados) == 3
+    assert resultado["productos_mencionados"] == ["pan"]
+    assert resultado["cantidades"] == {"pan": 3}
+
+    # Otra conversación empieza de cero
+    _turno(grafo, "quiero pan", thread_id="conversacion-2")
+    assert buscador.buscados[3:] == ["pan"]
+
+
+def test_estado_en_sqlite_sobrevive_al_reinicio(buscador):
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "conversaciones.db")
+
+        saver = crear_checkpointer("sqlite", ruta)
+        _turno(create_graph(RegistroModelos(proveedor="falso"), saver), "quiero leche")
+        saver.cerrar()
+
+        # Un grafo nuevo con otra conexión al mismo fichero continúa la conversación
+        saver = crear_checkpointer("sqlite", ruta)
+        grafo = create_graph(RegistroModelos(proveedor="falso"), saver)
+        config = {"configurable": {"thread_id": "conversacion-1"}}
+        resultado = asyncio.run(grafo.ainvoke({"messages": [HumanMessage(content="añade pan")]}, config))
+        saver.cerrar()
+
+    assert buscador.buscados == ["leche", "pan"]
+    assert resultado["productos_mencionados"] == ["leche", "pan"]
+
+
+def test_checkpointer_desactivado():
+    assert crear_checkpointer("desactivado") is None
+    assert isinstance(crear_checkpointer("memoria"), MemorySaver)
+
+
+if __name__ == "__main__":
+    test_ampliacion()
+    test_checkpointer_desactivado()
+    print("✅ Tests del estado de las conversaciones pasados (los del grafo requieren pytest)")
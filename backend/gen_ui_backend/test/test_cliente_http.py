@@ -0,0 +1,52 @@
+"""
+Test del limitador de tasa y del puente síncrono del cliente HTTP.
+"""
+import asyncio
+import sys
+import time
+sys.path.insert(0, '.')
+
+from gen_ui_backend.utils.cliente_http import LimitadorTokens, ejecutar_sincrono
+
+
+def test_limitador_permite_rafaga():
+    """Las primeras `capacidad` peticiones no esperan."""
+    limitador = LimitadorTokens(tasa=1, capacidad=5)
+    inicio = time.monotonic()
+    for _ in range(5):
+        limitador.adquirir()
+    assert time.monotonic() - inicio < 0.1
+
+
+def test_limitador_respeta_tasa():
+    """Agotada la ráfaga, las peticiones se espacian según la tasa."""
+    limitador = LimitadorTokens(tasa=20, capacidad=1)
+
+    async def lanzar():
+        await asyncio.gather(*(limitador.adquirir_async() for _ in range(5)))
+
+    inicio = time.monotonic()
+    asyncio.run(lanzar())
+    # 4 esperas de 1/20 s tras el primer token
+    assert time.monotonic() - inicio >= 0.18
+
+
+def test_ejecutar_sincrono():
+    """Las corrutinas se pueden ejecutar desde código síncrono y desde un bucle en marcha."""
+    async def doble(x):
+        await asyncio.sleep(0)
+        return x * 2
+
+    assert ejecutar_sincrono(doble(21)) == 42
+
+    async def desde_bucle():
+        return ejecutar_sincrono(doble(4))
+
+    assert asyncio.run(desde_bucle()) == 8
+
+
+if __name__ == "__main__":
+    test_limitador_permite_rafaga()
+    test_limitador_respeta_tasa()
+    test_ejecutar_sincrono()
+    print("✅ Tests del cliente HTTP pasados")
@@ -0,0 +1,113 @@
+"""
+Test de la coalescencia de búsquedas concurrentes (único vuelo y lotes).
+"""
+import sys
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, '.')
+
+from gen_ui_backend.test.datos_prueba import CATEGORIAS_PRINCIPALES, DETALLES_SUBCATEGORIAS
+from gen_ui_backend.tools import buscador_mercadona
+from gen_ui_backend.utils import mercadona_api
+from gen_ui_backend.utils.coalescencia import AgrupadorLotes, UnicoVuelo
+
+
+def test_unico_vuelo_comparte_la_ejecucion():
+    vuelos = UnicoVuelo()
+    llamadas = []
+
+    async def pedir():
+        llamadas.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def varias():
+        return await asyncio.gather(*(vuelos.ejecutar("url", pedir) for _ in range(5)))
+
+    resultados = asyncio.run(varias())
+    assert len(llamadas) == 1
+    assert all(r is resultados[0] for r in resultados)
+    assert vuelos.metricas() == {"ejecutadas": 1, "compartidas": 4, "en_vuelo": 0}
+
+    # Terminada la ejecución, la siguiente vuelve a salir
+    asyncio.run(vuelos.ejecutar("url", pedir))
+    assert len(llamadas) == 2
+
+
+def test_unico_vuelo_propaga_errores():
+    vuelos = UnicoVuelo()
+
+    async def fallar():
+        await asyncio.sleep(0.01)
+        raise ValueError("sin red")
+
+    async def varias():
+        return await asyncio.gather(*(vuelos.ejecutar("url", fallar) for _ in range(3)), return_exceptions=True)
+
+    resultados = asyncio.run(varias())
+    assert all(isinstance(r, ValueError) for r in resultados)
+
+
+def test_agrupador_reune_peticiones_concurrentes():
+    lotes = []
+
+    async def procesar(entradas):
+        lotes.append(list(entradas))
+        return [entrada * 2 for entrada in entradas]
+
+    agrupador = AgrupadorLotes(procesar, ventana=0.05, max_lote=100)
+    with ThreadPoolExecutor(8) as ejecutor:
+        resultados = list(ejecutor.map(agrupador.procesar, range(8)))
+
+    assert resultados == [n * 2 for n in range(8)]
+    assert len(lotes) < 8 and sum(len(lote) for lote in lotes) == 8
+    assert agrupador.metricas()["lotes"] == len(lotes)
+
+    # Un lote lleno se procesa sin esperar a la ventana
+    agrupador = AgrupadorLotes(procesar, ventana=10, max_lote=2)
+    inicio = time.monotonic()
+    with ThreadPoolExecutor(2) as ejecutor:
+        assert list(ejecutor.map(agrupador.procesar, [1, 2])) == [2, 4]
+    assert time.monotonic() - inicio < 5
+
+
+def test_busquedas_concurrentes_comparten_peticiones(monkeypatch):
+    peticiones = []
+    lock = threading.Lock()
+
+    async def obtener_json(url, timeout=None):
+        with lock:
+            peticiones.append(url)
+        await asyncio.sleep(0.05)
+        if url.endswith("categories/"):
+            return {"results": CATEGORIAS_PRINCIPALES}
+        return DETALLES_SUBCATEGORIAS[int(url.rstrip("/").rsplit("/", 1)[1])]
+
+    monkeypatch.setattr(mercadona_api, "obtener_catalogo_local", lambda: None)
+    monkeypatch.setattr(buscador_mercadona, "obtener_catalogo_local", lambda: None)
+    monkeypatch.setattr(mercadona_api.cliente_async, "obtener_json", obtener_json)
+
+    busqueda = {"productos": ["leche"]}
+    individual = buscador_mercadona.buscar_multiples_productos.invoke(busqueda)
+    peticiones_individual = list(peticiones)
+    peticiones.clear()
+
+    with ThreadPoolExecutor(6) as ejecutor:
+        resultados = list(ejecutor.map(
+            lambda _: buscador_mercadona.buscar_multiples_productos.invoke(busqueda), range(6)
+        ))
+
+    assert all(r == individual for r in resultados)
+    assert individual[0]["producto_buscado"] == "leche"
+    # 6 sesiones concurrentes cargan la API igual que una sola
+    assert sorted(peticiones) == sorted(peticiones_individual)
+    assert any(url.endswith("categories/72") for url in peticiones)
+
+
+if __name__ == "__main__":
+    test_unico_vuelo_comparte_la_ejecucion()
+    test_unico_vuelo_propaga_errores()
+    test_agrupador_reune_peticiones_concurrentes()
+    print("✅ Tests de coalescencia pasados (el de búsquedas concurrentes requiere pytest)")
@@ -0,0 +1,163 @@
+"""
+Test del índice del almacén de tickets y de su retención y compactación.
+"""
+import sys
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+sys.path.insert(0, '.')
+
+from gen_ui_backend.tools.generador_archivos import RENDERIZADORES, ruta_archivo_ticket
+from gen_ui_backend.utils.almacen_tickets import AlmacenTickets, crear_registro, hash_registro, nombre_descarga
+from gen_ui_backend.utils.compactacion_tickets import CompactacionTickets
+
+
+def _registro(dia, cantidad=1, nombre=None):
+    precio_info = {"num_items": 1, "num_productos": cantidad, "total": round(0.95 * cantidad, 2),
+                   "items": [{"nombre": nombre or f"Leche {dia}", "cantidad": cantidad, "precio_unitario": 0.95,
+                              "precio_total": round(0.95 * cantidad, 2)}]}
+    return crear_registro(precio_info, datetime(2025, 3, dia, 9, 0))
+
+
+def _almacen(directorio, dias=range(1, 11)):
+    almacen = AlmacenTickets(directorio)
+    return almacen, [almacen.guardar(_registro(dia, dia)) for dia in dias]
+
+
+def test_indice_de_tickets():
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen, hashes = _almacen(directorio)
+        assert len(almacen.indice) == 10
+
+        fila = almacen.indice.obtener(hashes[3])
+        assert fila["timestamp"] == "20250304_090000"
+        assert (fila["total"], fila["articulos"], fila["unidades"]) == (3.8, 1, 4)
+        assert fila["contenido"] == hash_registro(_registro(4, 4))
+        assert fila["ruta"] == f"registros/{fila['contenido']}.json"
+
+        desde, hasta = datetime(2025, 3, 3), datetime(2025, 3, 5, 23, 59, 59)
+        assert list(almacen.listar(desde, hasta)) == hashes[2:5]
+        assert not almacen.existe("0" * 32)
+
+        # Por lotes, sin perder ni repetir tickets en los cortes
+        ids = almacen.indice.entre(lote=3)
+        assert next(ids) == hashes[0]
+        assert [hashes[0]] + list(ids) == hashes
+        assert list(almacen.indice.entre("20250303_090000", "20250306_090000", lote=2)) == hashes[2:6]
+
+
+def test_compra_repetida_es_otro_ticket():
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = AlmacenTickets(directorio)
+        primero = almacen.guardar(_registro(1, 2, "Leche"))
+        repetido = almacen.guardar(_registro(20, 2, "Leche"))
+
+        # Mismo contenido en disco, pero cada emisión con su ID y su fecha
+        assert primero != repetido
+        assert os.listdir(os.path.join(directorio, "registros")) == [f"{hash_registro(_registro(1, 2, 'Leche'))}.json"]
+        assert almacen.cargar(primero)["fecha"] == "01/03/2025 09:00:00"
+        assert almacen.cargar(repetido)["fecha"] == "20/03/2025 09:00:00"
+        assert list(almacen.listar(datetime(2025, 3, 15))) == [repetido]
+        with open(almacen.renderizado(repetido, "txt", RENDERIZADORES["txt"]), encoding="utf-8") as f:
+            assert "20/03/2025" in f.read()
+
+        # Archivar la primera compra no se lleva el contenido de la repetida
+        assert almacen.compactar(datetime(2025, 3, 10))["archivados"] == 1
+        assert almacen.cargar(primero)["fecha"] == "01/03/2025 09:00:00"
+        assert almacen.cargar(repetido)["fecha"] == "20/03/2025 09:00:00"
+        assert almacen.compactar(datetime(2025, 3, 25))["archivados"] == 1
+        assert os.listdir(os.path.join(directorio, "registros")) == []
+        assert almacen.cargar(repetido)["productos"][0]["nombre"] == "Leche"
+
+
+def test_indice_se_reconstruye():
+    with tempfile.TemporaryDirectory() as directorio:
+        # Un almacén anterior al índice solo tenía los registros, con la fecha y el hash como ID
+        os.makedirs(os.path.join(directorio, "registros"))
+        hashes = []
+        for dia in range(1, 4):
+            registro = _registro(dia, dia)
+            hashes.append(hash_registro(registro))
+            with open(os.path.join(directorio, "registros", f"{hashes[-1]}.json"), "w", encoding="utf-8") as f:
+                json.dump(registro, f)
+
+        almacen = AlmacenTickets(directorio)
+        assert list(almacen.listar()) == hashes
+        assert almacen.cargar(hashes[1])["fecha"] == "02/03/2025 09:00:00"
+
+
+def test_indice_anterior_se_migra():
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen, hashes = _almacen(directorio, range(1, 3))
+        almacen.indice.cerrar()
+        # Índice sin la columna `contenido`: el ID de cada ticket era su hash
+        conexion = sqlite3.connect(os.path.join(directorio, "indice.sqlite3"))
+        with conexion:
+            conexion.execute("DROP INDEX tickets_por_contenido")
+            conexion.execute("ALTER TABLE tickets DROP COLUMN contenido")
+            conexion.executemany("UPDATE tickets SET id = ? WHERE id = ?",
+                                 [(hash_registro(_registro(dia, dia)), h) for dia, h in zip((1, 2), hashes)])
+        conexion.close()
+
+        migrado = AlmacenTickets(directorio)
+        ids = list(migrado.listar())
+        assert ids == [hash_registro(_registro(dia, dia)) for dia in (1, 2)]
+        assert migrado.indice.obtener(ids[0])["contenido"] == ids[0]
+        assert migrado.cargar(ids[1])["fecha"] == "02/03/2025 09:00:00"
+
+
+def test_compactacion_y_lectura_de_archivados():
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen, hashes = _almacen(directorio)
+        ruta_txt = ruta_archivo_ticket(nombre_descarga(hashes[0], "txt"), almacen)
+        esperado = almacen.cargar(hashes[0])
+
+        resultado = almacen.compactar(datetime(2025, 3, 8), tickets_por_segmento=3)
+        assert resultado == {"archivados": 7, "segmentos": 3, "eliminados": 0}
+        assert almacen.indice.contar() == {"tickets": 10, "sueltos": 3, "archivados": 7, "segmentos": 3}
+        assert sorted(os.listdir(os.path.join(directorio, "registros"))) == sorted(
+            f"{almacen.indice.obtener(h)['contenido']}.json" for h in hashes[7:])
+        assert not os.path.exists(ruta_txt)
+
+        # Un ticket archivado se sigue cargando y descargando
+        assert almacen.cargar(hashes[0]) == esperado
+        assert almacen.existe(hashes[0])
+        ruta = almacen.renderizado(hashes[0], "txt", RENDERIZADORES["txt"])
+        with open(ruta, encoding="utf-8") as f:
+            assert "Leche 1" in f.read()
+        assert list(almacen.listar()) == hashes
+
+        # Cada segmento se puede leer entero como NDJSON comprimido
+        segmento = almacen.indice.obtener(hashes[0])["ruta"]
+        with gzip.open(os.path.join(directorio, segmento), "rt", encoding="utf-8") as f:
+            assert [json.loads(linea)["ticket_id"] for linea in f] == hashes[:3]
+
+        # Una segunda pasada no vuelve a archivar nada
+        assert almacen.compactar(datetime(2025, 3, 8))["archivados"] == 0
+
+
+def test_retencion():
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen, hashes = _almacen(directorio)
+        compactacion = CompactacionTickets(almacen, dias_archivar=5, dias_retencion=7, tickets_por_segmento=2)
+
+        resultado = compactacion.ejecutar_ciclo(ahora=datetime(2025, 3, 12))
+        assert resultado["archivados"] == 6
+        assert resultado["eliminados"] == 4  # los segmentos de los días 1-2 y 3-4
+        assert [almacen.existe(h) for h in hashes[:5]] == [False] * 4 + [True]
+        assert almacen.cargar(hashes[0]) is None
+        assert len(os.listdir(os.path.join(directorio, "segmentos"))) == 1
+        assert compactacion.metricas()["tickets"] == 6
+
+
+if __name__ == "__main__":
+    test_indice_de_tickets()
+    test_compra_repetida_es_otro_ticket()
+    test_indice_se_reconstruye()
+    test_indice_anterior_se_migra()
+    test_compactacion_y_lectura_de_archivados()
+    test_retencion()
+    print("✅ Tests del índice y la compactación de tickets pasados")
@@ -0,0 +1,198 @@
+"""
+Test de las descargas: validación con ETag/Last-Modified, rangos, compresión y exportación en bloque.
+"""
+import sys
+import gzip
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+sys.path.insert(0, '.')
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from gen_ui_backend.tools.generador_archivos import exportar_zip
+from gen_ui_backend.utils import descargas
+from gen_ui_backend.utils.almacen_tickets import AlmacenTickets, crear_registro
+from gen_ui_backend.utils.descargas import elegir_codificacion, respuesta_exportacion, ruta_segura, servir_archivo
+
+CONTENIDO = ("Leche entera 1L,2,0.95,1.90\r\n" * 100).encode("utf-8")
+
+
+def _cliente(directorio):
+    app = FastAPI()
+
+    @app.get("/download/{filename}")
+    async def descargar(filename: str, request: Request):
+        ruta = ruta_segura(directorio, filename)
+        if not ruta:
+            raise HTTPException(status_code=404)
+        return await servir_archivo(request, ruta, filename)
+
+    return TestClient(app)
+
+
+def _con_archivo(prueba):
+    with tempfile.TemporaryDirectory() as directorio:
+        with open(os.path.join(directorio, "ticket.csv"), "wb") as f:
+            f.write(CONTENIDO)
+        with open(os.path.join(directorio, "ticket.bin"), "wb") as f:
+            f.write(CONTENIDO)
+        prueba(_cliente(directorio), directorio)
+
+
+def test_validacion_condicional():
+    def prueba(cliente, _):
+        respuesta = cliente.get("/download/ticket.csv", headers={"Accept-Encoding": "identity"})
+        assert respuesta.status_code == 200
+        assert respuesta.content == CONTENIDO
+        assert respuesta.headers["content-type"].startswith("text/csv")
+        etag, fecha = respuesta.headers["etag"], respuesta.headers["last-modified"]
+
+        repetida = cliente.get("/download/ticket.csv", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+        assert repetida.status_code == 304 and repetida.content == b""
+        assert cliente.get("/download/ticket.csv", headers={
+            "Accept-Encoding": "identity", "If-Modified-Since": fecha}).status_code == 304
+        assert cliente.get("/download/ticket.csv", headers={
+            "Accept-Encoding": "identity", "If-None-Match": '"otro"'}).status_code == 200
+
+    _con_archivo(prueba)
+
+
+def test_rangos():
+    def prueba(cliente, _):
+        parcial = cliente.get("/download/ticket.csv", headers={"Range": "bytes=10-19"})
+        assert parcial.status_code == 206
+        assert parcial.content == CONTENIDO[10:20]
+        assert parcial.headers["content-range"] == f"bytes 10-19/{len(CONTENIDO)}"
+        assert "content-encoding" not in parcial.headers
+
+        final = cliente.get("/download/ticket.csv", headers={"Range": "bytes=-5"})
+        assert final.status_code == 206 and final.content == CONTENIDO[-5:]
+
+        fuera = cliente.get("/download/ticket.csv", headers={"Range": f"bytes={len(CONTENIDO)}-"})
+        assert fuera.status_code == 416
+        assert fuera.headers["content-range"] == f"bytes */{len(CONTENIDO)}"
+
+        # Con un If-Range que ya no coincide se envía el archivo entero
+        obsoleto = cliente.get("/download/ticket.csv", headers={"Range": "bytes=0-9", "If-Range": '"viejo"'})
+        assert obsoleto.status_code == 200 and obsoleto.content == CONTENIDO
+
+    _con_archivo(prueba)
+
+
+def test_compresion(monkeypatch):
+    monkeypatch.setattr(descargas, "brotli", None)
+
+    def prueba(cliente, directorio):
+        respuesta = cliente.get("/download/ticket.csv", headers={"Accept-Encoding": "gzip, br"})
+        assert respuesta.headers["content-encoding"] == "gzip"
+        assert respuesta.headers["vary"] == "Accept-Encoding"
+        assert respuesta.content == CONTENIDO  # el cliente descomprime
+        assert int(respuesta.headers["content-length"]) < len(CONTENIDO)
+
+        # La versión comprimida se guarda y tiene su propio ETag
+        with open(os.path.join(directorio, "ticket.csv.gz"), "rb") as f:
+            assert gzip.decompress(f.read()) == CONTENIDO
+        sin_comprimir = cliente.get("/download/ticket.csv", headers={"Accept-Encoding": "identity"})
+        assert sin_comprimir.headers["etag"] != respuesta.headers["etag"]
+        assert cliente.get("/download/ticket.csv", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": respuesta.headers["etag"]}).status_code == 304
+
+        # Los formatos binarios no se comprimen
+        binario = cliente.get("/download/ticket.bin", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in binario.headers
+
+    _con_archivo(prueba)
+
+
+def test_negociacion_y_rutas(monkeypatch):
+    monkeypatch.setattr(descargas, "brotli", None)
+    assert elegir_codificacion("br;q=1.0, gzip;q=0.5") == ("gzip", ".gz")
+    assert elegir_codificacion("gzip;q=0") is None
+    assert elegir_codificacion("*") == ("gzip", ".gz")
+    assert elegir_codificacion(None) is None
+
+    monkeypatch.setattr(descargas, "brotli", object())
+    assert elegir_codificacion("gzip, br") == ("br", ".br")
+    assert elegir_codificacion("gzip, br;q=0.1") == ("gzip", ".gz")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        assert ruta_segura(directorio, "no_existe.txt") is None
+        try:
+            ruta_segura(directorio, "../fuera.txt")
+        except HTTPException as e:
+            assert e.status_code == 403
+        else:
+            raise AssertionError("debía rechazar rutas fuera del directorio")
+
+
+def _almacen_con_tickets(directorio):
+    """Diez tickets, uno por día del 1 al 10 de marzo de 2025."""
+    almacen = AlmacenTickets(directorio)
+    hashes = []
+    for dia in range(1, 11):
+        precio_info = {"items": [{"nombre": "Leche", "cantidad": dia, "precio_unitario": 0.95,
+                                  "precio_total": round(0.95 * dia, 2)}], "total": round(0.95 * dia, 2)}
+        hashes.append(almacen.guardar(crear_registro(precio_info, datetime(2025, 3, dia, 12, 30))))
+    return almacen, hashes
+
+
+def _cliente_exportacion(almacen):
+    app = FastAPI()
+
+    @app.get("/export")
+    async def exportar(formato: str = "zip", desde: str = None, hasta: str = None, ids: str = None):
+        fechas = [datetime.strptime(d, "%Y-%m-%d").date() if d else None for d in (desde, hasta)]
+        return respuesta_exportacion(formato, [ids] if ids else None, *fechas, almacen=almacen)
+
+    return TestClient(app)
+
+
+def test_exportacion_por_fechas_e_ids():
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen, hashes = _almacen_con_tickets(directorio)
+        cliente = _cliente_exportacion(almacen)
+
+        feed = cliente.get("/export", params={"formato": "ndjson", "desde": "2025-03-03", "hasta": "2025-03-05"})
+        assert feed.headers["content-type"] == "application/x-ndjson"
+        lineas = [json.loads(linea) for linea in feed.text.splitlines()]
+        assert [linea["ticket_id"] for linea in lineas] == hashes[2:5]
+
+        respuesta = cliente.get("/export", params={"ids": f"{hashes[0]},{hashes[9]}"})
+        assert respuesta.headers["content-type"] == "application/zip"
+        with zipfile.ZipFile(io.BytesIO(respuesta.content)) as archivo:
+            assert archivo.testzip() is None
+            assert sorted(archivo.namelist()) == sorted(
+                f"ticket_{h}.{f}" for h in (hashes[0], hashes[9]) for f in ("json", "txt", "csv"))
+            registro = json.loads(archivo.read(f"ticket_{hashes[9]}.json"))
+            assert registro["productos"][0]["cantidad"] == 10
+
+        assert cliente.get("/export").status_code == 400
+        assert cliente.get("/export", params={"ids": "../x"}).status_code == 400
+        assert cliente.get("/export", params={"ids": hashes[0], "formato": "tar"}).status_code == 400
+
+
+def test_exportacion_en_streaming(monkeypatch):
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen, hashes = _almacen_con_tickets(directorio)
+        cargados = []
+        cargar = almacen.cargar
+        monkeypatch.setattr(almacen, "cargar", lambda h: cargados.append(h) or cargar(h))
+
+        # El primer bloque sale antes de leer el resto de tickets
+        bloques = exportar_zip(hashes, ["txt"], almacen)
+        next(bloques)
+        assert len(cargados) == 1
+        resto = b"".join(bloques)
+        assert len(cargados) == len(hashes) and resto
+
+
+if __name__ == "__main__":
+    test_validacion_condicional()
+    test_rangos()
+    test_exportacion_por_fechas_e_ids()
+    print("✅ Tests de las descargas pasados (los de compresión requieren pytest)")
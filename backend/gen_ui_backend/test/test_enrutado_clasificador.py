@@ -0,0 +1,75 @@
+"""
+Test del enrutado del Agente 1: clasificador local primero, LLM solo si hace falta.
+"""
+import sys
+sys.path.insert(0, '.')
+
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+
+from gen_ui_backend.agents import agente_clasificador
+from gen_ui_backend.tools.clasificador_intencion import clasificar_intencion
+
+
+def _sin_llm(messages, config, texto=None, cadena=None):
+    raise AssertionError("No debería llamarse al LLM")
+
+
+def test_ruta_rapida_sin_llm(monkeypatch):
+    monkeypatch.setattr(agente_clasificador, "_clasificar_con_llm", _sin_llm)
+    antes = agente_clasificador.contador_rutas[agente_clasificador.RUTA_RAPIDA]
+
+    resultado = agente_clasificador.agente_1_clasificador(
+        {"messages": [HumanMessage(content="quiero 2 leches y 3 panes")]}, {}
+    )
+
+    assert resultado.goto == "agente_2_buscador"
+    assert resultado.update["productos_mencionados"] == ["leche", "pan"]
+    assert resultado.update["cantidades"] == {"leche": 2, "pan": 3}
+    assert agente_clasificador.contador_rutas[agente_clasificador.RUTA_RAPIDA] == antes + 1
+
+
+def test_productos_desconocidos_escalan_al_llm(monkeypatch):
+    llamadas = []
+
+    def llm(messages, config, texto=None, cadena=None):
+        llamadas.append(messages[-1].content)
+        return Command(goto="respuesta_final", update={"final_result": "llm"})
+
+    monkeypatch.setattr(agente_clasificador, "_clasificar_con_llm", llm)
+    antes = agente_clasificador.contador_escalados["productos_desconocidos"]
+
+    resultado = agente_clasificador.agente_1_clasificador(
+        {"messages": [HumanMessage(content="quiero comprar quinoa")]}, {}
+    )
+
+    assert resultado.update["final_result"] == "llm"
+    assert llamadas == ["quiero comprar quinoa"]
+    assert agente_clasificador.contador_escalados["productos_desconocidos"] == antes + 1
+
+
+def test_motivo_escalado():
+    conocida = clasificar_intencion.invoke({"user_input": "dame tres leches y dos panes"})
+    assert conocida["productos_desconocidos"] == []
+    assert agente_clasificador.motivo_escalado(conocida) is None
+
+    desconocida = clasificar_intencion.invoke({"user_input": "quiero comprar quinoa"})
+    assert "quinoa" in desconocida["productos_desconocidos"]
+    assert agente_clasificador.motivo_escalado(desconocida) == "productos_desconocidos"
+
+    assert agente_clasificador.motivo_escalado({"productos": []}) == "sin_productos"
+    assert agente_clasificador.motivo_escalado(
+        {"productos": ["leche"], "confianza": agente_clasificador.UMBRAL_CONFIANZA / 2}
+    ) == "confianza_baja"
+
+
+def test_metricas_enrutado():
+    metricas = agente_clasificador.metricas_enrutado()
+    assert set(metricas) >= {"rutas", "escalados", "proporcion_rapida", "umbral_confianza"}
+    assert 0.0 <= metricas["proporcion_rapida"] <= 1.0
+
+
+if __name__ == "__main__":
+    test_motivo_escalado()
+    test_metricas_enrutado()
+    print("✅ Tests de enrutado pasados (los de ruta rápida y escalado requieren pytest)")
@@ -0,0 +1,95 @@
+"""
+Test de los eventos de progreso que emiten los agentes durante la ejecución del grafo.
+"""
+import sys
+import asyncio
+sys.path.insert(0, '.')
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from gen_ui_backend.agents import agente_buscador, agente_clasificador
+from gen_ui_backend.agents.modelos import RegistroModelos
+from gen_ui_backend.graph import create_graph
+from gen_ui_backend.utils.eventos import ETIQUETA_EVENTO, PREFIJO_EVENTO, emitir_evento
+
+PRODUCTOS = {
+    "leche": {"id": "1", "nombre": "Leche entera", "precio_unidad": "0.95", "packaging": "Brick 1 L"},
+    "pan": {"id": "2", "nombre": "Pan de molde", "precio_unidad": "1.20", "packaging": "Paquete"},
+}
+
+
+class BuscadorFalso:
+    """Sustituye a `buscar_multiples_productos` sin llamar a la API."""
+
+    def _resultado(self, productos):
+        producto = productos[0]
+        if producto not in PRODUCTOS:
+            return []
+        return [{**PRODUCTOS[producto], "disponible": True, "producto_buscado": producto}]
+
+    def invoke(self, entrada):
+        return self._resultado(entrada["productos"])
+
+    async def ainvoke(self, entrada):
+        return self._resultado(entrada["productos"])
+
+
+async def _eventos(version):
+    grafo = create_graph(RegistroModelos(proveedor="falso"))
+    entrada = {"messages": [HumanMessage(content="quiero 2 leche y pan")]}
+    return [evento async for evento in grafo.astream_events(entrada, version=version)]
+
+
+@pytest.fixture
+def sin_red(monkeypatch):
+    monkeypatch.setattr(agente_clasificador, "obtener_cache_clasificacion", lambda: None)
+    monkeypatch.setattr(agente_buscador, "buscar_multiples_productos", BuscadorFalso())
+
+
+def test_eventos_v1(sin_red):
+    eventos = asyncio.run(_eventos("v1"))
+    progreso = [
+        (e["name"][len(PREFIJO_EVENTO):], e["data"]["output"])
+        for e in eventos
+        if e["event"] == "on_chain_end" and ETIQUETA_EVENTO in e.get("tags", [])
+    ]
+    nombres = [nombre for nombre, _ in progreso]
+
+    assert nombres == [
+        "clasificacion", "producto", "producto", "busqueda_completada",
+        "linea_ticket", "linea_ticket", "total",
+    ]
+    datos = dict(progreso)
+    assert datos["clasificacion"]["productos"] == ["leche", "pan"]
+    assert datos["clasificacion"]["cantidades"]["leche"] == 2
+
+    lineas = [d for n, d in progreso if n == "linea_ticket"]
+    assert lineas[0]["precio_total"] == 1.90
+    assert lineas[-1]["subtotal"] == 3.10
+    assert datos["total"]["total"] == 3.10
+
+    # Los eventos llegan antes que la respuesta final
+    indice_total = next(i for i, e in enumerate(eventos) if e["name"] == f"{PREFIJO_EVENTO}total")
+    indice_respuesta = next(i for i, e in enumerate(eventos) if e["event"] == "on_chat_model_stream")
+    assert indice_total < indice_respuesta
+
+
+def test_eventos_v2(sin_red):
+    eventos = asyncio.run(_eventos("v2"))
+    personalizados = [e["name"] for e in eventos if e["event"] == "on_custom_event"]
+    assert personalizados[0] == "clasificacion"
+    assert personalizados[-1] == "total"
+    assert personalizados.count("producto") == 2
+
+
+def test_emitir_fuera_del_grafo():
+    # Sin callbacks no hay a quién entregar el evento
+    emitir_evento("total", {"total": 0}, {})
+    with pytest.raises(ValueError):
+        emitir_evento("desconocido", {}, {})
+
+
+if __name__ == "__main__":
+    test_emitir_fuera_del_grafo()
+    print("✅ Tests de eventos pasados (los del grafo requieren pytest)")
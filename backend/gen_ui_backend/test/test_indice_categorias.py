@@ -0,0 +1,40 @@
+"""
+Test del índice de resolución de categorías.
+"""
+import sys
+sys.path.insert(0, '.')
+
+from gen_ui_backend.utils.indice_categorias import IndiceCategorias
+from gen_ui_backend.utils.mercadona_api import (
+    diccionario_desde_categorias,
+    encontrar_numero_categoria,
+    normalizar_nombre,
+)
+from gen_ui_backend.test.datos_prueba import CATEGORIAS_PRINCIPALES
+
+
+def test_resolucion_equivale_a_recorrido_lineal():
+    """El índice da las mismas categorías que comparar con cada nombre del diccionario."""
+    diccionario = diccionario_desde_categorias(CATEGORIAS_PRINCIPALES)
+    indice = IndiceCategorias(diccionario)
+
+    for producto in ["leche", "Huevos", "pan", "pollo", "panaderia", "y", "cordero", "arroz"]:
+        esperado = {
+            cat_id for nombre, cat_id in diccionario.items()
+            if normalizar_nombre(producto) in normalizar_nombre(nombre)
+        }
+        assert set(indice.resolver(producto)) == esperado, producto
+
+
+def test_encontrar_numero_categoria():
+    """encontrar_numero_categoria acepta el diccionario indexado y uno plano."""
+    diccionario = diccionario_desde_categorias(CATEGORIAS_PRINCIPALES)
+    assert sorted(encontrar_numero_categoria(["leche", "pollo"], diccionario)) == [18, 44, 72]
+    assert sorted(encontrar_numero_categoria(["huevos"], dict(diccionario))) == [18, 77]
+    assert encontrar_numero_categoria(["arroz"], diccionario) == []
+
+
+if __name__ == "__main__":
+    test_resolucion_equivale_a_recorrido_lineal()
+    test_encontrar_numero_categoria()
+    print("✅ Tests del índice de categorías pasados")
@@ -0,0 +1,64 @@
+"""
+Test del índice invertido de nombres de producto.
+"""
+import sys
+sys.path.insert(0, '.')
+
+from gen_ui_backend.utils.indice_productos import IndiceProductos
+from gen_ui_backend.utils.mercadona_api import mostrar_productos_seleccionados, normalizar_nombre
+
+
+PRODUCTOS = [
+    {"id": "1", "nombre": "Leche entera Hacendado", "precio_unidad": "0.89"},
+    {"id": "2", "nombre": "Leche semidesnatada Hacendado", "precio_unidad": "0.82"},
+    {"id": "3", "nombre": "Pan de molde", "precio_unidad": "1.15"},
+    {"id": "4", "nombre": "Panecillos tostados", "precio_unidad": "1.40"},
+    {"id": "5", "nombre": "Té verde", "precio_unidad": "1.05"},
+    {"id": "6", "nombre": "Café molido", "precio_unidad": "2.50"},
+]
+
+
+def test_buscar_equivale_a_recorrido_lineal():
+    """El índice devuelve lo mismo que comprobar 'término en nombre' uno a uno."""
+    indice = IndiceProductos(PRODUCTOS)
+    for termino in ["leche", "pan", "té", "cafe", "molid", "hacendado", "xyz", "e", "LECHE "]:
+        esperado = {p["id"] for p in PRODUCTOS if normalizar_nombre(termino) in normalizar_nombre(p["nombre"])}
+        assert indice.buscar(termino) == esperado, termino
+
+
+def test_buscar_prefijo():
+    """La búsqueda por prefijo encuentra palabras que empiezan por el texto dado."""
+    indice = IndiceProductos(PRODUCTOS)
+    assert indice.buscar_prefijo("pan") == {"3", "4"}
+    assert indice.buscar_prefijo("semi") == {"2"}
+    assert indice.buscar_prefijo("ntera") == set()
+
+
+def test_eliminar_con_referencias():
+    """Un producto indexado dos veces sigue en el índice hasta retirar ambas referencias."""
+    indice = IndiceProductos(PRODUCTOS)
+    indice.agregar([PRODUCTOS[0]])
+    indice.eliminar(["1"])
+    assert indice.buscar("entera") == {"1"}
+    indice.eliminar(["1"])
+    assert indice.buscar("entera") == set()
+    assert "1" not in indice and len(indice) == 5
+
+
+def test_seleccion_con_indice():
+    """La selección del más barato usa el índice y respeta la lista de candidatos."""
+    indice = IndiceProductos(PRODUCTOS)
+    seleccionados = mostrar_productos_seleccionados(PRODUCTOS[2:], ["leche", "pan"], indice)
+    assert [p["id"] for p in seleccionados] == ["3"]
+    assert seleccionados[0]["total_coincidencias"] == 2
+
+    seleccionados = mostrar_productos_seleccionados(PRODUCTOS, ["leche"])
+    assert seleccionados[0]["id"] == "2"
+
+
+if __name__ == "__main__":
+    test_buscar_equivale_a_recorrido_lineal()
+    test_buscar_prefijo()
+    test_eliminar_con_referencias()
+    test_seleccion_con_indice()
+    print("✅ Tests del índice de productos pasados")
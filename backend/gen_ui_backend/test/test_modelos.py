@@ -0,0 +1,83 @@
+"""
+Test del registro de modelos compartido y del modelo falso para ejecutar el grafo sin red.
+"""
+import sys
+sys.path.insert(0, '.')
+
+from langchain_core.messages import HumanMessage
+
+from gen_ui_backend.agents import agente_clasificador
+from gen_ui_backend.agents.agente_clasificador import (
+    crear_agente_1_clasificador,
+    crear_cadena_clasificador,
+)
+from gen_ui_backend.agents.modelos import (
+    NODO_CLASIFICADOR,
+    NODO_RESPUESTA_FINAL,
+    ModeloFalso,
+    RegistroModelos,
+)
+from gen_ui_backend.agents.nodo_final import EmisorRespuesta
+from gen_ui_backend.graph import create_graph
+
+
+def test_registro_reutiliza_modelos(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    configuracion = {
+        "a": {"model": "gpt-3.5-turbo"},
+        "b": {"model": "gpt-4o-mini", "temperature": 0},
+        NODO_RESPUESTA_FINAL: {"proveedor": "emisor"},
+    }
+    registro = RegistroModelos(configuracion=configuracion)
+
+    assert registro.modelo("a") is registro.modelo("a")
+    assert registro.modelo("b").model_name == "gpt-4o-mini"
+    # Todos los modelos de OpenAI comparten el mismo pool de conexiones, síncrono y asíncrono
+    assert registro.modelo("a").http_client is registro.modelo("b").http_client
+    assert registro.modelo("a").http_async_client is registro.modelo("b").http_async_client
+    assert isinstance(registro.modelo(NODO_RESPUESTA_FINAL), EmisorRespuesta)
+    registro.cerrar()
+
+
+def test_sin_clave_no_se_usa_el_modelo_falso(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    registro = RegistroModelos(proveedor="openai")
+    try:
+        registro.modelo(NODO_CLASIFICADOR)
+    except ValueError as e:
+        assert "OPENAI_API_KEY" in str(e) and "MERCADONA_MODELOS=falso" in str(e)
+    else:
+        raise AssertionError("sin clave debía fallar en lugar de usar el modelo falso")
+
+
+def test_registro_falso():
+    registro = RegistroModelos(proveedor="falso")
+    assert isinstance(registro.modelo(NODO_CLASIFICADOR), ModeloFalso)
+    # La configuración por nodo prevalece sobre el proveedor por defecto
+    assert isinstance(registro.modelo(NODO_RESPUESTA_FINAL), EmisorRespuesta)
+
+    falso = ModeloFalso()
+    registro.registrar(NODO_CLASIFICADOR, falso)
+    assert registro.modelo(NODO_CLASIFICADOR) is falso
+
+
+def test_modelo_falso_llama_a_la_herramienta(monkeypatch):
+    monkeypatch.setattr(agente_clasificador, "obtener_cache_clasificacion", lambda: None)
+    nodo = crear_agente_1_clasificador(crear_cadena_clasificador(ModeloFalso()))
+
+    resultado = nodo({"messages": [HumanMessage(content="quiero comprar quinoa")]}, {})
+
+    assert resultado.goto == "agente_2_buscador"
+    assert "quinoa" in resultado.update["productos_mencionados"]
+
+
+def test_grafo_con_modelos_falsos():
+    grafo = create_graph(RegistroModelos(proveedor="falso"))
+    assert "agente_1_clasificador" in grafo.nodes
+    assert "respuesta_final" in grafo.nodes
+
+
+if __name__ == "__main__":
+    test_registro_falso()
+    test_grafo_con_modelos_falsos()
+    print("✅ Tests del registro de modelos pasados (el resto requiere pytest)")
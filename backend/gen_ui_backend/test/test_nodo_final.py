@@ -0,0 +1,61 @@
+"""
+Test del nodo final: emite `final_result` como streaming del modelo de chat sin LLM.
+"""
+import sys
+import asyncio
+sys.path.insert(0, '.')
+
+from langchain_core.messages import AIMessage
+from langgraph.graph import StateGraph, START
+
+from gen_ui_backend.agents.state import MultiAgentState
+from gen_ui_backend.agents.nodo_final import emisor_respuesta, nodo_respuesta_final
+
+RESULTADO = """## 🧮 AGENTE 3: CALCULADOR
+
+| Nº | Producto | Cantidad | Precio Unit. | Precio Total |
+|----|----------|----------|--------------|--------------|
+| 1 | Leche entera | 2 | 0.89€ | 1.78€ |
+
+**TOTAL: 1.78€**"""
+
+
+def _grafo():
+    workflow = StateGraph(MultiAgentState)
+    workflow.add_node("respuesta_final", nodo_respuesta_final)
+    workflow.add_edge(START, "respuesta_final")
+    return workflow.compile()
+
+
+def test_emisor_devuelve_el_texto_intacto():
+    respuesta = emisor_respuesta.invoke(RESULTADO)
+    assert isinstance(respuesta, AIMessage)
+    assert respuesta.content == RESULTADO
+    assert "".join(chunk.content for chunk in emisor_respuesta.stream(RESULTADO)) == RESULTADO
+
+
+def test_nodo_final_anade_el_mensaje():
+    resultado = _grafo().invoke({"messages": [], "final_result": RESULTADO})
+    assert resultado["messages"][-1].content == RESULTADO
+
+
+def test_nodo_final_emite_eventos_de_chat_model():
+    async def eventos():
+        return [
+            evento async for evento in _grafo().astream_events(
+                {"messages": [], "final_result": RESULTADO}, version="v1"
+            )
+        ]
+
+    stream = [e for e in asyncio.run(eventos()) if e["event"] == "on_chat_model_stream"]
+    assert len(stream) > 1
+    # Un único run_id: el frontend lo usa para agrupar los trozos en un mensaje
+    assert len({e["run_id"] for e in stream}) == 1
+    assert "".join(e["data"]["chunk"].content for e in stream) == RESULTADO
+
+
+if __name__ == "__main__":
+    test_emisor_devuelve_el_texto_intacto()
+    test_nodo_final_anade_el_mensaje()
+    test_nodo_final_emite_eventos_de_chat_model()
+    print("✅ Tests del nodo final pasados")
@@ -0,0 +1,83 @@
+"""
+Test de la capa de normalización: equivalencia con el algoritmo Unicode original,
+normalización por lotes y uso en el clasificador y el calculador.
+"""
+import sys
+import unicodedata
+sys.path.insert(0, '.')
+
+from gen_ui_backend.utils.normalizacion import info_cache, normalizar_lote, normalizar_nombre
+from gen_ui_backend.tools.clasificador_intencion import clasificar_intencion
+from gen_ui_backend.tools.calculador_ticket import calcular_precio_total
+
+
+NOMBRES = [
+    "Leche Semidesnatada Hacendado",
+    "  Azúcar MORENO  ",
+    "Plátano de Canarias",
+    "Jamón ibérico Ñora",
+    "Café molido natural",
+    "Crème brûlée",
+    "Ǆemal Ǳ",
+    "Ωmega ç ü ø",
+    "",
+]
+
+
+def _normalizar_original(nombre):
+    """Implementación previa, usada como referencia."""
+    if not nombre:
+        return ""
+    nombre = nombre.lower().strip()
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', nombre)
+        if unicodedata.category(c) != 'Mn'
+    )
+
+
+def test_equivalencia_con_original():
+    for nombre in NOMBRES:
+        assert normalizar_nombre(nombre) == _normalizar_original(nombre), nombre
+    assert normalizar_nombre(None) == ""
+
+
+def test_lote_equivale_a_individual():
+    assert normalizar_lote(NOMBRES) == [normalizar_nombre(n) for n in NOMBRES]
+    assert normalizar_lote([]) == []
+    assert normalizar_lote(["a\x00b", None]) == ["a\x00b", ""]
+
+
+def test_cache_reutiliza_resultados():
+    normalizar_nombre("Yogur Griego Ñam")
+    antes = info_cache()
+    resultado = normalizar_nombre("Yogur Griego Ñam")
+    despues = info_cache()
+    assert resultado == "yogur griego nam"
+    assert despues["aciertos"] == antes["aciertos"] + 1
+    assert resultado is normalizar_nombre("Yogur Griego Ñam")
+
+
+def test_clasificador_sin_tildes():
+    resultado = clasificar_intencion.invoke({"user_input": "Quiero 2 azucar y tres cafés"})
+    assert set(resultado["productos"]) == {"azúcar", "café"}
+    assert resultado["cantidades"] == {"azúcar": 2, "café": 3}
+
+    # "te" sin tilde no debe confundirse con "té" dentro de otras palabras
+    resultado = clasificar_intencion.invoke({"user_input": "dame aceite y tomate"})
+    assert "té" not in resultado["productos"]
+
+
+def test_calculador_cantidades_sin_tildes():
+    productos = [{"id": "1", "nombre": "Azúcar blanco", "producto_buscado": "azúcar", "precio_unidad": "1.5"}]
+    resultado = calcular_precio_total.invoke({"productos": productos, "cantidades": {"AZUCAR": 3}})
+    assert resultado["items"][0]["cantidad"] == 3
+    assert resultado["total"] == 4.5
+
+
+if __name__ == "__main__":
+    test_equivalencia_con_original()
+    test_lote_equivale_a_individual()
+    test_cache_reutiliza_resultados()
+    test_clasificador_sin_tildes()
+    test_calculador_cantidades_sin_tildes()
+    print("✅ Tests de normalización pasados")
@@ -0,0 +1,114 @@
+"""
+Test del motor de plantillas compartido por el ticket, los archivos y la tabla markdown.
+"""
+import sys
+import csv
+import io
+import json
+import socket
+import threading
+sys.path.insert(0, '.')
+
+from gen_ui_backend.utils.almacen_tickets import crear_registro
+from gen_ui_backend.utils.carrito import Carrito
+from gen_ui_backend.utils.plantillas_ticket import (
+    TABLA_MARKDOWN,
+    TICKET,
+    TICKET_CSV,
+    TICKET_JSON,
+    TICKET_TXT,
+    resumen_ticket,
+)
+
+PRODUCTOS = [
+    {"id": "1", "nombre": "Leche entera, \"sin lactosa\" de vaca gallega 1L", "producto_buscado": "leche",
+     "precio_unidad": "0.95", "packaging": "Brick 1 L"},
+    {"id": "2", "nombre": "Pan de molde", "producto_buscado": "pan", "precio_unidad": "1.20"},
+]
+
+
+def _registro():
+    carrito = Carrito()
+    carrito.sincronizar(PRODUCTOS, {"leche": 2})
+    return crear_registro(carrito.precio_info())
+
+
+def _resumen(registro):
+    return {"fecha": registro["fecha"], **registro["resumen"]}
+
+
+def test_json_igual_que_json_dumps():
+    registro = _registro()
+    assert TICKET_JSON.renderizar(registro, registro["productos"]) == json.dumps(registro, ensure_ascii=False, indent=2)
+    vacio = {**registro, "productos": []}
+    assert TICKET_JSON.renderizar(vacio, []) == json.dumps(vacio, ensure_ascii=False, indent=2)
+
+
+def test_csv_igual_que_csv_writer():
+    registro = _registro()
+    resumen = registro["resumen"]
+    esperado = io.StringIO(newline="")
+    writer = csv.writer(esperado)
+    writer.writerows([["MERCADONA - TICKET DE COMPRA"], [f"Fecha: {registro['fecha']}"], [],
+                      ["Nº", "Producto", "Cantidad", "Precio Unitario (€)", "Precio Total (€)", "Packaging"]])
+    for i, item in enumerate(registro["productos"], 1):
+        writer.writerow([i, item["nombre"], item["cantidad"], f"{item['precio_unitario']:.2f}",
+                         f"{item['precio_total']:.2f}", item["packaging"]])
+    writer.writerows([[], ["RESUMEN"], ["Artículos diferentes", resumen["articulos_diferentes"]],
+                      ["Unidades totales", resumen["unidades_totales"]], [],
+                      ["Subtotal", f"{resumen['subtotal']:.2f}€"], ["Descuentos", f"{resumen['descuentos']:.2f}€"],
+                      ["TOTAL A PAGAR", f"{resumen['total']:.2f}€"]])
+
+    assert TICKET_CSV.renderizar(_resumen(registro), registro["productos"]) == esperado.getvalue()
+
+
+def test_ticket_y_tabla_comparten_lineas_del_carrito():
+    carrito = Carrito()
+    carrito.sincronizar(PRODUCTOS, {"leche": 2})
+    resumen = resumen_ticket(carrito.precio_info())
+
+    ticket = TICKET.renderizar(resumen, lineas=carrito.fragmentos(TICKET.nombre, TICKET.linea))
+    assert ticket == TICKET.renderizar(resumen, carrito.items())
+    assert "1. Leche entera, \"sin lactosa\" de vaca g...\n   Brick 1 L\n   2 x 0.95€ = 1.90€\n\n2. Pan de molde\n" in ticket
+    assert "TOTAL A PAGAR:       3.10€" in ticket
+
+    # El archivo TXT usa el mismo diseño, con el nombre completo
+    completo = TICKET_TXT.renderizar(resumen, carrito.items())
+    assert "1. Leche entera, \"sin lactosa\" de vaca gallega 1L\n" in completo
+
+    tabla = TABLA_MARKDOWN.renderizar(resumen, carrito.items())
+    assert "| 2 | Pan de molde | 1 | 1.20€ | **1.20€** |\n" in tabla
+
+
+def test_escritura_por_partes():
+    registro = _registro()
+    resumen, items = _resumen(registro), registro["productos"]
+    texto = TICKET_TXT.renderizar(resumen, items)
+
+    destino = io.StringIO()
+    TICKET_TXT.escribir(destino, resumen, items)
+    assert destino.getvalue() == texto
+
+    bloques = list(TICKET_TXT.bloques(resumen, items * 200, tamano=1024))
+    assert len(bloques) > 1
+    assert b"".join(bloques).decode("utf-8") == TICKET_TXT.renderizar(resumen, items * 200)
+
+    # A un socket, a través de `makefile`
+    emisor, receptor = socket.socketpair()
+    recibido = []
+    lector = threading.Thread(target=lambda: recibido.append(receptor.makefile("rb").read()))
+    lector.start()
+    with emisor.makefile("w", encoding="utf-8", newline="") as salida:
+        TICKET_TXT.escribir(salida, resumen, items)
+    emisor.close()
+    lector.join()
+    receptor.close()
+    assert recibido[0].decode("utf-8") == texto
+
+
+if __name__ == "__main__":
+    test_json_igual_que_json_dumps()
+    test_csv_igual_que_csv_writer()
+    test_ticket_y_tabla_comparten_lineas_del_carrito()
+    test_escritura_por_partes()
+    print("✅ Tests de plantillas del ticket pasados")
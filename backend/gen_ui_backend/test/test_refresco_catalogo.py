@@ -0,0 +1,76 @@
+"""
+Test del refresco incremental del catálogo local (sin acceso a la red).
+"""
+import copy
+import os
+import sys
+import tempfile
+sys.path.insert(0, '.')
+
+from gen_ui_backend.utils import refresco_catalogo
+from gen_ui_backend.utils.catalogo import CatalogoMercadona
+from gen_ui_backend.utils.refresco_catalogo import RefrescoCatalogo
+from gen_ui_backend.test.datos_prueba import CATEGORIAS_PRINCIPALES, DETALLES_SUBCATEGORIAS
+
+
+def test_refresco_solo_actualiza_lo_cambiado():
+    """Solo se vuelven a procesar las subcategorías cuyo contenido ha cambiado."""
+    detalle_nuevo = copy.deepcopy(DETALLES_SUBCATEGORIAS[72])
+    detalle_nuevo["categories"][0]["products"][0]["price_instructions"]["unit_price"] = "0.75"
+
+    peticiones = []
+
+    def peticion_falsa(url, etag=None, hash_previo=None, timeout=10):
+        peticiones.append((url, etag))
+        if url.endswith("categories/72"):
+            return {"modificado": True, "data": detalle_nuevo, "etag": '"v2"', "hash": "h2"}
+        return {"modificado": False, "data": None, "etag": etag, "hash": hash_previo}
+
+    original = refresco_catalogo.hacer_peticion_api_condicional
+    refresco_catalogo.hacer_peticion_api_condicional = peticion_falsa
+    try:
+        with tempfile.TemporaryDirectory() as directorio:
+            catalogo = CatalogoMercadona(os.path.join(directorio, "catalogo.db"))
+            validadores = {cat_id: {"etag": '"v1"', "hash": "h1"} for cat_id in [0, 44, 46, 72, 77, 59]}
+            catalogo.guardar_arbol(CATEGORIAS_PRINCIPALES, DETALLES_SUBCATEGORIAS, validadores)
+
+            # TTL de subcategorías vencido, el de `categories/` todavía vigente
+            refresco = RefrescoCatalogo(catalogo, ttl_por_nivel={0: 3600, 1: 0})
+            resultado = refresco.ejecutar_ciclo()
+
+            assert resultado == {"revalidadas": 5, "cambiadas": 1, "sin_cambios": 4, "errores": 0}
+            assert all(etag == '"v1"' for _, etag in peticiones)
+            assert not any(url.endswith("categories/") for url, _ in peticiones)
+
+            leche = catalogo.productos_de_categorias([72])[0]
+            assert leche["precio_unidad"] == "0.75"
+
+            # El cambio se ha persistido en disco
+            recargado = CatalogoMercadona(catalogo.ruta_db)
+            recargado.cargar()
+            assert recargado.productos_de_categorias([72])[0]["precio_unidad"] == "0.75"
+            assert recargado.estado_revalidacion()[72]["etag"] == '"v2"'
+
+            metricas = refresco.metricas()
+            assert metricas["entradas_totales"] == 6
+            assert metricas["entradas_sin_validar"] == 0
+            assert metricas["cambiadas"] == 1
+    finally:
+        refresco_catalogo.hacer_peticion_api_condicional = original
+
+
+def test_ttl_por_categoria():
+    """El TTL de una categoría concreta tiene prioridad sobre el de su nivel."""
+    with tempfile.TemporaryDirectory() as directorio:
+        catalogo = CatalogoMercadona(os.path.join(directorio, "catalogo.db"))
+        validadores = {cat_id: {"etag": None, "hash": "h1"} for cat_id in [0, 44, 46, 72, 77, 59]}
+        catalogo.guardar_arbol(CATEGORIAS_PRINCIPALES, DETALLES_SUBCATEGORIAS, validadores)
+
+        refresco = RefrescoCatalogo(catalogo, ttl_por_nivel={0: 3600, 1: 3600}, ttl_por_categoria={77: 0})
+        assert list(refresco.entradas_vencidas()) == [77]
+
+
+if __name__ == "__main__":
+    test_refresco_solo_actualiza_lo_cambiado()
+    test_ttl_por_categoria()
+    print("✅ Tests del refresco del catálogo pasados")
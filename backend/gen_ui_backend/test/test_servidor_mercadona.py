@@ -0,0 +1,80 @@
+"""
+Test del servidor local que reproduce la API de Mercadona y de la búsqueda contra él.
+"""
+import sys
+import time
+sys.path.insert(0, '.')
+
+import requests
+
+from gen_ui_backend.test import benchmark_mercadona
+from gen_ui_backend.test.servidor_mercadona import ServidorMercadona, cargar_fixtures, generar_catalogo_sintetico
+from gen_ui_backend.tools import buscador_mercadona
+from gen_ui_backend.utils import mercadona_api
+
+
+def test_reproduce_fixtures_con_etag():
+    respuestas = cargar_fixtures()
+    assert "categories" in respuestas and "categories/72" in respuestas
+
+    with ServidorMercadona(respuestas) as servidor:
+        respuesta = requests.get(f"{servidor.url}categories/72", timeout=5)
+        assert respuesta.status_code == 200
+        assert respuesta.json() == respuestas["categories/72"]
+
+        etag = respuesta.headers["ETag"]
+        assert requests.get(f"{servidor.url}categories/72", headers={"If-None-Match": etag}, timeout=5).status_code == 304
+        assert requests.get(f"{servidor.url}categories/999", timeout=5).status_code == 404
+        assert servidor.peticiones["categories/72"] == 2
+
+
+def test_latencia_inyectada():
+    with ServidorMercadona(cargar_fixtures(), latencia=0.1) as servidor:
+        inicio = time.monotonic()
+        requests.get(f"{servidor.url}categories/", timeout=5)
+        assert time.monotonic() - inicio >= 0.1
+
+
+def test_busqueda_contra_el_servidor(monkeypatch):
+    monkeypatch.setattr(mercadona_api, "obtener_catalogo_local", lambda: None)
+    monkeypatch.setattr(buscador_mercadona, "obtener_catalogo_local", lambda: None)
+
+    with ServidorMercadona(cargar_fixtures()) as servidor:
+        monkeypatch.setattr(mercadona_api, "BASE_URL", servidor.url)
+        resultados = buscador_mercadona.buscar_multiples_productos.invoke({"productos": ["leche"]})
+
+    assert [r["producto_buscado"] for r in resultados] == ["leche"]
+    assert resultados[0]["id"] == "1003"  # la leche más barata de las fixtures
+    assert servidor.peticiones["categories/72"] == 1
+
+
+def test_catalogo_sintetico_determinista():
+    catalogo = generar_catalogo_sintetico(num_categorias=2, subcategorias=2, sub_subcategorias=1, productos=3)
+    assert catalogo == generar_catalogo_sintetico(num_categorias=2, subcategorias=2, sub_subcategorias=1, productos=3)
+    assert len(catalogo["categories"]["results"]) == 2
+    assert len(catalogo) == 1 + 2 * 2
+
+
+def test_benchmark_y_comparacion(monkeypatch):
+    monkeypatch.setattr(mercadona_api, "obtener_catalogo_local", lambda: None)
+    monkeypatch.setattr(buscador_mercadona, "obtener_catalogo_local", lambda: None)
+
+    with ServidorMercadona(cargar_fixtures()) as servidor:
+        resultados = benchmark_mercadona.ejecutar_benchmark(servidor.url, repeticiones=1, productos=["leche"])
+
+    assert "buscar_multiples_productos" in resultados
+    assert all(medida["mediana_ms"] >= 0 for medida in resultados.values())
+    assert mercadona_api.BASE_URL != servidor.url  # se restaura al terminar
+
+    referencia = {"buscar_multiples_productos": {"mediana_ms": 10.0, "p95_ms": 10.0}}
+    assert benchmark_mercadona.comparar({"buscar_multiples_productos": {"mediana_ms": 12.0}}, referencia) == []
+    assert benchmark_mercadona.comparar(
+        {"buscar_multiples_productos": {"mediana_ms": 40.0}}, referencia
+    ) == ["buscar_multiples_productos"]
+
+
+if __name__ == "__main__":
+    test_reproduce_fixtures_con_etag()
+    test_latencia_inyectada()
+    test_catalogo_sintetico_determinista()
+    print("✅ Tests del servidor de Mercadona pasados (los de búsqueda requieren pytest)")
@@ -0,0 +1,125 @@
+"""
+Test de la tabla columnar de productos y de su uso desde el catálogo local.
+"""
+import sys
+import tempfile
+import os
+sys.path.insert(0, '.')
+
+from gen_ui_backend.test.datos_prueba import CATEGORIAS_PRINCIPALES, DETALLES_SUBCATEGORIAS
+from gen_ui_backend.utils.catalogo import CatalogoMercadona
+from gen_ui_backend.utils.mercadona_api import mostrar_productos_seleccionados
+from gen_ui_backend.utils.tabla_productos import FilaProducto, TablaProductos, como_tabla
+
+
+CATEGORIA = {"id": 18, "name": "Huevos, leche y mantequilla"}
+SUBCATEGORIA = {"id": 72, "name": "Leche y bebidas vegetales"}
+SUB_SUBCATEGORIA = {"id": 720, "name": "Leche entera"}
+
+
+def _tabla_de_ejemplo():
+    tabla = TablaProductos()
+    for producto in DETALLES_SUBCATEGORIAS[72]["categories"][0]["products"]:
+        tabla.agregar_producto_api(producto, CATEGORIA, SUBCATEGORIA, SUB_SUBCATEGORIA)
+    return tabla
+
+
+def test_fila_se_comporta_como_diccionario():
+    tabla = _tabla_de_ejemplo()
+    fila = tabla.fila(0)
+    assert fila["nombre"] == "Leche entera Hacendado"
+    assert fila["precio_unidad"] == "0.89" and fila.precio == 0.89
+    assert fila.get("categoria_id") == 18
+    assert fila.get("no_existe", "x") == "x"
+    assert fila["sub_subcategoria_nombre"] == "Leche entera"
+
+    copia = fila.copy()
+    assert type(copia) is dict and len(copia) == 13
+    assert copia == dict(fila)
+    assert not hasattr(fila, "__dict__")
+
+
+def test_cadenas_internadas():
+    tabla = _tabla_de_ejemplo()
+    tabla.agregar_producto_api(
+        {"id": "x", "display_name": "Otra", "packaging": "Brick 1 L", "price_instructions": {}},
+        CATEGORIA, SUBCATEGORIA, SUB_SUBCATEGORIA
+    )
+    assert tabla.packaging[0] is tabla.packaging[-1]
+
+
+def test_argmin_y_diccionarios():
+    productos = [
+        {"id": "1", "nombre": "Leche A", "precio_unidad": "0.90"},
+        {"id": "2", "nombre": "Leche B", "precio_unidad": "0.80"},
+        {"id": "3", "nombre": "Leche C", "precio_unidad": "0.80"},
+        {"id": "4", "nombre": "Leche D", "precio_unidad": "sin precio"},
+    ]
+    tabla, filas = como_tabla(productos)
+    assert filas == [0, 1, 2, 3]
+    assert tabla.argmin_precio(filas) == 1  # en empate gana el primero
+    assert tabla.argmin_precio([]) is None
+
+    seleccionados = mostrar_productos_seleccionados(productos, ["leche"])
+    assert seleccionados[0]["id"] == "2"
+    assert seleccionados[0]["total_coincidencias"] == 4
+
+
+def test_precios_convertidos_al_ingerir():
+    tabla = _tabla_de_ejemplo()
+    assert tabla.precios_unidad.typecode == "d" and tabla.precios_referencia.typecode == "d"
+    assert list(tabla.precios_unidad) == [float(t) for t in tabla.precios_unidad_texto]
+    assert tabla.fila(0)["precio_referencia"] == tabla.precios_referencia_texto[0]
+
+
+def test_mas_baratos_y_por_formato():
+    productos = [
+        {"id": "1", "nombre": "Arroz A", "precio_unidad": "1.20", "precio_referencia": "1.20", "formato_referencia": "kg"},
+        {"id": "2", "nombre": "Arroz B", "precio_unidad": "0.95", "precio_referencia": "1.90", "formato_referencia": "kg"},
+        {"id": "3", "nombre": "Arroz C", "precio_unidad": "2.10", "precio_referencia": "0.70", "formato_referencia": "kg"},
+        {"id": "4", "nombre": "Arroz D", "precio_unidad": "0.95", "precio_referencia": "3.80", "formato_referencia": "ud"},
+        {"id": "5", "nombre": "Arroz E", "precio_unidad": "3.00", "precio_referencia": "", "formato_referencia": "L"},
+    ]
+    tabla, filas = como_tabla(productos)
+    assert tabla.mas_baratos(filas, 3) == [1, 3, 0]
+    assert tabla.mas_baratos(filas, 0) == []
+    assert tabla.mas_barato_por_formato(filas) == {"kg": 2, "ud": 3}
+
+    seleccionado = mostrar_productos_seleccionados(productos, ["arroz"], top_k=2)[0]
+    assert seleccionado["id"] == "2"
+    assert [p["id"] for p in seleccionado["mas_baratos"]] == ["2", "4"]
+    assert seleccionado["mas_barato_por_formato"]["kg"]["id"] == "3"
+    assert seleccionado["mas_barato_por_formato"]["kg"]["precio_referencia"] == "0.70"
+
+
+def test_catalogo_usa_la_tabla():
+    with tempfile.TemporaryDirectory() as directorio:
+        catalogo = CatalogoMercadona(os.path.join(directorio, "catalogo.db"))
+        catalogo.guardar_arbol(CATEGORIAS_PRINCIPALES, DETALLES_SUBCATEGORIAS)
+
+        leches = catalogo.productos_de_categorias([72])
+        assert all(isinstance(p, FilaProducto) and p.tabla is catalogo.tabla for p in leches)
+        tabla, _ = como_tabla(leches)
+        assert tabla is catalogo.tabla
+
+        seleccionados = mostrar_productos_seleccionados(leches, ["leche"], catalogo.indice)
+        assert type(seleccionados[0]) is dict
+        assert seleccionados[0]["precio_unidad"] == min(leches, key=lambda p: p.precio)["precio_unidad"]
+
+        # Las actualizaciones repetidas compactan la tabla en lugar de crecer sin límite
+        for _ in range(5):
+            catalogo.actualizar_subcategoria(72, DETALLES_SUBCATEGORIAS[72])
+        vivas = sum(len(f) for f in catalogo.productos.filas_por_subcategoria.values())
+        assert len(catalogo.tabla) <= 2 * vivas
+        assert [p["id"] for p in catalogo.productos_de_categorias([72])] == ["1001", "1002", "1003", "1004"]
+        assert catalogo.indice.buscar("entera")
+
+
+if __name__ == "__main__":
+    test_fila_se_comporta_como_diccionario()
+    test_cadenas_internadas()
+    test_argmin_y_diccionarios()
+    test_precios_convertidos_al_ingerir()
+    test_mas_baratos_y_por_formato()
+    test_catalogo_usa_la_tabla()
+    print("✅ Tests de la tabla de productos pasados")
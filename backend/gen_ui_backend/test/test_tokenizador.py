@@ -0,0 +1,60 @@
+"""
+Test del analizador léxico del clasificador de intención.
+"""
+import sys
+sys.path.insert(0, '.')
+
+from gen_ui_backend.tools.clasificador_intencion import (
+    TOKEN_INTENCION,
+    TOKEN_NUMERO,
+    TOKEN_PALABRA,
+    TOKEN_PRODUCTO,
+    clasificar_intencion,
+    tokenizar,
+)
+from gen_ui_backend.utils.normalizacion import normalizar_nombre
+
+
+def test_tokens_con_posiciones():
+    texto = "Quiero 2 leches, tres cafés y té"
+    tokens = tokenizar(texto)
+
+    assert [t.tipo for t in tokens] == [
+        TOKEN_INTENCION, TOKEN_NUMERO, TOKEN_PRODUCTO, TOKEN_NUMERO, TOKEN_PRODUCTO, TOKEN_PALABRA, TOKEN_PRODUCTO,
+    ]
+    assert [t.valor for t in tokens if t.tipo == TOKEN_PRODUCTO] == ["leche", "café", "té"]
+    assert [t.valor for t in tokens if t.tipo == TOKEN_NUMERO] == [2, 3]
+    for token in tokens:
+        assert normalizar_nombre(texto[token.inicio:token.fin]) == token.texto
+
+
+def test_intencion_por_prefijo():
+    (token,) = tokenizar("buscar")
+    assert {palabra for _, palabra in token.valor} == {"busca", "buscar"}
+    assert clasificar_intencion.invoke({"user_input": "¿cuánto cuesta el aceite?"})["intencion"] == "consulta"
+
+
+def test_cantidades_por_mencion():
+    resultado = clasificar_intencion.invoke({"user_input": "dame 3 panes y 2 leches"})
+    # Los productos quedan en el orden en que se mencionan
+    assert resultado["productos"] == ["pan", "leche"]
+
+    resultado = clasificar_intencion.invoke({"user_input": "leches x3 y panes x 2"})
+    assert resultado["cantidades"] == {"leche": 3, "pan": 2}
+
+    # La cantidad de un producto no se arrastra al siguiente
+    resultado = clasificar_intencion.invoke({"user_input": "dos de pollo y pescado"})
+    assert resultado["cantidades"] == {"pollo": 2, "pescado": 1}
+
+
+def test_productos_potenciales():
+    resultado = clasificar_intencion.invoke({"user_input": "quiero comprar quinoa"})
+    assert resultado["productos_desconocidos"] == ["quinoa"]
+
+
+if __name__ == "__main__":
+    test_tokens_con_posiciones()
+    test_intencion_por_prefijo()
+    test_cantidades_por_mencion()
+    test_productos_potenciales()
+    print("✅ Tests del analizador léxico pasados")
@@ -0,0 +1,99 @@
+"""
+Test del vocabulario de productos construido a partir del catálogo.
+"""
+import sys
+import tempfile
+import time
+sys.path.insert(0, '.')
+
+from gen_ui_backend.tools import clasificador_intencion
+from gen_ui_backend.tools.clasificador_intencion import clasificar_intencion
+from gen_ui_backend.utils.vocabulario import VocabularioProductos, raiz
+from gen_ui_backend.test.test_catalogo import crear_catalogo_prueba
+
+
+def test_raiz_singular_y_plural():
+    for singular, plural in [("pan", "panes"), ("leche", "leches"), ("nuez", "nueces"),
+                             ("yogur", "yogures"), ("postre", "postres"), ("huevo", "huevos")]:
+        assert raiz(singular) == raiz(plural), (singular, plural)
+
+
+def test_reconoce_terminos_del_catalogo():
+    with tempfile.TemporaryDirectory() as directorio:
+        vocabulario = crear_catalogo_prueba(directorio).vocabulario()
+
+    # Plurales, tildes y la coincidencia más larga
+    assert vocabulario.reconocer_texto("Quiero pan de molde y leches semidesnatadas") == [
+        "pan de molde", "leche semidesnatada"
+    ]
+    assert vocabulario.reconocer_texto("algo de panaderia") == ["panadería"]
+    assert vocabulario.reconocer_texto("bebidas vegetales") == ["bebidas vegetales"]
+    # Las palabras vacías y las unidades no son términos
+    assert vocabulario.reconocer_texto("una caja de la") == []
+
+
+def test_se_reconstruye_al_actualizar_el_catalogo():
+    with tempfile.TemporaryDirectory() as directorio:
+        catalogo = crear_catalogo_prueba(directorio)
+        anterior = catalogo.vocabulario()
+        assert catalogo.vocabulario() is anterior
+        assert anterior.reconocer_texto("pan de centeno") == ["pan"]
+
+        catalogo.actualizar_subcategoria(59, {"id": 59, "categories": [
+            {"id": 590, "name": "Pan", "products": [{"id": "4003", "display_name": "Pan de centeno"}]},
+        ]})
+        nuevo = catalogo.vocabulario()
+        assert nuevo is not anterior
+        assert nuevo.reconocer_texto("pan de centeno") == ["pan de centeno"]
+
+
+def test_clasificador_con_vocabulario(monkeypatch):
+    with tempfile.TemporaryDirectory() as directorio:
+        vocabulario = crear_catalogo_prueba(directorio).vocabulario()
+    monkeypatch.setattr(clasificador_intencion, "_vocabulario_catalogo", lambda: vocabulario)
+
+    resultado = clasificar_intencion.invoke({"user_input": "quiero 2 pechugas de pollo y pan de molde"})
+    assert resultado["productos"] == ["pechuga de pollo", "pan de molde"]
+    assert resultado["cantidades"] == {"pechuga de pollo": 2, "pan de molde": 1}
+
+    resultado = clasificar_intencion.invoke({"user_input": "quiero conejo"})
+    assert resultado["productos"] == ["conejo"]
+    assert resultado["productos_desconocidos"] == []
+
+    # Los productos comunes conservan su nombre
+    resultado = clasificar_intencion.invoke({"user_input": "dame 3 huevos"})
+    assert resultado["cantidades"] == {"huevos": 3}
+
+
+def _palabra(numero):
+    """Palabra artificial única para cada número: 0 → "baa", 1 → "bab"..."""
+    letras = ""
+    for _ in range(3):
+        numero, resto = divmod(numero, 26)
+        letras = chr(ord("a") + resto) + letras
+    return "b" + letras
+
+
+def test_reconocer_con_miles_de_terminos():
+    nombres = [f"{_palabra(i)} {_palabra(i % 97)} {_palabra(i % 13)}" for i in range(5000)]
+    vocabulario = VocabularioProductos.desde_catalogo([], nombres)
+    palabras = f"quiero dos {_palabra(4321)} {_palabra(4321 % 97)} y tres {_palabra(17)} por favor".split()
+
+    repeticiones = 1000
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        coincidencias = vocabulario.reconocer(palabras)
+    por_mensaje = (time.perf_counter() - inicio) / repeticiones
+
+    assert [termino for _, _, termino in coincidencias] == [
+        f"{_palabra(4321)} {_palabra(4321 % 97)}", _palabra(17)
+    ]
+    assert por_mensaje < 100e-6
+
+
+if __name__ == "__main__":
+    test_raiz_singular_y_plural()
+    test_reconoce_terminos_del_catalogo()
+    test_se_reconstruye_al_actualizar_el_catalogo()
+    test_reconocer_con_miles_de_terminos()
+    print("✅ Tests del vocabulario pasados (el del clasificador requiere pytest)")
@@ -2,16 +2,24 @@
 Tool para buscar productos en la API de Mercadona.
 Integra con las utilidades de mercadona_api para realizar búsquedas reales.
 """
+import asyncio
+import os
 from typing import Any, Dict, List
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool, tool
 
+from gen_ui_backend.utils.coalescencia import AgrupadorLotes
 from gen_ui_backend.utils.mercadona_api import (
-    crear_diccionario_categorias,
+    crear_diccionario_categorias_async,
     encontrar_numero_categoria,
-    extraer_productos_de_categoria,
-    mostrar_productos_seleccionados
+    extraer_productos_de_categoria_async,
+    mostrar_productos_seleccionados,
+    obtener_catalogo_local
 )
 
+# Las búsquedas que llegan dentro de esta ventana se procesan juntas
+VENTANA_LOTE = float(os.getenv("MERCADONA_VENTANA_LOTE_MS", 10)) / 1000
+MAX_LOTE = int(os.getenv("MERCADONA_MAX_LOTE", 32))
+
 
 @tool
 def buscar_producto_mercadona(producto: str) -> Dict[str, Any]:
@@ -59,8 +67,7 @@ def buscar_producto_mercadona(producto: str) -> Dict[str, Any]:
         }
 
 
-@tool
-def buscar_multiples_productos(productos: List[str]) -> List[Dict[str, Any]]:
+def _buscar_multiples_productos(productos: List[str]) -> List[Dict[str, Any]]:
     """
     Busca múltiples productos en la API de Mercadona.
     
@@ -70,71 +77,147 @@ def buscar_multiples_productos(productos: List[str]) -> List[Dict[str, Any]]:
     3. Extrae productos de esas categorías
     4. Selecciona los más baratos que coincidan
     
+    Las búsquedas concurrentes de varias sesiones se agrupan en lotes
+    (`agrupador_busquedas`) que comparten una única pasada por el catálogo.
+    
     Args:
         productos: Lista de nombres de productos a buscar
         
     Returns:
-        Lista de dicts con información de cada producto encontrado
+        Lista de dicts con información de cada producto encontrado, incluyendo
+        los más baratos (`mas_baratos`) y el más barato por formato de
+        referencia (`mas_barato_por_formato`)
     """
-    try:
-        print(f"\n🔍 Iniciando búsqueda de productos: {productos}")
+    return agrupador_busquedas.procesar(list(productos))
+
+
+async def _abuscar_multiples_productos(productos: List[str]) -> List[Dict[str, Any]]:
+    """
+    Versión asíncrona de la búsqueda: espera el lote sin bloquear el bucle de eventos.
+    """
+    return await agrupador_busquedas.procesar_async(list(productos))
+
+
+async def _buscar_lote(peticiones: List[List[str]]) -> List[List[Dict[str, Any]]]:
+    """
+    Procesa juntas las búsquedas de varias sesiones que llegan en la misma ventana.
+    
+    El diccionario de categorías se obtiene una vez para todo el lote y las
+    extracciones se lanzan a la vez, de modo que una subcategoría que piden
+    varias sesiones solo se descarga una vez. Cada búsqueda conserva su propio
+    resultado, igual que si se hubiera hecho por separado.
+    
+    Args:
+        peticiones: Lista de productos de cada búsqueda, en orden de llegada
         
-        # 1. Crear diccionario de categorías
+    Returns:
+        Resultados de cada búsqueda, en el mismo orden
+    """
+    print(f"\n🔍 Iniciando lote de {len(peticiones)} búsquedas: {peticiones}")
+    try:
+        # 1. Crear diccionario de categorías (compartido por el lote)
         print("\n📚 Paso 1: Creando diccionario de categorías...")
-        diccionario_categorias = crear_diccionario_categorias()
-        
-        if not diccionario_categorias:
-            print("❌ No se pudo crear el diccionario de categorías")
-            return []
-        
+        diccionario_categorias = await crear_diccionario_categorias_async()
+    except Exception as e:
+        _informar_error(e)
+        return [[] for _ in peticiones]
+    
+    return list(await asyncio.gather(*(
+        _buscar_con_diccionario(productos, diccionario_categorias) for productos in peticiones
+    )))
+
+
+async def _buscar_con_diccionario(
+    productos: List[str],
+    diccionario_categorias: Dict[str, int]
+) -> List[Dict[str, Any]]:
+    """Pasos 2 a 4 de la búsqueda de una sesión."""
+    try:
         # 2. Encontrar categorías relevantes
-        print("\n🔎 Paso 2: Buscando categorías relevantes...")
-        categorias_ids = encontrar_numero_categoria(productos, diccionario_categorias)
-        
+        categorias_ids = _categorias_relevantes(productos, diccionario_categorias)
         if not categorias_ids:
-            print("❌ No se encontraron categorías para los productos especificados")
             return []
         
         # 3. Extraer productos de esas categorías
         print(f"\n📦 Paso 3: Extrayendo productos de {len(categorias_ids)} categorías...")
-        productos_mercadona = extraer_productos_de_categoria(categorias_ids)
-        
-        if not productos_mercadona:
-            print("❌ No se encontraron productos en las categorías")
-            return []
+        productos_mercadona = await extraer_productos_de_categoria_async(categorias_ids)
         
         # 4. Seleccionar los productos más baratos que coincidan
-        print("\n💰 Paso 4: Seleccionando productos más baratos...")
-        productos_seleccionados = mostrar_productos_seleccionados(productos_mercadona, productos)
-        
-        if not productos_seleccionados:
-            print("❌ No se encontraron coincidencias para los productos buscados")
-            return []
-        
-        # Formatear resultados para ser compatibles con el sistema multi-agente
-        resultados = []
-        for producto in productos_seleccionados:
-            resultado = {
-                "id": producto.get("id", ""),
-                "nombre": producto.get("nombre", ""),
-                "precio_unidad": producto.get("precio_unidad", 0.0),
-                "disponible": True,
-                "categoria": producto.get("categoria_nombre", ""),
-                "subcategoria": producto.get("subcategoria_nombre", ""),
-                "packaging": producto.get("packaging", ""),
-                "precio_referencia": producto.get("precio_referencia", ""),
-                "formato_referencia": producto.get("formato_referencia", ""),
-                "producto_buscado": producto.get("producto_buscado", ""),
-                "total_coincidencias": producto.get("total_coincidencias", 0)
-            }
-            resultados.append(resultado)
-        
-        print(f"\n✅ Búsqueda completada: {len(resultados)} productos encontrados")
-        return resultados
+        return _seleccionar_y_formatear(productos_mercadona, productos)
     
     except Exception as e:
-        print(f"❌ Error durante la búsqueda de productos: {e}")
-        import traceback
-        traceback.print_exc()
+        _informar_error(e)
+        return []
+
+
+def _informar_error(e: Exception) -> None:
+    print(f"❌ Error durante la búsqueda de productos: {e}")
+    import traceback
+    traceback.print_exc()
+
+
+agrupador_busquedas = AgrupadorLotes(_buscar_lote, ventana=VENTANA_LOTE, max_lote=MAX_LOTE)
+
+
+buscar_multiples_productos = StructuredTool.from_function(
+    func=_buscar_multiples_productos,
+    coroutine=_abuscar_multiples_productos,
+    name="buscar_multiples_productos",
+)
+
+
+def _categorias_relevantes(productos: List[str], diccionario_categorias: Dict[str, int]) -> List[int]:
+    """Paso 2: encuentra las categorías cuyos nombres contienen los productos buscados."""
+    if not diccionario_categorias:
+        print("❌ No se pudo crear el diccionario de categorías")
         return []
+    
+    print("\n🔎 Paso 2: Buscando categorías relevantes...")
+    categorias_ids = encontrar_numero_categoria(productos, diccionario_categorias)
+    
+    if not categorias_ids:
+        print("❌ No se encontraron categorías para los productos especificados")
+    return categorias_ids
+
 
+def _seleccionar_y_formatear(
+    productos_mercadona: List[Dict[str, Any]],
+    productos: List[str]
+) -> List[Dict[str, Any]]:
+    """Paso 4: selecciona el más barato de cada producto y lo formatea para los agentes."""
+    if not productos_mercadona:
+        print("❌ No se encontraron productos en las categorías")
+        return []
+    
+    print("\n💰 Paso 4: Seleccionando productos más baratos...")
+    # Con catálogo local se reutiliza su índice de nombres, ya construido al cargarlo
+    catalogo = obtener_catalogo_local()
+    indice = catalogo.indice if catalogo is not None else None
+    productos_seleccionados = mostrar_productos_seleccionados(productos_mercadona, productos, indice)
+    
+    if not productos_seleccionados:
+        print("❌ No se encontraron coincidencias para los productos buscados")
+        return []
+    
+    # Formatear resultados para ser compatibles con el sistema multi-agente
+    resultados = []
+    for producto in productos_seleccionados:
+        resultado = {
+            "id": producto.get("id", ""),
+            "nombre": producto.get("nombre", ""),
+            "precio_unidad": producto.get("precio_unidad", 0.0),
+            "disponible": True,
+            "categoria": producto.get("categoria_nombre", ""),
+            "subcategoria": producto.get("subcategoria_nombre", ""),
+            "packaging": producto.get("packaging", ""),
+            "precio_referencia": producto.get("precio_referencia", ""),
+            "formato_referencia": producto.get("formato_referencia", ""),
+            "producto_buscado": producto.get("producto_buscado", ""),
+            "total_coincidencias": producto.get("total_coincidencias", 0),
+            "mas_baratos": producto.get("mas_baratos", []),
+            "mas_barato_por_formato": producto.get("mas_barato_por_formato", {})
+        }
+        resultados.append(resultado)
+    
+    print(f"\n✅ Búsqueda completada: {len(resultados)} productos encontrados")
+    return resultados
@@ -1,11 +1,16 @@
 """
 Tool para clasificar la intención del usuario y extraer productos mencionados.
-Implementa lógica de NLP básica con regex para análisis de texto.
+Implementa lógica de NLP básica con un analizador léxico que recorre el
+mensaje una sola vez: las tablas y la expresión regular se preparan al importar.
 """
 import re
-from typing import Any, Dict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from langchain_core.tools import tool
 
+from gen_ui_backend.utils.mercadona_api import obtener_catalogo_local
+from gen_ui_backend.utils.normalizacion import normalizar_nombre
+from gen_ui_backend.utils.vocabulario import VocabularioProductos
+
 
 # Palabras clave para detectar intenciones
 PALABRAS_COMPRA = [
@@ -39,13 +44,243 @@ NUMEROS_TEXTO = {
     "media": 0.5, "medio": 0.5
 }
 
+# Por debajo de esta longitud la forma sin tildes es ambigua ("té" → "te"):
+# esos productos se buscan respetando las tildes
+LONGITUD_MINIMA_SIN_TILDES = 3
+
+# Palabras tras las que se busca un producto cuando no hay ninguno conocido
+DISPARADORES_PRODUCTO = ("de", "un", "una", "comprar", "quiero")
+LONGITUD_MINIMA_PRODUCTO_POTENCIAL = 4
+
+# Distancia máxima (en caracteres) a la que se busca un número escrito antes del producto
+VENTANA_CANTIDAD_CERCANA = 20
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LÉXICO (precalculado al importar)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+TOKEN_NUMERO = "numero"
+TOKEN_PRODUCTO = "producto"
+TOKEN_INTENCION = "intencion"
+TOKEN_PALABRA = "palabra"
+
+INTENCION_COMPRA = "compra"
+INTENCION_CONSULTA = "consulta"
+
+_PATRON_TOKEN = re.compile(r"(?P<numero>\d+)|(?P<palabra>[^\W\d_]+)")
+
+# palabra clave normalizada -> intención
+_PALABRAS_CLAVE: Dict[str, str] = {}
+for _palabra in PALABRAS_CONSULTA:
+    _PALABRAS_CLAVE[normalizar_nombre(_palabra)] = INTENCION_CONSULTA
+for _palabra in PALABRAS_COMPRA:
+    _PALABRAS_CLAVE[normalizar_nombre(_palabra)] = INTENCION_COMPRA
+_LONGITUDES_CLAVE = sorted({len(p) for p in _PALABRAS_CLAVE})
+
+_NUMEROS_NORM = {normalizar_nombre(k): v for k, v in NUMEROS_TEXTO.items()}
+
+
+def _formas_producto() -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Calcula las formas (singular y plurales) con las que se reconoce cada producto.
+
+    Returns:
+        Tupla (formas sin tildes, formas con tildes) -> producto. Las segundas
+        son las de los productos cortos, que se comparan con el texto original.
+    """
+    sin_tildes, con_tildes = {}, {}
+    for producto in PRODUCTOS_COMUNES:
+        producto_norm = normalizar_nombre(producto)
+        if len(producto_norm) < LONGITUD_MINIMA_SIN_TILDES:
+            destino, forma = con_tildes, producto.lower()
+        else:
+            destino, forma = sin_tildes, producto_norm
+        for variante in (forma, forma + "s", forma + "es"):
+            destino.setdefault(variante, producto)
+    return sin_tildes, con_tildes
+
+
+_FORMAS_PRODUCTO, _FORMAS_PRODUCTO_CON_TILDES = _formas_producto()
+
+
+class Token(NamedTuple):
+    """Unidad léxica del mensaje, con su posición en el texto en minúsculas."""
+    tipo: str
+    texto: str
+    inicio: int
+    fin: int
+    valor: Any = None
+    """Cantidad (números), producto canónico (productos) o
+    pares (intención, palabra clave) (palabras de intención)."""
+
+
+def _intenciones(palabra: str) -> Tuple[Tuple[str, str], ...]:
+    """Palabras clave con las que empieza `palabra` ("buscar" → "busca", "buscar")."""
+    encontradas = []
+    for longitud in _LONGITUDES_CLAVE:
+        if longitud > len(palabra):
+            break
+        prefijo = palabra[:longitud]
+        intencion = _PALABRAS_CLAVE.get(prefijo)
+        if intencion:
+            encontradas.append((intencion, prefijo))
+    return tuple(encontradas)
+
+
+def tokenizar(texto: str, vocabulario: Optional[VocabularioProductos] = None) -> List[Token]:
+    """
+    Recorre el mensaje una sola vez y lo divide en tokens clasificados.
+
+    Args:
+        texto: Mensaje del usuario
+        vocabulario: Vocabulario del catálogo con el que reconocer productos
+            además de `PRODUCTOS_COMUNES` (ver `utils/vocabulario.py`)
+
+    Returns:
+        Lista de tokens en orden de aparición. Las palabras se comparan sin
+        tildes salvo los productos cortos (ver `LONGITUD_MINIMA_SIN_TILDES`).
+    """
+    texto = texto.lower()
+    tokens = []
+    for match in _PATRON_TOKEN.finditer(texto):
+        original = match.group()
+        inicio, fin = match.span()
+        if match.lastgroup == "numero":
+            tokens.append(Token(TOKEN_NUMERO, original, inicio, fin, int(original)))
+            continue
+
+        palabra = normalizar_nombre(original)
+        if palabra in _NUMEROS_NORM:
+            tokens.append(Token(TOKEN_NUMERO, palabra, inicio, fin, _NUMEROS_NORM[palabra]))
+            continue
+
+        producto = _FORMAS_PRODUCTO_CON_TILDES.get(original) or _FORMAS_PRODUCTO.get(palabra)
+        if producto:
+            tokens.append(Token(TOKEN_PRODUCTO, palabra, inicio, fin, producto))
+            continue
+
+        intenciones = _intenciones(palabra)
+        if intenciones:
+            tokens.append(Token(TOKEN_INTENCION, palabra, inicio, fin, intenciones))
+        else:
+            tokens.append(Token(TOKEN_PALABRA, palabra, inicio, fin))
+
+    if vocabulario is not None:
+        tokens = _aplicar_vocabulario(tokens, vocabulario, texto)
+    return tokens
+
+
+def _aplicar_vocabulario(tokens: List[Token], vocabulario: VocabularioProductos, texto: str) -> List[Token]:
+    """
+    Sustituye por un único token de producto cada término del catálogo reconocido.
+
+    Los términos que incluyen números o palabras de intención se ignoran, y
+    los productos comunes de una palabra conservan su nombre canónico.
+    """
+    resultado = []
+    siguiente = 0
+    for inicio, fin, termino in vocabulario.reconocer([token.texto for token in tokens]):
+        tramo = tokens[inicio:fin]
+        if any(token.tipo in (TOKEN_NUMERO, TOKEN_INTENCION) for token in tramo):
+            continue
+        if len(tramo) == 1 and tramo[0].tipo == TOKEN_PRODUCTO:
+            continue
+        if not all(_seguidos(a, b, texto) for a, b in zip(tramo, tramo[1:])):
+            continue
+        resultado.extend(tokens[siguiente:inicio])
+        resultado.append(Token(
+            TOKEN_PRODUCTO, " ".join(token.texto for token in tramo),
+            tramo[0].inicio, tramo[-1].fin, termino
+        ))
+        siguiente = fin
+    resultado.extend(tokens[siguiente:])
+    return resultado
+
+
+def _vocabulario_catalogo() -> Optional[VocabularioProductos]:
+    """Vocabulario del catálogo local, o None si no hay catálogo cargado."""
+    catalogo = obtener_catalogo_local()
+    return catalogo.vocabulario() if catalogo is not None else None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ANÁLISIS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Patrones de cantidad, de mayor a menor prioridad
+CANTIDAD_NUMERO_ANTES = 0   # "2 leches", "3 de leche"
+CANTIDAD_TEXTO_ANTES = 1    # "dos leches", "cinco de pan"
+CANTIDAD_X_DESPUES = 2      # "leche x 2", "pan x3"
+CANTIDAD_TEXTO_CERCANO = 3  # "dos litros de leche"
+
+_NOMBRES_PATRON_CANTIDAD = {
+    CANTIDAD_NUMERO_ANTES: "Patrón número antes",
+    CANTIDAD_TEXTO_ANTES: "Patrón texto antes",
+    CANTIDAD_X_DESPUES: "Patrón x después",
+    CANTIDAD_TEXTO_CERCANO: "Patrón texto cercano",
+}
+
+
+def _seguidos(anterior: Token, siguiente: Token, texto: str) -> bool:
+    """Indica si entre dos tokens solo hay espacios."""
+    return not texto[anterior.fin:siguiente.inicio].strip()
+
+
+def _cantidad_mencion(tokens: List[Token], i: int, texto: str) -> Optional[Tuple[int, Any]]:
+    """
+    Cantidad asociada a la mención de producto `tokens[i]`.
+
+    Solo mira los tokens vecinos (y como mucho `VENTANA_CANTIDAD_CERCANA`
+    caracteres hacia atrás), así que el coste no depende de la longitud del mensaje.
+
+    Returns:
+        Tupla (patrón, cantidad) o None si la mención no lleva cantidad
+    """
+    mencion = tokens[i]
+
+    # Número (o número escrito) antes, con "de" opcional en medio
+    j = i - 1
+    if j >= 1 and tokens[j].texto == "de" and _seguidos(tokens[j], mencion, texto):
+        j -= 1
+    if j >= 0 and tokens[j].tipo == TOKEN_NUMERO and _seguidos(tokens[j], tokens[j + 1], texto):
+        patron = CANTIDAD_NUMERO_ANTES if tokens[j].texto.isdigit() else CANTIDAD_TEXTO_ANTES
+        return patron, tokens[j].valor
+
+    # "x" y número después
+    if (i + 2 < len(tokens) and tokens[i + 1].texto == "x"
+            and tokens[i + 2].tipo == TOKEN_NUMERO and tokens[i + 2].texto.isdigit()
+            and _seguidos(mencion, tokens[i + 1], texto) and _seguidos(tokens[i + 1], tokens[i + 2], texto)):
+        return CANTIDAD_X_DESPUES, tokens[i + 2].valor
+
+    # Número escrito cercano, sin cruzar la mención de otro producto
+    limite = mencion.inicio - VENTANA_CANTIDAD_CERCANA
+    for j in range(i - 1, -1, -1):
+        anterior = tokens[j]
+        if anterior.inicio < limite or anterior.tipo == TOKEN_PRODUCTO:
+            break
+        if anterior.tipo == TOKEN_NUMERO and not anterior.texto.isdigit():
+            return CANTIDAD_TEXTO_CERCANO, anterior.valor
+    return None
+
+
+def _productos_potenciales(tokens: List[Token], texto: str) -> List[str]:
+    """Palabras que siguen a un disparador ("de", "quiero"...) cuando no hay productos conocidos."""
+    potenciales = []
+    for anterior, token in zip(tokens, tokens[1:]):
+        if (anterior.texto in DISPARADORES_PRODUCTO and token.tipo == TOKEN_PALABRA
+                and len(token.texto) >= LONGITUD_MINIMA_PRODUCTO_POTENCIAL
+                and _seguidos(anterior, token, texto) and token.texto not in potenciales):
+            potenciales.append(token.texto)
+    return potenciales
+
 
 @tool
 def clasificar_intencion(user_input: str) -> Dict[str, Any]:
     """
     Clasifica la intención del usuario y extrae los productos mencionados.
     
-    Usa análisis de palabras clave y regex para:
+    Tokeniza el mensaje (ver `tokenizar`) y a partir de los tokens:
     1. Determinar si es una compra, consulta u otra acción
     2. Extraer nombres de productos mencionados
     3. Detectar cantidades asociadas a cada producto
@@ -59,14 +294,22 @@ def clasificar_intencion(user_input: str) -> Dict[str, Any]:
         - productos: lista de productos mencionados
         - cantidades: dict con producto -> cantidad
         - confianza: nivel de confianza en la clasificación (0-1)
+        - productos_desconocidos: productos extraídos por patrones genéricos
+          que no están en el vocabulario conocido
     """
     try:
-        texto = user_input.lower().strip()
-        
+        texto = user_input.lower()
+        tokens = tokenizar(texto, _vocabulario_catalogo())
+
         # 1. CLASIFICAR INTENCIÓN
-        score_compra = sum(1 for palabra in PALABRAS_COMPRA if palabra in texto)
-        score_consulta = sum(1 for palabra in PALABRAS_CONSULTA if palabra in texto)
-        
+        palabras_clave = {INTENCION_COMPRA: set(), INTENCION_CONSULTA: set()}
+        for token in tokens:
+            if token.tipo == TOKEN_INTENCION:
+                for intencion, palabra in token.valor:
+                    palabras_clave[intencion].add(palabra)
+        score_compra = len(palabras_clave[INTENCION_COMPRA])
+        score_consulta = len(palabras_clave[INTENCION_CONSULTA])
+
         if score_compra > score_consulta:
             intencion = "compra"
             confianza = min(score_compra / 3.0, 1.0)  # Normalizar
@@ -76,140 +319,55 @@ def clasificar_intencion(user_input: str) -> Dict[str, Any]:
         else:
             intencion = "compra"  # Por defecto asumir compra
             confianza = 0.5
-        
+
         print(f"📋 Intención detectada: {intencion} (confianza: {confianza:.2f})")
-        
-        # 2. EXTRAER PRODUCTOS
-        productos = []
-        
-        # Buscar productos comunes
-        for producto in PRODUCTOS_COMUNES:
-            if producto in texto:
-                productos.append(producto)
+
+        # 2. EXTRAER PRODUCTOS Y 3. ASOCIAR CANTIDADES
+        # producto -> (patrón, cantidad) de la mención con el patrón más fiable
+        mejores: Dict[str, Optional[Tuple[int, Any]]] = {}
+        for i, token in enumerate(tokens):
+            if token.tipo != TOKEN_PRODUCTO:
+                continue
+            producto = token.valor
+            if producto not in mejores:
+                mejores[producto] = None
                 print(f"   ✅ Producto encontrado: {producto}")
-        
-        # Buscar patrones adicionales: "de [producto]", "[producto]s"
-        # Esto captura variaciones como "leches", "panes", etc.
-        palabras = texto.split()
-        for palabra in palabras:
-            # Remover plural simple
-            if palabra.endswith("s") and len(palabra) > 3:
-                singular = palabra[:-1]
-                if singular in PRODUCTOS_COMUNES and singular not in productos:
-                    productos.append(singular)
-                    print(f"   ✅ Producto encontrado (plural): {singular}")
-        
+            cantidad = _cantidad_mencion(tokens, i, texto)
+            if cantidad and (mejores[producto] is None or cantidad[0] < mejores[producto][0]):
+                mejores[producto] = cantidad
+
+        productos = list(mejores)
+        productos_desconocidos = []
+
         # Si no se encontraron productos, intentar extraer sustantivos potenciales
         if not productos:
-            # Buscar palabras después de "de", preposiciones, etc.
-            patrones = [
-                r"de\s+(\w+)",
-                r"un\s+(\w+)",
-                r"una\s+(\w+)",
-                r"comprar\s+(\w+)",
-                r"quiero\s+(\w+)"
-            ]
-            for patron in patrones:
-                matches = re.findall(patron, texto)
-                for match in matches:
-                    if match not in productos and len(match) > 3:
-                        productos.append(match)
-                        print(f"   ⚠️  Producto potencial: {match}")
-        
-        # 3. EXTRAER CANTIDADES CON PATRONES MEJORADOS
+            productos_desconocidos = _productos_potenciales(tokens, texto)
+            for producto in productos_desconocidos:
+                mejores[producto] = None
+                print(f"   ⚠️  Producto potencial: {producto}")
+            productos = list(productos_desconocidos)
+
         cantidades = {}
-        
-        # Patrón mejorado: múltiples formas de expresar cantidades
-        # Ejemplos: "2 leches", "leche x 2", "tres panes", "3 de leche", "leches x3"
-        for producto in productos:
-            cantidad = 1  # Por defecto
-            cantidad_encontrada = False
-            
-            # Escapar caracteres especiales en el nombre del producto para regex
-            producto_escaped = re.escape(producto)
-            
-            # Patrón 1: número + producto (ej: "2 leches", "3 panes")
-            patron_numero_antes = rf"(\d+)\s*(?:de\s+)?{producto_escaped}s?"
-            match = re.search(patron_numero_antes, texto)
-            if match:
-                cantidad = int(match.group(1))
-                cantidad_encontrada = True
-                print(f"   📊 [Patrón número antes] {producto}: {cantidad}")
-            
-            # Patrón 2: texto número + producto (ej: "dos leches", "tres panes")
-            if not cantidad_encontrada:
-                patron_texto_antes = rf"({'|'.join(NUMEROS_TEXTO.keys())})\s*(?:de\s+)?{producto_escaped}s?"
-                match = re.search(patron_texto_antes, texto)
-                if match:
-                    cantidad = NUMEROS_TEXTO.get(match.group(1), 1)
-                    cantidad_encontrada = True
-                    print(f"   📊 [Patrón texto antes] {producto}: {cantidad}")
-            
-            # Patrón 3: producto + x + número (ej: "leche x 2", "pan x3")
-            if not cantidad_encontrada:
-                patron_x_despues = rf"{producto_escaped}s?\s*x\s*(\d+)"
-                match = re.search(patron_x_despues, texto)
-                if match:
-                    cantidad = int(match.group(1))
-                    cantidad_encontrada = True
-                    print(f"   📊 [Patrón x después] {producto}: {cantidad}")
-            
-            # Patrón 4: "de" + producto (ej: "3 de leche", "cinco de pan")
-            if not cantidad_encontrada:
-                patron_de = rf"(\d+|{'|'.join(NUMEROS_TEXTO.keys())})\s+de\s+{producto_escaped}s?"
-                match = re.search(patron_de, texto)
-                if match:
-                    cantidad_str = match.group(1)
-                    if cantidad_str.isdigit():
-                        cantidad = int(cantidad_str)
-                    else:
-                        cantidad = NUMEROS_TEXTO.get(cantidad_str, 1)
-                    cantidad_encontrada = True
-                    print(f"   📊 [Patrón de] {producto}: {cantidad}")
-            
-            # Patrón 5: coma o "y" separadores (ej: "2 leches, 3 panes y 4 huevos")
-            # Buscar la cantidad más cercana antes del producto
-            if not cantidad_encontrada:
-                # Buscar hacia atrás desde el producto
-                pos_producto = texto.find(producto)
-                if pos_producto > 0:
-                    texto_antes = texto[:pos_producto]
-                    # Buscar el último número antes del producto (máximo 20 caracteres atrás)
-                    texto_antes_cercano = texto_antes[-20:]
-                    match_numero = re.search(r'(\d+)\s*$', texto_antes_cercano)
-                    if match_numero:
-                        cantidad = int(match_numero.group(1))
-                        cantidad_encontrada = True
-                        print(f"   📊 [Patrón cercano] {producto}: {cantidad}")
-                    else:
-                        # Buscar texto número
-                        for num_texto, num_valor in NUMEROS_TEXTO.items():
-                            if num_texto in texto_antes_cercano:
-                                cantidad = num_valor
-                                cantidad_encontrada = True
-                                print(f"   📊 [Patrón texto cercano] {producto}: {cantidad}")
-                                break
-            
-            cantidades[producto] = cantidad
-            if not cantidad_encontrada:
-                print(f"   📊 [Por defecto] {producto}: {cantidad}")
-        
-        # Si hay productos sin cantidades explícitas, asignar 1
-        for producto in productos:
-            if producto not in cantidades:
+        for producto, mejor in mejores.items():
+            if mejor is None:
                 cantidades[producto] = 1
-        
+                print(f"   📊 [Por defecto] {producto}: 1")
+            else:
+                patron, cantidades[producto] = mejor
+                print(f"   📊 [{_NOMBRES_PATRON_CANTIDAD[patron]}] {producto}: {cantidades[producto]}")
+
         resultado = {
             "intencion": intencion,
             "productos": productos,
             "cantidades": cantidades,
             "confianza": round(confianza, 2),
-            "num_productos": len(productos)
+            "num_productos": len(productos),
+            "productos_desconocidos": productos_desconocidos
         }
-        
+
         print(f"✅ Clasificación completada: {len(productos)} productos detectados")
         return resultado
-    
+
     except Exception as e:
         print(f"❌ Error al clasificar intención: {e}")
         import traceback
@@ -222,6 +380,7 @@ def clasificar_intencion(user_input: str) -> Dict[str, Any]:
             "cantidades": {},
             "confianza": 0.0,
             "num_productos": 0,
+            "productos_desconocidos": [],
             "error": str(e)
         }
 
@@ -1,190 +1,139 @@
 """
 Tool para generar archivos descargables del ticket de compra.
 Crea archivos en formato JSON, TXT y CSV con la información del ticket.
+
+Los tickets se guardan en el almacén de `utils/almacen_tickets.py`, que
+escribe una sola vez el contenido de carritos idénticos, y cada formato se
+renderiza al descargarlo. `programar_archivos_ticket` guarda el registro en un
+pool de hilos y devuelve al momento los nombres de descarga, para no retrasar la respuesta; el endpoint
+de descarga espera con `esperar_archivo` si se pide uno que aún no está.
+`exportar_zip` y `exportar_ndjson` generan en streaming exportaciones de
+muchos tickets a la vez.
 """
-import os
 import json
-import csv
-from typing import Any, Dict, List
+import os
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 from langchain_core.tools import tool
 
+from gen_ui_backend.utils.almacen_tickets import (
+    FORMATOS,
+    AlmacenTickets,
+    analizar_nombre,
+    crear_registro,
+    hash_registro,
+    nombre_descarga,
+    nuevo_id_ticket,
+    obtener_almacen_tickets,
+)
+from gen_ui_backend.utils.plantillas_ticket import TICKET_CSV, TICKET_JSON, TICKET_TXT, agrupar_bloques
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Hilos que guardan tickets en segundo plano
+MAX_HILOS_ARCHIVOS = int(os.getenv("MERCADONA_HILOS_ARCHIVOS", "2"))
+
+# Segundos que espera una descarga a que termine de guardarse su ticket
+ESPERA_MAXIMA_ARCHIVO = 10.0
+
+_ejecutor: Optional[ThreadPoolExecutor] = None
+_pendientes: Dict[str, Future] = {}  # ID del ticket -> guardado en curso
+_fallidos: Dict[str, str] = {}  # ID del ticket -> error de su guardado
+_lock = threading.Lock()
+_lock_ejecutor = threading.Lock()
+
+
+class ErrorArchivoTicket(Exception):
+    """El guardado en segundo plano de un ticket ha fallado."""
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FORMATOS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _resumen_registro(registro: Dict[str, Any]) -> Dict[str, Any]:
+    return {"fecha": registro["fecha"], **registro["resumen"]}
+
+
+def partes_json(registro: Dict[str, Any]) -> Iterator[str]:
+    """Ticket en JSON legible."""
+    return TICKET_JSON.partes(registro, registro["productos"])
+
+
+def partes_txt(registro: Dict[str, Any]) -> Iterator[str]:
+    """Ticket en texto con el formato del ticket impreso."""
+    return TICKET_TXT.partes(_resumen_registro(registro), registro["productos"])
+
+
+def partes_csv(registro: Dict[str, Any]) -> Iterator[str]:
+    """Ticket en CSV (una fila por producto y el resumen al final)."""
+    return TICKET_CSV.partes(_resumen_registro(registro), registro["productos"])
+
+
+RENDERIZADORES: Dict[str, Callable[[Dict[str, Any]], Iterator[str]]] = {
+    "json": partes_json,
+    "txt": partes_txt,
+    "csv": partes_csv,
+}
+
+
+def _rutas_descarga(almacen: AlmacenTickets, ticket_id: str) -> Dict[str, str]:
+    """Rutas que se muestran al usuario; el endpoint de descarga las resuelve por su nombre."""
+    return {
+        f"{formato}_path": os.path.join(almacen.directorio, nombre_descarga(ticket_id, formato))
+        for formato in FORMATOS
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TOOL
+# ═══════════════════════════════════════════════════════════════════════════════
 
 @tool
 def generar_archivos_ticket(
     productos: List[Dict[str, Any]],  # noqa: ARG001
     cantidades: Dict[str, int],  # noqa: ARG001
     precio_info: Dict[str, Any],
-    directorio_salida: str = "tickets"
+    directorio_salida: Optional[str] = None
 ) -> Dict[str, str]:
     """
     Genera archivos descargables del ticket de compra en múltiples formatos.
-    
+
     Args:
         productos: Lista de productos con información completa
         cantidades: Cantidades de cada producto
         precio_info: Información de precios calculados
-        directorio_salida: Directorio donde guardar los archivos
-        
+        directorio_salida: Directorio del almacén de tickets (por defecto, el compartido)
+
     Returns:
         Dict con rutas de archivos generados: json_path, txt_path, csv_path
     """
     try:
-        # Crear directorio si no existe
-        os.makedirs(directorio_salida, exist_ok=True)
-        
-        # Generar timestamp para nombres únicos
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_filename = f"ticket_{timestamp}"
-        
-        # Preparar datos
-        items = precio_info.get("items", [])
-        fecha_hora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        
-        # ========== GENERAR JSON ==========
-        json_data = {
-            "fecha": fecha_hora,
-            "timestamp": timestamp,
-            "resumen": {
-                "articulos_diferentes": precio_info.get("num_items", 0),
-                "unidades_totales": precio_info.get("num_productos", 0),
-                "subtotal": precio_info.get("subtotal", 0.0),
-                "descuentos": precio_info.get("descuentos", 0.0),
-                "total": precio_info.get("total", 0.0)
-            },
-            "productos": []
-        }
-        
-        for item in items:
-            producto_json = {
-                "producto_id": item.get("producto_id", ""),
-                "nombre": item.get("nombre", ""),
-                "cantidad": item.get("cantidad", 0),
-                "precio_unitario": item.get("precio_unitario", 0.0),
-                "precio_total": item.get("precio_total", 0.0),
-                "packaging": item.get("packaging", ""),
-                "categoria": item.get("categoria", "")
-            }
-            json_data["productos"].append(producto_json)
-        
-        json_path = os.path.join(directorio_salida, f"{base_filename}.json")
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2)
-        
-        # ========== GENERAR TXT ==========
-        txt_content = f"""╔═══════════════════════════════════════════════════════╗
-║              MERCADONA - TICKET DE COMPRA             ║
-╚═══════════════════════════════════════════════════════╝
-
-Fecha: {fecha_hora}
-
-───────────────────────────────────────────────────────
-PRODUCTOS
-───────────────────────────────────────────────────────
-"""
-        
-        for i, item in enumerate(items, 1):
-            nombre = item.get("nombre", "")
-            cantidad = item.get("cantidad", 0)
-            precio_unitario = item.get("precio_unitario", 0.0)
-            precio_total = item.get("precio_total", 0.0)
-            packaging = item.get("packaging", "")
-            
-            txt_content += f"{i}. {nombre}\n"
-            if packaging:
-                txt_content += f"   {packaging}\n"
-            txt_content += f"   {cantidad} x {precio_unitario:.2f}€ = {precio_total:.2f}€\n\n"
-        
-        subtotal = precio_info.get("subtotal", 0.0)
-        descuentos = precio_info.get("descuentos", 0.0)
-        total = precio_info.get("total", 0.0)
-        num_items = precio_info.get("num_items", 0)
-        num_productos = precio_info.get("num_productos", 0)
-        
-        txt_content += f"""───────────────────────────────────────────────────────
-RESUMEN
-───────────────────────────────────────────────────────
-Artículos diferentes: {num_items}
-Unidades totales: {num_productos}
-
-Subtotal:        {subtotal:>8.2f}€
-Descuentos:      {descuentos:>8.2f}€
-───────────────────────────────────────────────────────
-TOTAL A PAGAR:   {total:>8.2f}€
-═══════════════════════════════════════════════════════
-
-          ¡Gracias por su compra!
-          Vuelva pronto a Mercadona
-          
-═══════════════════════════════════════════════════════
-"""
-        
-        txt_path = os.path.join(directorio_salida, f"{base_filename}.txt")
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write(txt_content)
-        
-        # ========== GENERAR CSV ==========
-        csv_path = os.path.join(directorio_salida, f"{base_filename}.csv")
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            
-            # Header
-            writer.writerow(["MERCADONA - TICKET DE COMPRA"])
-            writer.writerow([f"Fecha: {fecha_hora}"])
-            writer.writerow([])
-            
-            # Columnas de productos
-            writer.writerow([
-                "Nº", "Producto", "Cantidad", "Precio Unitario (€)", 
-                "Precio Total (€)", "Packaging"
-            ])
-            
-            # Productos
-            for i, item in enumerate(items, 1):
-                writer.writerow([
-                    i,
-                    item.get("nombre", ""),
-                    item.get("cantidad", 0),
-                    f"{item.get('precio_unitario', 0.0):.2f}",
-                    f"{item.get('precio_total', 0.0):.2f}",
-                    item.get("packaging", "")
-                ])
-            
-            # Resumen
-            writer.writerow([])
-            writer.writerow(["RESUMEN"])
-            writer.writerow(["Artículos diferentes", num_items])
-            writer.writerow(["Unidades totales", num_productos])
-            writer.writerow([])
-            writer.writerow(["Subtotal", f"{subtotal:.2f}€"])
-            writer.writerow(["Descuentos", f"{descuentos:.2f}€"])
-            writer.writerow(["TOTAL A PAGAR", f"{total:.2f}€"])
-        
-        # Obtener rutas absolutas
-        json_path_abs = os.path.abspath(json_path)
-        txt_path_abs = os.path.abspath(txt_path)
-        csv_path_abs = os.path.abspath(csv_path)
-        
+        almacen = AlmacenTickets(directorio_salida) if directorio_salida else obtener_almacen_tickets()
+        registro = crear_registro(precio_info)
+        ticket_id = almacen.guardar(registro)
+
         resultado = {
-            "json_path": json_path_abs,
-            "txt_path": txt_path_abs,
-            "csv_path": csv_path_abs,
-            "timestamp": timestamp,
-            "success": True
+            f"{formato}_path": almacen.renderizado(ticket_id, formato, RENDERIZADORES[formato])
+            for formato in FORMATOS
         }
-        
-        print("✅ Archivos generados exitosamente:")
-        print(f"   - JSON: {json_path_abs}")
-        print(f"   - TXT: {txt_path_abs}")
-        print(f"   - CSV: {csv_path_abs}")
-        
+        resultado.update({"ticket_id": ticket_id, "timestamp": registro["timestamp"], "success": True})
+
+        print(f"✅ Archivos generados exitosamente (ticket {ticket_id})")
         return resultado
-    
+
     except Exception as e:
         print(f"❌ Error al generar archivos: {e}")
         import traceback
         traceback.print_exc()
-        
+
         return {
             "success": False,
             "error": str(e),
@@ -194,3 +143,205 @@ TOTAL A PAGAR:   {total:>8.2f}€
             "timestamp": ""
         }
 
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GUARDADO EN SEGUNDO PLANO Y DESCARGA
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _obtener_ejecutor() -> ThreadPoolExecutor:
+    global _ejecutor
+    with _lock_ejecutor:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(
+                max_workers=MAX_HILOS_ARCHIVOS,
+                thread_name_prefix="archivos_ticket"
+            )
+        return _ejecutor
+
+
+def programar_archivos_ticket(
+    precio_info: Dict[str, Any],
+    almacen: Optional[AlmacenTickets] = None
+) -> Dict[str, Any]:
+    """
+    Encarga el guardado del ticket y devuelve ya sus nombres de descarga.
+
+    Cada llamada emite un ticket nuevo, con su ID y su fecha. Si el almacén ya
+    tiene el contenido de un carrito idéntico, solo se indexa, sin pasar por el pool.
+
+    Args:
+        precio_info: Información de precios calculados
+        almacen: Almacén de tickets (por defecto, el compartido)
+
+    Returns:
+        Dict con las rutas de descarga (json_path, txt_path, csv_path),
+        `ticket_id`, `timestamp` y `pendiente`
+    """
+    almacen = almacen or obtener_almacen_tickets()
+    registro = crear_registro(precio_info)
+    ticket_id = nuevo_id_ticket()
+    resultado = {
+        **_rutas_descarga(almacen, ticket_id),
+        "ticket_id": ticket_id,
+        "timestamp": registro["timestamp"],
+        "success": True,
+        "pendiente": False,
+    }
+
+    if almacen.tiene_contenido(hash_registro(registro)):
+        almacen.guardar(registro, ticket_id)
+        print(f"🗂️ Ticket {ticket_id} guardado (contenido ya existente)")
+        return resultado
+
+    ejecutor = _obtener_ejecutor()
+    with _lock:
+        futuro = ejecutor.submit(almacen.guardar, registro, ticket_id)
+        _pendientes[ticket_id] = futuro
+
+    def _terminado(_: Future) -> None:
+        error = futuro.exception()
+        if error is not None:
+            print(f"❌ No se pudo guardar el ticket {ticket_id}: {error}")
+        with _lock:
+            if _pendientes.get(ticket_id) is futuro:
+                del _pendientes[ticket_id]
+            if error is not None:
+                _fallidos[ticket_id] = str(error)
+
+    futuro.add_done_callback(_terminado)
+    print(f"🗂️ Ticket {ticket_id} en cola")
+    return {**resultado, "pendiente": True}
+
+
+def esperar_archivo(nombre: str, timeout: float = ESPERA_MAXIMA_ARCHIVO) -> bool:
+    """
+    Espera a que termine de guardarse el ticket de un nombre de descarga.
+
+    Args:
+        nombre: Nombre del archivo (sin directorio)
+        timeout: Segundos máximos de espera
+
+    Returns:
+        False si el guardado sigue en curso al vencer el plazo; True en otro caso
+        (también si el ticket no estaba pendiente)
+
+    Raises:
+        ErrorArchivoTicket: Si el guardado del ticket ha fallado
+    """
+    partes = analizar_nombre(nombre)
+    if partes is None:
+        return True
+    with _lock:
+        futuro = _pendientes.get(partes[0])
+        error = _fallidos.get(partes[0])
+    if futuro is not None:
+        try:
+            futuro.result(timeout=timeout)
+        except FuturesTimeoutError:
+            return False
+        except Exception as e:
+            error = str(e)
+    if error:
+        raise ErrorArchivoTicket(error)
+    return True
+
+
+def ruta_archivo_ticket(nombre: str, almacen: Optional[AlmacenTickets] = None) -> Optional[str]:
+    """
+    Ruta del archivo de un nombre de descarga, renderizándolo si hace falta.
+
+    Args:
+        nombre: Nombre del archivo (`ticket_<id>.<formato>`)
+        almacen: Almacén de tickets (por defecto, el compartido)
+
+    Returns:
+        Ruta del archivo renderizado, o None si el nombre no es de un ticket
+        del almacén o el ticket no existe
+    """
+    partes = analizar_nombre(nombre)
+    if partes is None:
+        return None
+    ticket_id, formato = partes
+    return (almacen or obtener_almacen_tickets()).renderizado(ticket_id, formato, RENDERIZADORES[formato])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EXPORTACIÓN EN BLOQUE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class _SalidaZip:
+    """Destino de `zipfile` sin `seek`: acumula lo escrito hasta que se recoge."""
+
+    def __init__(self):
+        self._bloques: List[bytes] = []
+
+    def write(self, datos: bytes) -> int:
+        self._bloques.append(bytes(datos))
+        return len(datos)
+
+    def flush(self) -> None:
+        pass
+
+    def vaciar(self) -> Iterator[bytes]:
+        if self._bloques:
+            bloque = b"".join(self._bloques)
+            self._bloques = []
+            yield bloque
+
+
+def exportar_ndjson(ids: Iterable[str], almacen: Optional[AlmacenTickets] = None) -> Iterator[bytes]:
+    """
+    Registros de varios tickets en NDJSON, una línea por ticket, según se leen.
+
+    Args:
+        ids: IDs de los tickets (los que no existen se omiten)
+        almacen: Almacén de tickets (por defecto, el compartido)
+
+    Returns:
+        Iterador de líneas codificadas en UTF-8
+    """
+    almacen = almacen or obtener_almacen_tickets()
+    for ticket_id in ids:
+        registro = almacen.cargar(ticket_id)
+        if registro is not None:
+            linea = json.dumps({"ticket_id": ticket_id, **registro}, ensure_ascii=False)
+            yield (linea + "\n").encode("utf-8")
+
+
+def exportar_zip(
+    ids: Iterable[str],
+    formatos: Iterable[str] = FORMATOS,
+    almacen: Optional[AlmacenTickets] = None
+) -> Iterator[bytes]:
+    """
+    Archivo ZIP con varios tickets en los formatos pedidos, generado según se envía.
+
+    Cada entrada se renderiza desde el registro y se comprime por bloques; en
+    memoria solo está el ticket en curso.
+
+    Args:
+        ids: IDs de los tickets (los que no existen se omiten)
+        formatos: Formatos de cada ticket dentro del ZIP
+        almacen: Almacén de tickets (por defecto, el compartido)
+
+    Returns:
+        Iterador de bloques del ZIP
+    """
+    almacen = almacen or obtener_almacen_tickets()
+    formatos = tuple(formatos)
+    salida = _SalidaZip()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as archivo:
+        for ticket_id in ids:
+            registro = almacen.cargar(ticket_id)
+            if registro is None:
+                continue
+            fecha = datetime.strptime(registro["timestamp"], "%Y%m%d_%H%M%S")
+            for formato in formatos:
+                info = zipfile.ZipInfo(nombre_descarga(ticket_id, formato), fecha.timetuple()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with archivo.open(info, "w") as entrada:
+                    for bloque in agrupar_bloques(RENDERIZADORES[formato](registro)):
+                        entrada.write(bloque)
+                        yield from salida.vaciar()
+            yield from salida.vaciar()
+    yield from salida.vaciar()
@@ -10,6 +10,25 @@ from .mercadona_api import (  # noqa: F401
     extraer_productos_de_categoria,
     mostrar_productos_seleccionados,
 )
+from .catalogo import (  # noqa: F401
+    CatalogoMercadona,
+    obtener_catalogo,
+    inicializar_catalogo,
+)
+from .tabla_productos import (  # noqa: F401
+    TablaProductos,
+    FilaProducto,
+)
+from .vocabulario import (  # noqa: F401
+    VocabularioProductos,
+)
+from .carrito import (  # noqa: F401
+    Carrito,
+)
+from .cache_clasificacion import (  # noqa: F401
+    CacheClasificacion,
+    obtener_cache_clasificacion,
+)
 
 __all__ = [
     "normalizar_nombre",
@@ -18,5 +37,14 @@ __all__ = [
     "encontrar_numero_categoria",
     "extraer_productos_de_categoria",
     "mostrar_productos_seleccionados",
+    "CatalogoMercadona",
+    "obtener_catalogo",
+    "inicializar_catalogo",
+    "TablaProductos",
+    "FilaProducto",
+    "VocabularioProductos",
+    "Carrito",
+    "CacheClasificacion",
+    "obtener_cache_clasificacion",
 ]
 
@@ -0,0 +1,421 @@
+"""
+Almacén de tickets con el contenido direccionado por hash.
+
+El contenido de un ticket (productos y resumen, sin la fecha) se guarda una
+sola vez como un JSON compacto cuyo nombre es su hash: dos carritos idénticos
+comparten ese archivo. Cada ticket emitido tiene aun así su propio ID y su
+propia fila en el índice SQLite (`utils/indice_tickets.py`), con su fecha, su
+total y el hash del contenido que lee, así que repetir una compra no reutiliza
+la fecha de la anterior. Los formatos descargables (JSON, TXT, CSV) no se
+escriben al crear el ticket sino al pedirlos, y quedan en una caché en disco
+por ticket y formato.
+
+`compactar` mueve los tickets antiguos, ya con su fecha, a segmentos
+comprimidos para que el directorio no crezca sin límite; el archivo de un
+contenido se borra cuando ningún ticket sin archivar lo usa.
+
+    tickets/
+    ├── indice.sqlite3                  # índice de tickets
+    ├── registros/<hash>.json           # contenido compartido
+    ├── segmentos/segmento_*.ndjson.gz  # tickets archivados
+    └── cache/<ticket>.<formato>        # formatos ya renderizados
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from gen_ui_backend.utils.indice_tickets import IndiceTickets
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+DIRECTORIO_POR_DEFECTO = os.getenv("MERCADONA_TICKETS_DIR", os.path.join(os.getcwd(), "tickets"))
+
+LONGITUD_HASH = 32  # caracteres hexadecimales (128 bits), también de los IDs de ticket
+
+FORMATO_TIMESTAMP = "%Y%m%d_%H%M%S"
+FORMATO_FECHA = "%d/%m/%Y %H:%M:%S"
+
+FORMATOS = ("json", "txt", "csv")
+
+NOMBRE_INDICE = "indice.sqlite3"
+
+# Máximo de tickets en cada segmento comprimido
+TICKETS_POR_SEGMENTO = int(os.getenv("MERCADONA_TICKETS_POR_SEGMENTO", "1000"))
+
+# Nombre con el que se descarga cada formato: ticket_<id>.<formato>
+_PATRON_NOMBRE = re.compile(rf"^ticket_([0-9a-f]{{{LONGITUD_HASH}}})\.({'|'.join(FORMATOS)})$")
+
+# Campos del registro que identifican el ticket (la fecha no cuenta)
+CAMPOS_CONTENIDO = ("resumen", "productos")
+
+
+def _serializar(datos: Any) -> bytes:
+    """JSON canónico: claves ordenadas y sin espacios."""
+    return json.dumps(datos, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _escribir_atomico(ruta: str, partes: Iterable[str]) -> None:
+    """
+    Escribe en un temporal y lo renombra, para no servir nunca un archivo a medias.
+
+    Las partes se escriben según llegan, sin juntar el contenido en memoria.
+    """
+    temporal = f"{ruta}.{threading.get_ident()}.tmp"
+    with open(temporal, "w", encoding="utf-8", newline="") as f:
+        for parte in partes:
+            f.write(parte)
+    os.replace(temporal, ruta)
+
+
+def nombre_descarga(ticket_id: str, formato: str) -> str:
+    """Nombre de archivo con el que se descarga un formato del ticket."""
+    return f"ticket_{ticket_id}.{formato}"
+
+
+def analizar_nombre(nombre: str) -> Optional[Tuple[str, str]]:
+    """
+    Separa un nombre de descarga en (ID del ticket, formato).
+
+    Returns:
+        (ticket_id, formato), o None si el nombre no es de un ticket del almacén
+    """
+    coincidencia = _PATRON_NOMBRE.match(nombre)
+    return (coincidencia.group(1), coincidencia.group(2)) if coincidencia else None
+
+
+def crear_registro(precio_info: Dict[str, Any], momento: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Registro canónico de un ticket a partir de la información de precios.
+
+    Args:
+        precio_info: Información de precios (de `calcular_precio_total` o del carrito)
+        momento: Fecha del ticket (por defecto, ahora)
+
+    Returns:
+        Dict con `fecha`, `timestamp`, `resumen` y `productos`
+    """
+    momento = momento or datetime.now()
+    return {
+        "fecha": momento.strftime(FORMATO_FECHA),
+        "timestamp": momento.strftime(FORMATO_TIMESTAMP),
+        "resumen": {
+            "articulos_diferentes": precio_info.get("num_items", 0),
+            "unidades_totales": precio_info.get("num_productos", 0),
+            "subtotal": precio_info.get("subtotal", 0.0),
+            "descuentos": precio_info.get("descuentos", 0.0),
+            "total": precio_info.get("total", 0.0)
+        },
+        "productos": [
+            {
+                "producto_id": item.get("producto_id", ""),
+                "nombre": item.get("nombre", ""),
+                "cantidad": item.get("cantidad", 0),
+                "precio_unitario": item.get("precio_unitario", 0.0),
+                "precio_total": item.get("precio_total", 0.0),
+                "packaging": item.get("packaging", ""),
+                "categoria": item.get("categoria", "")
+            }
+            for item in precio_info.get("items", [])
+        ]
+    }
+
+
+def hash_registro(registro: Dict[str, Any]) -> str:
+    """Hash del contenido del ticket (productos y resumen)."""
+    return hashlib.sha256(_serializar(_contenido(registro))).hexdigest()[:LONGITUD_HASH]
+
+
+def nuevo_id_ticket() -> str:
+    """ID de un ticket emitido: distinto en cada emisión, aunque se repita el carrito."""
+    return uuid.uuid4().hex
+
+
+def _contenido(registro: Dict[str, Any]) -> Dict[str, Any]:
+    return {campo: registro[campo] for campo in CAMPOS_CONTENIDO}
+
+
+def _emision(timestamp: str, contenido: Dict[str, Any]) -> Dict[str, Any]:
+    """Registro de un ticket: su fecha de emisión y el contenido compartido."""
+    fecha = datetime.strptime(timestamp, FORMATO_TIMESTAMP).strftime(FORMATO_FECHA)
+    return {"fecha": fecha, "timestamp": timestamp, **_contenido(contenido)}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ALMACÉN
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class AlmacenTickets:
+    """Registros de tickets en disco, su índice y la caché de formatos renderizados."""
+
+    def __init__(self, directorio: str = DIRECTORIO_POR_DEFECTO):
+        """
+        Args:
+            directorio: Directorio raíz de los tickets
+        """
+        self.directorio = os.path.abspath(directorio)
+        self._dir_registros = os.path.join(self.directorio, "registros")
+        self._dir_cache = os.path.join(self.directorio, "cache")
+        self._dir_segmentos = os.path.join(self.directorio, "segmentos")
+        self._creado = False
+        self._indice: Optional[IndiceTickets] = None
+        self._lock = threading.Lock()
+        self._lock_compactacion = threading.Lock()
+
+    def _crear_directorios(self) -> None:
+        if not self._creado:
+            os.makedirs(self._dir_registros, exist_ok=True)
+            os.makedirs(self._dir_cache, exist_ok=True)
+            os.makedirs(self._dir_segmentos, exist_ok=True)
+            self._creado = True
+
+    @property
+    def indice(self) -> IndiceTickets:
+        """Índice SQLite del almacén; al crearlo indexa los registros sueltos que ya hubiera."""
+        with self._lock:
+            if self._indice is None:
+                self._crear_directorios()
+                indice = IndiceTickets(os.path.join(self.directorio, NOMBRE_INDICE))
+                if len(indice) == 0:
+                    self._indexar_registros(indice)
+                self._indice = indice
+            return self._indice
+
+    def _indexar_registros(self, indice: IndiceTickets) -> None:
+        """
+        Indexa los registros de `registros/` (almacenes anteriores al índice).
+
+        Allí cada registro era un ticket con su fecha y su hash como ID; los
+        archivos de solo contenido no son tickets por sí mismos y se omiten.
+        """
+        indexados = 0
+        for entrada in os.scandir(self._dir_registros):
+            if entrada.name.endswith(".json"):
+                hash_contenido = entrada.name[:-len(".json")]
+                with open(entrada.path, "rb") as f:
+                    registro = json.loads(f.read())
+                if "timestamp" in registro:
+                    indice.anadir(hash_contenido, registro, hash_contenido, self._relativa(entrada.path))
+                    indexados += 1
+        if indexados:
+            print(f"🗂️ Índice de tickets reconstruido: {indexados} registros")
+
+    def _relativa(self, ruta: str) -> str:
+        return os.path.relpath(ruta, self.directorio)
+
+    def ruta_registro(self, hash_contenido: str) -> str:
+        return os.path.join(self._dir_registros, f"{hash_contenido}.json")
+
+    def ruta_cache(self, ticket_id: str, formato: str) -> str:
+        return os.path.join(self._dir_cache, f"{ticket_id}.{formato}")
+
+    def existe(self, ticket_id: str) -> bool:
+        return self.indice.obtener(ticket_id) is not None
+
+    def tiene_contenido(self, hash_contenido: str) -> bool:
+        """Indica si el contenido ya está escrito (guardar otro ticket igual solo lo indexa)."""
+        return os.path.exists(self.ruta_registro(hash_contenido))
+
+    def guardar(self, registro: Dict[str, Any], ticket_id: Optional[str] = None) -> str:
+        """
+        Guarda un ticket emitido; su contenido solo se escribe si no estaba ya.
+
+        Args:
+            registro: Salida de `crear_registro`
+            ticket_id: ID del ticket (por defecto, uno nuevo de `nuevo_id_ticket`)
+
+        Returns:
+            ID del ticket
+        """
+        ticket_id = ticket_id or nuevo_id_ticket()
+        hash_contenido = hash_registro(registro)
+        indice = self.indice
+        ruta = self.ruta_registro(hash_contenido)
+        # Con el lock, la compactación no puede borrar el contenido entre comprobarlo e indexar el ticket
+        with self._lock:
+            if not os.path.exists(ruta):
+                _escribir_atomico(ruta, [_serializar(_contenido(registro)).decode("utf-8")])
+            indice.anadir(ticket_id, registro, hash_contenido, self._relativa(ruta))
+        return ticket_id
+
+    def cargar(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el registro de un ticket, o None si no existe.
+
+        Busca el ticket en el índice y lee su contenido suelto (con la fecha del
+        índice) o su trozo del segmento, que ya la incluye.
+        """
+        for _ in range(2):
+            fila = self.indice.obtener(ticket_id)
+            if fila is None:
+                return None
+            try:
+                if fila["desplazamiento"] is None:
+                    with open(os.path.join(self.directorio, fila["ruta"]), "rb") as f:
+                        return _emision(fila["timestamp"], json.loads(f.read()))
+                return _leer_de_segmento(
+                    os.path.join(self.directorio, fila["ruta"]), fila["desplazamiento"], fila["longitud"]
+                )
+            except FileNotFoundError:
+                continue  # archivado o eliminado mientras tanto: se vuelve a consultar el índice
+        return None
+
+    def listar(self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> Iterator[str]:
+        """
+        IDs de los tickets emitidos entre dos fechas, del más antiguo al más reciente.
+
+        Args:
+            desde: Fecha mínima (incluida); None para no acotar
+            hasta: Fecha máxima (incluida); None para no acotar
+
+        Returns:
+            Iterador de IDs
+        """
+        minimo = desde.strftime(FORMATO_TIMESTAMP) if desde else ""
+        maximo = hasta.strftime(FORMATO_TIMESTAMP) if hasta else "~"
+        return self.indice.entre(minimo, maximo)
+
+    def renderizado(
+        self,
+        ticket_id: str,
+        formato: str,
+        renderizar: Callable[[Dict[str, Any]], Iterable[str]]
+    ) -> Optional[str]:
+        """
+        Ruta del ticket en un formato, renderizándolo solo la primera vez.
+
+        Args:
+            ticket_id: ID del ticket
+            formato: Uno de `FORMATOS`
+            renderizar: Función registro -> partes del texto del formato
+
+        Returns:
+            Ruta del archivo en la caché, o None si el ticket no existe
+        """
+        ruta = self.ruta_cache(ticket_id, formato)
+        if os.path.exists(ruta):
+            return ruta
+
+        registro = self.cargar(ticket_id)
+        if registro is None:
+            return None
+        self._crear_directorios()
+        _escribir_atomico(ruta, renderizar(registro))
+        print(f"🧾 Ticket {ticket_id} renderizado en {formato.upper()}")
+        return ruta
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Retención y compactación
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def compactar(
+        self,
+        archivar_antes: datetime,
+        eliminar_antes: Optional[datetime] = None,
+        tickets_por_segmento: int = TICKETS_POR_SEGMENTO
+    ) -> Dict[str, int]:
+        """
+        Archiva los tickets antiguos en segmentos comprimidos y borra los caducados.
+
+        Cada segmento es una secuencia de miembros gzip, uno por ticket (el
+        archivo entero se descomprime como NDJSON). El índice guarda dónde
+        empieza y cuánto ocupa cada uno, así que leer un ticket archivado es
+        una búsqueda en el índice y una sola lectura. Los formatos en caché se
+        borran después de actualizar el índice, y el contenido suelto cuando ya
+        no lo usa ningún ticket sin archivar.
+
+        Args:
+            archivar_antes: Se archivan los tickets anteriores a esta fecha
+            eliminar_antes: Se borran los segmentos con todos sus tickets anteriores
+                a esta fecha (None: no se borra nada)
+            tickets_por_segmento: Máximo de tickets por segmento
+
+        Returns:
+            Dict con `archivados`, `segmentos` creados y `eliminados`
+        """
+        resultado = {"archivados": 0, "segmentos": 0, "eliminados": 0}
+        indice = self.indice
+        with self._lock_compactacion:
+            maximo = archivar_antes.strftime(FORMATO_TIMESTAMP)
+            while True:
+                sueltos = indice.sueltos_anteriores(maximo, tickets_por_segmento)
+                if not sueltos:
+                    break
+                resultado["archivados"] += self._escribir_segmento(sueltos)
+                resultado["segmentos"] += 1
+
+            if eliminar_antes is not None:
+                for ruta_segmento in indice.segmentos_anteriores(eliminar_antes.strftime(FORMATO_TIMESTAMP)):
+                    resultado["eliminados"] += indice.eliminar_segmento(ruta_segmento)
+                    try:
+                        os.remove(os.path.join(self.directorio, ruta_segmento))
+                    except FileNotFoundError:
+                        pass
+
+        if any(resultado.values()):
+            print(f"🗜️ Tickets compactados: {resultado}")
+        return resultado
+
+    def _escribir_segmento(self, sueltos: List[Tuple[str, str, str, str]]) -> int:
+        self._crear_directorios()
+        indice = self.indice
+        nombre = f"segmento_{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.ndjson.gz"
+        ruta_segmento = os.path.join(self._dir_segmentos, nombre)
+        posiciones = []
+        contenidos: Dict[str, Dict[str, Any]] = {}
+        temporal = ruta_segmento + ".tmp"
+        with open(temporal, "wb") as segmento:
+            for ticket_id, timestamp, hash_contenido, ruta in sueltos:
+                if hash_contenido not in contenidos:
+                    with open(os.path.join(self.directorio, ruta), "rb") as f:
+                        contenidos[hash_contenido] = json.loads(f.read())
+                registro = _emision(timestamp, contenidos[hash_contenido])
+                miembro = gzip.compress(_serializar({"ticket_id": ticket_id, **registro}) + b"\n", mtime=0)
+                posiciones.append((ticket_id, segmento.tell(), len(miembro)))
+                segmento.write(miembro)
+            segmento.flush()
+            os.fsync(segmento.fileno())
+        os.replace(temporal, ruta_segmento)
+
+        indice.archivar(self._relativa(ruta_segmento), posiciones)
+        sobrantes = [self.ruta_cache(ticket_id, f) for ticket_id, *_ in sueltos for f in FORMATOS]
+        with self._lock:
+            # Un carrito que se sigue comprando conserva su contenido suelto
+            sobrantes += [self.ruta_registro(h) for h in contenidos if not indice.contenido_en_uso(h)]
+            for sobrante in sobrantes:
+                try:
+                    os.remove(sobrante)
+                except FileNotFoundError:
+                    pass
+        return len(posiciones)
+
+
+def _leer_de_segmento(ruta: str, desplazamiento: int, longitud: int) -> Dict[str, Any]:
+    """Lee y descomprime el registro de un ticket dentro de un segmento."""
+    with open(ruta, "rb") as f:
+        f.seek(desplazamiento)
+        registro = json.loads(gzip.decompress(f.read(longitud)))
+    registro.pop("ticket_id", None)
+    return registro
+
+
+_almacen: Optional[AlmacenTickets] = None
+_lock_almacen = threading.Lock()
+
+
+def obtener_almacen_tickets() -> AlmacenTickets:
+    """Devuelve el almacén de tickets compartido del proceso."""
+    global _almacen
+    with _lock_almacen:
+        if _almacen is None:
+            _almacen = AlmacenTickets()
+        return _almacen
@@ -0,0 +1,364 @@
+"""
+Caché de clasificaciones de intención.
+
+Guarda el resultado (`intencion`, `productos`, `cantidades`) de clasificar un
+mensaje, indexado por su texto normalizado, para no repetir la llamada al LLM
+cuando los usuarios envían las mismas frases. Desaloja por LRU y caduca por TTL,
+con almacenes intercambiables en memoria o en SQLite, y admite un nivel
+opcional por similitud de embeddings.
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from gen_ui_backend.utils.normalizacion import normalizar_nombre
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+CAPACIDAD_POR_DEFECTO = int(os.getenv("MERCADONA_CACHE_CLASIFICACION_CAPACIDAD", 4096))
+TTL_POR_DEFECTO = float(os.getenv("MERCADONA_CACHE_CLASIFICACION_TTL", 24 * 3600))  # segundos
+UMBRAL_SIMILITUD = float(os.getenv("MERCADONA_CACHE_UMBRAL_SIMILITUD", 0.95))
+
+ALMACEN_MEMORIA = "memoria"
+ALMACEN_SQLITE = "sqlite"
+ALMACEN_DESACTIVADO = "desactivado"
+
+RUTA_CACHE_POR_DEFECTO = os.path.join(os.getcwd(), "cache_clasificacion.db")
+
+# Campos de la clasificación que se guardan
+CAMPOS_CLASIFICACION = ("intencion", "productos", "cantidades")
+
+_NO_PALABRA = re.compile(r"[^\w]+")
+_NUMEROS = re.compile(
+    r"\b(\d+|un|una|uno|dos|tres|cuatro|cinco|seis|siete|ocho|nueve|diez|once|doce|"
+    r"trece|catorce|quince|dieciseis|diecisiete|dieciocho|diecinueve|veinte|media|medio)\b"
+)
+
+ESQUEMA_CACHE = """
+CREATE TABLE IF NOT EXISTS clasificaciones (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL,
+    creado_en REAL NOT NULL,
+    usado_en REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_clasificaciones_usado ON clasificaciones (usado_en);
+"""
+
+
+def clave_mensaje(texto: str) -> str:
+    """
+    Normaliza un mensaje para usarlo como clave de la caché.
+
+    Minúsculas, sin tildes, sin puntuación y con los espacios colapsados:
+    "¡Quiero 2 Leches!" y "quiero 2 leches" comparten clave.
+    """
+    return " ".join(_NO_PALABRA.sub(" ", normalizar_nombre(texto)).split())
+
+
+def firma_numerica(clave: str) -> Tuple[str, ...]:
+    """
+    Devuelve los números (en cifras o en texto) de una clave, en orden.
+
+    El nivel por embeddings solo compara mensajes con la misma firma: "2 leches"
+    y "3 leches" son casi idénticos semánticamente pero no intercambiables.
+    """
+    return tuple(_NUMEROS.findall(clave))
+
+
+def _coseno(a: List[float], b: List[float]) -> float:
+    producto = sum(x * y for x, y in zip(a, b))
+    norma = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return producto / norma if norma else 0.0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ALMACENES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class AlmacenMemoria:
+    """Almacén LRU en memoria con caducidad por entrada."""
+
+    def __init__(self, capacidad: int = CAPACIDAD_POR_DEFECTO, ttl: float = TTL_POR_DEFECTO):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._entradas: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expirados = 0
+        self.desalojados = 0
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            creado_en, valor = entrada
+            if time.time() - creado_en > self.ttl:
+                del self._entradas[clave]
+                self.expirados += 1
+                return None
+            self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave: str, valor: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entradas[clave] = (time.time(), valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.desalojados += 1
+
+    def contiene(self, clave: str) -> bool:
+        return self.obtener(clave) is not None
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+class AlmacenSQLite:
+    """
+    Almacén LRU persistente en SQLite.
+
+    La recencia se guarda en `usado_en`; al superar la capacidad se borran las
+    entradas usadas hace más tiempo. Sobrevive a reinicios del servidor.
+    """
+
+    def __init__(
+        self,
+        ruta_db: Optional[str] = None,
+        capacidad: int = CAPACIDAD_POR_DEFECTO,
+        ttl: float = TTL_POR_DEFECTO
+    ):
+        self.ruta_db = ruta_db or os.getenv("MERCADONA_CACHE_CLASIFICACION_DB", RUTA_CACHE_POR_DEFECTO)
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.expirados = 0
+        self.desalojados = 0
+        directorio = os.path.dirname(os.path.abspath(self.ruta_db))
+        os.makedirs(directorio, exist_ok=True)
+        self._conexion = sqlite3.connect(self.ruta_db, check_same_thread=False)
+        self._conexion.executescript(ESQUEMA_CACHE)
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        ahora = time.time()
+        with self._lock, self._conexion:
+            fila = self._conexion.execute(
+                "SELECT valor, creado_en FROM clasificaciones WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                return None
+            valor, creado_en = fila
+            if ahora - creado_en > self.ttl:
+                self._conexion.execute("DELETE FROM clasificaciones WHERE clave = ?", (clave,))
+                self.expirados += 1
+                return None
+            self._conexion.execute(
+                "UPDATE clasificaciones SET usado_en = ? WHERE clave = ?", (ahora, clave)
+            )
+            return json.loads(valor)
+
+    def guardar(self, clave: str, valor: Dict[str, Any]) -> None:
+        ahora = time.time()
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO clasificaciones VALUES (?, ?, ?, ?)",
+                (clave, json.dumps(valor, ensure_ascii=False), ahora, ahora)
+            )
+            sobrantes = self._conexion.execute("SELECT COUNT(*) FROM clasificaciones").fetchone()[0] - self.capacidad
+            if sobrantes > 0:
+                self._conexion.execute(
+                    "DELETE FROM clasificaciones WHERE clave IN "
+                    "(SELECT clave FROM clasificaciones ORDER BY usado_en LIMIT ?)",
+                    (sobrantes,)
+                )
+                self.desalojados += sobrantes
+
+    def contiene(self, clave: str) -> bool:
+        return self.obtener(clave) is not None
+
+    def limpiar(self) -> None:
+        with self._lock, self._conexion:
+            self._conexion.execute("DELETE FROM clasificaciones")
+
+    def cerrar(self) -> None:
+        self._conexion.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM clasificaciones").fetchone()[0]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHÉ
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class CacheClasificacion:
+    """
+    Caché de clasificaciones con nivel exacto (texto normalizado) y, si se
+    proporciona una función de embeddings, un nivel por similitud semántica.
+
+    Los vectores del nivel semántico solo se guardan en memoria: tras un
+    reinicio, el nivel exacto sigue respondiendo desde SQLite y el semántico
+    se vuelve a poblar con las nuevas entradas.
+    """
+
+    def __init__(
+        self,
+        almacen: Any = None,
+        embeddings: Optional[Callable[[str], List[float]]] = None,
+        umbral_similitud: float = UMBRAL_SIMILITUD
+    ):
+        """
+        Args:
+            almacen: `AlmacenMemoria` o `AlmacenSQLite` (por defecto, en memoria)
+            embeddings: Función texto → vector para el nivel semántico (opcional)
+            umbral_similitud: Similitud coseno mínima para un acierto semántico
+        """
+        self.almacen = almacen if almacen is not None else AlmacenMemoria()
+        self.embeddings = embeddings
+        self.umbral_similitud = umbral_similitud
+        self._vectores: Dict[str, Tuple[Tuple[str, ...], List[float]]] = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_semanticos = 0
+        self.fallos = 0
+
+    def obtener(self, texto: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca la clasificación de un mensaje.
+
+        Returns:
+            Diccionario con `intencion`, `productos` y `cantidades`, o None si no está
+        """
+        clave = clave_mensaje(texto)
+        valor = self.almacen.obtener(clave)
+        if valor is not None:
+            self.aciertos += 1
+            return valor
+
+        if self.embeddings is not None:
+            valor = self._obtener_semantico(clave)
+            if valor is not None:
+                self.aciertos_semanticos += 1
+                return valor
+
+        self.fallos += 1
+        return None
+
+    def guardar(self, texto: str, clasificacion: Dict[str, Any]) -> None:
+        """Guarda la clasificación de un mensaje (solo los campos de `CAMPOS_CLASIFICACION`)."""
+        clave = clave_mensaje(texto)
+        valor = {campo: clasificacion.get(campo) for campo in CAMPOS_CLASIFICACION}
+        self.almacen.guardar(clave, valor)
+
+        if self.embeddings is not None:
+            try:
+                vector = self.embeddings(clave)
+            except Exception as e:
+                print(f"⚠️  No se pudo calcular el embedding para la caché: {e}")
+                return
+            with self._lock:
+                self._vectores[clave] = (firma_numerica(clave), vector)
+
+    def _obtener_semantico(self, clave: str) -> Optional[Dict[str, Any]]:
+        firma = firma_numerica(clave)
+        with self._lock:
+            candidatos = [(c, v) for c, (f, v) in self._vectores.items() if f == firma]
+        if not candidatos:
+            return None
+
+        try:
+            vector = self.embeddings(clave)
+        except Exception as e:
+            print(f"⚠️  No se pudo calcular el embedding para la caché: {e}")
+            return None
+
+        mejor_clave, mejor_similitud = None, self.umbral_similitud
+        for candidata, vector_candidato in candidatos:
+            similitud = _coseno(vector, vector_candidato)
+            if similitud >= mejor_similitud:
+                mejor_clave, mejor_similitud = candidata, similitud
+        if mejor_clave is None:
+            return None
+
+        valor = self.almacen.obtener(mejor_clave)
+        if valor is None:
+            # La entrada caducó o se desalojó del almacén
+            with self._lock:
+                self._vectores.pop(mejor_clave, None)
+        return valor
+
+    def limpiar(self) -> None:
+        self.almacen.limpiar()
+        with self._lock:
+            self._vectores.clear()
+
+    def metricas(self) -> Dict[str, Any]:
+        """Devuelve aciertos, fallos y ocupación para dimensionar la caché."""
+        consultas = self.aciertos + self.aciertos_semanticos + self.fallos
+        return {
+            "almacen": type(self.almacen).__name__,
+            "aciertos": self.aciertos,
+            "aciertos_semanticos": self.aciertos_semanticos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round((self.aciertos + self.aciertos_semanticos) / consultas, 3) if consultas else 0.0,
+            "expirados": self.almacen.expirados,
+            "desalojados": self.almacen.desalojados,
+            "tamano": len(self.almacen),
+            "capacidad": self.almacen.capacidad,
+            "ttl_s": self.almacen.ttl,
+            "vectores": len(self._vectores),
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INSTANCIA COMPARTIDA
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_cache: Optional[CacheClasificacion] = None
+_cache_creada = False
+_cache_lock = threading.Lock()
+
+
+def _crear_embeddings() -> Optional[Callable[[str], List[float]]]:
+    """Crea la función de embeddings si `MERCADONA_CACHE_EMBEDDINGS` indica un modelo."""
+    modelo = os.getenv("MERCADONA_CACHE_EMBEDDINGS")
+    if not modelo:
+        return None
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(model=modelo).embed_query
+
+
+def obtener_cache_clasificacion() -> Optional[CacheClasificacion]:
+    """
+    Devuelve la caché compartida del proceso según `MERCADONA_CACHE_CLASIFICACION`
+    (`memoria` por defecto, `sqlite` o `desactivado`).
+
+    Returns:
+        La caché, o None si está desactivada
+    """
+    global _cache, _cache_creada
+    with _cache_lock:
+        if not _cache_creada:
+            tipo = os.getenv("MERCADONA_CACHE_CLASIFICACION", ALMACEN_MEMORIA)
+            if tipo == ALMACEN_SQLITE:
+                _cache = CacheClasificacion(AlmacenSQLite(), _crear_embeddings())
+            elif tipo == ALMACEN_MEMORIA:
+                _cache = CacheClasificacion(AlmacenMemoria(), _crear_embeddings())
+            _cache_creada = True
+        return _cache
@@ -0,0 +1,271 @@
+"""
+Carrito de la compra incremental.
+
+Guarda una línea por ID de producto y mantiene el subtotal y las unidades al
+añadir, cambiar o quitar líneas, sin recalcular las demás. Cada línea guarda
+también sus fragmentos ya formateados (línea del ticket, fila de la tabla...),
+que solo se vuelven a generar cuando la línea cambia: editar una cantidad en
+una lista larga cuesta O(cambio).
+
+El carrito se guarda en el estado del grafo como un diccionario (`a_estado`),
+así que con checkpointer se conserva entre turnos de la conversación.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+from gen_ui_backend.utils.normalizacion import normalizar_nombre
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+CANTIDAD_POR_DEFECTO = 1
+
+# Campos de cada línea que se copian del producto encontrado
+CAMPOS_PRODUCTO = ("nombre", "producto_buscado", "packaging", "categoria")
+
+
+def _a_centimos(euros: float) -> int:
+    return int(round(euros * 100))
+
+
+def clave_producto(producto: Mapping[str, Any]) -> str:
+    """ID con el que se guarda un producto en el carrito (su nombre si no tiene ID)."""
+    return str(producto.get("id") or normalizar_nombre(producto.get("nombre", "")))
+
+
+def cantidad_pedida(producto: Mapping[str, Any], cantidades: Mapping[str, Any]) -> int:
+    """
+    Cantidad pedida de un producto encontrado.
+
+    Busca la clave de `cantidades` que coincida (sin tildes ni mayúsculas) con el
+    nombre del producto o con el término buscado, en cualquier dirección.
+
+    Args:
+        producto: Producto encontrado (con `nombre` y `producto_buscado`)
+        cantidades: Dict producto -> cantidad del clasificador
+
+    Returns:
+        Cantidad pedida, o `CANTIDAD_POR_DEFECTO` si no se menciona
+    """
+    nombre_norm = normalizar_nombre(producto.get("nombre", ""))
+    buscado_norm = normalizar_nombre(producto.get("producto_buscado", ""))
+    for clave, cantidad in cantidades.items():
+        clave_norm = normalizar_nombre(str(clave))
+        if (clave_norm in nombre_norm or
+                clave_norm in buscado_norm or
+                nombre_norm in clave_norm or
+                buscado_norm in clave_norm):
+            return int(cantidad) or CANTIDAD_POR_DEFECTO
+    return CANTIDAD_POR_DEFECTO
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CARRITO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class Carrito:
+    """
+    Líneas de la compra indexadas por ID de producto, en orden de llegada.
+
+    Cada línea es un diccionario con los campos de un item de
+    `calcular_precio_total` más `fragmentos` (formato -> texto ya renderizado).
+    """
+
+    def __init__(self, estado: Optional[Mapping[str, Any]] = None):
+        """
+        Args:
+            estado: Diccionario devuelto por `a_estado` en un turno anterior
+        """
+        estado = estado or {}
+        self._lineas: Dict[str, Dict[str, Any]] = {
+            clave: {**linea, "fragmentos": dict(linea.get("fragmentos", {}))}
+            for clave, linea in estado.get("lineas", {}).items()
+        }
+        self._subtotal_centimos = sum(l["centimos"] for l in self._lineas.values())
+        self._unidades = sum(l["cantidad"] for l in self._lineas.values())
+        self.version: int = estado.get("version", 0)
+
+    def a_estado(self) -> Dict[str, Any]:
+        """Diccionario serializable con el contenido del carrito, para el estado del grafo."""
+        return {"lineas": self._lineas, "version": self.version}
+
+    def __len__(self) -> int:
+        return len(self._lineas)
+
+    def __contains__(self, producto_id: object) -> bool:
+        return producto_id in self._lineas
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Operaciones
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def anadir(self, producto: Mapping[str, Any], cantidad: int = CANTIDAD_POR_DEFECTO) -> bool:
+        """
+        Añade un producto o sustituye su línea si ya estaba.
+
+        Args:
+            producto: Producto encontrado (con `id`, `nombre`, `precio_unidad`...)
+            cantidad: Unidades de la línea
+
+        Returns:
+            True si el carrito ha cambiado
+        """
+        clave = clave_producto(producto)
+        precio_unitario = float(producto.get("precio_unidad", 0.0) or 0.0)
+        anterior = self._lineas.get(clave)
+        if (anterior is not None
+                and anterior["cantidad"] == cantidad
+                and anterior["precio_unitario"] == precio_unitario
+                and all(anterior[c] == producto.get(c, "") for c in CAMPOS_PRODUCTO)):
+            return False
+
+        linea = {"producto_id": producto.get("id", "")}
+        for campo in CAMPOS_PRODUCTO:
+            linea[campo] = producto.get(campo, "")
+        linea["precio_unitario"] = precio_unitario
+        self._fijar(clave, linea, cantidad)
+        return True
+
+    def actualizar(self, producto_id: str, cantidad: int) -> bool:
+        """
+        Cambia la cantidad de una línea (cero o menos la quita).
+
+        Returns:
+            True si el carrito ha cambiado
+        """
+        linea = self._lineas.get(producto_id)
+        if linea is None or linea["cantidad"] == cantidad:
+            return False
+        if cantidad <= 0:
+            return self.eliminar(producto_id)
+        self._fijar(producto_id, dict(linea), cantidad)
+        return True
+
+    def eliminar(self, producto_id: str) -> bool:
+        """
+        Quita una línea del carrito.
+
+        Returns:
+            True si la línea existía
+        """
+        linea = self._lineas.pop(producto_id, None)
+        if linea is None:
+            return False
+        self._subtotal_centimos -= linea["centimos"]
+        self._unidades -= linea["cantidad"]
+        self.version += 1
+        return True
+
+    def sincronizar(
+        self,
+        productos: Iterable[Mapping[str, Any]],
+        cantidades: Mapping[str, Any]
+    ) -> int:
+        """
+        Deja en el carrito exactamente los productos encontrados en este turno.
+
+        Las líneas que no cambian conservan sus fragmentos; si dos búsquedas dan
+        el mismo producto, sus cantidades se suman en una sola línea.
+
+        Args:
+            productos: Productos encontrados por el Agente 2
+            cantidades: Dict producto -> cantidad del clasificador
+
+        Returns:
+            Número de líneas añadidas, cambiadas o quitadas
+        """
+        pedidos: Dict[str, List[Any]] = {}
+        for producto in productos:
+            clave = clave_producto(producto)
+            cantidad = cantidad_pedida(producto, cantidades)
+            if clave in pedidos:
+                pedidos[clave][1] += cantidad
+            else:
+                pedidos[clave] = [producto, cantidad]
+
+        cambios = 0
+        for clave in [c for c in self._lineas if c not in pedidos]:
+            cambios += self.eliminar(clave)
+        for producto, cantidad in pedidos.values():
+            cambios += self.anadir(producto, cantidad)
+        return cambios
+
+    def _fijar(self, clave: str, linea: Dict[str, Any], cantidad: int) -> None:
+        anterior = self._lineas.get(clave)
+        if anterior is not None:
+            self._subtotal_centimos -= anterior["centimos"]
+            self._unidades -= anterior["cantidad"]
+
+        centimos = _a_centimos(linea["precio_unitario"] * cantidad)
+        linea.update({
+            "cantidad": cantidad,
+            "precio_total": centimos / 100,
+            "centimos": centimos,
+            "fragmentos": {},
+        })
+        self._lineas[clave] = linea
+        self._subtotal_centimos += centimos
+        self._unidades += cantidad
+        self.version += 1
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Consultas
+    # ───────────────────────────────────────────────────────────────────────────
+
+    @property
+    def subtotal(self) -> float:
+        return self._subtotal_centimos / 100
+
+    @property
+    def unidades(self) -> int:
+        return self._unidades
+
+    def items(self) -> List[Dict[str, Any]]:
+        """Líneas con el formato de los items de `calcular_precio_total`."""
+        return [
+            {
+                "producto_id": l["producto_id"],
+                "nombre": l["nombre"],
+                "producto_buscado": l["producto_buscado"],
+                "cantidad": l["cantidad"],
+                "precio_unitario": l["precio_unitario"],
+                "precio_total": l["precio_total"],
+                "packaging": l["packaging"],
+                "categoria": l["categoria"],
+            }
+            for l in self._lineas.values()
+        ]
+
+    def precio_info(self) -> Dict[str, Any]:
+        """Resumen de precios con el formato de `calcular_precio_total`."""
+        descuentos = 0.0  # futuro: descuentos por línea
+        return {
+            "subtotal": self.subtotal,
+            "descuentos": descuentos,
+            "total": round(self.subtotal - descuentos, 2),
+            "items": self.items(),
+            "num_items": len(self._lineas),
+            "num_productos": self._unidades,
+        }
+
+    def fragmentos(self, formato: str, renderizar: Callable[[Dict[str, Any]], str]) -> List[str]:
+        """
+        Texto de cada línea en un formato, renderizando solo las que han cambiado.
+
+        Args:
+            formato: Nombre del formato ("ticket", "tabla"...), clave de la caché de cada línea
+            renderizar: Función item -> texto (sin el número de línea)
+
+        Returns:
+            Fragmentos en el orden de las líneas
+        """
+        resultado = []
+        for linea in self._lineas.values():
+            cache = linea["fragmentos"]
+            fragmento = cache.get(formato)
+            if fragmento is None:
+                fragmento = cache[formato] = renderizar(linea)
+            resultado.append(fragmento)
+        return resultado
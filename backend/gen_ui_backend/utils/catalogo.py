@@ -0,0 +1,666 @@
+"""
+Catálogo local persistente de Mercadona.
+
+Guarda en SQLite el árbol completo categoría → subcategoría → sub-subcategoría → producto
+para que las búsquedas se resuelvan en memoria sin recorrer la API en cada turno.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from gen_ui_backend.utils.indice_productos import IndiceProductos
+from gen_ui_backend.utils.mercadona_api import (
+    BASE_URL,
+    diccionario_desde_categorias,
+    hacer_peticion_api_condicional,
+)
+from gen_ui_backend.utils.tabla_productos import FilaProducto, TablaProductos
+from gen_ui_backend.utils.vocabulario import VocabularioProductos
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+RUTA_CATALOGO_POR_DEFECTO = os.path.join(os.getcwd(), "catalogo_mercadona.db")
+
+NIVEL_CATEGORIA = 0
+NIVEL_SUBCATEGORIA = 1
+NIVEL_SUB_SUBCATEGORIA = 2
+
+# Clave de revalidación de la lista de categorías principales (`categories/`)
+ID_RAIZ = 0
+
+# Fracción de filas obsoletas de la tabla de productos a partir de la cual se compacta
+UMBRAL_COMPACTACION = 0.5
+
+ESQUEMA_CATALOGO = """
+CREATE TABLE IF NOT EXISTS categorias (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    padre_id INTEGER,
+    nivel INTEGER NOT NULL,
+    orden INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS productos (
+    id TEXT NOT NULL,
+    sub_subcategoria_id INTEGER NOT NULL,
+    orden INTEGER NOT NULL,
+    nombre TEXT NOT NULL,
+    packaging TEXT,
+    precio_unidad TEXT,
+    precio_bulk TEXT,
+    precio_referencia TEXT,
+    formato_referencia TEXT,
+    PRIMARY KEY (id, sub_subcategoria_id)
+);
+CREATE TABLE IF NOT EXISTS revalidaciones (
+    categoria_id INTEGER PRIMARY KEY,
+    nivel INTEGER NOT NULL,
+    etag TEXT,
+    hash TEXT,
+    revalidado_en REAL NOT NULL,
+    cambiado_en REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metadatos (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CATÁLOGO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class InstantaneaProductos(NamedTuple):
+    """
+    Productos del catálogo en un momento dado.
+
+    La tabla, las filas de cada subcategoría y el índice se publican juntos y
+    nunca se modifican después: una actualización construye una instantánea
+    nueva y la sustituye con una sola asignación. La tabla sí se comparte entre
+    instantáneas, pero solo crece, así que las filas de una instantánea
+    anterior siguen siendo válidas.
+    """
+    tabla: TablaProductos
+    filas_por_subcategoria: Dict[int, array]
+    indice: IndiceProductos
+
+
+class CatalogoMercadona:
+    """
+    Instantánea local del catálogo de Mercadona.
+
+    Los datos se persisten en un fichero SQLite. En memoria, las categorías
+    tienen la misma forma que devuelve la API y los productos se guardan en
+    una `TablaProductos` columnar, de modo que las funciones de
+    `mercadona_api` pueden usarlo como sustituto directo de la red.
+    """
+
+    def __init__(self, ruta_db: Optional[str] = None):
+        self.ruta_db = ruta_db or os.getenv("MERCADONA_CATALOGO_DB", RUTA_CATALOGO_POR_DEFECTO)
+        self._lock = threading.RLock()
+        self._categorias_principales: List[Dict[str, Any]] = []
+        self._ubicacion_subcategorias: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self._productos = InstantaneaProductos(TablaProductos(), {}, IndiceProductos())
+        self._diccionario_categorias: Optional[Dict[str, int]] = None
+        self._vocabulario: Optional[Tuple[InstantaneaProductos, VocabularioProductos]] = None
+        self.actualizado_en: Optional[float] = None
+
+    @property
+    def productos(self) -> InstantaneaProductos:
+        """Instantánea actual de los productos; quien la lee debe quedarse con esta referencia."""
+        return self._productos
+
+    @property
+    def tabla(self) -> TablaProductos:
+        return self._productos.tabla
+
+    @property
+    def indice(self) -> IndiceProductos:
+        return self._productos.indice
+
+    @property
+    def cargado(self) -> bool:
+        """Indica si hay un catálogo en memoria listo para responder consultas."""
+        return bool(self._categorias_principales)
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Persistencia
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def _conectar(self) -> sqlite3.Connection:
+        directorio = os.path.dirname(os.path.abspath(self.ruta_db))
+        os.makedirs(directorio, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta_db)
+        conexion.executescript(ESQUEMA_CATALOGO)
+        return conexion
+
+    def guardar_arbol(
+        self,
+        categorias_principales: List[Dict[str, Any]],
+        detalles_subcategorias: Dict[int, Dict[str, Any]],
+        validadores: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> int:
+        """
+        Persiste el árbol completo del catálogo y lo recarga en memoria.
+
+        Args:
+            categorias_principales: Lista `results` de la respuesta de `categories/`
+            detalles_subcategorias: Respuestas de `categories/{id}` indexadas por ID de subcategoría
+            validadores: ETag y hash de cada respuesta, indexados por ID (0 para `categories/`)
+
+        Returns:
+            Número de productos guardados
+        """
+        filas_categorias = _filas_categorias_principales(categorias_principales)
+        filas_productos = []
+
+        for categoria in categorias_principales:
+            for subcat in categoria.get("categories", []):
+                subcat_id = subcat.get("id")
+                if subcat_id not in detalles_subcategorias:
+                    continue
+                filas_subsub, filas_prod = _filas_subcategoria(subcat_id, detalles_subcategorias[subcat_id])
+                filas_categorias.extend(filas_subsub)
+                filas_productos.extend(filas_prod)
+
+        ahora = time.time()
+        with self._lock:
+            conexion = self._conectar()
+            try:
+                with conexion:
+                    conexion.execute("DELETE FROM productos")
+                    conexion.execute("DELETE FROM categorias")
+                    conexion.executemany(
+                        "INSERT OR REPLACE INTO categorias VALUES (?, ?, ?, ?, ?)",
+                        filas_categorias
+                    )
+                    conexion.executemany(
+                        "INSERT OR REPLACE INTO productos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        filas_productos
+                    )
+                    for categoria_id, validador in (validadores or {}).items():
+                        _guardar_revalidacion(conexion, categoria_id, validador, ahora, cambiado=True)
+                    conexion.execute(
+                        "INSERT OR REPLACE INTO metadatos VALUES ('actualizado_en', ?)",
+                        (str(ahora),)
+                    )
+            finally:
+                conexion.close()
+
+            self.cargar()
+
+        return len(filas_productos)
+
+    def cargar(self) -> bool:
+        """
+        Carga en memoria el catálogo guardado en disco.
+
+        Returns:
+            True si se cargó un catálogo con datos, False en caso contrario
+        """
+        if not os.path.exists(self.ruta_db):
+            return False
+
+        with self._lock:
+            conexion = self._conectar()
+            try:
+                filas_categorias = conexion.execute(
+                    "SELECT id, nombre, padre_id, nivel FROM categorias ORDER BY nivel, padre_id, orden"
+                ).fetchall()
+                filas_productos = conexion.execute(
+                    "SELECT sub_subcategoria_id, id, nombre, packaging, precio_unidad, precio_bulk, "
+                    "precio_referencia, formato_referencia FROM productos ORDER BY sub_subcategoria_id, orden"
+                ).fetchall()
+                fila_fecha = conexion.execute(
+                    "SELECT valor FROM metadatos WHERE clave = 'actualizado_en'"
+                ).fetchone()
+            finally:
+                conexion.close()
+
+            nodos: Dict[int, Dict[str, Any]] = {}
+            principales: List[Dict[str, Any]] = []
+            sub_subcategorias: Dict[int, List[Dict[str, Any]]] = {}
+            for cat_id, nombre, padre_id, nivel in filas_categorias:
+                if nivel == NIVEL_SUB_SUBCATEGORIA:
+                    sub_subcategorias.setdefault(padre_id, []).append({"id": cat_id, "name": nombre})
+                    continue
+                nodo = {"id": cat_id, "name": nombre, "categories": []}
+                if nivel == NIVEL_CATEGORIA:
+                    principales.append(nodo)
+                elif padre_id in nodos:
+                    nodos[padre_id]["categories"].append(nodo)
+                nodos[cat_id] = nodo
+
+            productos_por_sub_subcategoria: Dict[int, List[Tuple]] = {}
+            for sub_subcat_id, *campos in filas_productos:
+                productos_por_sub_subcategoria.setdefault(sub_subcat_id, []).append(campos)
+
+            tabla = TablaProductos()
+            ubicaciones: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+            filas_por_subcategoria: Dict[int, array] = {}
+            for categoria in principales:
+                for subcat in categoria["categories"]:
+                    ubicaciones[subcat["id"]] = (categoria, subcat)
+                    filas_por_subcategoria[subcat["id"]] = _agregar_productos(
+                        tabla, categoria, subcat,
+                        sub_subcategorias.get(subcat["id"], []), productos_por_sub_subcategoria
+                    )
+
+            indice = IndiceProductos(tabla.filas(range(len(tabla))))
+
+            self._categorias_principales = principales
+            self._ubicacion_subcategorias = ubicaciones
+            self._productos = InstantaneaProductos(tabla, filas_por_subcategoria, indice)
+            self._diccionario_categorias = None
+            self._vocabulario = None
+            self.actualizado_en = float(fila_fecha[0]) if fila_fecha else None
+
+        if self.cargado:
+            total = sum(len(filas) for filas in filas_por_subcategoria.values())
+            print(f"✅ Catálogo local cargado: {len(principales)} categorías, {total} productos")
+        return self.cargado
+
+    def sincronizar(self) -> int:
+        """
+        Descarga el árbol completo de la API de Mercadona y lo guarda en disco.
+
+        Returns:
+            Número de productos guardados (0 si la descarga falla)
+        """
+        print("🔄 Sincronizando catálogo local con la API de Mercadona...")
+        respuesta = hacer_peticion_api_condicional(f"{BASE_URL}categories/")
+
+        if not respuesta or not respuesta["data"] or "results" not in respuesta["data"]:
+            print("❌ Error: No se pudieron obtener las categorías para el catálogo")
+            return 0
+
+        categorias_principales = respuesta["data"]["results"]
+        detalles_subcategorias: Dict[int, Dict[str, Any]] = {}
+        validadores = {ID_RAIZ: respuesta}
+
+        for categoria in categorias_principales:
+            for subcat in categoria.get("categories", []):
+                subcat_id = subcat.get("id")
+                if not subcat_id:
+                    continue
+                detalle = hacer_peticion_api_condicional(f"{BASE_URL}categories/{subcat_id}")
+                if detalle and detalle["data"] and "categories" in detalle["data"]:
+                    detalles_subcategorias[subcat_id] = detalle["data"]
+                    validadores[subcat_id] = detalle
+
+        total = self.guardar_arbol(categorias_principales, detalles_subcategorias, validadores)
+        print(f"✅ Catálogo sincronizado: {total} productos guardados en {self.ruta_db}")
+        return total
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Actualización incremental
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def actualizar_categorias_principales(self, categorias_principales: List[Dict[str, Any]]) -> None:
+        """
+        Sustituye la lista de categorías y subcategorías conservando los productos.
+
+        Las subcategorías que desaparecen se eliminan con sus productos; las nuevas
+        quedan sin productos hasta que se revaliden.
+        """
+        filas_categorias = _filas_categorias_principales(categorias_principales)
+        ids_vigentes = [fila[0] for fila in filas_categorias]
+
+        with self._lock:
+            conexion = self._conectar()
+            try:
+                with conexion:
+                    marcadores = ", ".join("?" for _ in ids_vigentes) or "NULL"
+                    conexion.execute(
+                        f"DELETE FROM productos WHERE sub_subcategoria_id IN ("
+                        f"SELECT id FROM categorias WHERE nivel = ? AND padre_id NOT IN ({marcadores}))",
+                        (NIVEL_SUB_SUBCATEGORIA, *ids_vigentes)
+                    )
+                    conexion.execute(
+                        f"DELETE FROM categorias WHERE nivel = ? AND padre_id NOT IN ({marcadores})",
+                        (NIVEL_SUB_SUBCATEGORIA, *ids_vigentes)
+                    )
+                    conexion.execute(
+                        "DELETE FROM categorias WHERE nivel IN (?, ?)",
+                        (NIVEL_CATEGORIA, NIVEL_SUBCATEGORIA)
+                    )
+                    conexion.executemany(
+                        "INSERT OR REPLACE INTO categorias VALUES (?, ?, ?, ?, ?)",
+                        filas_categorias
+                    )
+                    conexion.execute(
+                        f"DELETE FROM revalidaciones WHERE categoria_id != ? AND categoria_id NOT IN ({marcadores})",
+                        (ID_RAIZ, *ids_vigentes)
+                    )
+            finally:
+                conexion.close()
+
+            self.cargar()
+
+    def actualizar_subcategoria(self, subcat_id: int, detalle: Dict[str, Any]) -> int:
+        """
+        Sustituye los productos de una subcategoría sin tocar el resto del catálogo.
+
+        Args:
+            subcat_id: ID de la subcategoría
+            detalle: Respuesta de `categories/{subcat_id}`
+
+        Returns:
+            Número de productos de la subcategoría tras la actualización
+        """
+        filas_subsub, filas_productos = _filas_subcategoria(subcat_id, detalle)
+
+        with self._lock:
+            conexion = self._conectar()
+            try:
+                with conexion:
+                    conexion.execute(
+                        "DELETE FROM productos WHERE sub_subcategoria_id IN ("
+                        "SELECT id FROM categorias WHERE nivel = ? AND padre_id = ?)",
+                        (NIVEL_SUB_SUBCATEGORIA, subcat_id)
+                    )
+                    conexion.execute(
+                        "DELETE FROM categorias WHERE nivel = ? AND padre_id = ?",
+                        (NIVEL_SUB_SUBCATEGORIA, subcat_id)
+                    )
+                    conexion.executemany(
+                        "INSERT OR REPLACE INTO categorias VALUES (?, ?, ?, ?, ?)",
+                        filas_subsub
+                    )
+                    conexion.executemany(
+                        "INSERT OR REPLACE INTO productos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        filas_productos
+                    )
+            finally:
+                conexion.close()
+
+            ubicacion = self._ubicacion_subcategorias.get(subcat_id)
+            if ubicacion is None:
+                return 0
+
+            sub_subcategorias = [{"id": fila[0], "name": fila[1]} for fila in filas_subsub]
+            productos_por_sub_subcategoria: Dict[int, List[Tuple]] = {}
+            for producto_id, sub_subcat_id, _orden, *campos in filas_productos:
+                productos_por_sub_subcategoria.setdefault(sub_subcat_id, []).append((producto_id, *campos))
+
+            # Las búsquedas en curso siguen con la instantánea actual hasta que se publique la nueva
+            categoria, subcat = ubicacion
+            actual = self._productos
+            tabla = actual.tabla
+            filas = _agregar_productos(tabla, categoria, subcat, sub_subcategorias, productos_por_sub_subcategoria)
+            indice = actual.indice.derivar()
+            indice.agregar(tabla.filas(filas))
+            indice.eliminar(tabla.ids[fila] for fila in actual.filas_por_subcategoria.get(subcat_id, ()))
+            nueva = InstantaneaProductos(tabla, {**actual.filas_por_subcategoria, subcat_id: filas}, indice)
+            self._productos = _compactar_si_necesario(nueva)
+            self.actualizado_en = time.time()
+
+        return len(filas)
+
+    def estado_revalidacion(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Devuelve los validadores guardados de cada respuesta de la API.
+
+        Returns:
+            Diccionario {categoria_id: {nivel, etag, hash, revalidado_en, cambiado_en}}
+            con la clave 0 para la lista de categorías principales.
+        """
+        conexion = self._conectar()
+        try:
+            filas = conexion.execute(
+                "SELECT categoria_id, nivel, etag, hash, revalidado_en, cambiado_en FROM revalidaciones"
+            ).fetchall()
+        finally:
+            conexion.close()
+
+        return {
+            categoria_id: {
+                "nivel": nivel,
+                "etag": etag,
+                "hash": hash_contenido,
+                "revalidado_en": revalidado_en,
+                "cambiado_en": cambiado_en,
+            }
+            for categoria_id, nivel, etag, hash_contenido, revalidado_en, cambiado_en in filas
+        }
+
+    def registrar_revalidacion(self, categoria_id: int, validador: Dict[str, Any]) -> None:
+        """Guarda el resultado de revalidar una respuesta de la API."""
+        with self._lock:
+            conexion = self._conectar()
+            try:
+                with conexion:
+                    _guardar_revalidacion(
+                        conexion, categoria_id, validador, time.time(),
+                        cambiado=validador.get("modificado", False)
+                    )
+            finally:
+                conexion.close()
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Consultas
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def categorias_principales(self) -> List[Dict[str, Any]]:
+        """
+        Devuelve las categorías principales con sus subcategorías.
+
+        Tiene la misma forma que la lista `results` de `categories/`.
+        """
+        return self._categorias_principales
+
+    def diccionario_categorias(self) -> Dict[str, int]:
+        """
+        Devuelve el diccionario nombre -> ID de categorías con su índice de resolución.
+
+        Se construye una vez por carga del catálogo y se reutiliza entre búsquedas.
+        """
+        diccionario = self._diccionario_categorias
+        if diccionario is None:
+            diccionario = diccionario_desde_categorias(self._categorias_principales)
+            diccionario.indice  # Construir el índice ahora, fuera del camino de las búsquedas
+            self._diccionario_categorias = diccionario
+        return diccionario
+
+    def vocabulario(self) -> VocabularioProductos:
+        """
+        Devuelve el vocabulario de productos del clasificador (categorías y nombres).
+
+        Se construye una vez por instantánea de productos: cargar o actualizar
+        una subcategoría publica otra y la siguiente llamada lo reconstruye.
+        """
+        productos = self._productos
+        cache = self._vocabulario
+        if cache is None or cache[0] is not productos:
+            with self._lock:
+                productos = self._productos
+                cache = self._vocabulario
+                if cache is None or cache[0] is not productos:
+                    nombres = productos.tabla.nombres
+                    cache = (productos, VocabularioProductos.desde_catalogo(
+                        self.diccionario_categorias(),
+                        (nombres[fila] for filas in productos.filas_por_subcategoria.values() for fila in filas)
+                    ))
+                    self._vocabulario = cache
+        return cache[1]
+
+    def ids_subcategorias(self) -> List[int]:
+        """Devuelve los IDs de todas las subcategorías en orden de catálogo."""
+        return list(self._ubicacion_subcategorias)
+
+    def productos_de_categorias(self, categorias: Iterable[int]) -> List[FilaProducto]:
+        """
+        Devuelve los productos de las categorías o subcategorías indicadas.
+
+        Respeta el orden y la deduplicación por ID de `extraer_productos_de_categoria`.
+        Devuelve vistas de solo lectura de la tabla: `copy()` las convierte en diccionarios.
+        """
+        solicitadas = set(categorias)
+        tabla, filas_por_subcategoria, _ = self._productos
+        filas_seleccionadas: List[int] = []
+        productos_unicos = set()
+
+        for categoria in self._categorias_principales:
+            incluir_categoria = categoria["id"] in solicitadas
+            for subcat in categoria["categories"]:
+                if not incluir_categoria and subcat["id"] not in solicitadas:
+                    continue
+                for fila in filas_por_subcategoria.get(subcat["id"], ()):
+                    producto_id = tabla.ids[fila]
+                    if producto_id in productos_unicos:
+                        continue
+                    filas_seleccionadas.append(fila)
+                    productos_unicos.add(producto_id)
+
+        return tabla.filas(filas_seleccionadas)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FUNCIONES AUXILIARES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _compactar_si_necesario(productos: InstantaneaProductos) -> InstantaneaProductos:
+    """Descarta de la tabla las filas sustituidas cuando pasan a ser mayoría."""
+    tabla, filas_por_subcategoria, _ = productos
+    vivas = sum(len(filas) for filas in filas_por_subcategoria.values())
+    if len(tabla) - vivas <= UMBRAL_COMPACTACION * len(tabla):
+        return productos
+    # Tabla nueva: la anterior queda intacta para quien aún tenga la instantánea vieja
+    tabla, filas_por_subcategoria = tabla.compactar(filas_por_subcategoria)
+    return InstantaneaProductos(tabla, filas_por_subcategoria, IndiceProductos(tabla.filas(range(len(tabla)))))
+
+
+def _a_texto(valor: Any) -> str:
+    return "" if valor is None else str(valor)
+
+
+def _filas_categorias_principales(categorias_principales: List[Dict[str, Any]]) -> List[Tuple]:
+    """Genera las filas de categorías principales y subcategorías."""
+    filas = []
+    for orden_cat, categoria in enumerate(categorias_principales):
+        cat_id = categoria.get("id")
+        if not cat_id or not categoria.get("name"):
+            continue
+        filas.append((cat_id, categoria["name"], None, NIVEL_CATEGORIA, orden_cat))
+
+        for orden_sub, subcat in enumerate(categoria.get("categories", [])):
+            subcat_id = subcat.get("id")
+            if not subcat_id or not subcat.get("name"):
+                continue
+            filas.append((subcat_id, subcat["name"], cat_id, NIVEL_SUBCATEGORIA, orden_sub))
+    return filas
+
+
+def _filas_subcategoria(subcat_id: int, detalle: Dict[str, Any]) -> Tuple[List[Tuple], List[Tuple]]:
+    """Genera las filas de sub-subcategorías y productos de una respuesta `categories/{id}`."""
+    filas_categorias = []
+    filas_productos = []
+
+    for orden_subsub, sub_subcat in enumerate(detalle.get("categories", [])):
+        sub_subcat_id = sub_subcat.get("id")
+        if not sub_subcat_id:
+            continue
+        filas_categorias.append((
+            sub_subcat_id, sub_subcat.get("name", ""), subcat_id,
+            NIVEL_SUB_SUBCATEGORIA, orden_subsub
+        ))
+
+        for orden_prod, producto in enumerate(sub_subcat.get("products", [])):
+            producto_id = producto.get("id")
+            if not producto_id:
+                continue
+            price_info = producto.get("price_instructions", {})
+            filas_productos.append((
+                str(producto_id), sub_subcat_id, orden_prod,
+                producto.get("display_name", ""),
+                producto.get("packaging", ""),
+                _a_texto(price_info.get("unit_price", 0)),
+                _a_texto(price_info.get("bulk_price", "")),
+                _a_texto(price_info.get("reference_price", "")),
+                price_info.get("reference_format", ""),
+            ))
+
+    return filas_categorias, filas_productos
+
+
+def _agregar_productos(
+    tabla: TablaProductos,
+    categoria: Dict[str, Any],
+    subcat: Dict[str, Any],
+    sub_subcategorias: List[Dict[str, Any]],
+    productos_por_sub_subcategoria: Dict[int, List[Tuple]]
+) -> array:
+    """
+    Añade a la tabla los productos de una subcategoría, en orden de catálogo.
+
+    Args:
+        tabla: Tabla de productos del catálogo
+        categoria, subcat: Nodos que contienen la subcategoría
+        sub_subcategorias: Sub-subcategorías (`id`, `name`) en orden
+        productos_por_sub_subcategoria: Filas (id, nombre, packaging, precios...) por sub-subcategoría
+
+    Returns:
+        Números de fila añadidos
+    """
+    filas = array("q")
+    for sub_subcat in sub_subcategorias:
+        for campos in productos_por_sub_subcategoria.get(sub_subcat["id"], []):
+            filas.append(tabla.agregar(*campos, categoria, subcat, sub_subcat))
+    return filas
+
+
+def _guardar_revalidacion(
+    conexion: sqlite3.Connection,
+    categoria_id: int,
+    validador: Dict[str, Any],
+    ahora: float,
+    cambiado: bool
+) -> None:
+    """Inserta o actualiza la fila de revalidación de una respuesta."""
+    nivel = NIVEL_CATEGORIA if categoria_id == ID_RAIZ else NIVEL_SUBCATEGORIA
+    conexion.execute(
+        "INSERT INTO revalidaciones VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(categoria_id) DO UPDATE SET etag = excluded.etag, hash = excluded.hash, "
+        "revalidado_en = excluded.revalidado_en, "
+        "cambiado_en = CASE WHEN ? THEN excluded.cambiado_en ELSE revalidaciones.cambiado_en END",
+        (categoria_id, nivel, validador.get("etag"), validador.get("hash"), ahora, ahora, cambiado)
+    )
+
+
+_catalogo: Optional[CatalogoMercadona] = None
+_catalogo_lock = threading.Lock()
+
+
+def obtener_catalogo() -> CatalogoMercadona:
+    """
+    Devuelve el catálogo compartido del proceso.
+
+    La primera llamada intenta cargarlo desde disco (sin acceder a la red).
+    """
+    global _catalogo
+    with _catalogo_lock:
+        if _catalogo is None:
+            _catalogo = CatalogoMercadona()
+            _catalogo.cargar()
+        return _catalogo
+
+
+def inicializar_catalogo(sincronizar_si_vacio: bool = True) -> CatalogoMercadona:
+    """
+    Prepara el catálogo al arrancar el servidor.
+
+    Carga la instantánea de disco y, si no existe, la descarga de la API.
+    """
+    catalogo = obtener_catalogo()
+    if not catalogo.cargado and sincronizar_si_vacio:
+        catalogo.sincronizar()
+    if catalogo.cargado:
+        catalogo.vocabulario()  # Compilar el vocabulario del clasificador antes de la primera petición
+    return catalogo
@@ -0,0 +1,93 @@
+"""
+Estado persistente de las conversaciones (checkpointer de LangGraph).
+
+Con un checkpointer, el grafo guarda su estado bajo el `thread_id` de la
+conversación y cada turno parte del anterior: el clasificador puede ampliar
+la compra previa y el buscador reutiliza los productos ya encontrados.
+
+Se elige con `MERCADONA_CHECKPOINTER`:
+- `desactivado` (por defecto): cada turno empieza de cero
+- `memoria`: estado en la memoria del proceso
+- `sqlite`: fichero SQLite en `MERCADONA_CHECKPOINTER_DB` (requiere `langgraph-checkpoint-sqlite`)
+"""
+
+import os
+import threading
+from typing import Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+CHECKPOINTER_MEMORIA = "memoria"
+CHECKPOINTER_SQLITE = "sqlite"
+CHECKPOINTER_DESACTIVADO = "desactivado"
+
+RUTA_CHECKPOINTER_POR_DEFECTO = os.path.join(os.getcwd(), "conversaciones_mercadona.db")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CREACIÓN
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def crear_checkpointer(
+    tipo: Optional[str] = None,
+    ruta_db: Optional[str] = None
+) -> Optional[BaseCheckpointSaver]:
+    """
+    Crea el checkpointer indicado.
+
+    Args:
+        tipo: `memoria`, `sqlite` o `desactivado` (por defecto, `MERCADONA_CHECKPOINTER`)
+        ruta_db: Fichero SQLite (por defecto, `MERCADONA_CHECKPOINTER_DB`)
+
+    Returns:
+        El checkpointer, o None si está desactivado
+    """
+    tipo = tipo or os.getenv("MERCADONA_CHECKPOINTER", CHECKPOINTER_DESACTIVADO)
+
+    if tipo == CHECKPOINTER_SQLITE:
+        try:
+            from gen_ui_backend.utils.saver_sqlite import SaverSQLite
+        except ImportError:
+            print("⚠️  MERCADONA_CHECKPOINTER=sqlite requiere 'langgraph-checkpoint-sqlite': "
+                  "se guarda el estado en memoria")
+            return MemorySaver()
+        ruta_db = ruta_db or os.getenv("MERCADONA_CHECKPOINTER_DB", RUTA_CHECKPOINTER_POR_DEFECTO)
+        print(f"✅ Estado de las conversaciones en {ruta_db}")
+        return SaverSQLite(ruta_db)
+
+    if tipo == CHECKPOINTER_MEMORIA:
+        return MemorySaver()
+
+    if tipo != CHECKPOINTER_DESACTIVADO:
+        print(f"⚠️  MERCADONA_CHECKPOINTER desconocido: '{tipo}'; estado de las conversaciones desactivado")
+    return None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INSTANCIA COMPARTIDA
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_checkpointer: Optional[BaseCheckpointSaver] = None
+_checkpointer_creado = False
+_checkpointer_lock = threading.Lock()
+
+
+def obtener_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """
+    Devuelve el checkpointer compartido del proceso según `MERCADONA_CHECKPOINTER`.
+
+    Returns:
+        El checkpointer, o None si está desactivado
+    """
+    global _checkpointer, _checkpointer_creado
+    with _checkpointer_lock:
+        if not _checkpointer_creado:
+            _checkpointer = crear_checkpointer()
+            _checkpointer_creado = True
+        return _checkpointer
@@ -0,0 +1,187 @@
+"""
+Clientes HTTP con conexiones persistentes para la API de Mercadona.
+
+Incluye un limitador de tasa tipo "token bucket" compartido por los clientes
+síncrono (`requests.Session`) y asíncrono (`httpx.AsyncClient`), que sustituye
+la espera fija antes de cada petición.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+T = TypeVar("T")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LIMITADOR DE TASA
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class LimitadorTokens:
+    """
+    Limitador de tasa "token bucket" seguro entre hilos y corrutinas.
+
+    Permite ráfagas de hasta `capacidad` peticiones y una tasa sostenida de
+    `tasa` peticiones por segundo.
+    """
+
+    def __init__(self, tasa: float, capacidad: int):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = float(capacidad)
+        self._ultima_recarga = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reservar(self) -> float:
+        """Reserva un token y devuelve los segundos que hay que esperar para usarlo."""
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultima_recarga) * self.tasa)
+            self._ultima_recarga = ahora
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.tasa
+
+    def adquirir(self) -> None:
+        """Espera (bloqueando el hilo) hasta disponer de un token."""
+        espera = self._reservar()
+        if espera > 0:
+            time.sleep(espera)
+
+    async def adquirir_async(self) -> None:
+        """Espera (sin bloquear el bucle de eventos) hasta disponer de un token."""
+        espera = self._reservar()
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CLIENTES HTTP
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def crear_sesion(headers: Dict[str, str], max_conexiones: int) -> requests.Session:
+    """
+    Crea una sesión de `requests` con un pool de conexiones keep-alive.
+
+    Args:
+        headers: Cabeceras comunes a todas las peticiones
+        max_conexiones: Tamaño del pool de conexiones por host
+
+    Returns:
+        Sesión lista para reutilizarse entre peticiones e hilos
+    """
+    sesion = requests.Session()
+    sesion.headers.update(headers)
+    adaptador = HTTPAdapter(pool_connections=max_conexiones, pool_maxsize=max_conexiones)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+
+class ClienteHttpAsync:
+    """
+    Cliente asíncrono con pool de conexiones y concurrencia acotada.
+
+    Mantiene un `httpx.AsyncClient` por bucle de eventos, ya que los clientes
+    de httpx no pueden compartirse entre bucles.
+    """
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        limitador: LimitadorTokens,
+        max_concurrencia: int,
+        timeout: float = 10
+    ):
+        self.headers = headers
+        self.limitador = limitador
+        self.max_concurrencia = max_concurrencia
+        self.timeout = timeout
+        self._por_bucle: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _recursos(self) -> tuple:
+        """Devuelve (cliente, semáforo) del bucle de eventos actual."""
+        bucle = asyncio.get_running_loop()
+        recursos = self._por_bucle.get(bucle)
+        if recursos is None:
+            cliente = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrencia,
+                    max_keepalive_connections=self.max_concurrencia
+                ),
+            )
+            recursos = (cliente, asyncio.Semaphore(self.max_concurrencia))
+            self._por_bucle[bucle] = recursos
+        return recursos
+
+    async def obtener_json(self, url: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Realiza una petición GET y devuelve el JSON de la respuesta.
+
+        Returns:
+            Diccionario con la respuesta JSON o None si hay error
+        """
+        cliente, semaforo = self._recursos()
+        async with semaforo:
+            await self.limitador.adquirir_async()
+            try:
+                response = await cliente.get(url, timeout=timeout or self.timeout)
+                response.raise_for_status()
+                return response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"Error en petición a {url}: {e}")
+                return None
+
+    async def obtener_varios(self, urls: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Realiza varias peticiones GET en paralelo, respetando el límite de concurrencia."""
+        return await asyncio.gather(*(self.obtener_json(url) for url in urls))
+
+    async def cerrar(self) -> None:
+        """Cierra el cliente del bucle de eventos actual."""
+        recursos = self._por_bucle.pop(asyncio.get_running_loop(), None)
+        if recursos is not None:
+            await recursos[0].aclose()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PUENTE SÍNCRONO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_bucle_compartido: Optional[asyncio.AbstractEventLoop] = None
+_bucle_lock = threading.Lock()
+
+
+def obtener_bucle_compartido() -> asyncio.AbstractEventLoop:
+    """Devuelve un bucle de eventos que vive en un hilo propio durante todo el proceso."""
+    global _bucle_compartido
+    with _bucle_lock:
+        if _bucle_compartido is None:
+            _bucle_compartido = asyncio.new_event_loop()
+            hilo = threading.Thread(
+                target=_bucle_compartido.run_forever, name="bucle-http", daemon=True
+            )
+            hilo.start()
+        return _bucle_compartido
+
+
+def ejecutar_sincrono(corrutina: Awaitable[T]) -> T:
+    """
+    Ejecuta una corrutina desde código síncrono y devuelve su resultado.
+
+    Usa un bucle compartido en segundo plano, de modo que las conexiones del
+    cliente asíncrono se reutilizan entre llamadas síncronas y se puede llamar
+    también desde un hilo que ya tenga un bucle en marcha.
+    """
+    futuro = asyncio.run_coroutine_threadsafe(corrutina, obtener_bucle_compartido())
+    return futuro.result()
@@ -0,0 +1,168 @@
+"""
+Coalescencia de peticiones entre sesiones de chat concurrentes.
+
+- `UnicoVuelo`: si varias búsquedas piden la misma URL a la vez, solo una
+  petición sale hacia la API y el resto espera su resultado.
+- `AgrupadorLotes`: reúne las búsquedas que llegan dentro de una ventana corta
+  y las procesa juntas, de modo que comparten una única pasada por el catálogo.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+from gen_ui_backend.utils.cliente_http import obtener_bucle_compartido
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ÚNICO VUELO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class UnicoVuelo:
+    """
+    Deduplica operaciones asíncronas en curso con la misma clave.
+
+    Funciona entre hilos y bucles de eventos: quien llega mientras otra
+    corrutina ejecuta la misma clave espera su resultado (o su excepción).
+    """
+
+    def __init__(self):
+        self._en_vuelo: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._contadores = {"ejecutadas": 0, "compartidas": 0}
+
+    async def ejecutar(self, clave: Hashable, fabrica: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta `fabrica()` salvo que ya haya una ejecución en curso para `clave`.
+
+        Args:
+            clave: Identificador de la operación (p. ej. la URL)
+            fabrica: Función que crea la corrutina a ejecutar
+
+        Returns:
+            El resultado de la ejecución, propia o compartida
+        """
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            propietario = futuro is None
+            if propietario:
+                futuro = concurrent.futures.Future()
+                self._en_vuelo[clave] = futuro
+                self._contadores["ejecutadas"] += 1
+            else:
+                self._contadores["compartidas"] += 1
+
+        if not propietario:
+            return await asyncio.wrap_future(futuro)
+
+        try:
+            resultado = await fabrica()
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+
+    def metricas(self) -> Dict[str, int]:
+        """Devuelve cuántas operaciones se ejecutaron y cuántas se compartieron."""
+        with self._lock:
+            return {**self._contadores, "en_vuelo": len(self._en_vuelo)}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# AGRUPACIÓN EN LOTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class AgrupadorLotes:
+    """
+    Agrupa peticiones que llegan dentro de una ventana de tiempo corta.
+
+    El lote se procesa en el bucle de eventos compartido con una sola llamada a
+    `procesar_lote`, que recibe las entradas en orden de llegada y devuelve una
+    salida por entrada. Se puede usar desde código síncrono y asíncrono.
+    """
+
+    def __init__(
+        self,
+        procesar_lote: Callable[[List[T]], Awaitable[List[R]]],
+        ventana: float = 0.01,
+        max_lote: int = 32
+    ):
+        """
+        Args:
+            procesar_lote: Corrutina que procesa una lista de entradas
+            ventana: Segundos que se espera a más entradas tras la primera
+            max_lote: Número de entradas que dispara el procesado sin esperar
+        """
+        self.procesar_lote = procesar_lote
+        self.ventana = ventana
+        self.max_lote = max_lote
+        # Solo se tocan desde el hilo del bucle compartido
+        self._pendientes: List[Tuple[T, concurrent.futures.Future]] = []
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._contadores = {"lotes": 0, "entradas": 0, "max_entradas_lote": 0}
+
+    def enviar(self, entrada: T) -> concurrent.futures.Future:
+        """
+        Añade una entrada al lote en curso.
+
+        Returns:
+            Futuro con la salida correspondiente a la entrada
+        """
+        futuro: concurrent.futures.Future = concurrent.futures.Future()
+        obtener_bucle_compartido().call_soon_threadsafe(self._encolar, entrada, futuro)
+        return futuro
+
+    def procesar(self, entrada: T) -> R:
+        """Envía una entrada y espera su salida (bloqueando el hilo)."""
+        return self.enviar(entrada).result()
+
+    async def procesar_async(self, entrada: T) -> R:
+        """Envía una entrada y espera su salida sin bloquear el bucle de eventos."""
+        return await asyncio.wrap_future(self.enviar(entrada))
+
+    def _encolar(self, entrada: T, futuro: concurrent.futures.Future) -> None:
+        self._pendientes.append((entrada, futuro))
+        if len(self._pendientes) >= self.max_lote:
+            self._vaciar()
+        elif self._temporizador is None:
+            self._temporizador = asyncio.get_running_loop().call_later(self.ventana, self._vaciar)
+
+    def _vaciar(self) -> None:
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        lote, self._pendientes = self._pendientes, []
+        if lote:
+            asyncio.ensure_future(self._procesar(lote))
+
+    async def _procesar(self, lote: List[Tuple[T, concurrent.futures.Future]]) -> None:
+        self._contadores["lotes"] += 1
+        self._contadores["entradas"] += len(lote)
+        self._contadores["max_entradas_lote"] = max(self._contadores["max_entradas_lote"], len(lote))
+
+        try:
+            salidas = await self.procesar_lote([entrada for entrada, _ in lote])
+        except Exception as e:
+            for _, futuro in lote:
+                futuro.set_exception(e)
+            return
+
+        for (_, futuro), salida in zip(lote, salidas):
+            futuro.set_result(salida)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Devuelve el número de lotes procesados y su tamaño."""
+        lotes = self._contadores["lotes"]
+        return {
+            **self._contadores,
+            "media_entradas_lote": round(self._contadores["entradas"] / lotes, 2) if lotes else None,
+        }
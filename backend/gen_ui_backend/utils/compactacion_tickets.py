@@ -0,0 +1,141 @@
+"""
+Retención y compactación en segundo plano del almacén de tickets.
+
+Cada ciclo archiva en segmentos comprimidos los tickets con más de
+`MERCADONA_TICKETS_ARCHIVAR_DIAS` días y, si se configura
+`MERCADONA_TICKETS_RETENCION_DIAS`, borra los segmentos cuyos tickets son
+todos más antiguos que ese plazo.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from gen_ui_backend.utils.almacen_tickets import TICKETS_POR_SEGMENTO, AlmacenTickets
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+DIAS_ARCHIVAR = float(os.getenv("MERCADONA_TICKETS_ARCHIVAR_DIAS", 30))
+DIAS_RETENCION = float(os.getenv("MERCADONA_TICKETS_RETENCION_DIAS", 0))  # 0 = sin borrado
+INTERVALO_CICLO = float(os.getenv("MERCADONA_INTERVALO_COMPACTACION", 3600))  # segundos entre ciclos
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COMPACTACIÓN
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class CompactacionTickets:
+    """Trabajador que mantiene acotado el directorio de tickets."""
+
+    def __init__(
+        self,
+        almacen: AlmacenTickets,
+        dias_archivar: float = DIAS_ARCHIVAR,
+        dias_retencion: float = DIAS_RETENCION,
+        intervalo: float = INTERVALO_CICLO,
+        tickets_por_segmento: int = TICKETS_POR_SEGMENTO
+    ):
+        """
+        Args:
+            almacen: Almacén de tickets a compactar
+            dias_archivar: Antigüedad en días a partir de la que se archiva un ticket
+            dias_retencion: Antigüedad en días a partir de la que se borra (0 = nunca)
+            intervalo: Segundos de espera entre ciclos
+            tickets_por_segmento: Máximo de tickets por segmento
+        """
+        self.almacen = almacen
+        self.dias_archivar = dias_archivar
+        self.dias_retencion = dias_retencion
+        self.intervalo = intervalo
+        self.tickets_por_segmento = tickets_por_segmento
+
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._contadores = {"ciclos": 0, "archivados": 0, "segmentos": 0, "eliminados": 0, "errores": 0}
+        self._ultimo_ciclo: Optional[float] = None
+
+    def ejecutar_ciclo(self, ahora: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Archiva y borra los tickets que han superado sus plazos.
+
+        Args:
+            ahora: Fecha de referencia (por defecto, ahora)
+
+        Returns:
+            Dict con `archivados`, `segmentos` creados y `eliminados` en este ciclo
+        """
+        ahora = ahora or datetime.now()
+        resultado = self.almacen.compactar(
+            ahora - timedelta(days=self.dias_archivar),
+            ahora - timedelta(days=self.dias_retencion) if self.dias_retencion > 0 else None,
+            self.tickets_por_segmento
+        )
+        self._contadores["ciclos"] += 1
+        for clave, valor in resultado.items():
+            self._contadores[clave] += valor
+        self._ultimo_ciclo = time.time()
+        return resultado
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Hilo en segundo plano
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def iniciar(self) -> None:
+        """Arranca el hilo de compactación si no está en marcha."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="compactacion-tickets", daemon=True)
+        self._hilo.start()
+        print(f"✅ Compactación de tickets iniciada (cada {self.intervalo:.0f}s)")
+
+    def detener(self, timeout: Optional[float] = None) -> None:
+        """Detiene el hilo de compactación y espera a que termine el ciclo en curso."""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def _bucle(self) -> None:
+        while not self._parar.is_set():
+            try:
+                self.ejecutar_ciclo()
+            except Exception as e:
+                self._contadores["errores"] += 1
+                print(f"❌ Error en la compactación de tickets: {e}")
+            self._parar.wait(self.intervalo)
+
+    def metricas(self) -> Dict[str, Any]:
+        """Tickets sueltos y archivados, segmentos y contadores acumulados."""
+        return {**self.almacen.indice.contar(), "ultimo_ciclo": self._ultimo_ciclo, "acumulado": dict(self._contadores)}
+
+
+_compactacion: Optional[CompactacionTickets] = None
+
+
+def iniciar_compactacion_tickets(almacen: AlmacenTickets, **opciones: Any) -> CompactacionTickets:
+    """
+    Arranca la compactación en segundo plano del almacén compartido.
+
+    Args:
+        almacen: Almacén de tickets a compactar
+        **opciones: Parámetros adicionales de `CompactacionTickets`
+
+    Returns:
+        El trabajador de compactación en marcha
+    """
+    global _compactacion
+    if _compactacion is None:
+        _compactacion = CompactacionTickets(almacen, **opciones)
+    _compactacion.iniciar()
+    return _compactacion
+
+
+def obtener_compactacion_tickets() -> Optional[CompactacionTickets]:
+    """Devuelve el trabajador de compactación en marcha, si lo hay."""
+    return _compactacion
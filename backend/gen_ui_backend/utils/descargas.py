@@ -0,0 +1,384 @@
+"""
+Descarga de archivos con caché HTTP, rangos y compresión.
+
+Sirve un archivo del disco en bloques, sin leerlo entero en memoria:
+
+- `ETag` y `Last-Modified`, con respuesta 304 a `If-None-Match` / `If-Modified-Since`
+- Peticiones `Range` de un solo rango (206, o 416 si no se puede satisfacer),
+  respetando `If-Range`
+- Compresión gzip o brotli de los formatos de texto según `Accept-Encoding`;
+  la versión comprimida se genera una vez y se guarda junto al original
+
+Todas las operaciones de disco (`stat`, `open`, lecturas, compresión) se hacen
+en hilos, fuera del bucle de eventos.
+
+`respuesta_exportacion` envía muchos tickets en una sola respuesta (ZIP o NDJSON),
+generada según se transmite.
+"""
+
+import asyncio
+import gzip
+import os
+import re
+import shutil
+from datetime import date, datetime, time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from gen_ui_backend.tools.generador_archivos import exportar_ndjson, exportar_zip
+from gen_ui_backend.utils.almacen_tickets import FORMATOS, LONGITUD_HASH, AlmacenTickets, obtener_almacen_tickets
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él solo se ofrece gzip
+    brotli = None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+TAMANO_BLOQUE = 64 * 1024
+
+# Por debajo de este tamaño comprimir no compensa
+TAMANO_MINIMO_COMPRESION = 512
+
+TIPOS_MEDIA = {
+    ".json": "application/json",
+    ".txt": "text/plain; charset=utf-8",
+    ".csv": "text/csv; charset=utf-8",
+}
+TIPO_MEDIA_POR_DEFECTO = "application/octet-stream"
+
+# Codificaciones en orden de preferencia: (nombre, extensión del archivo comprimido)
+CODIFICACIONES = (("br", ".br"), ("gzip", ".gz"))
+
+
+def tipo_media(nombre: str) -> str:
+    """Tipo MIME de un archivo por su extensión."""
+    return TIPOS_MEDIA.get(os.path.splitext(nombre)[1].lower(), TIPO_MEDIA_POR_DEFECTO)
+
+
+def _es_texto(media_type: str) -> bool:
+    return media_type.startswith("text/") or media_type.startswith("application/json")
+
+
+def ruta_segura(directorio: str, nombre: str) -> Optional[str]:
+    """
+    Ruta de un archivo dentro de un directorio, sin salir de él.
+
+    Es bloqueante (resuelve enlaces y consulta el disco): llamarla con `asyncio.to_thread`.
+
+    Args:
+        directorio: Directorio permitido
+        nombre: Nombre pedido por el cliente
+
+    Returns:
+        Ruta real del archivo, o None si no existe
+
+    Raises:
+        HTTPException: 403 si la ruta sale del directorio
+    """
+    base = os.path.realpath(directorio)
+    ruta = os.path.realpath(os.path.join(base, nombre))
+    if os.path.commonpath([base, ruta]) != base:
+        raise HTTPException(status_code=403, detail="Acceso denegado")
+    return ruta if os.path.isfile(ruta) else None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CABECERAS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def etag_archivo(info: os.stat_result) -> str:
+    """ETag fuerte a partir del tamaño y la fecha de modificación."""
+    return f'"{info.st_size:x}-{info.st_mtime_ns:x}"'
+
+
+def _coincide_etag(cabecera: str, etag: str) -> bool:
+    """Comparación débil de `If-None-Match` (lista de ETags o `*`)."""
+    if cabecera.strip() == "*":
+        return True
+    propia = etag.removeprefix("W/")
+    return any(candidato.strip().removeprefix("W/") == propia for candidato in cabecera.split(","))
+
+
+def _no_modificado(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _coincide_etag(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _rango(cabecera: str, tamano: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta `Range: bytes=...` con un solo rango.
+
+    Returns:
+        (inicio, fin) inclusivos, o None si el rango no es satisfacible
+
+    Raises:
+        ValueError: Si la cabecera no se entiende o pide varios rangos (se sirve entero)
+    """
+    unidad, _, especificacion = cabecera.partition("=")
+    if unidad.strip() != "bytes" or "," in especificacion:
+        raise ValueError(cabecera)
+    inicio_texto, _, fin_texto = especificacion.strip().partition("-")
+    if not inicio_texto:
+        sufijo = int(fin_texto)
+        if sufijo <= 0:
+            return None
+        return max(tamano - sufijo, 0), tamano - 1
+    inicio = int(inicio_texto)
+    fin = int(fin_texto) if fin_texto else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return None
+    return inicio, min(fin, tamano - 1)
+
+
+def _rango_vigente(request: Request, etag: str, ultima_modificacion: str) -> bool:
+    """`If-Range`: el rango solo vale si el validador coincide con el actual."""
+    if_range = request.headers.get("if-range")
+    return if_range is None or if_range.strip() in (etag, ultima_modificacion)
+
+
+def _codificaciones_aceptadas(cabecera: str) -> Dict[str, float]:
+    aceptadas = {}
+    for elemento in cabecera.split(","):
+        nombre, _, parametros = elemento.strip().partition(";")
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            aceptadas[nombre.strip().lower()] = calidad
+    return aceptadas
+
+
+def elegir_codificacion(cabecera: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Codificación con la que responder según `Accept-Encoding`.
+
+    Returns:
+        (codificación, extensión) o None para enviar el archivo sin comprimir
+    """
+    if not cabecera:
+        return None
+    aceptadas = _codificaciones_aceptadas(cabecera)
+    comodin = aceptadas.get("*", 0.0)
+    mejor, mejor_calidad = None, 0.0
+    for nombre, extension in CODIFICACIONES:
+        if nombre == "br" and brotli is None:
+            continue
+        calidad = aceptadas.get(nombre, comodin)
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = (nombre, extension), calidad
+    return mejor
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COMPRESIÓN Y LECTURA
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _comprimido(ruta: str, info: os.stat_result, codificacion: str, extension: str) -> str:
+    """Ruta de la versión comprimida del archivo, creándola si falta o está desfasada."""
+    destino = ruta + extension
+    try:
+        if os.stat(destino).st_mtime_ns >= info.st_mtime_ns:
+            return destino
+    except FileNotFoundError:
+        pass
+
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with open(ruta, "rb") as origen:
+        if codificacion == "gzip":
+            with open(temporal, "wb") as salida, gzip.GzipFile(fileobj=salida, mode="wb", mtime=0) as comprimido:
+                shutil.copyfileobj(origen, comprimido, TAMANO_BLOQUE)
+        else:
+            compresor = brotli.Compressor(mode=brotli.MODE_TEXT)
+            with open(temporal, "wb") as salida:
+                for bloque in iter(lambda: origen.read(TAMANO_BLOQUE), b""):
+                    salida.write(compresor.process(bloque))
+                salida.write(compresor.finish())
+    os.replace(temporal, destino)
+    return destino
+
+
+async def _leer(ruta: str, inicio: int, longitud: int) -> AsyncIterator[bytes]:
+    """Lee `longitud` bytes desde `inicio` en bloques, sin bloquear el bucle."""
+    archivo = await asyncio.to_thread(open, ruta, "rb")
+    try:
+        if inicio:
+            await asyncio.to_thread(archivo.seek, inicio)
+        restante = longitud
+        while restante > 0:
+            bloque = await asyncio.to_thread(archivo.read, min(TAMANO_BLOQUE, restante))
+            if not bloque:
+                break
+            restante -= len(bloque)
+            yield bloque
+    finally:
+        await asyncio.to_thread(archivo.close)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RESPUESTA
+# ═══════════════════════════════════════════════════════════════════════════════
+
+async def servir_archivo(
+    request: Request,
+    ruta: str,
+    nombre_descarga: str,
+    media_type: Optional[str] = None
+) -> Response:
+    """
+    Respuesta HTTP para descargar un archivo con validación, rangos y compresión.
+
+    Args:
+        request: Petición entrante (cabeceras condicionales, Range, Accept-Encoding)
+        ruta: Ruta del archivo ya validada (ver `ruta_segura`)
+        nombre_descarga: Nombre que verá el cliente
+        media_type: Tipo MIME (por defecto, según la extensión)
+
+    Returns:
+        Respuesta 200, 206, 304 o 416
+    """
+    media_type = media_type or tipo_media(nombre_descarga)
+    try:
+        info = await asyncio.to_thread(os.stat, ruta)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    etag = etag_archivo(info)
+    ultima_modificacion = formatdate(info.st_mtime, usegmt=True)
+    cabeceras = {
+        "ETag": etag,
+        "Last-Modified": ultima_modificacion,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache",
+        "Content-Disposition": f'attachment; filename="{nombre_descarga}"',
+    }
+    comprimible = _es_texto(media_type) and info.st_size >= TAMANO_MINIMO_COMPRESION
+    if comprimible:
+        cabeceras["Vary"] = "Accept-Encoding"
+
+    rango = request.headers.get("range")
+    codificacion = None
+    if comprimible and rango is None:
+        codificacion = elegir_codificacion(request.headers.get("accept-encoding"))
+    if codificacion:
+        # Cada codificación es una representación distinta con su propio ETag
+        cabeceras["ETag"] = etag = f'{etag[:-1]}-{codificacion[0]}"'
+
+    if _no_modificado(request, etag, info.st_mtime):
+        return Response(status_code=304, headers=cabeceras)
+
+    if codificacion:
+        ruta = await asyncio.to_thread(_comprimido, ruta, info, *codificacion)
+        tamano = (await asyncio.to_thread(os.stat, ruta)).st_size
+        cabeceras.update({"Content-Encoding": codificacion[0], "Content-Length": str(tamano)})
+        return StreamingResponse(_leer(ruta, 0, tamano), media_type=media_type, headers=cabeceras)
+
+    if rango is not None and _rango_vigente(request, etag, ultima_modificacion):
+        try:
+            limites = _rango(rango, info.st_size)
+        except ValueError:
+            limites = (0, info.st_size - 1) if info.st_size else None
+        if limites is None:
+            cabeceras["Content-Range"] = f"bytes */{info.st_size}"
+            return Response(status_code=416, headers=cabeceras)
+        inicio, fin = limites
+        if (inicio, fin) != (0, info.st_size - 1):
+            cabeceras.update({
+                "Content-Range": f"bytes {inicio}-{fin}/{info.st_size}",
+                "Content-Length": str(fin - inicio + 1),
+            })
+            return StreamingResponse(
+                _leer(ruta, inicio, fin - inicio + 1), status_code=206, media_type=media_type, headers=cabeceras
+            )
+
+    cabeceras["Content-Length"] = str(info.st_size)
+    return StreamingResponse(_leer(ruta, 0, info.st_size), media_type=media_type, headers=cabeceras)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EXPORTACIÓN EN BLOQUE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+TIPOS_EXPORTACION = {
+    "zip": "application/zip",
+    "ndjson": "application/x-ndjson",
+}
+
+_PATRON_ID = re.compile(rf"^[0-9a-f]{{{LONGITUD_HASH}}}$")
+
+
+def respuesta_exportacion(
+    formato: str = "zip",
+    ids: Optional[Iterable[str]] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    formatos: Optional[Iterable[str]] = None,
+    almacen: Optional[AlmacenTickets] = None
+) -> StreamingResponse:
+    """
+    Respuesta en streaming con varios tickets en un ZIP o en NDJSON.
+
+    Los tickets se leen y se renderizan según se envían (en el pool de hilos de
+    Starlette), así que la memoria no crece con el número de tickets.
+
+    Args:
+        formato: `zip` o `ndjson`
+        ids: IDs de los tickets (admite varios separados por comas)
+        desde: Primer día del rango (incluido)
+        hasta: Último día del rango (incluido)
+        formatos: Formatos de cada ticket dentro del ZIP (por defecto, todos)
+        almacen: Almacén de tickets (por defecto, el compartido)
+
+    Returns:
+        StreamingResponse con el ZIP o el NDJSON
+
+    Raises:
+        HTTPException: 400 si faltan criterios o algún parámetro no es válido
+    """
+    if formato not in TIPOS_EXPORTACION:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato}")
+    formatos = [f for valor in (formatos or FORMATOS) for f in valor.split(",") if f]
+    if any(f not in FORMATOS for f in formatos):
+        raise HTTPException(status_code=400, detail=f"Formatos válidos: {', '.join(FORMATOS)}")
+
+    almacen = almacen or obtener_almacen_tickets()
+    if ids:
+        tickets = list(dict.fromkeys(i.strip() for valor in ids for i in valor.split(",") if i.strip()))
+        if not all(_PATRON_ID.match(t) for t in tickets):
+            raise HTTPException(status_code=400, detail="Identificador de ticket no válido")
+    elif desde or hasta:
+        tickets = almacen.listar(
+            datetime.combine(desde, time.min) if desde else None,
+            datetime.combine(hasta, time.max) if hasta else None
+        )
+    else:
+        raise HTTPException(status_code=400, detail="Indica `ids` o un rango `desde`/`hasta`")
+
+    if formato == "zip":
+        contenido = exportar_zip(tickets, formatos, almacen)
+    else:
+        contenido = exportar_ndjson(tickets, almacen)
+    nombre = "_".join(["tickets"] + [d.strftime("%Y%m%d") for d in (desde, hasta) if d])
+    return StreamingResponse(
+        contenido,
+        media_type=TIPOS_EXPORTACION[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    )
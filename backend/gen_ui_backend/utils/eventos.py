@@ -0,0 +1,104 @@
+"""
+Eventos de progreso que los agentes emiten mientras trabajan.
+
+Cada evento se publica de dos formas:
+
+- Como evento personalizado de LangChain (`dispatch_custom_event`), visible
+  como `on_custom_event` en `astream_events(version="v2")`.
+- Como una ejecución con nombre `evento_<nombre>` y etiqueta `ETIQUETA_EVENTO`,
+  visible como `on_chain_end` (con los datos en `data.output`) también en
+  `astream_events(version="v1")`, que es la versión que usa langserve y, por
+  tanto, la que recibe `streamRunnableUI` en el frontend.
+
+Emitir fuera de una ejecución del grafo (p. ej. al llamar a un agente en un
+test) no hace nada.
+"""
+
+from typing import Any, Dict, Optional
+
+from langchain_core.callbacks.manager import adispatch_custom_event, dispatch_custom_event
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.runnables.config import merge_configs
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+ETIQUETA_EVENTO = "mercadona_evento"
+PREFIJO_EVENTO = "evento_"
+
+EVENTO_CLASIFICACION = "clasificacion"
+"""Agente 1: intención, productos y cantidades detectados."""
+EVENTO_PRODUCTO = "producto"
+"""Agente 2: resultado de la búsqueda de un producto, en cuanto termina su rama."""
+EVENTO_BUSQUEDA_COMPLETADA = "busqueda_completada"
+"""Agente 2: recuento final de productos encontrados y no encontrados."""
+EVENTO_LINEA_TICKET = "linea_ticket"
+"""Agente 3: una línea del ticket con el subtotal acumulado hasta ella."""
+EVENTO_TOTAL = "total"
+"""Agente 3: totales finales de la compra."""
+
+EVENTOS = (
+    EVENTO_CLASIFICACION,
+    EVENTO_PRODUCTO,
+    EVENTO_BUSQUEDA_COMPLETADA,
+    EVENTO_LINEA_TICKET,
+    EVENTO_TOTAL,
+)
+
+
+def _identidad(datos: Dict[str, Any]) -> Dict[str, Any]:
+    return datos
+
+
+# Ejecución que solo devuelve sus datos: sirve de portador del evento en v1
+_EMISOR = RunnableLambda(_identidad)
+
+
+def _config_evento(nombre: str, config: RunnableConfig) -> RunnableConfig:
+    """Configuración del nodo con el nombre y la etiqueta del evento."""
+    return merge_configs(config, {"run_name": f"{PREFIJO_EVENTO}{nombre}", "tags": [ETIQUETA_EVENTO]})
+
+
+def _hay_ejecucion(config: Optional[RunnableConfig]) -> bool:
+    """Indica si hay callbacks a los que entregar el evento."""
+    return bool(config and config.get("callbacks"))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EMISIÓN
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def emitir_evento(nombre: str, datos: Dict[str, Any], config: Optional[RunnableConfig]) -> None:
+    """
+    Emite un evento de progreso desde un nodo síncrono.
+
+    Args:
+        nombre: Uno de `EVENTOS`
+        datos: Contenido del evento (serializable a JSON)
+        config: Configuración recibida por el nodo
+    """
+    if nombre not in EVENTOS:
+        raise ValueError(f"Evento desconocido: {nombre}")
+    if not _hay_ejecucion(config):
+        return
+    try:
+        dispatch_custom_event(nombre, datos, config=config)
+        _EMISOR.invoke(datos, _config_evento(nombre, config))
+    except Exception as e:
+        # Un evento de progreso nunca debe interrumpir el flujo
+        print(f"⚠️  No se pudo emitir el evento '{nombre}': {e}")
+
+
+async def aemitir_evento(nombre: str, datos: Dict[str, Any], config: Optional[RunnableConfig]) -> None:
+    """Versión asíncrona de `emitir_evento`, para nodos asíncronos."""
+    if nombre not in EVENTOS:
+        raise ValueError(f"Evento desconocido: {nombre}")
+    if not _hay_ejecucion(config):
+        return
+    try:
+        await adispatch_custom_event(nombre, datos, config=config)
+        await _EMISOR.ainvoke(datos, _config_evento(nombre, config))
+    except Exception as e:
+        print(f"⚠️  No se pudo emitir el evento '{nombre}': {e}")
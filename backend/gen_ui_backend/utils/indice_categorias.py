@@ -0,0 +1,70 @@
+"""
+Índice de resolución de categorías por nombre.
+
+Precalcula todas las subcadenas de los nombres de categoría normalizados, de
+modo que saber qué categorías contienen un producto es una consulta directa
+en lugar de recorrer y normalizar el diccionario completo por cada producto.
+"""
+
+from typing import Dict, Iterable, Tuple
+
+from gen_ui_backend.utils.normalizacion import normalizar_nombre
+
+
+class IndiceCategorias:
+    """
+    Índice subcadena → IDs de categoría.
+
+    Equivale a comprobar `producto_norm in nombre_categoria_norm` para todas
+    las categorías, pero cada consulta cuesta O(longitud del producto).
+    """
+
+    def __init__(self, diccionario_categorias: Dict[str, int]):
+        subcadenas: Dict[str, set] = {}
+        nombres_vistos = set()
+
+        for nombre_cat, cat_id in diccionario_categorias.items():
+            nombre_norm = normalizar_nombre(str(nombre_cat))
+            if (nombre_norm, cat_id) in nombres_vistos:
+                continue
+            nombres_vistos.add((nombre_norm, cat_id))
+
+            longitud = len(nombre_norm)
+            for inicio in range(longitud):
+                for fin in range(inicio + 1, longitud + 1):
+                    subcadenas.setdefault(nombre_norm[inicio:fin], set()).add(cat_id)
+
+        self._subcadenas: Dict[str, Tuple[int, ...]] = {
+            subcadena: tuple(sorted(ids)) for subcadena, ids in subcadenas.items()
+        }
+
+    def resolver(self, producto: str) -> Tuple[int, ...]:
+        """Devuelve los IDs de las categorías cuyo nombre contiene el producto."""
+        return self._subcadenas.get(normalizar_nombre(producto), ())
+
+    def resolver_lista(self, productos: Iterable[str]) -> Dict[str, Tuple[int, ...]]:
+        """
+        Resuelve una lista completa de productos en una sola pasada.
+
+        Returns:
+            Diccionario {producto: IDs de categorías que lo contienen}
+        """
+        return {producto: self.resolver(producto) for producto in productos if producto}
+
+
+class DiccionarioCategorias(dict):
+    """
+    Diccionario {nombre_categoria: id_categoria} con su índice de resolución.
+
+    Se comporta como el diccionario que devolvía `crear_diccionario_categorias`
+    y construye el índice una sola vez, la primera vez que se necesita.
+    """
+
+    _indice = None
+
+    @property
+    def indice(self) -> IndiceCategorias:
+        if self._indice is None:
+            self._indice = IndiceCategorias(self)
+        return self._indice
+
@@ -0,0 +1,196 @@
+"""
+Índice invertido sobre los nombres de producto normalizados.
+
+Sustituye el recorrido lineal de `mostrar_productos_seleccionados`: cada nombre
+se normaliza una sola vez al indexarlo y las búsquedas se resuelven
+intersecando listas de n-gramas.
+"""
+
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from gen_ui_backend.utils.normalizacion import normalizar_lote, normalizar_nombre
+
+
+TAMANO_NGRAMA = 3
+
+
+class IndiceProductos:
+    """
+    Índice invertido de productos por token y por n-grama de su nombre.
+
+    Mantiene la semántica "el término está contenido en el nombre" de la
+    búsqueda original y añade búsqueda por prefijo de palabra.
+    """
+
+    def __init__(self, productos: Optional[Iterable[Dict[str, Any]]] = None, n: int = TAMANO_NGRAMA):
+        self.n = n
+        self._nombres: Dict[Any, str] = {}
+        self._referencias: Counter = Counter()
+        self._ngramas: Dict[str, Set[Any]] = {}
+        self._tokens: Dict[str, Set[Any]] = {}
+        self._tokens_ordenados: Optional[List[str]] = None
+        # Claves cuyos conjuntos son de este índice; None: todos (no es una derivación)
+        self._propios: Optional[Set[Tuple[int, str]]] = None
+        if productos is not None:
+            self.agregar(productos)
+
+    def derivar(self) -> "IndiceProductos":
+        """
+        Copia del índice para modificarla sin tocar el original.
+
+        Comparte los conjuntos de IDs con el original y solo copia los que se
+        modifican después, así que derivar y actualizar unos pocos productos
+        no cuesta lo mismo que reconstruir el índice.
+        """
+        copia = IndiceProductos.__new__(IndiceProductos)
+        copia.n = self.n
+        copia._nombres = dict(self._nombres)
+        copia._referencias = Counter(self._referencias)
+        copia._ngramas = dict(self._ngramas)
+        copia._tokens = dict(self._tokens)
+        copia._tokens_ordenados = self._tokens_ordenados
+        copia._propios = set()
+        return copia
+
+    def __len__(self) -> int:
+        return len(self._nombres)
+
+    def __contains__(self, producto_id: Any) -> bool:
+        return producto_id in self._nombres
+
+    def _ngramas_de(self, texto: str) -> Set[str]:
+        return {texto[i:i + self.n] for i in range(len(texto) - self.n + 1)}
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Mantenimiento
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def agregar(self, productos: Iterable[Dict[str, Any]]) -> None:
+        """
+        Indexa productos (diccionarios con `id` y `nombre`).
+
+        Un mismo producto puede añadirse varias veces (p. ej. si aparece en
+        varias subcategorías); solo sale del índice cuando se elimina tantas
+        veces como se añadió.
+        """
+        nuevos = {}
+        for producto in productos:
+            producto_id = producto.get("id")
+            if not producto_id:
+                continue
+            self._referencias[producto_id] += 1
+            if producto_id not in self._nombres and producto_id not in nuevos:
+                nuevos[producto_id] = producto.get("nombre", "")
+
+        # Todos los nombres nuevos se normalizan en una sola llamada
+        for producto_id, nombre_norm in zip(nuevos, normalizar_lote(nuevos.values())):
+            self._nombres[producto_id] = nombre_norm
+            for ngrama in self._ngramas_de(nombre_norm):
+                self._conjunto(self._ngramas, ngrama).add(producto_id)
+            for token in nombre_norm.split():
+                self._conjunto(self._tokens, token).add(producto_id)
+            self._tokens_ordenados = None
+
+    def eliminar(self, ids: Iterable[Any]) -> None:
+        """Retira una referencia de cada producto y lo desindexa si ya no quedan."""
+        for producto_id in ids:
+            if self._referencias[producto_id] > 1:
+                self._referencias[producto_id] -= 1
+                continue
+            self._referencias.pop(producto_id, None)
+            nombre_norm = self._nombres.pop(producto_id, None)
+            if nombre_norm is None:
+                continue
+
+            for ngrama in self._ngramas_de(nombre_norm):
+                self._descartar(self._ngramas, ngrama, producto_id)
+            for token in nombre_norm.split():
+                self._descartar(self._tokens, token, producto_id)
+            self._tokens_ordenados = None
+
+    def _conjunto(self, indice: Dict[str, Set[Any]], clave: str) -> Set[Any]:
+        """Conjunto de IDs de `clave` que se puede modificar (copiado si es compartido)."""
+        ids = indice.get(clave)
+        if self._propios is None:
+            if ids is None:
+                ids = indice[clave] = set()
+            return ids
+        marca = (id(indice), clave)
+        if marca not in self._propios:
+            ids = indice[clave] = set(ids or ())
+            self._propios.add(marca)
+        return ids
+
+    def _descartar(self, indice: Dict[str, Set[Any]], clave: str, producto_id: Any) -> None:
+        if producto_id not in indice.get(clave, ()):
+            return
+        ids = self._conjunto(indice, clave)
+        ids.discard(producto_id)
+        if not ids:
+            del indice[clave]
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Consultas
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def buscar(self, termino: str) -> Set[Any]:
+        """
+        Devuelve los IDs de productos cuyo nombre normalizado contiene el término.
+
+        Args:
+            termino: Texto a buscar (se normaliza igual que los nombres)
+
+        Returns:
+            Conjunto de IDs de producto
+        """
+        termino_norm = normalizar_nombre(termino)
+        if not termino_norm:
+            return set()
+
+        if len(termino_norm) < self.n:
+            # Términos muy cortos: no hay n-gramas, se comprueban los nombres ya normalizados
+            return {pid for pid, nombre in self._nombres.items() if termino_norm in nombre}
+
+        listas = []
+        for ngrama in self._ngramas_de(termino_norm):
+            ids = self._ngramas.get(ngrama)
+            if not ids:
+                return set()
+            listas.append(ids)
+
+        listas.sort(key=len)
+        candidatos = set(listas[0])
+        for ids in listas[1:]:
+            candidatos &= ids
+            if not candidatos:
+                return candidatos
+
+        # Los n-gramas comunes no garantizan que estén contiguos: verificar
+        return {pid for pid in candidatos if termino_norm in self._nombres.get(pid, "")}
+
+    def buscar_prefijo(self, prefijo: str) -> Set[Any]:
+        """
+        Devuelve los IDs de productos con alguna palabra que empiece por el prefijo.
+
+        Args:
+            prefijo: Inicio de palabra (se normaliza igual que los nombres)
+
+        Returns:
+            Conjunto de IDs de producto
+        """
+        prefijo_norm = normalizar_nombre(prefijo)
+        if not prefijo_norm:
+            return set()
+
+        if self._tokens_ordenados is None:
+            self._tokens_ordenados = sorted(self._tokens)
+
+        resultado: Set[Any] = set()
+        tokens = self._tokens_ordenados
+        for posicion in range(bisect_left(tokens, prefijo_norm), len(tokens)):
+            if not tokens[posicion].startswith(prefijo_norm):
+                break
+            resultado |= self._tokens.get(tokens[posicion], set())
+        return resultado
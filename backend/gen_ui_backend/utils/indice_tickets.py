@@ -0,0 +1,184 @@
+"""
+Índice SQLite del almacén de tickets.
+
+Una fila por ticket emitido con su fecha, total, número de artículos, el hash
+del contenido que comparte con otros tickets del mismo carrito y dónde leerlo:
+el archivo suelto de ese contenido en `registros/` o un trozo de un segmento
+comprimido en `segmentos/` (desplazamiento y longitud). Buscar un ticket es
+una consulta por clave primaria (árbol B, O(log n)) y listar por fechas usa el
+índice por `timestamp`, sin recorrer el directorio.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+ESQUEMA_INDICE = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    total REAL NOT NULL,
+    articulos INTEGER NOT NULL,
+    unidades INTEGER NOT NULL,
+    ruta TEXT NOT NULL,
+    desplazamiento INTEGER,
+    longitud INTEGER,
+    contenido TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tickets_por_fecha ON tickets (timestamp, id);
+CREATE INDEX IF NOT EXISTS tickets_por_ruta ON tickets (ruta);
+CREATE INDEX IF NOT EXISTS tickets_por_contenido ON tickets (contenido);
+"""
+
+# Filas por consulta al listar tickets por fecha
+LOTE_CONSULTA = 500
+
+COLUMNAS = ("id", "timestamp", "total", "articulos", "unidades", "ruta", "desplazamiento", "longitud", "contenido")
+
+
+class IndiceTickets:
+    """Índice de los tickets del almacén en una base de datos SQLite."""
+
+    def __init__(self, ruta_db: str):
+        """
+        Args:
+            ruta_db: Ruta del archivo SQLite (se crea si no existe)
+        """
+        self.ruta_db = ruta_db
+        os.makedirs(os.path.dirname(os.path.abspath(ruta_db)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta_db, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._migrar()
+        self._conexion.executescript(ESQUEMA_INDICE)
+
+    def _migrar(self) -> None:
+        """Añade `contenido` a índices anteriores, donde el ID de cada ticket era el hash de su contenido."""
+        columnas = {fila[1] for fila in self._conexion.execute("PRAGMA table_info(tickets)")}
+        if columnas and "contenido" not in columnas:
+            with self._conexion:
+                self._conexion.execute("ALTER TABLE tickets ADD COLUMN contenido TEXT")
+                self._conexion.execute("UPDATE tickets SET contenido = id")
+
+    def anadir(self, ticket_id: str, registro: Dict[str, Any], contenido: str, ruta: str) -> None:
+        """
+        Indexa un ticket cuyo contenido está en un archivo suelto (si ya estaba, no cambia nada).
+
+        Args:
+            ticket_id: ID del ticket
+            registro: Registro del ticket (de `crear_registro`)
+            contenido: Hash del contenido del ticket
+            ruta: Ruta del archivo del contenido, relativa al directorio del almacén
+        """
+        resumen = registro.get("resumen", {})
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR IGNORE INTO tickets (id, timestamp, total, articulos, unidades, ruta, contenido) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ticket_id, registro.get("timestamp", ""), resumen.get("total", 0.0),
+                 resumen.get("articulos_diferentes", 0), resumen.get("unidades_totales", 0), ruta, contenido)
+            )
+
+    def obtener(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """Fila de un ticket (ver `COLUMNAS`), o None si no está indexado."""
+        with self._lock:
+            fila = self._conexion.execute(
+                f"SELECT {', '.join(COLUMNAS)} FROM tickets WHERE id = ?", (ticket_id,)
+            ).fetchone()
+        return dict(zip(COLUMNAS, fila)) if fila else None
+
+    def entre(self, minimo: str = "", maximo: str = "~", lote: int = LOTE_CONSULTA) -> Iterator[str]:
+        """
+        IDs de los tickets con `minimo <= timestamp <= maximo`, por fecha, según se leen.
+
+        Se consultan por lotes de `lote` filas a partir de la última devuelta
+        (paginación por clave sobre `tickets_por_fecha`), así que ni se
+        construye la lista entera ni se retiene el lock de la conexión mientras
+        quien itera procesa cada ticket.
+        """
+        ultimo: Tuple[str, str] = (minimo, "")
+        while True:
+            with self._lock:
+                filas = self._conexion.execute(
+                    "SELECT timestamp, id FROM tickets WHERE (timestamp, id) > (?, ?) AND timestamp <= ? "
+                    "ORDER BY timestamp, id LIMIT ?",
+                    (*ultimo, maximo, lote)
+                ).fetchall()
+            for _, ticket_id in filas:
+                yield ticket_id
+            if len(filas) < lote:
+                return
+            ultimo = filas[-1]
+
+    def sueltos_anteriores(self, maximo: str, limite: int) -> List[Tuple[str, str, str, str]]:
+        """
+        (id, timestamp, contenido, ruta) de los tickets sin archivar con
+        `timestamp < maximo`, los más antiguos primero.
+        """
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT id, timestamp, contenido, ruta FROM tickets WHERE timestamp < ? AND desplazamiento IS NULL "
+                "ORDER BY timestamp, id LIMIT ?",
+                (maximo, limite)
+            ).fetchall()
+
+    def contenido_en_uso(self, contenido: str) -> bool:
+        """Indica si algún ticket sin archivar lee todavía el archivo suelto de un contenido."""
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT 1 FROM tickets WHERE contenido = ? AND desplazamiento IS NULL LIMIT 1", (contenido,)
+            ).fetchone() is not None
+
+    def archivar(self, ruta_segmento: str, posiciones: Iterable[Tuple[str, int, int]]) -> None:
+        """
+        Apunta varios tickets a su trozo dentro de un segmento, en una transacción.
+
+        Args:
+            ruta_segmento: Ruta del segmento, relativa al directorio del almacén
+            posiciones: (id, desplazamiento, longitud) de cada ticket
+        """
+        with self._lock, self._conexion:
+            self._conexion.executemany(
+                "UPDATE tickets SET ruta = ?, desplazamiento = ?, longitud = ? WHERE id = ?",
+                [(ruta_segmento, desplazamiento, longitud, ticket_id)
+                 for ticket_id, desplazamiento, longitud in posiciones]
+            )
+
+    def segmentos_anteriores(self, maximo: str) -> List[str]:
+        """Segmentos cuyos tickets son todos anteriores a `maximo`."""
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT ruta FROM tickets WHERE desplazamiento IS NOT NULL "
+                "GROUP BY ruta HAVING MAX(timestamp) < ?",
+                (maximo,)
+            ).fetchall()
+        return [fila[0] for fila in filas]
+
+    def eliminar_segmento(self, ruta_segmento: str) -> int:
+        """Quita del índice los tickets de un segmento y devuelve cuántos eran."""
+        with self._lock, self._conexion:
+            return self._conexion.execute(
+                "DELETE FROM tickets WHERE ruta = ? AND desplazamiento IS NOT NULL", (ruta_segmento,)
+            ).rowcount
+
+    def contar(self) -> Dict[str, int]:
+        """Tickets indexados, sueltos y archivados, y número de segmentos."""
+        with self._lock:
+            total, archivados, segmentos = self._conexion.execute(
+                "SELECT COUNT(*), COUNT(desplazamiento), "
+                "COUNT(DISTINCT CASE WHEN desplazamiento IS NOT NULL THEN ruta END) FROM tickets"
+            ).fetchone()
+        return {"tickets": total, "sueltos": total - archivados, "archivados": archivados, "segmentos": segmentos}
+
+    def cerrar(self) -> None:
+        self._conexion.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
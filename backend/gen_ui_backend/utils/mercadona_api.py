@@ -3,53 +3,82 @@ Utilidades para interactuar con la API de Mercadona.
 Funciones auxiliares para búsqueda, normalización y procesamiento de datos.
 """
 
+import asyncio
+import hashlib
+import os
 import requests
-import unicodedata
-import time
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence
+
+from gen_ui_backend.utils.cliente_http import (
+    ClienteHttpAsync,
+    LimitadorTokens,
+    crear_sesion,
+    ejecutar_sincrono,
+)
+from gen_ui_backend.utils.coalescencia import UnicoVuelo
+from gen_ui_backend.utils.normalizacion import normalizar_nombre  # noqa: F401 - reexportada
+from gen_ui_backend.utils.tabla_productos import FilaProducto, TablaProductos, como_tabla
+
+if TYPE_CHECKING:
+    from gen_ui_backend.utils.indice_productos import IndiceProductos
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # CONFIGURACIÓN Y CONSTANTES
 # ═══════════════════════════════════════════════════════════════════════════════
 
-BASE_URL = "https://tienda.mercadona.es/api/"
+# Se puede apuntar a un servidor local que reproduzca respuestas grabadas (ver test/servidor_mercadona.py)
+BASE_URL = os.getenv("MERCADONA_API_URL", "https://tienda.mercadona.es/api/")
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
     "Accept": "application/json"
 }
-REQUEST_DELAY = 0.3  # segundos entre peticiones
+PETICIONES_POR_SEGUNDO = 5  # tasa sostenida máxima contra la API
+RAFAGA_PETICIONES = 10  # peticiones que se pueden lanzar de golpe
+MAX_CONCURRENCIA = 8  # peticiones simultáneas (y conexiones keep-alive)
+TOP_K_ALTERNATIVAS = 3  # productos más baratos que se devuelven por cada búsqueda
+
+# Clientes compartidos por todo el proceso: reutilizan conexiones y comparten el límite de tasa
+LIMITADOR = LimitadorTokens(PETICIONES_POR_SEGUNDO, RAFAGA_PETICIONES)
+_sesion = crear_sesion(HEADERS, MAX_CONCURRENCIA)
+cliente_async = ClienteHttpAsync(HEADERS, LIMITADOR, MAX_CONCURRENCIA)
+# Las búsquedas concurrentes que piden la misma URL comparten una sola petición
+vuelos_api = UnicoVuelo()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # FUNCIONES AUXILIARES
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def normalizar_nombre(nombre: str) -> str:
+def hacer_peticion_api(url: str, timeout: int = 10) -> Optional[Dict]:
     """
-    Normaliza un nombre eliminando tildes y convirtiendo a minúsculas.
+    Realiza una petición GET a la API de Mercadona con manejo de errores.
     
     Args:
-        nombre: Texto a normalizar
+        url: URL completa a la que hacer la petición
+        timeout: Tiempo máximo de espera en segundos
         
     Returns:
-        Texto normalizado en minúsculas sin tildes
+        Diccionario con la respuesta JSON o None si hay error
     """
-    if not nombre:
-        return ""
-    
-    nombre = nombre.lower().strip()
-    # Eliminar tildes usando Unicode
-    nombre = ''.join(
-        c for c in unicodedata.normalize('NFD', nombre)
-        if unicodedata.category(c) != 'Mn'
-    )
-    return nombre
+    try:
+        LIMITADOR.adquirir()
+        response = _sesion.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        print(f"Error en petición a {url}: {e}")
+        return None
 
 
-def hacer_peticion_api(url: str, timeout: int = 10) -> Optional[Dict]:
+async def hacer_peticion_api_async(url: str, timeout: int = 10) -> Optional[Dict]:
     """
-    Realiza una petición GET a la API de Mercadona con manejo de errores.
+    Versión asíncrona de `hacer_peticion_api`.
+    
+    Usa el cliente compartido con pool de conexiones, límite de tasa y
+    concurrencia acotada, de modo que se puede esperar desde los nodos del grafo.
+    Si otra búsqueda ya está pidiendo la misma URL, espera su respuesta en
+    lugar de repetir la petición.
     
     Args:
         url: URL completa a la que hacer la petición
@@ -58,12 +87,68 @@ def hacer_peticion_api(url: str, timeout: int = 10) -> Optional[Dict]:
     Returns:
         Diccionario con la respuesta JSON o None si hay error
     """
+    return await vuelos_api.ejecutar(url, lambda: cliente_async.obtener_json(url, timeout))
+
+
+def obtener_catalogo_local():
+    """
+    Devuelve el catálogo local si está cargado, o None para usar la API.
+    
+    La importación es diferida porque `catalogo` depende de este módulo.
+    """
+    from gen_ui_backend.utils.catalogo import obtener_catalogo
+    
+    catalogo = obtener_catalogo()
+    return catalogo if catalogo.cargado else None
+
+
+def hacer_peticion_api_condicional(
+    url: str,
+    etag: Optional[str] = None,
+    hash_previo: Optional[str] = None,
+    timeout: int = 10
+) -> Optional[Dict[str, Any]]:
+    """
+    Realiza una petición GET de revalidación a la API de Mercadona.
+    
+    Envía `If-None-Match` con el ETag conocido y, si el servidor no lo soporta,
+    compara el hash del contenido para saber si la respuesta ha cambiado.
+    El JSON solo se decodifica cuando hay cambios.
+    
+    Args:
+        url: URL completa a la que hacer la petición
+        etag: ETag de la última respuesta conocida
+        hash_previo: Hash SHA-256 del contenido de la última respuesta conocida
+        timeout: Tiempo máximo de espera en segundos
+        
+    Returns:
+        Diccionario con:
+        - modificado: Si el contenido ha cambiado respecto al conocido
+        - data: JSON de la respuesta (None si no ha cambiado)
+        - etag: ETag de la respuesta
+        - hash: Hash SHA-256 del contenido
+        o None si hay error
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+    
     try:
-        time.sleep(REQUEST_DELAY)
-        response = requests.get(url, headers=HEADERS, timeout=timeout)
+        LIMITADOR.adquirir()
+        response = _sesion.get(url, headers=headers, timeout=timeout)
+        
+        if response.status_code == 304:
+            return {"modificado": False, "data": None, "etag": etag, "hash": hash_previo}
+        
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        hash_contenido = hashlib.sha256(response.content).hexdigest()
+        modificado = hash_contenido != hash_previo
+        
+        return {
+            "modificado": modificado,
+            "data": response.json() if modificado else None,
+            "etag": response.headers.get("ETag"),
+            "hash": hash_contenido
+        }
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error en petición a {url}: {e}")
         return None
 
@@ -90,17 +175,48 @@ def crear_diccionario_categorias() -> Dict[str, int]:
         >>> print(categorias["Carne"])
         3
     """
-    categorias_dict = {}
+    # Obtener categorías principales (del catálogo local si está disponible)
+    catalogo = obtener_catalogo_local()
+    if catalogo is not None:
+        return catalogo.diccionario_categorias()
     
-    # Obtener categorías principales
-    url_categorias = f"{BASE_URL}categories/"
-    data = hacer_peticion_api(url_categorias)
+    data = hacer_peticion_api(f"{BASE_URL}categories/")
+    return diccionario_desde_categorias(data.get("results") if data else None)
+
+
+async def crear_diccionario_categorias_async() -> Dict[str, int]:
+    """
+    Versión asíncrona de `crear_diccionario_categorias`.
     
-    if not data or "results" not in data:
+    Returns:
+        Diccionario con formato {nombre_categoria: id_categoria}
+    """
+    catalogo = obtener_catalogo_local()
+    if catalogo is not None:
+        return catalogo.diccionario_categorias()
+    
+    data = await hacer_peticion_api_async(f"{BASE_URL}categories/")
+    return diccionario_desde_categorias(data.get("results") if data else None)
+
+
+def diccionario_desde_categorias(categorias_principales: Optional[List[Dict[str, Any]]]) -> Dict[str, int]:
+    """
+    Construye el diccionario nombre -> ID a partir de la lista de categorías principales.
+    
+    Args:
+        categorias_principales: Lista `results` de `categories/` (None si la petición falló)
+        
+    Returns:
+        Diccionario con formato {nombre_categoria: id_categoria}
+    """
+    from gen_ui_backend.utils.indice_categorias import DiccionarioCategorias
+    
+    categorias_dict = DiccionarioCategorias()
+    
+    if categorias_principales is None:
         print("Error: No se pudieron obtener las categorías principales")
         return categorias_dict
     
-    categorias_principales = data["results"]
     print(f"✅ Obtenidas {len(categorias_principales)} categorías principales")
     
     # Recorrer cada categoría principal
@@ -159,6 +275,8 @@ def encontrar_numero_categoria(productos: List[str], diccionario_categorias: Opt
         >>> print(ids)
         [6, 5]
     """
+    from gen_ui_backend.utils.indice_categorias import DiccionarioCategorias
+    
     if diccionario_categorias is None:
         print("⚠️ No se proporcionó diccionario, creando uno nuevo...")
         diccionario_categorias = crear_diccionario_categorias()
@@ -167,38 +285,36 @@ def encontrar_numero_categoria(productos: List[str], diccionario_categorias: Opt
         print("❌ Error: No se pudo crear el diccionario de categorías")
         return []
     
+    # El índice se construye una sola vez por diccionario
+    if not isinstance(diccionario_categorias, DiccionarioCategorias):
+        diccionario_categorias = DiccionarioCategorias(diccionario_categorias)
+    
     categorias_ids = set()  # Usar set para evitar duplicados
     
-    for producto in productos:
-        if not producto:
-            continue
-        
-        producto_norm = normalizar_nombre(producto)
-        
-        # Buscar en el diccionario
-        for nombre_cat, cat_id in diccionario_categorias.items():
-            nombre_cat_norm = normalizar_nombre(str(nombre_cat))
-            
-            # Si el nombre del producto está contenido en el nombre de la categoría
-            if producto_norm in nombre_cat_norm:
+    # Si el nombre del producto está contenido en el nombre de la categoría
+    for producto, ids in diccionario_categorias.indice.resolver_lista(productos).items():
+        for cat_id in ids:
+            if cat_id not in categorias_ids:
                 categorias_ids.add(cat_id)
                 print(f"✅ '{producto}' encontrado en categoría ID: {cat_id}")
     
     return list(categorias_ids)
 
 
-def extraer_productos_de_categoria(categorias: List[int]) -> List[Dict[str, Any]]:
+def extraer_productos_de_categoria(categorias: List[int]) -> List[FilaProducto]:
     """
     Extrae todos los productos de las categorías especificadas.
     
-    Consulta la API de Mercadona para obtener todos los productos dentro de
-    las categorías dadas, incluyendo información de precios y detalles.
+    Consulta el catálogo local si está cargado y, si no, la API de Mercadona
+    para obtener todos los productos dentro de las categorías dadas,
+    incluyendo información de precios y detalles.
     
     Args:
         categorias: Lista de IDs de categorías/subcategorías de las que extraer productos
         
     Returns:
-        Lista de diccionarios con información de productos. Cada producto contiene:
+        Lista de productos (vistas de una `TablaProductos`, que se usan como
+        diccionarios de solo lectura). Cada producto contiene:
         - id: ID del producto
         - nombre: Nombre para mostrar
         - packaging: Información de empaquetado
@@ -214,106 +330,135 @@ def extraer_productos_de_categoria(categorias: List[int]) -> List[Dict[str, Any]
         >>> print(productos[0]["nombre"])
         'Leche semidesnatada Hacendado'
     """
+    catalogo = obtener_catalogo_local()
+    if catalogo is not None:
+        productos_mercadona = catalogo.productos_de_categorias(categorias)
+        print(f"✅ Total de productos extraídos (catálogo local): {len(productos_mercadona)}")
+        return productos_mercadona
+    
+    return ejecutar_sincrono(_extraer_productos_de_api(categorias))
+
+
+async def extraer_productos_de_categoria_async(categorias: List[int]) -> List[FilaProducto]:
+    """
+    Versión asíncrona de `extraer_productos_de_categoria`.
+    
+    Args:
+        categorias: Lista de IDs de categorías/subcategorías de las que extraer productos
+        
+    Returns:
+        Lista de productos (vistas de una `TablaProductos`)
+    """
+    catalogo = obtener_catalogo_local()
+    if catalogo is not None:
+        productos_mercadona = catalogo.productos_de_categorias(categorias)
+        print(f"✅ Total de productos extraídos (catálogo local): {len(productos_mercadona)}")
+        return productos_mercadona
+    
+    return await _extraer_productos_de_api(categorias)
+
+
+async def _extraer_productos_de_api(categorias: List[int]) -> List[FilaProducto]:
+    """
+    Extrae los productos de las categorías consultando la API.
+    
+    Las subcategorías necesarias se piden en paralelo con el cliente asíncrono
+    compartido; el resultado conserva el orden del catálogo.
+    """
     productos_mercadona = []
+    tabla = TablaProductos()
     productos_unicos = set()  # Para evitar duplicados por ID
     
     # Obtener todas las categorías con sus subcategorías
     url_categorias = f"{BASE_URL}categories/"
-    data = hacer_peticion_api(url_categorias)
+    data = await hacer_peticion_api_async(url_categorias)
     
     if not data or "results" not in data:
         print("❌ Error: No se pudieron obtener las categorías")
         return productos_mercadona
     
-    categorias_principales = data["results"]
-    
-    # Procesar cada categoría principal
-    for categoria in categorias_principales:
+    # Seleccionar las subcategorías solicitadas (o cuya categoría padre está en la lista)
+    subcategorias_a_extraer = []
+    for categoria in data["results"]:
         cat_id = categoria.get("id")
         
         if "categories" not in categoria:
             continue
         
-        # Verificar si alguna subcategoría o la categoría principal está en la lista solicitada
-        tiene_productos_para_extraer = False
-        
-        # Procesar subcategorías que vienen en la respuesta
         for subcat in categoria["categories"]:
-            subcat_id = subcat.get("id")
+            if subcat.get("id") in categorias or cat_id in categorias:
+                subcategorias_a_extraer.append((categoria, subcat))
+    
+    # Las subcategorías NO incluyen productos directamente:
+    # hay que pedir cada una para obtener sus sub-subcategorías con productos
+    print(f"🔎 Obteniendo productos de {len(subcategorias_a_extraer)} subcategorías en paralelo...")
+    respuestas = await asyncio.gather(*(
+        hacer_peticion_api_async(f"{BASE_URL}categories/{subcat.get('id')}")
+        for _, subcat in subcategorias_a_extraer
+    ))
+    
+    for (categoria, subcat), subcat_data in zip(subcategorias_a_extraer, respuestas):
+        print(f"   🔎 '{subcat.get('name')}' (ID: {subcat.get('id')}) - {categoria.get('name')}")
+        
+        if not subcat_data or "categories" not in subcat_data:
+            print("      ⚠️  No se pudieron obtener sub-subcategorías")
+            continue
+        
+        # Ahora SÍ tenemos las sub-subcategorías con productos
+        for sub_subcat in subcat_data["categories"]:
+            if "products" not in sub_subcat:
+                continue
             
-            # Si la subcategoría está en la lista solicitada O la categoría padre está en la lista
-            if subcat_id in categorias or cat_id in categorias:
-                if not tiene_productos_para_extraer:
-                    print(f"🔍 Procesando categoría ID: {cat_id} - {categoria.get('name')}")
-                    tiene_productos_para_extraer = True
-                
-                # Las subcategorías NO incluyen productos directamente
-                # Hay que hacer una petición a cada subcategoría para obtener sus sub-subcategorías con productos
-                print(f"   🔎 Obteniendo productos de '{subcat.get('name')}' (ID: {subcat_id})...")
-                
-                subcat_url = f"{BASE_URL}categories/{subcat_id}"
-                subcat_data = hacer_peticion_api(subcat_url)
+            productos = sub_subcat.get("products", [])
+            print(f"      📦 {sub_subcat.get('name')}: {len(productos)} productos")
+            
+            for producto in productos:
+                producto_id = producto.get("id")
                 
-                if not subcat_data or "categories" not in subcat_data:
-                    print("      ⚠️  No se pudieron obtener sub-subcategorías")
+                # Evitar duplicados
+                if not producto_id or producto_id in productos_unicos:
                     continue
                 
-                # Ahora SÍ tenemos las sub-subcategorías con productos
-                for sub_subcat in subcat_data["categories"]:
-                    if "products" not in sub_subcat:
-                        continue
-                    
-                    productos = sub_subcat.get("products", [])
-                    print(f"      📦 {sub_subcat.get('name')}: {len(productos)} productos")
-                    
-                    for producto in productos:
-                        producto_id = producto.get("id")
-                        
-                        # Evitar duplicados
-                        if not producto_id or producto_id in productos_unicos:
-                            continue
-                        
-                        # Extraer información del producto
-                        price_info = producto.get("price_instructions", {})
-                        
-                        producto_info = {
-                            "id": producto_id,
-                            "nombre": producto.get("display_name", ""),
-                            "packaging": producto.get("packaging", ""),
-                            "precio_unidad": price_info.get("unit_price", 0),
-                            "precio_bulk": price_info.get("bulk_price", ""),
-                            "precio_referencia": price_info.get("reference_price", ""),
-                            "formato_referencia": price_info.get("reference_format", ""),
-                            "categoria_id": cat_id,
-                            "categoria_nombre": categoria.get("name", ""),
-                            "subcategoria_id": subcat_id,
-                            "subcategoria_nombre": subcat.get("name", ""),
-                            "sub_subcategoria_id": sub_subcat.get("id"),
-                            "sub_subcategoria_nombre": sub_subcat.get("name", "")
-                        }
-                        
-                        productos_mercadona.append(producto_info)
-                        productos_unicos.add(producto_id)
+                # Extraer información del producto
+                fila = tabla.agregar_producto_api(producto, categoria, subcat, sub_subcat)
+                
+                productos_mercadona.append(tabla.fila(fila))
+                productos_unicos.add(producto_id)
     
     print(f"✅ Total de productos extraídos: {len(productos_mercadona)}")
     return productos_mercadona
 
 
-def mostrar_productos_seleccionados(productos_mercadona: List[Dict[str, Any]], productos_buscados: List[str]) -> List[Dict[str, Any]]:
+def mostrar_productos_seleccionados(
+    productos_mercadona: Sequence[Mapping[str, Any]],
+    productos_buscados: List[str],
+    indice: Optional["IndiceProductos"] = None,
+    top_k: int = TOP_K_ALTERNATIVAS
+) -> List[Dict[str, Any]]:
     """
     Encuentra productos que coincidan con los nombres buscados y selecciona el más barato.
     
     Para cada producto buscado, encuentra todas las coincidencias en la lista de
-    productos de Mercadona y devuelve el de menor precio.
+    productos de Mercadona y devuelve el de menor precio. Las coincidencias se
+    resuelven con un índice invertido sobre los nombres normalizados en lugar
+    de normalizar cada nombre para cada término, y el más barato se elige sobre
+    la columna de precios ya convertidos de la `TablaProductos`.
     
     Args:
-        productos_mercadona: Lista de productos extraídos de Mercadona
+        productos_mercadona: Lista de productos extraídos de Mercadona (vistas de una
+                             `TablaProductos` o diccionarios en el formato interno)
         productos_buscados: Lista de nombres de productos a buscar
+        indice: Índice ya construido que cubra los productos (p. ej. el del catálogo
+                local). Si no se proporciona, se construye uno para esta lista.
+        top_k: Número de productos más baratos a incluir en "mas_baratos"
         
     Returns:
         Lista de productos seleccionados (el más barato de cada coincidencia).
-        Cada producto incluye toda su información más un campo "producto_buscado"
-        que indica qué término de búsqueda coincidió.
+        Cada producto incluye toda su información más:
+        - producto_buscado: término de búsqueda que coincidió
+        - total_coincidencias: número de productos que coincidieron
+        - mas_baratos: los `top_k` más baratos por unidad (id, nombre, precio_unidad, packaging)
+        - mas_barato_por_formato: {formato_referencia: el de menor precio_referencia}
         
     Example:
         >>> productos = extraer_productos_de_categoria([6])
@@ -323,38 +468,48 @@ def mostrar_productos_seleccionados(productos_mercadona: List[Dict[str, Any]], p
         >>> print(seleccionados[0]["precio_unidad"])
         0.59
     """
+    from gen_ui_backend.utils.indice_productos import IndiceProductos
+    
     productos_seleccionados = []
     
+    if indice is None:
+        indice = IndiceProductos(productos_mercadona)
+    tabla, filas = como_tabla(productos_mercadona)
+    
+    # Posición de cada producto en la lista, para conservar su orden en los empates
+    posiciones = {}
+    for posicion, producto in enumerate(productos_mercadona):
+        posiciones.setdefault(producto.get("id"), posicion)
+    
     for producto_buscado in productos_buscados:
         if not producto_buscado:
             continue
         
-        producto_buscado_norm = normalizar_nombre(producto_buscado)
-        coincidencias = []
-        
-        # Buscar todas las coincidencias
-        for producto in productos_mercadona:
-            nombre_producto = producto.get("nombre", "")
-            nombre_norm = normalizar_nombre(nombre_producto)
-            
-            # Si el término buscado está en el nombre del producto
-            if producto_buscado_norm in nombre_norm:
-                coincidencias.append(producto)
+        # Buscar todas las coincidencias (el término está en el nombre del producto)
+        ids_coincidentes = [pid for pid in indice.buscar(producto_buscado) if pid in posiciones]
+        coincidencias = sorted((posiciones[pid] for pid in ids_coincidentes))
         
         if not coincidencias:
             print(f"⚠️ No se encontraron productos para: '{producto_buscado}'")
             continue
         
-        # Seleccionar el más barato
-        producto_mas_barato = min(
-            coincidencias, 
-            key=lambda p: float(p.get("precio_unidad", float('inf')))
-        )
+        # Seleccionar el más barato (argmin sobre la columna de precios ya convertidos)
+        filas_candidatas = [filas[posicion] for posicion in coincidencias]
+        mejor = tabla.argmin_precio(filas_candidatas)
+        producto_mas_barato = productos_mercadona[coincidencias[mejor]]
         
-        # Añadir información de búsqueda
-        producto_seleccionado = producto_mas_barato.copy()
+        # Añadir información de búsqueda (aquí se materializa el diccionario)
+        producto_seleccionado = dict(producto_mas_barato)
         producto_seleccionado["producto_buscado"] = producto_buscado
         producto_seleccionado["total_coincidencias"] = len(coincidencias)
+        producto_seleccionado["mas_baratos"] = [
+            _resumen_producto(productos_mercadona[coincidencias[posicion]], "precio_unidad", "packaging")
+            for posicion in tabla.mas_baratos(filas_candidatas, top_k)
+        ]
+        producto_seleccionado["mas_barato_por_formato"] = {
+            formato: _resumen_producto(productos_mercadona[coincidencias[posicion]], "precio_referencia")
+            for formato, posicion in tabla.mas_barato_por_formato(filas_candidatas).items()
+        }
         
         productos_seleccionados.append(producto_seleccionado)
         
@@ -362,3 +517,10 @@ def mostrar_productos_seleccionados(productos_mercadona: List[Dict[str, Any]], p
     
     return productos_seleccionados
 
+
+def _resumen_producto(producto: Mapping[str, Any], *campos: str) -> Dict[str, Any]:
+    """Extrae el ID, el nombre y los campos indicados de un producto."""
+    resumen = {"id": producto.get("id"), "nombre": producto.get("nombre", "")}
+    for campo in campos:
+        resumen[campo] = producto.get(campo, "")
+    return resumen
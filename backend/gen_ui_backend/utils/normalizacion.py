@@ -0,0 +1,105 @@
+"""
+Normalización de texto para búsquedas: minúsculas y sin tildes.
+
+Usa una tabla de traducción precalculada (`str.translate`) en lugar de
+descomponer cada carácter con `unicodedata`, y cachea los nombres ya vistos.
+El resultado es idéntico al de quitar las marcas diacríticas tras NFD.
+"""
+
+import sys
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+TAMANO_CACHE = 16384
+SEPARADOR_LOTE = "\x00"
+
+
+def _construir_tabla_sin_tildes() -> Dict[int, str]:
+    """Precalcula la traducción de los caracteres latinos acentuados a su forma base."""
+    tabla = {}
+    for codigo in range(0x80, 0x250):  # Latin-1, Latin Extended-A y B
+        caracter = chr(codigo)
+        sin_tildes = _quitar_tildes_unicode(caracter)
+        if sin_tildes != caracter:
+            tabla[codigo] = sin_tildes
+    return tabla
+
+
+def _quitar_tildes_unicode(texto: str) -> str:
+    """Elimina las marcas diacríticas (categoría Mn) tras la descomposición NFD."""
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', texto)
+        if unicodedata.category(c) != 'Mn'
+    )
+
+
+TABLA_SIN_TILDES = _construir_tabla_sin_tildes()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FUNCIONES DE NORMALIZACIÓN
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _quitar_tildes(texto: str) -> str:
+    """Quita tildes usando la tabla y recurre a Unicode solo para caracteres fuera de ella."""
+    if texto.isascii():
+        return texto
+    texto = texto.translate(TABLA_SIN_TILDES)
+    if texto.isascii():
+        return texto
+    return _quitar_tildes_unicode(texto)
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def _normalizar_cacheado(nombre: str) -> str:
+    return sys.intern(_quitar_tildes(nombre.lower().strip()))
+
+
+def normalizar_nombre(nombre: Optional[str]) -> str:
+    """
+    Normaliza un nombre eliminando tildes y convirtiendo a minúsculas.
+
+    Args:
+        nombre: Texto a normalizar
+
+    Returns:
+        Texto normalizado en minúsculas sin tildes
+    """
+    if not nombre:
+        return ""
+    return _normalizar_cacheado(nombre)
+
+
+def normalizar_lote(nombres: Iterable[Optional[str]]) -> List[str]:
+    """
+    Normaliza una lista completa de nombres en una sola llamada.
+
+    Une los nombres, aplica minúsculas y la tabla de tildes sobre el texto
+    completo y lo vuelve a separar, evitando el coste por elemento.
+
+    Args:
+        nombres: Textos a normalizar (los vacíos o None dan "")
+
+    Returns:
+        Lista de textos normalizados, en el mismo orden
+    """
+    nombres = [nombre or "" for nombre in nombres]
+    if not nombres:
+        return []
+    if any(SEPARADOR_LOTE in nombre for nombre in nombres):
+        return [normalizar_nombre(nombre) for nombre in nombres]
+
+    texto = _quitar_tildes(SEPARADOR_LOTE.join(nombres).lower())
+    return [parte.strip() for parte in texto.split(SEPARADOR_LOTE)]
+
+
+def info_cache() -> Dict[str, int]:
+    """Devuelve aciertos, fallos y tamaño de la caché de normalización."""
+    info = _normalizar_cacheado.cache_info()
+    return {"aciertos": info.hits, "fallos": info.misses, "tamano": info.currsize}
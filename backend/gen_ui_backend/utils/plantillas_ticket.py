@@ -0,0 +1,313 @@
+"""
+Plantillas del ticket de compra.
+
+Un solo motor para todos los sitios que dibujan el ticket: el ticket de texto
+de la respuesta, los archivos descargables (TXT, CSV y JSON) y la tabla
+markdown del mensaje final. Cada formato es una cabecera, un prefijo y una
+línea por producto y un pie, compilados una vez al importar el módulo.
+
+El render produce una secuencia de partes que se unen con un solo `join`
+(`renderizar`) o se envían según se generan a un archivo o socket (`escribir`)
+o a una respuesta HTTP en streaming (`bloques`), sin construir el ticket entero.
+
+Las líneas se pueden pasar ya renderizadas (`lineas`): es lo que hace el
+carrito, que guarda el texto de cada línea y solo lo regenera si cambia.
+"""
+
+import json
+import string
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Tamaño mínimo de cada bloque al enviar un ticket por partes
+TAMANO_BLOQUE = 16 * 1024
+
+FORMATO_FECHA = "%d/%m/%Y %H:%M:%S"
+
+_SEPARADOR = "───────────────────────────────────────────────────────"
+_DOBLE = "═══════════════════════════════════════════════════════"
+
+_CABECERA_TEXTO = f"""╔═══════════════════════════════════════════════════════╗
+║              MERCADONA - TICKET DE COMPRA             ║
+╚═══════════════════════════════════════════════════════╝
+
+Fecha: {{fecha}}
+
+{_SEPARADOR}
+PRODUCTOS
+{_SEPARADOR}
+"""
+
+_PIE_TEXTO = f"""{_SEPARADOR}
+RESUMEN
+{_SEPARADOR}
+Artículos diferentes: {{articulos_diferentes}}
+Unidades totales: {{unidades_totales}}
+
+Subtotal:        {{subtotal:>8.2f}}€
+Descuentos:      {{descuentos:>8.2f}}€
+{_SEPARADOR}
+TOTAL A PAGAR:   {{total:>8.2f}}€
+{_DOBLE}
+
+          ¡Gracias por su compra!
+          Vuelva pronto a Mercadona
+
+{_DOBLE}
+"""
+
+_LINEA_TEXTO = "{nombre}\n{linea_packaging}   {cantidad} x {precio_unitario:.2f}€ = {precio_total:.2f}€\n\n"
+
+_CABECERA_CSV = (
+    "MERCADONA - TICKET DE COMPRA\r\n"
+    "{fecha_csv}\r\n"
+    "\r\n"
+    "Nº,Producto,Cantidad,Precio Unitario (€),Precio Total (€),Packaging\r\n"
+)
+_LINEA_CSV = "{nombre_csv},{cantidad},{precio_unitario:.2f},{precio_total:.2f},{packaging_csv}\r\n"
+_PIE_CSV = (
+    "\r\n"
+    "RESUMEN\r\n"
+    "Artículos diferentes,{articulos_diferentes}\r\n"
+    "Unidades totales,{unidades_totales}\r\n"
+    "\r\n"
+    "Subtotal,{subtotal:.2f}€\r\n"
+    "Descuentos,{descuentos:.2f}€\r\n"
+    "TOTAL A PAGAR,{total:.2f}€\r\n"
+)
+
+_CABECERA_TABLA = (
+    "\n\n📦 **LISTA DE LA COMPRA**\n\n"
+    "| Nº | Producto | Cantidad | Precio Unit. | Precio Total |\n"
+    "|---|---|---|---|---|\n"
+)
+_LINEA_TABLA = "{nombre} | {cantidad} | {precio_unitario:.2f}€ | **{precio_total:.2f}€** |\n"
+
+
+def _campo_csv(valor: Any) -> str:
+    """Campo CSV con las mismas reglas que `csv.writer` (QUOTE_MINIMAL)."""
+    texto = str(valor)
+    if any(c in texto for c in ',"\r\n'):
+        return '"' + texto.replace('"', '""') + '"'
+    return texto
+
+
+def _recortar(nombre: str, maximo: Optional[int]) -> str:
+    if maximo is not None and len(nombre) > maximo:
+        return nombre[:maximo - 3] + "..."
+    return nombre
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MOTOR
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class Plantilla:
+    """Texto con campos `{nombre:formato}`, analizado una sola vez."""
+
+    def __init__(self, texto: str):
+        self._partes: List[Tuple[str, Optional[str], str]] = [
+            (literal, campo, especificacion or "")
+            for literal, campo, especificacion, _ in string.Formatter().parse(texto)
+        ]
+
+    def partes(self, valores: Mapping[str, Any]) -> Iterator[str]:
+        for literal, campo, especificacion in self._partes:
+            if literal:
+                yield literal
+            if campo is not None:
+                yield format(valores[campo], especificacion)
+
+    def renderizar(self, valores: Mapping[str, Any]) -> str:
+        return "".join(self.partes(valores))
+
+
+class FormatoTicket:
+    """
+    Un formato del ticket: cabecera, líneas numeradas y pie.
+
+    La cabecera y el pie reciben el resumen (`fecha`, `articulos_diferentes`,
+    `unidades_totales`, `subtotal`, `descuentos`, `total`); cada línea, un item
+    de `precio_info["items"]`. El número de línea va en un prefijo aparte para
+    que el texto de cada línea no dependa de su posición.
+    """
+
+    def __init__(
+        self,
+        nombre: str,
+        cabecera: str,
+        linea: str,
+        pie: str = "",
+        prefijo: str = "",
+        max_nombre: Optional[int] = None
+    ):
+        """
+        Args:
+            nombre: Nombre del formato (clave de la caché de líneas del carrito)
+            cabecera: Plantilla de la cabecera
+            linea: Plantilla de cada línea, sin el número
+            pie: Plantilla del pie
+            prefijo: Plantilla que precede a cada línea (con `{numero}`)
+            max_nombre: Longitud máxima del nombre del producto (None: completo)
+        """
+        self.nombre = nombre
+        self.max_nombre = max_nombre
+        self._cabecera = Plantilla(cabecera)
+        self._linea = Plantilla(linea)
+        self._pie = Plantilla(pie)
+        self._prefijo = Plantilla(prefijo)
+
+    def _valores_linea(self, item: Mapping[str, Any]) -> Dict[str, Any]:
+        nombre = _recortar(item.get("nombre", ""), self.max_nombre)
+        packaging = item.get("packaging", "")
+        return {
+            "nombre": nombre,
+            "nombre_csv": _campo_csv(nombre),
+            "packaging_csv": _campo_csv(packaging),
+            "linea_packaging": f"   {packaging}\n" if packaging else "",
+            "cantidad": item.get("cantidad", 0),
+            "precio_unitario": item.get("precio_unitario", 0.0),
+            "precio_total": item.get("precio_total", 0.0),
+        }
+
+    def linea(self, item: Mapping[str, Any]) -> str:
+        """Texto de una línea, sin el número (lo que guarda el carrito)."""
+        return self._linea.renderizar(self._valores_linea(item))
+
+    def partes(
+        self,
+        resumen: Mapping[str, Any],
+        items: Iterable[Mapping[str, Any]] = (),
+        lineas: Optional[Iterable[str]] = None
+    ) -> Iterator[str]:
+        """
+        Partes del ticket en orden.
+
+        Args:
+            resumen: Valores de la cabecera y el pie (ver `resumen_ticket`)
+            items: Items del ticket (se ignoran si se pasan `lineas`)
+            lineas: Líneas ya renderizadas con `linea`
+
+        Returns:
+            Iterador de trozos de texto
+        """
+        valores = {**resumen, "fecha_csv": _campo_csv(f"Fecha: {resumen.get('fecha', '')}")}
+        yield from self._cabecera.partes(valores)
+        if lineas is None:
+            lineas = (self.linea(item) for item in items)
+        for numero, linea in enumerate(lineas, 1):
+            yield from self._prefijo.partes({"numero": numero})
+            yield linea
+        yield from self._pie.partes(valores)
+
+    def renderizar(self, *args, **kwargs) -> str:
+        """El ticket completo, con un solo `join` (mismos argumentos que `partes`)."""
+        return "".join(self.partes(*args, **kwargs))
+
+    def escribir(self, destino: Any, *args, **kwargs) -> None:
+        """Envía el ticket por partes a cualquier objeto con `write` (archivo, `socket.makefile`...)."""
+        for parte in self.partes(*args, **kwargs):
+            destino.write(parte)
+
+    def bloques(self, *args, tamano: int = TAMANO_BLOQUE, **kwargs) -> Iterator[bytes]:
+        """El ticket en bloques UTF-8 de al menos `tamano` bytes, para respuestas en streaming."""
+        yield from agrupar_bloques(self.partes(*args, **kwargs), tamano)
+
+
+class FormatoJSON:
+    """
+    El registro del ticket en JSON con sangría, producto a producto.
+
+    Misma interfaz que `FormatoTicket`; el resultado es el de
+    `json.dumps(registro, ensure_ascii=False, indent=2)`.
+    """
+
+    nombre = "json"
+
+    def linea(self, item: Mapping[str, Any]) -> str:
+        texto = json.dumps(dict(item), ensure_ascii=False, indent=2)
+        return "    " + texto.replace("\n", "\n    ")
+
+    def partes(
+        self,
+        resumen: Mapping[str, Any],
+        items: Iterable[Mapping[str, Any]] = (),
+        lineas: Optional[Iterable[str]] = None
+    ) -> Iterator[str]:
+        cabecera = {clave: valor for clave, valor in resumen.items() if clave != "productos"}
+        texto = json.dumps(cabecera, ensure_ascii=False, indent=2)
+        yield texto[:-2] + ',\n  "productos": ['
+        if lineas is None:
+            lineas = (self.linea(item) for item in items)
+        separador = "\n"
+        for linea in lineas:
+            yield separador
+            yield linea
+            separador = ",\n"
+        yield "\n  ]\n}" if separador != "\n" else "]\n}"
+
+    renderizar = FormatoTicket.renderizar
+    escribir = FormatoTicket.escribir
+    bloques = FormatoTicket.bloques
+
+
+def agrupar_bloques(partes: Iterable[str], tamano: int = TAMANO_BLOQUE) -> Iterator[bytes]:
+    """Agrupa trozos de texto en bloques UTF-8 de al menos `tamano` bytes."""
+    pendientes: List[str] = []
+    acumulado = 0
+    for parte in partes:
+        pendientes.append(parte)
+        acumulado += len(parte)
+        if acumulado >= tamano:
+            yield "".join(pendientes).encode("utf-8")
+            pendientes, acumulado = [], 0
+    if pendientes:
+        yield "".join(pendientes).encode("utf-8")
+
+
+def resumen_ticket(precio_info: Mapping[str, Any], momento: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Valores de cabecera y pie a partir de la información de precios.
+
+    Args:
+        precio_info: Información de precios (de `calcular_precio_total` o del carrito)
+        momento: Fecha del ticket (por defecto, ahora)
+
+    Returns:
+        Dict con `fecha` y los campos del resumen del registro del ticket
+    """
+    return {
+        "fecha": (momento or datetime.now()).strftime(FORMATO_FECHA),
+        "articulos_diferentes": precio_info.get("num_items", 0),
+        "unidades_totales": precio_info.get("num_productos", 0),
+        "subtotal": precio_info.get("subtotal", 0.0),
+        "descuentos": precio_info.get("descuentos", 0.0),
+        "total": precio_info.get("total", 0.0),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FORMATOS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Ticket de texto de la respuesta del chat (nombres recortados)
+TICKET = FormatoTicket("ticket", _CABECERA_TEXTO, _LINEA_TEXTO, _PIE_TEXTO, "{numero}. ", max_nombre=40)
+
+# Archivo TXT descargable (nombres completos)
+TICKET_TXT = FormatoTicket("txt", _CABECERA_TEXTO, _LINEA_TEXTO, _PIE_TEXTO, "{numero}. ")
+
+# Archivo CSV descargable
+TICKET_CSV = FormatoTicket("csv", _CABECERA_CSV, _LINEA_CSV, _PIE_CSV, "{numero},")
+
+# Archivo JSON descargable (el registro del ticket)
+TICKET_JSON = FormatoJSON()
+
+# Tabla markdown del mensaje final
+TABLA_MARKDOWN = FormatoTicket("tabla", _CABECERA_TABLA, _LINEA_TABLA, prefijo="| {numero} | ", max_nombre=35)
+
+FORMATOS_ARCHIVO: Dict[str, Any] = {"json": TICKET_JSON, "txt": TICKET_TXT, "csv": TICKET_CSV}
@@ -0,0 +1,238 @@
+"""
+Refresco en segundo plano del catálogo local de Mercadona.
+
+Revalida periódicamente cada respuesta de la API (`categories/` y `categories/{id}`)
+con peticiones condicionales y solo vuelve a procesar las que han cambiado,
+de modo que la frescura del catálogo no se paga en el camino de cada petición.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from gen_ui_backend.utils.catalogo import (
+    ID_RAIZ,
+    NIVEL_CATEGORIA,
+    NIVEL_SUBCATEGORIA,
+    CatalogoMercadona,
+)
+from gen_ui_backend.utils.mercadona_api import BASE_URL, hacer_peticion_api_condicional
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+TTL_POR_NIVEL = {
+    NIVEL_CATEGORIA: float(os.getenv("MERCADONA_TTL_CATEGORIAS", 6 * 3600)),
+    NIVEL_SUBCATEGORIA: float(os.getenv("MERCADONA_TTL_SUBCATEGORIAS", 3600)),
+}
+INTERVALO_CICLO = float(os.getenv("MERCADONA_INTERVALO_REFRESCO", 60))  # segundos entre ciclos
+MAX_PETICIONES_POR_CICLO = 20
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REFRESCO DEL CATÁLOGO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class RefrescoCatalogo:
+    """
+    Trabajador que mantiene actualizado el catálogo local.
+
+    En cada ciclo revalida las respuestas cuyo TTL ha vencido, empezando por
+    las más antiguas y sin superar `max_peticiones_por_ciclo`, para repartir
+    la carga sobre la API a lo largo del tiempo.
+    """
+
+    def __init__(
+        self,
+        catalogo: CatalogoMercadona,
+        ttl_por_nivel: Optional[Dict[int, float]] = None,
+        ttl_por_categoria: Optional[Dict[int, float]] = None,
+        intervalo: float = INTERVALO_CICLO,
+        max_peticiones_por_ciclo: int = MAX_PETICIONES_POR_CICLO
+    ):
+        """
+        Args:
+            catalogo: Catálogo local a mantener
+            ttl_por_nivel: TTL en segundos por nivel (0 = `categories/`, 1 = subcategorías)
+            ttl_por_categoria: TTL en segundos para IDs concretos, con prioridad sobre el nivel
+            intervalo: Segundos de espera entre ciclos
+            max_peticiones_por_ciclo: Máximo de revalidaciones en cada ciclo
+        """
+        self.catalogo = catalogo
+        self.ttl_por_nivel = {**TTL_POR_NIVEL, **(ttl_por_nivel or {})}
+        self.ttl_por_categoria = dict(ttl_por_categoria or {})
+        self.intervalo = intervalo
+        self.max_peticiones_por_ciclo = max_peticiones_por_ciclo
+
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._contadores = {"ciclos": 0, "revalidadas": 0, "cambiadas": 0, "sin_cambios": 0, "errores": 0}
+        self._ultimo_ciclo: Optional[float] = None
+
+    def ttl(self, categoria_id: int, nivel: int) -> float:
+        """Devuelve el TTL aplicable a una respuesta."""
+        return self.ttl_por_categoria.get(categoria_id, self.ttl_por_nivel[nivel])
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Ciclo de refresco
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def entradas_vencidas(self, ahora: Optional[float] = None) -> Dict[int, Optional[Dict[str, Any]]]:
+        """
+        Devuelve las respuestas que hay que revalidar, ordenadas de más a menos antigua.
+
+        Las subcategorías sin validador guardado (nuevas) se consideran vencidas.
+        """
+        ahora = ahora or time.time()
+        estado = self.catalogo.estado_revalidacion()
+
+        candidatas = [(ID_RAIZ, NIVEL_CATEGORIA)]
+        candidatas += [(subcat_id, NIVEL_SUBCATEGORIA) for subcat_id in self.catalogo.ids_subcategorias()]
+
+        vencidas = []
+        for categoria_id, nivel in candidatas:
+            validador = estado.get(categoria_id)
+            revalidado_en = validador["revalidado_en"] if validador else 0.0
+            if ahora - revalidado_en >= self.ttl(categoria_id, nivel):
+                vencidas.append((revalidado_en, categoria_id, validador))
+
+        vencidas.sort(key=lambda entrada: entrada[0])
+        return {categoria_id: validador for _, categoria_id, validador in vencidas}
+
+    def ejecutar_ciclo(self) -> Dict[str, int]:
+        """
+        Revalida las respuestas vencidas y aplica los cambios al catálogo.
+
+        Returns:
+            Contadores del ciclo: revalidadas, cambiadas, sin_cambios y errores
+        """
+        resultado = {"revalidadas": 0, "cambiadas": 0, "sin_cambios": 0, "errores": 0}
+        vencidas = self.entradas_vencidas()
+
+        for categoria_id, validador in list(vencidas.items())[:self.max_peticiones_por_ciclo]:
+            if self._parar.is_set():
+                break
+
+            validador = validador or {}
+            url = f"{BASE_URL}categories/" if categoria_id == ID_RAIZ else f"{BASE_URL}categories/{categoria_id}"
+            respuesta = hacer_peticion_api_condicional(url, validador.get("etag"), validador.get("hash"))
+
+            if respuesta is None:
+                resultado["errores"] += 1
+                continue
+
+            if respuesta["modificado"]:
+                data = respuesta["data"] or {}
+                if categoria_id == ID_RAIZ and "results" in data:
+                    self.catalogo.actualizar_categorias_principales(data["results"])
+                elif categoria_id != ID_RAIZ and "categories" in data:
+                    self.catalogo.actualizar_subcategoria(categoria_id, data)
+                else:
+                    resultado["errores"] += 1
+                    continue
+                resultado["cambiadas"] += 1
+                print(f"🔄 Catálogo: respuesta {url} actualizada")
+            else:
+                resultado["sin_cambios"] += 1
+
+            self.catalogo.registrar_revalidacion(categoria_id, respuesta)
+            resultado["revalidadas"] += 1
+
+        if resultado["cambiadas"]:
+            # Reconstruir aquí el vocabulario del clasificador, no en la próxima petición
+            self.catalogo.vocabulario()
+
+        self._contadores["ciclos"] += 1
+        for clave, valor in resultado.items():
+            self._contadores[clave] += valor
+        self._ultimo_ciclo = time.time()
+        return resultado
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Hilo en segundo plano
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def iniciar(self) -> None:
+        """Arranca el hilo de refresco si no está en marcha."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="refresco-catalogo", daemon=True)
+        self._hilo.start()
+        print(f"✅ Refresco del catálogo iniciado (cada {self.intervalo:.0f}s)")
+
+    def detener(self, timeout: Optional[float] = None) -> None:
+        """Detiene el hilo de refresco y espera a que termine el ciclo en curso."""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def _bucle(self) -> None:
+        while not self._parar.is_set():
+            try:
+                self.ejecutar_ciclo()
+            except Exception as e:
+                self._contadores["errores"] += 1
+                print(f"❌ Error en el refresco del catálogo: {e}")
+            self._parar.wait(self.intervalo)
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Métricas
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve métricas de obsolescencia del catálogo.
+
+        Returns:
+            Diccionario con:
+            - antiguedad_maxima_s / antiguedad_media_s: segundos desde la última revalidación
+            - entradas_totales / entradas_vencidas: respuestas conocidas y pendientes de revalidar
+            - entradas_sin_validar: respuestas que todavía no se han revalidado nunca
+            - ultimo_ciclo: marca de tiempo del último ciclo completado
+            - contadores acumulados: ciclos, revalidadas, cambiadas, sin_cambios, errores
+        """
+        ahora = time.time()
+        estado = self.catalogo.estado_revalidacion()
+        ids = [ID_RAIZ] + self.catalogo.ids_subcategorias()
+        antiguedades = [ahora - estado[categoria_id]["revalidado_en"] for categoria_id in ids if categoria_id in estado]
+
+        return {
+            "antiguedad_maxima_s": round(max(antiguedades), 1) if antiguedades else None,
+            "antiguedad_media_s": round(sum(antiguedades) / len(antiguedades), 1) if antiguedades else None,
+            "entradas_totales": len(ids),
+            "entradas_sin_validar": len(ids) - len(antiguedades),
+            "entradas_vencidas": len(self.entradas_vencidas(ahora)),
+            "ultimo_ciclo": self._ultimo_ciclo,
+            **self._contadores,
+        }
+
+
+_refresco: Optional[RefrescoCatalogo] = None
+
+
+def iniciar_refresco_catalogo(catalogo: CatalogoMercadona, **opciones: Any) -> RefrescoCatalogo:
+    """
+    Arranca el refresco en segundo plano del catálogo compartido.
+
+    Args:
+        catalogo: Catálogo local a mantener
+        **opciones: Parámetros adicionales de `RefrescoCatalogo`
+
+    Returns:
+        El trabajador de refresco en marcha
+    """
+    global _refresco
+    if _refresco is None:
+        _refresco = RefrescoCatalogo(catalogo, **opciones)
+    _refresco.iniciar()
+    return _refresco
+
+
+def obtener_refresco_catalogo() -> Optional[RefrescoCatalogo]:
+    """Devuelve el trabajador de refresco en marcha, si lo hay."""
+    return _refresco
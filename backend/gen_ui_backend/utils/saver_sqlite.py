@@ -0,0 +1,77 @@
+"""
+Checkpointer de LangGraph sobre un fichero SQLite local.
+
+Requiere el paquete opcional `langgraph-checkpoint-sqlite` (comentado en
+`requirements.txt`, necesita langgraph>=0.2); se importa solo
+cuando `MERCADONA_CHECKPOINTER=sqlite` (ver `utils/checkpointer.py`).
+"""
+
+import asyncio
+import os
+import sqlite3
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+class SaverSQLite(SqliteSaver):
+    """
+    `SqliteSaver` que guarda el estado de cada conversación (`thread_id`) en un fichero.
+
+    `SqliteSaver` solo implementa la interfaz síncrona; aquí los métodos
+    asíncronos, que son los que usan `ainvoke` y `astream_events` (langserve),
+    ejecutan los síncronos en un hilo para no bloquear el bucle de eventos.
+    La conexión admite varios hilos y el saver serializa el acceso a ella.
+    """
+
+    def __init__(self, ruta_db: str):
+        """
+        Args:
+            ruta_db: Ruta del fichero SQLite (se crea si no existe)
+        """
+        directorio = os.path.dirname(os.path.abspath(ruta_db))
+        os.makedirs(directorio, exist_ok=True)
+        super().__init__(sqlite3.connect(ruta_db, check_same_thread=False))
+        self.ruta_db = ruta_db
+        self.setup()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuplas = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for tupla in tuplas:
+            yield tupla
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    def cerrar(self) -> None:
+        """Cierra la conexión con el fichero."""
+        self.conn.close()
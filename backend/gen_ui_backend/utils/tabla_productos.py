@@ -0,0 +1,343 @@
+"""
+Tabla columnar de productos de Mercadona.
+
+Guarda cada campo en una columna (cadenas internadas, precios en `array('d')`
+e IDs de categoría en `array('q')`) en lugar de un diccionario por producto.
+Los precios se convierten a número una sola vez, al ingerir cada producto.
+Las filas se exponen como vistas ligeras que solo se convierten en
+diccionarios al devolverse desde las tools.
+"""
+
+import heapq
+import sys
+from array import array
+from collections.abc import Mapping
+from itertools import count
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Campos de cada producto, en el orden del formato interno de búsqueda
+COLUMNAS = (
+    "id", "nombre", "packaging",
+    "precio_unidad", "precio_bulk", "precio_referencia", "formato_referencia",
+    "categoria_id", "categoria_nombre",
+    "subcategoria_id", "subcategoria_nombre",
+    "sub_subcategoria_id", "sub_subcategoria_nombre",
+)
+
+SIN_ID = -1  # Marca de "sin categoría" en las columnas enteras
+PRECIO_DESCONOCIDO = float("inf")  # Los precios ilegibles nunca ganan la selección
+
+
+def _internar(valor: Any) -> Any:
+    return sys.intern(valor) if type(valor) is str else valor
+
+
+def _a_precio(valor: Any) -> float:
+    """Convierte un precio de la API (texto o número) a float."""
+    try:
+        precio = float(valor)
+    except (TypeError, ValueError):
+        return PRECIO_DESCONOCIDO
+    return PRECIO_DESCONOCIDO if precio != precio else precio  # NaN
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TABLA DE PRODUCTOS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TablaProductos:
+    """
+    Almacén columnar de productos con el formato interno de búsqueda.
+
+    Las filas solo se añaden; quien necesite retirar productos mantiene sus
+    propias listas de filas vivas y compacta la tabla con `compactar`.
+    """
+
+    def __init__(self):
+        self.ids: List[Any] = []
+        self.nombres: List[str] = []
+        self.packaging: List[str] = []
+        self.precios_unidad_texto: List[Any] = []
+        self.precios_bulk: List[Any] = []
+        self.precios_referencia_texto: List[Any] = []
+        self.formatos_referencia: List[str] = []
+        self.precios_unidad = array("d")
+        self.precios_referencia = array("d")
+        self.categoria_ids = array("q")
+        self.subcategoria_ids = array("q")
+        self.sub_subcategoria_ids = array("q")
+        self._nombres_categoria: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Ingesta
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def _categoria(self, categoria_id: Any, nombre: Any) -> int:
+        if categoria_id is None:
+            return SIN_ID
+        if nombre or categoria_id not in self._nombres_categoria:
+            self._nombres_categoria[categoria_id] = _internar(nombre or "")
+        return categoria_id
+
+    def agregar(
+        self,
+        producto_id: Any,
+        nombre: str,
+        packaging: str,
+        precio_unidad: Any,
+        precio_bulk: Any,
+        precio_referencia: Any,
+        formato_referencia: str,
+        categoria: Dict[str, Any],
+        subcat: Dict[str, Any],
+        sub_subcat: Dict[str, Any]
+    ) -> int:
+        """
+        Añade un producto a la tabla.
+
+        Args:
+            producto_id, nombre, packaging: Datos del producto
+            precio_unidad, precio_bulk, precio_referencia, formato_referencia: Precios tal y como los da la API
+            categoria, subcat, sub_subcat: Nodos (con `id` y `name`) que contienen el producto
+
+        Returns:
+            Número de fila del producto
+        """
+        self.ids.append(_internar(producto_id))
+        self.nombres.append(_internar(nombre))
+        self.packaging.append(_internar(packaging))
+        self.precios_unidad_texto.append(_internar(precio_unidad))
+        self.precios_bulk.append(_internar(precio_bulk))
+        self.precios_referencia_texto.append(_internar(precio_referencia))
+        self.formatos_referencia.append(_internar(formato_referencia))
+        self.precios_unidad.append(_a_precio(precio_unidad))
+        self.precios_referencia.append(_a_precio(precio_referencia))
+        self.categoria_ids.append(self._categoria(categoria.get("id"), categoria.get("name")))
+        self.subcategoria_ids.append(self._categoria(subcat.get("id"), subcat.get("name")))
+        self.sub_subcategoria_ids.append(self._categoria(sub_subcat.get("id"), sub_subcat.get("name")))
+        return len(self.ids) - 1
+
+    def agregar_producto_api(
+        self,
+        producto: Dict[str, Any],
+        categoria: Dict[str, Any],
+        subcat: Dict[str, Any],
+        sub_subcat: Dict[str, Any]
+    ) -> int:
+        """
+        Añade un producto tal y como lo devuelve `categories/{id}`.
+
+        Returns:
+            Número de fila del producto
+        """
+        price_info = producto.get("price_instructions", {})
+        return self.agregar(
+            producto.get("id"),
+            producto.get("display_name", ""),
+            producto.get("packaging", ""),
+            price_info.get("unit_price", 0),
+            price_info.get("bulk_price", ""),
+            price_info.get("reference_price", ""),
+            price_info.get("reference_format", ""),
+            categoria, subcat, sub_subcat
+        )
+
+    def agregar_info(self, producto: Mapping) -> int:
+        """Añade un producto que ya está en el formato interno de búsqueda."""
+        return self.agregar(
+            producto.get("id"),
+            producto.get("nombre", ""),
+            producto.get("packaging", ""),
+            producto.get("precio_unidad", 0),
+            producto.get("precio_bulk", ""),
+            producto.get("precio_referencia", ""),
+            producto.get("formato_referencia", ""),
+            {"id": producto.get("categoria_id"), "name": producto.get("categoria_nombre", "")},
+            {"id": producto.get("subcategoria_id"), "name": producto.get("subcategoria_nombre", "")},
+            {"id": producto.get("sub_subcategoria_id"), "name": producto.get("sub_subcategoria_nombre", "")},
+        )
+
+    @classmethod
+    def desde_productos(cls, productos: Iterable[Mapping]) -> "TablaProductos":
+        """Construye una tabla a partir de productos en el formato interno."""
+        tabla = cls()
+        for producto in productos:
+            tabla.agregar_info(producto)
+        return tabla
+
+    def compactar(self, grupos: Dict[Any, Sequence[int]]) -> Tuple["TablaProductos", Dict[Any, array]]:
+        """
+        Copia en una tabla nueva solo las filas referenciadas por `grupos`.
+
+        Args:
+            grupos: Listas de filas vivas (p. ej. por subcategoría)
+
+        Returns:
+            (tabla nueva, mismas listas con los números de fila de la tabla nueva)
+        """
+        nueva = TablaProductos()
+        nueva._nombres_categoria = dict(self._nombres_categoria)
+        columnas = (
+            "ids", "nombres", "packaging", "precios_unidad_texto", "precios_bulk",
+            "precios_referencia_texto", "formatos_referencia", "precios_unidad",
+            "precios_referencia", "categoria_ids", "subcategoria_ids", "sub_subcategoria_ids",
+        )
+        origen = [getattr(self, columna) for columna in columnas]
+        destino = [getattr(nueva, columna) for columna in columnas]
+
+        grupos_nuevos = {}
+        for clave, filas in grupos.items():
+            inicio = len(nueva.ids)
+            for fila in filas:
+                for columna_origen, columna_destino in zip(origen, destino):
+                    columna_destino.append(columna_origen[fila])
+            grupos_nuevos[clave] = array("q", range(inicio, len(nueva.ids)))
+        return nueva, grupos_nuevos
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # Consultas
+    # ───────────────────────────────────────────────────────────────────────────
+
+    def nombre_categoria(self, categoria_id: int) -> str:
+        return self._nombres_categoria.get(categoria_id, "")
+
+    def fila(self, numero: int) -> "FilaProducto":
+        """Devuelve la vista de una fila."""
+        return FilaProducto(self, numero)
+
+    def filas(self, numeros: Iterable[int]) -> List["FilaProducto"]:
+        """Devuelve las vistas de varias filas, en el orden dado."""
+        return [FilaProducto(self, numero) for numero in numeros]
+
+    def argmin_precio(self, numeros: Sequence[int]) -> Optional[int]:
+        """
+        Devuelve la posición (dentro de `numeros`) de la fila con menor precio por unidad.
+
+        En caso de empate gana la primera, igual que `min`.
+        """
+        if not numeros:
+            return None
+        # Pares (precio, posición) leídos de la columna según se comparan, sin copiarla
+        return min(zip(map(self.precios_unidad.__getitem__, numeros), count()))[1]
+
+    def mas_baratos(self, numeros: Sequence[int], k: int) -> List[int]:
+        """
+        Devuelve las posiciones (dentro de `numeros`) de las `k` filas más baratas.
+
+        Ordenadas de menor a mayor precio por unidad; los empates conservan el orden dado.
+        """
+        if not numeros or k <= 0:
+            return []
+        pares = zip(map(self.precios_unidad.__getitem__, numeros), count())
+        return [posicion for _, posicion in heapq.nsmallest(k, pares)]
+
+    def mas_barato_por_formato(self, numeros: Sequence[int]) -> Dict[str, int]:
+        """
+        Devuelve, para cada formato de referencia (kg, L...), la posición de la fila
+        con menor precio de referencia.
+
+        Las filas sin formato o sin precio de referencia legible se ignoran.
+        """
+        mejores: Dict[str, int] = {}
+        mejores_precios: Dict[str, float] = {}
+        formatos = self.formatos_referencia
+        precios = self.precios_referencia
+        for posicion, fila in enumerate(numeros):
+            formato = formatos[fila]
+            precio = precios[fila]
+            if not formato or precio == PRECIO_DESCONOCIDO:
+                continue
+            if precio < mejores_precios.get(formato, PRECIO_DESCONOCIDO):
+                mejores[formato] = posicion
+                mejores_precios[formato] = precio
+        return mejores
+
+
+_ID = lambda c: None if c == SIN_ID else c  # noqa: E731
+
+_LECTORES: Dict[str, Callable[[TablaProductos, int], Any]] = {
+    "id": lambda t, i: t.ids[i],
+    "nombre": lambda t, i: t.nombres[i],
+    "packaging": lambda t, i: t.packaging[i],
+    "precio_unidad": lambda t, i: t.precios_unidad_texto[i],
+    "precio_bulk": lambda t, i: t.precios_bulk[i],
+    "precio_referencia": lambda t, i: t.precios_referencia_texto[i],
+    "formato_referencia": lambda t, i: t.formatos_referencia[i],
+    "categoria_id": lambda t, i: _ID(t.categoria_ids[i]),
+    "categoria_nombre": lambda t, i: t.nombre_categoria(t.categoria_ids[i]),
+    "subcategoria_id": lambda t, i: _ID(t.subcategoria_ids[i]),
+    "subcategoria_nombre": lambda t, i: t.nombre_categoria(t.subcategoria_ids[i]),
+    "sub_subcategoria_id": lambda t, i: _ID(t.sub_subcategoria_ids[i]),
+    "sub_subcategoria_nombre": lambda t, i: t.nombre_categoria(t.sub_subcategoria_ids[i]),
+}
+
+
+class FilaProducto(Mapping):
+    """
+    Vista de solo lectura de un producto de una `TablaProductos`.
+
+    Se usa como el diccionario del formato interno (`fila["nombre"]`,
+    `fila.get(...)`); `copy()` la convierte en un diccionario independiente.
+    """
+
+    __slots__ = ("tabla", "fila")
+
+    def __init__(self, tabla: TablaProductos, fila: int):
+        self.tabla = tabla
+        self.fila = fila
+
+    def __getitem__(self, clave: str) -> Any:
+        lector = _LECTORES.get(clave)
+        if lector is None:
+            raise KeyError(clave)
+        return lector(self.tabla, self.fila)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(COLUMNAS)
+
+    def __len__(self) -> int:
+        return len(COLUMNAS)
+
+    @property
+    def precio(self) -> float:
+        """Precio por unidad ya convertido a número."""
+        return self.tabla.precios_unidad[self.fila]
+
+    @property
+    def precio_referencia(self) -> float:
+        """Precio de referencia (por kg, L...) ya convertido a número."""
+        return self.tabla.precios_referencia[self.fila]
+
+    def copy(self) -> Dict[str, Any]:
+        """Materializa la fila como diccionario."""
+        return {columna: _LECTORES[columna](self.tabla, self.fila) for columna in COLUMNAS}
+
+    def __repr__(self) -> str:
+        return f"FilaProducto({self.copy()!r})"
+
+
+def como_tabla(productos: Sequence[Mapping]) -> Tuple[TablaProductos, List[int]]:
+    """
+    Devuelve la tabla y el número de fila de cada producto de la lista.
+
+    Si todos los productos son vistas de una misma tabla se reutiliza sin
+    copiar nada; si no, se construye una tabla con ellos.
+    """
+    tabla = None
+    for producto in productos:
+        if not isinstance(producto, FilaProducto) or (tabla is not None and producto.tabla is not tabla):
+            tabla = None
+            break
+        tabla = producto.tabla
+
+    if tabla is not None:
+        return tabla, [producto.fila for producto in productos]
+    return TablaProductos.desde_productos(productos), list(range(len(productos)))
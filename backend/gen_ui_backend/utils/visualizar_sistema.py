@@ -40,10 +40,11 @@ def mostrar_estructura():
   ┌─────────────────────────────────────────────────────────────┐
   │  🔍 AGENTE 2: BUSCADOR                                       │
   │  ─────────────────────────────────────────────────────────  │
-  │  • Busca "leche" → ✓ Leche Entera 1L - 1.20€              │
-  │  • Busca "pan" → ✓ Pan de Molde - 0.85€                   │
-  │  • Tools: buscar_producto_mercadona()                       │
-  │           buscar_multiples_productos()                      │
+  │  • Una rama en paralelo por producto (Send):                │
+  │      buscar_producto("leche") → ✓ Leche Entera 1L - 1.20€  │
+  │      buscar_producto("pan") → ✓ Pan de Molde - 0.85€       │
+  │  • consolidar_busqueda reúne los resultados                 │
+  │  • Tool: buscar_multiples_productos()                       │
   │  ─────────────────────────────────────────────────────────  │
   │  → Si encuentra productos: goto agente_3_calculador         │
   │  → Si no encuentra: END con mensaje de error                │
@@ -193,7 +194,10 @@ def informacion_tecnica():
         print(f"✓ Modelo: GPT-4o (OpenAI)")
         
         print("\nNodos del grafo:")
-        nodos = ["agente_1_clasificador", "agente_2_buscador", "agente_3_calculador"]
+        nodos = [
+            "agente_1_clasificador", "agente_2_buscador", "buscar_producto",
+            "consolidar_busqueda", "agente_3_calculador", "respuesta_final"
+        ]
         for i, nodo in enumerate(nodos, 1):
             print(f"  {i}. {nodo}")
         
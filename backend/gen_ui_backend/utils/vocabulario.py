@@ -0,0 +1,211 @@
+"""
+Vocabulario de productos del clasificador, construido a partir del catálogo.
+
+Reúne los nombres de categoría (los de `crear_diccionario_categorias`) y los
+nombres de producto del catálogo local y los compila en un autómata de
+Aho-Corasick sobre palabras: reconocer las menciones de un mensaje cuesta
+O(palabras del mensaje), sea cual sea el número de términos.
+
+Las palabras se comparan por su raíz (sin tildes y en singular), tanto al
+compilar como al reconocer, de modo que "plátanos" encuentra "Plátano".
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from gen_ui_backend.utils.normalizacion import normalizar_lote, normalizar_nombre
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURACIÓN Y CONSTANTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Palabras iniciales de un nombre de producto que se convierten en términos
+MAX_PALABRAS_TERMINO = 3
+
+# Los términos de una sola palabra más cortos son ambiguos ("té" → "te")
+LONGITUD_MINIMA_TERMINO = 3
+
+# Palabras que no pueden empezar ni terminar un término
+PALABRAS_VACIAS = frozenset({
+    "a", "al", "con", "de", "del", "e", "el", "en", "la", "las", "lo", "los",
+    "o", "para", "por", "sin", "su", "un", "una", "y",
+    # Envases y unidades: "bolsa de patatas" es una mención de "patatas"
+    "bandeja", "bolsa", "bote", "botella", "brick", "caja", "docena", "frasco",
+    "gramo", "kilo", "lata", "litro", "pack", "paquete", "pieza", "tarrina", "unidad",
+})
+
+_PATRON_PALABRA = re.compile(r"[^\W\d_]+|\d+")
+_SEPARADORES_CATEGORIA = re.compile(r",|\s+y\s+|\s+e\s+")
+_VOCALES = "aeiou"
+
+
+@lru_cache(maxsize=16384)
+def raiz(palabra: str) -> str:
+    """
+    Forma singular aproximada de una palabra ya normalizada.
+
+    No pretende ser un lematizador: basta con que singular y plural den la
+    misma raíz ("panes"/"pan", "leches"/"leche", "nueces"/"nuez").
+    """
+    if len(palabra) > 4 and palabra.endswith("es") and palabra[-4] in _VOCALES:
+        # Consonante simple tras vocal: "panes" → "pan", pero "postres" → "postre"
+        if palabra[-3] == "c":
+            return palabra[:-3] + "z"
+        if palabra[-3] in "dlnrj":
+            return palabra[:-2]
+    if len(palabra) > 3 and palabra.endswith("s"):
+        return palabra[:-1]
+    return palabra
+
+
+def _terminos_categoria(nombre: str) -> List[List[str]]:
+    """Parte un nombre de categoría en términos: "Aceite, especias y salsas" → aceite / especias / salsas."""
+    terminos = []
+    for parte in _SEPARADORES_CATEGORIA.split(nombre.lower()):
+        palabras = _PATRON_PALABRA.findall(parte)
+        if palabras:
+            terminos.append(palabras)
+    return terminos
+
+
+def _terminos_producto(nombre: str) -> List[List[str]]:
+    """Prefijos de hasta `MAX_PALABRAS_TERMINO` palabras del nombre: "pan", "pan de molde"..."""
+    palabras = _PATRON_PALABRA.findall(nombre.lower())
+    terminos = []
+    for longitud in range(1, min(len(palabras), MAX_PALABRAS_TERMINO) + 1):
+        if not palabras[longitud - 1].isalpha():
+            break
+        terminos.append(palabras[:longitud])
+    return terminos
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# AUTÓMATA
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class VocabularioProductos:
+    """
+    Autómata de Aho-Corasick cuyas transiciones son raíces de palabras.
+
+    Cada nodo guarda el término más largo que termina en él (propio o
+    heredado por su enlace de fallo), así que el reconocimiento emite como
+    mucho una coincidencia por palabra y selecciona las más largas sin solaparse.
+    """
+
+    def __init__(self, terminos: Iterable[Sequence[str]] = ()):
+        """
+        Args:
+            terminos: Términos como listas de palabras en minúsculas (con tildes).
+                Si dos términos tienen la misma raíz se conserva el primero.
+        """
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._salidas: List[Optional[Tuple[int, str]]] = [None]
+        self._fallos: List[int] = [0]
+        self._total = 0
+        for palabras in terminos:
+            self._insertar(palabras)
+        self._enlazar()
+
+    @classmethod
+    def desde_catalogo(
+        cls,
+        diccionario_categorias: Iterable[str],
+        nombres_productos: Iterable[str]
+    ) -> "VocabularioProductos":
+        """
+        Construye el vocabulario a partir de los nombres del catálogo.
+
+        Args:
+            diccionario_categorias: Nombres de categoría (las claves de `crear_diccionario_categorias`)
+            nombres_productos: Nombres de los productos del catálogo
+
+        Returns:
+            Vocabulario con los términos de categorías y productos
+        """
+        terminos: List[List[str]] = []
+        for nombre in diccionario_categorias:
+            terminos.extend(_terminos_categoria(str(nombre)))
+        for nombre in nombres_productos:
+            terminos.extend(_terminos_producto(nombre))
+        return cls(terminos)
+
+    def __len__(self) -> int:
+        return self._total
+
+    def _insertar(self, palabras: Sequence[str]) -> None:
+        raices = [raiz(p) for p in normalizar_lote(palabras)]
+        if not raices or raices[0] in PALABRAS_VACIAS or raices[-1] in PALABRAS_VACIAS:
+            return
+        if len(raices) == 1 and len(raices[0]) < LONGITUD_MINIMA_TERMINO:
+            return
+
+        nodo = 0
+        for palabra in raices:
+            siguiente = self._transiciones[nodo].get(palabra)
+            if siguiente is None:
+                siguiente = len(self._transiciones)
+                self._transiciones[nodo][palabra] = siguiente
+                self._transiciones.append({})
+                self._salidas.append(None)
+                self._fallos.append(0)
+            nodo = siguiente
+
+        if self._salidas[nodo] is None:
+            self._salidas[nodo] = (len(raices), " ".join(palabras))
+            self._total += 1
+
+    def _enlazar(self) -> None:
+        """Calcula los enlaces de fallo en anchura y hereda las salidas por ellos."""
+        cola = deque(self._transiciones[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for palabra, hijo in self._transiciones[nodo].items():
+                fallo = self._fallos[nodo]
+                while fallo and palabra not in self._transiciones[fallo]:
+                    fallo = self._fallos[fallo]
+                destino = self._transiciones[fallo].get(palabra, 0)
+                self._fallos[hijo] = destino if destino != hijo else 0
+                if self._salidas[hijo] is None:
+                    self._salidas[hijo] = self._salidas[self._fallos[hijo]]
+                cola.append(hijo)
+
+    def reconocer(self, palabras: Sequence[str]) -> List[Tuple[int, int, str]]:
+        """
+        Busca los términos del vocabulario en una secuencia de palabras.
+
+        Args:
+            palabras: Palabras del mensaje, ya normalizadas
+
+        Returns:
+            Lista de (inicio, fin, término) sobre los índices de `palabras`, sin
+            solapamientos y prefiriendo las coincidencias más largas
+        """
+        transiciones, fallos, salidas = self._transiciones, self._fallos, self._salidas
+        coincidencias = []
+        nodo = 0
+        for posicion, palabra in enumerate(palabras):
+            palabra = raiz(palabra)
+            while nodo and palabra not in transiciones[nodo]:
+                nodo = fallos[nodo]
+            nodo = transiciones[nodo].get(palabra, 0)
+            salida = salidas[nodo]
+            if salida is not None:
+                coincidencias.append((posicion + 1 - salida[0], posicion + 1, salida[1]))
+
+        # Las más largas primero entre las que empiezan en la misma palabra
+        coincidencias.sort(key=lambda c: (c[0], c[0] - c[1]))
+        seleccionadas = []
+        fin_anterior = 0
+        for inicio, fin, termino in coincidencias:
+            if inicio >= fin_anterior:
+                seleccionadas.append((inicio, fin, termino))
+                fin_anterior = fin
+        return seleccionadas
+
+    def reconocer_texto(self, texto: str) -> List[str]:
+        """Devuelve los términos mencionados en un texto libre."""
+        palabras = _PATRON_PALABRA.findall(normalizar_nombre(texto))
+        return [termino for _, _, termino in self.reconocer(palabras)]
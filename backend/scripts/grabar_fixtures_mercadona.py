@@ -0,0 +1,70 @@
+"""
+Graba respuestas reales de la API de Mercadona como fixtures para el servidor local.
+
+Guarda `categories/` y las respuestas `categories/{id}` de las subcategorías
+indicadas en el directorio de fixtures de `gen_ui_backend/test/servidor_mercadona.py`.
+
+Uso (desde backend/):
+    python scripts/grabar_fixtures_mercadona.py                 # todas las subcategorías
+    python scripts/grabar_fixtures_mercadona.py --ids 44 72 77  # solo algunas
+    python scripts/grabar_fixtures_mercadona.py --max-subcategorias 20 --destino /tmp/fixtures
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gen_ui_backend.test.servidor_mercadona import (  # noqa: E402
+    DIRECTORIO_FIXTURES,
+    RECURSO_CATEGORIAS,
+    guardar_fixture,
+)
+from gen_ui_backend.utils.mercadona_api import BASE_URL, hacer_peticion_api  # noqa: E402
+
+
+def grabar(destino: str, ids=None, max_subcategorias=None) -> int:
+    """
+    Descarga las respuestas de la API y las guarda en `destino`.
+
+    Returns:
+        Número de respuestas guardadas
+    """
+    data = hacer_peticion_api(f"{BASE_URL}{RECURSO_CATEGORIAS}/")
+    if not data or "results" not in data:
+        print("❌ Error: No se pudieron obtener las categorías")
+        return 0
+
+    subcategorias = [
+        subcat["id"]
+        for categoria in data["results"]
+        for subcat in categoria.get("categories", [])
+        if subcat.get("id") and (not ids or subcat["id"] in ids)
+    ]
+    if max_subcategorias:
+        subcategorias = subcategorias[:max_subcategorias]
+
+    guardar_fixture(destino, RECURSO_CATEGORIAS, data)
+    guardadas = 1
+    for subcat_id in subcategorias:
+        detalle = hacer_peticion_api(f"{BASE_URL}{RECURSO_CATEGORIAS}/{subcat_id}")
+        if not detalle or "categories" not in detalle:
+            print(f"   ⚠️  Sin respuesta para la subcategoría {subcat_id}")
+            continue
+        guardar_fixture(destino, f"{RECURSO_CATEGORIAS}/{subcat_id}", detalle)
+        guardadas += 1
+        print(f"   📦 categories/{subcat_id}")
+
+    print(f"✅ {guardadas} respuestas guardadas en {destino}")
+    return guardadas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Graba respuestas de la API de Mercadona como fixtures")
+    parser.add_argument("--destino", default=DIRECTORIO_FIXTURES, help="Directorio donde guardar las respuestas")
+    parser.add_argument("--ids", type=int, nargs="*", help="IDs de subcategorías a grabar (por defecto, todas)")
+    parser.add_argument("--max-subcategorias", type=int, help="Máximo de subcategorías a grabar")
+    args = parser.parse_args()
+
+    sys.exit(0 if grabar(args.destino, args.ids, args.max_subcategorias) else 1)
@@ -5,12 +5,17 @@ import { StreamEvent } from "@langchain/core/tracers/log_stream";
 import { EventHandlerFields } from "@/utils/server";
 import { createStreamableValue } from "ai/rsc";
 import { AIMessage } from "@/ai/message";
+import { EventoProgreso, ProgresoCompra } from "@/components/prebuilt/progreso-compra";
 
 const API_URL = "http://localhost:8000/chat";
+// Etiqueta y prefijo de los eventos de progreso del backend (utils/eventos.py)
+const ETIQUETA_EVENTO = "mercadona_evento";
+const PREFIJO_EVENTO = "evento_";
 
 async function agent(inputs: {
   input: string;
   chat_history: [role: string, content: string][];
+  thread_id?: string;
   file?: {
     base64: string;
     extension: string;
@@ -47,6 +52,35 @@ async function agent(inputs: {
     }
   };
 
+  /**
+   * Handles the progress events emitted by the agents (classification,
+   * per-product matches, running subtotal) so the UI can render them
+   * before the final answer arrives.
+   */
+  const eventosProgreso: EventoProgreso[] = [];
+  const handleProgresoEvent = (
+    event: StreamEvent,
+    fields: EventHandlerFields,
+  ) => {
+    if (
+      event.event !== "on_chain_end" ||
+      !event.tags?.includes(ETIQUETA_EVENTO) ||
+      !event.name.startsWith(PREFIJO_EVENTO)
+    )
+      return;
+    if (!fields.callbacks[ETIQUETA_EVENTO]) {
+      const progresoStream = createStreamableValue<EventoProgreso[]>();
+      fields.ui.append(<ProgresoCompra value={progresoStream.value} />);
+      fields.callbacks[ETIQUETA_EVENTO] = progresoStream;
+    }
+
+    eventosProgreso.push({
+      nombre: event.name.slice(PREFIJO_EVENTO.length),
+      datos: event.data.output,
+    });
+    fields.callbacks[ETIQUETA_EVENTO].update([...eventosProgreso]);
+  };
+
   return streamRunnableUI(
     remoteRunnable,
     {
@@ -63,8 +97,12 @@ async function agent(inputs: {
     },
     {
       eventHandlers: [
+        handleProgresoEvent,
         handleChatModelStreamEvent,
       ],
+      config: inputs.thread_id
+        ? { configurable: { thread_id: inputs.thread_id } }
+        : undefined,
     },
   );
 }
@@ -41,6 +41,8 @@ export default function Chat() {
 
   const [elements, setElements] = useState<JSX.Element[]>([]);
   const [history, setHistory] = useState<[role: string, content: string][]>([]);
+  // Identifica la conversación en el backend (estado guardado por turno)
+  const [threadId] = useState(() => crypto.randomUUID());
   const [input, setInput] = useState("");
   const [selectedFile, setSelectedFile] = useState<File>();
 
@@ -54,6 +56,7 @@ export default function Chat() {
     const element = await actions.agent({
       input,
       chat_history: history,
+      thread_id: threadId,
       file:
         base64File && fileExtension
           ? {
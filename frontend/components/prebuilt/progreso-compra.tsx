@@ -0,0 +1,62 @@
+"use client";
+
+import { StreamableValue, useStreamableValue } from "ai/rsc";
+
+/**
+ * Evento de progreso emitido por los agentes del backend
+ * (ver backend/gen_ui_backend/utils/eventos.py).
+ */
+export interface EventoProgreso {
+  nombre: string;
+  datos: Record<string, any>;
+}
+
+function formatearPrecio(valor: number | undefined): string {
+  return `${(valor ?? 0).toFixed(2)}€`;
+}
+
+function lineaEvento(evento: EventoProgreso): string | null {
+  const { nombre, datos } = evento;
+  switch (nombre) {
+    case "clasificacion":
+      return `📋 Buscando ${datos.productos?.length ?? 0} productos: ${(datos.productos ?? []).join(", ")}`;
+    case "producto":
+      if (!datos.encontrado) {
+        return `✗ ${datos.producto}: no disponible`;
+      }
+      return `✓ ${datos.nombre} — ${datos.cantidad} × ${formatearPrecio(datos.precio_unidad)} = ${formatearPrecio(datos.precio_total)}`;
+    case "busqueda_completada":
+      return `🔍 ${datos.encontrados} productos encontrados`;
+    case "linea_ticket":
+      return null;
+    case "total":
+      return `💰 Total: ${formatearPrecio(datos.total)}`;
+    default:
+      return null;
+  }
+}
+
+export function ProgresoCompra(props: { value: StreamableValue<EventoProgreso[]> }) {
+  const [eventos] = useStreamableValue(props.value);
+
+  if (!eventos || eventos.length === 0) {
+    return null;
+  }
+
+  const lineas = eventos.map(lineaEvento).filter((linea): linea is string => linea !== null);
+  const ultimaLinea = [...eventos].reverse().find((evento) => evento.nombre === "linea_ticket");
+  const hayTotal = eventos.some((evento) => evento.nombre === "total");
+
+  return (
+    <div className="flex mr-auto w-fit max-w-[700px] bg-green-50 border border-green-200 rounded-md px-2 py-1 mt-3 text-sm text-green-900">
+      <div className="flex flex-col gap-0.5">
+        {lineas.map((linea, i) => (
+          <span key={i}>{linea}</span>
+        ))}
+        {ultimaLinea && !hayTotal && (
+          <span>🧮 Subtotal: {formatearPrecio(ultimaLinea.datos.subtotal)}</span>
+        )}
+      </div>
+    </div>
+  );
+}
@@ -1,7 +1,7 @@
 import "server-only";
 import { AIProvider } from "./client";
 import { ReactNode } from "react";
-import { Runnable } from "@langchain/core/runnables";
+import { Runnable, RunnableConfig } from "@langchain/core/runnables";
 import { CompiledStateGraph } from "@langchain/langgraph";
 import { createStreamableUI, createStreamableValue } from "ai/rsc";
 import { StreamEvent } from "@langchain/core/tracers/log_stream";
@@ -34,6 +34,7 @@ export function streamRunnableUI<RunInput, RunOutput>(
   inputs: RunInput,
   options: {
     eventHandlers: Array<EventHandler>;
+    config?: RunnableConfig;
   },
 ) {
   const ui = createStreamableUI();
@@ -49,6 +50,7 @@ export function streamRunnableUI<RunInput, RunOutput>(
     for await (const streamEvent of (
       runnable as Runnable<RunInput, RunOutput>
     ).streamEvents(inputs, {
+      ...options.config,
       version: "v1",
     })) {
       for await (const handler of options.eventHandlers) {